@@ -1,9 +1,8 @@
 import os
-import random
 import string
 import httpx
-import asyncio
 import json # Added for potential context data parsing
+import hashlib
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel, Field
 
@@ -12,6 +11,9 @@ from google.adk.agents import LlmAgent
 from google.adk.runtime import InvocationContext
 from google.adk.runtime.events import Event
 
+from utils.a2a_transport import get_a2a_transport
+from utils.name_availability import get_name_availability_checker
+
 # Assuming ImprovedProductSpec structure is available or defined elsewhere
 # Define input based on what BrandingAgent needs from ImprovedProductSpec
 class BrandingAgentInput(BaseModel):
@@ -105,120 +107,62 @@ class BrandingAgent(LlmAgent): # Inherit from LlmAgent
 
         self.web_search_agent_url = web_search_agent_url or os.getenv("WEB_SEARCH_AGENT_URL")
         self.brave_api_key = os.getenv("BRAVE_API_KEY")
+        self.a2a_transport = get_a2a_transport() # Shared, pooled transport for A2A calls
+        self.availability_checker = get_name_availability_checker() # Batched, memoized name checks
 
         if not self.web_search_agent_url:
-            self.logger.warning("WEB_SEARCH_AGENT_URL is not configured. Availability checks will be skipped.")
+            self.logger.warning("WEB_SEARCH_AGENT_URL is not configured. Only domain availability will be checked.")
         if not self.brave_api_key:
             # Log warning, but allow continuation if only URL is missing (maybe search works without API key for some basic checks?)
             # Or raise an error if API key is absolutely essential for the WebSearchAgent. Let's warn for now.
             self.logger.warning("BRAVE_API_KEY is not configured. Web search functionality might be limited or fail.")
         self.logger.info(f"BrandingAgent initialized with model: {self.model_name}") # Added logging for model
 
-    async def _check_name_availability(self, name: str, client: httpx.AsyncClient) -> tuple[str, str]:
+    async def _web_search(self, query: str) -> Optional[List[Dict[str, Any]]]:
         """
-        Checks domain, social, and potentially trademark availability for a given name.
-        Returns a tuple: (summary_string, availability_status).
-        Status can be 'available', 'likely_taken', 'uncertain', 'error', or 'skipped'.
+        Runs one search through the WebSearchAgent (A2A).
+        Returns the result items (title, summary, source), or None if the search failed.
         """
-        if not self.web_search_agent_url or not self.brave_api_key:
-            self.logger.warning(f"Skipping availability check for '{name}' due to missing configuration.")
-            return "Availability check skipped (missing configuration).", "skipped"
-
-        # Simple check for common TLDs - more sophisticated checks might be needed
-        domain_query = f"Is the domain name {name.replace(' ', '').lower()}.com available?"
-        social_query = f"Are social media handles for '{name}' available on major platforms (Twitter, Instagram, Facebook)?"
-        # Trademark check is complex, a simple search might just look for existing usage
-        trademark_query = f"Are there existing trademarks or widely known brands called '{name}'?"
-
-        queries = {
-            "domain": domain_query,
-            "social": social_query,
-            "trademark": trademark_query
+        search_url = f"{self.web_search_agent_url}/a2a/web_search/invoke"
+        payload = {
+            "input": {
+                "event_type": "adk.agent.invoke",
+                "data": {"query": query},
+                "metadata": {"brave_api_key": self.brave_api_key} # Pass API key in metadata
+            },
+            # Deterministic ID so identical checks from concurrent workflows are coalesced
+            "invocation_id": f"branding-search-{hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]}",
+            "agent_id": "web_search_agent"
         }
-        results = {}
-        raw_search_details = {} # Store snippets for summary
-
-        async def perform_search(query_type: str, query: str):
-            search_url = f"{self.web_search_agent_url}/a2a/web_search/invoke"
-            payload = {
-                "input": {
-                    "event_type": "adk.agent.invoke",
-                    "data": {"query": query},
-                    "metadata": {"brave_api_key": self.brave_api_key} # Pass API key in metadata
-                },
-                "invocation_id": f"branding-search-{name.replace(' ', '-')}-{query_type}-{random.randint(1000, 9999)}",
-                "agent_id": "web_search_agent"
-            }
-            try:
-                self.logger.info(f"Sending search request for '{name}' ({query_type}) to {search_url}")
-                response = await client.post(search_url, json=payload, timeout=30.0)
-                response.raise_for_status() # Raise HTTPStatusError for bad responses (4xx or 5xx)
-                event_data = response.json()
-                self.logger.debug(f"Received search response for '{name}' ({query_type}): {event_data}")
-
-                if event_data.get("event_type") == "adk.agent.result" and isinstance(event_data.get("data"), dict):
-                    # Extract relevant info - structure depends on WebSearchAgent's output
-                    # Assuming 'summary' or 'results' field contains the answer
-                    search_result = event_data["data"].get("summary") or event_data["data"].get("results", "No specific result found.")
-                    # Basic interpretation (can be improved)
-                    raw_search_details[query_type] = f"{search_result[:150]}..." # Store for summary
-                    if "available" in str(search_result).lower() and "not available" not in str(search_result).lower():
-                        results[query_type] = "Likely Available"
-                    elif "not available" in str(search_result).lower() or "taken" in str(search_result).lower():
-                        results[query_type] = "Likely Unavailable"
-                    else:
-                        results[query_type] = "Unclear/Check Manually"
-                elif event_data.get("event_type") == "adk.agent.error":
-                     self.logger.error(f"WebSearchAgent returned error for '{name}' ({query_type}): {event_data.get('data')}")
-                     results[query_type] = "Error during check"
-                     raw_search_details[query_type] = "Error during check."
-                else:
-                    self.logger.warning(f"Unexpected event type from WebSearchAgent for '{name}' ({query_type}): {event_data.get('event_type')}")
-                    results[query_type] = "Unknown response format"
-                    raw_search_details[query_type] = "Unknown response format."
-
-            except httpx.HTTPStatusError as e:
-                self.logger.error(f"HTTP error calling WebSearchAgent for '{name}' ({query_type}): {e.response.status_code} - {e.response.text}")
-                results[query_type] = f"HTTP Error ({e.response.status_code})"
-                raw_search_details[query_type] = f"HTTP Error ({e.response.status_code})."
-            except httpx.RequestError as e:
-                self.logger.error(f"Request error calling WebSearchAgent for '{name}' ({query_type}): {e}")
-                results[query_type] = "Request Error"
-                raw_search_details[query_type] = "Request Error."
-            except Exception as e:
-                self.logger.error(f"Unexpected error during web search for '{name}' ({query_type}): {e}", exc_info=True)
-                results[query_type] = "Unexpected Error"
-                raw_search_details[query_type] = "Unexpected Error."
-
-        # Run searches concurrently
-        tasks = [perform_search(q_type, q_text) for q_type, q_text in queries.items()]
-        await asyncio.gather(*tasks)
-
-        # Format summary string including raw details
-        summary_str = (
-            f"Domain: {results.get('domain', 'N/A')} ({raw_search_details.get('domain', 'N/A')}). "
-            f"Social: {results.get('social', 'N/A')} ({raw_search_details.get('social', 'N/A')}). "
-            f"Trademark: {results.get('trademark', 'N/A')} ({raw_search_details.get('trademark', 'N/A')})"
-        )
-        self.logger.info(f"Availability check summary for '{name}': {summary_str}")
-
-        # Determine overall status
-        domain_status = results.get('domain')
-        social_status = results.get('social')
-        trademark_status = results.get('trademark')
-
-        if any(s and 'Error' in s for s in results.values()):
-            status = 'error'
-        elif domain_status == "Likely Unavailable" or trademark_status == "Likely Unavailable":
-            status = 'likely_taken'
-        elif domain_status == "Likely Available" and social_status != "Likely Unavailable":
-            # Prioritize domain availability, allow social to be unclear/taken if domain is good
-            status = 'available'
-        else: # Covers cases where domain is unclear, or domain is available but social is unavailable etc.
-            status = 'uncertain'
-
-        self.logger.info(f"Determined availability status for '{name}': {status}")
-        return summary_str, status
+        try:
+            self.logger.info(f"Sending search request '{query}' to {search_url}")
+            response = await self.a2a_transport.post_json(search_url, payload, timeout=30.0)
+            response.raise_for_status() # Raise HTTPStatusError for bad responses (4xx or 5xx)
+            event_data = response.json()
+        except httpx.HTTPStatusError as e:
+            self.logger.error(f"HTTP error calling WebSearchAgent for '{query}': {e.response.status_code} - {e.response.text}")
+            return None
+        except (httpx.RequestError, ValueError) as e:
+            self.logger.error(f"Request error calling WebSearchAgent for '{query}': {e}")
+            return None
+
+        data = event_data.get("data")
+        if event_data.get("event_type") == "adk.agent.error" or not isinstance(data, dict) or data.get("error"):
+            self.logger.error(f"WebSearchAgent returned error for '{query}': {data}")
+            return None
+        results = data.get("results")
+        return results if isinstance(results, list) else [] # e.g. {"message": "No results found ..."}
+
+    async def _check_names_availability(self, names: List[str]) -> Dict[str, tuple[str, str]]:
+        """
+        Checks domain, social, and trademark availability for all candidate names in one batch.
+        Returns name -> (summary_string, availability_status).
+        Status can be 'available', 'likely_taken', 'uncertain', or 'error'.
+        """
+        search = self._web_search if self.web_search_agent_url and self.brave_api_key else None
+        if search is None:
+            self.logger.warning("Web search not configured; checking domain availability only.")
+        return await self.availability_checker.check_many(names, search=search)
 
 
     async def run_async(self, context: InvocationContext) -> Event:
@@ -377,44 +321,28 @@ class BrandingAgent(LlmAgent): # Inherit from LlmAgent
             availability_statuses: Dict[str, str] = {}
             suggested_names_map: Dict[str, Dict] = {} # Map name to original suggestion dict
 
-            if self.web_search_agent_url and self.brave_api_key:
-                brand_suggestions = llm_data.get("brand_name_suggestions", [])
-                suggested_names = [s.get("value") for s in brand_suggestions if s.get("value")]
-
-                if not suggested_names:
-                     self.logger.warning("No brand name suggestions found in LLM response to check availability.")
-                else:
-                    # Store original suggestions for later lookup
-                    for suggestion in brand_suggestions:
-                        if suggestion.get("value"):
-                            suggested_names_map[suggestion["value"]] = suggestion
-
-                    self.logger.info(f"Checking availability for suggested names: {suggested_names}")
-                    async with httpx.AsyncClient() as client:
-                        tasks = [self._check_name_availability(name, client) for name in suggested_names]
-                        # results will be a list of tuples: [(summary1, status1), (summary2, status2), ...]
-                        check_results = await asyncio.gather(*tasks)
-
-                        # Populate notes and statuses dictionaries
-                        for i, name in enumerate(suggested_names):
-                            if i < len(check_results):
-                                summary, status = check_results[i]
-                                availability_notes[name] = summary
-                                availability_statuses[name] = status
-                            else:
-                                # Should not happen if gather worked correctly, but handle defensively
-                                availability_notes[name] = "Error retrieving check result."
-                                availability_statuses[name] = "error"
-
-                        self.logger.info(f"Availability check notes: {availability_notes}")
-                        self.logger.info(f"Availability check statuses: {availability_statuses}")
+            brand_suggestions = llm_data.get("brand_name_suggestions", [])
+            suggested_names = [s.get("value") for s in brand_suggestions if s.get("value")]
+
+            if not suggested_names:
+                 self.logger.warning("No brand name suggestions found in LLM response to check availability.")
             else:
-                self.logger.info("Skipping availability checks as Web Search Agent URL or Brave API Key is not configured.")
-                availability_notes = {"info": "Availability checks skipped due to missing configuration."}
-                # Populate statuses as skipped for any suggested names
-                for s in llm_data.get("brand_name_suggestions", []):
-                    if s.get("value"):
-                        availability_statuses[s["value"]] = "skipped"
+                # Store original suggestions for later lookup
+                for suggestion in brand_suggestions:
+                    if suggestion.get("value"):
+                        suggested_names_map[suggestion["value"]] = suggestion
+
+                self.logger.info(f"Checking availability for suggested names: {suggested_names}")
+                check_results = await self._check_names_availability(suggested_names)
+
+                # Populate notes and statuses dictionaries
+                for name in suggested_names:
+                    summary, status = check_results.get(name, ("Error retrieving check result.", "error"))
+                    availability_notes[name] = summary
+                    availability_statuses[name] = status
+
+                self.logger.info(f"Availability check notes: {availability_notes}")
+                self.logger.info(f"Availability check statuses: {availability_statuses}")
 
 
             # 6. Analyze Availability and Select Final Name
@@ -1,11 +1,14 @@
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from google import genai
 from google.adk.agents import LlmAgent
 from google.adk.runtime import InvocationContext, Event
 
+from utils.llm_cache import get_llm_cache
+from utils.task_stream import cached_stream_completion
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -44,6 +47,7 @@ class CodeGenerationAgent(LlmAgent):
             # instruction can be set here if needed, or rely on default/prompt
         )
         self.target_framework = target_framework
+        self.llm_cache = get_llm_cache() # Identical spec + branding => reuse the generated project
         # self.llm_model = genai.GenerativeModel('gemini-pro') # Removed direct instantiation
         logger.info(f"CodeGenerationAgent initialized with model: {self.model_name} for framework: {self.target_framework}")
 
@@ -80,7 +84,11 @@ class CodeGenerationAgent(LlmAgent):
             # 2. Call the LLM
             # TODO: Add retry logic, more sophisticated error handling for LLM calls
             # Use the LlmAgent's client, configured with the correct model
-            response_text = await self.llm_client.generate_text_async(prompt=prompt)
+            # Streamed so output reaches the active task stream (if any) as it is generated
+            response_text = await cached_stream_completion(
+                self.llm_cache, 'code_generation', self.model_name, prompt, self.llm_client,
+                validate=lambda text: '{' in text and '}' in text,
+            )
             logger.info("LLM response received.")
             # Assuming the LLM returns a JSON string mapping file paths to content
             # Need robust parsing and validation here
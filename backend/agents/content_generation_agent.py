@@ -5,6 +5,9 @@ from typing import Dict, List, Any, Optional
 from google.adk.agents import LlmAgent
 from google.adk.runtime import InvocationContext, Event
 
+from utils.llm_cache import get_llm_cache
+from utils.task_stream import cached_stream_completion, publish_delta
+
 logger = logging.getLogger(__name__)
 
 class ContentGenerationAgent(LlmAgent):
@@ -39,6 +42,7 @@ class ContentGenerationAgent(LlmAgent):
             model=adk_model # Pass the initialized ADK model object
             # instruction can be set here if needed, or rely on default/prompt
         )
+        self.llm_cache = get_llm_cache() # Shared LLM response cache
         logger.info(f"Content Generation Agent ({self.agent_id}) initialized with model: {self.model_name}.")
 
     async def run_async(self, context: InvocationContext) -> Optional[Event]:
@@ -120,9 +124,9 @@ class ContentGenerationAgent(LlmAgent):
         """Generates multiple affiliate marketing content pieces."""
         logger.info(f"[{self.agent_id}] Generating {quantity} affiliate content pieces for '{niche}' (focus: {focus})")
         contents = []
-        for _ in range(quantity):
-            title = await self._generate_title(niche, focus)
-            body = await self._generate_article_body(niche, focus)
+        for variant in range(quantity):
+            title = await self._generate_title(niche, focus, variant)
+            body = await self._generate_article_body(niche, focus, variant)
             contents.append({
                 "title": title,
                 "body": body,
@@ -159,12 +163,19 @@ class ContentGenerationAgent(LlmAgent):
         logger.info(f"[{self.agent_id}] Finished generating marketing copy for '{product_name}'.")
         return copy
 
-    async def _generate_title(self, niche: str, focus: str) -> str:
-        """Generates a content title using the LLM."""
+    async def _generate_title(self, niche: str, focus: str, variant: int = 0) -> str:
+        """
+        Generates a content title using the LLM.
+        ``variant`` is part of the cache key so pieces in one batch stay distinct.
+        """
         prompt = f"Generate a catchy {'conversion-focused' if focus == 'conversion' else 'informative'} title for an affiliate marketing article in the '{niche}' niche. Provide only the title text."
         try:
             # Use the LlmAgent's client
-            title = await self.llm_client.generate_text_async(prompt=prompt)
+            title = await cached_stream_completion(
+                self.llm_cache, 'content_generation', self.model_name, prompt, self.llm_client,
+                config={'variant': variant},
+            )
+            publish_delta("\n\n")
             # Accessing text might differ based on the exact LLM client response structure
             # Assuming response.text or similar attribute holds the generated text
             # title = response.text.strip() if hasattr(response, 'text') else str(response).strip() # generate_text_async returns string directly
@@ -184,15 +195,22 @@ class ContentGenerationAgent(LlmAgent):
             else:
                 return f"Ultimate Guide to {niche.title()} in 2025"
 
-    async def _generate_article_body(self, niche: str, focus: str) -> str:
-        """Generates an article body using the LLM."""
+    async def _generate_article_body(self, niche: str, focus: str, variant: int = 0) -> str:
+        """
+        Generates an article body using the LLM.
+        ``variant`` is part of the cache key so pieces in one batch stay distinct.
+        """
         prompt = f"Write a compelling {'conversion-focused' if focus == 'conversion' else 'informative'} affiliate marketing article body (around 200-300 words) about the '{niche}' niche. Focus on providing value and seamlessly integrating potential affiliate links (use placeholders like '[Product Link]')."
         try:
             # Assuming max_tokens or similar parameter can be passed via generate_text_async options
             # Note: ADK's generate_text_async might not directly support generation_config like this.
             # If specific config is needed, might need to use generate_content_async or adjust model defaults.
             # For now, assume default config is sufficient or handled by model init.
-            body = await self.llm_client.generate_text_async(prompt=prompt) # Removed generation_config for now
+            body = await cached_stream_completion(
+                self.llm_cache, 'content_generation', self.model_name, prompt, self.llm_client, # Removed generation_config for now
+                config={'variant': variant},
+            )
+            publish_delta("\n\n")
             # body = response.text.strip() if hasattr(response, 'text') else str(response).strip() # generate_text_async returns string directly
             body = body.strip() # Clean whitespace
             logger.debug(f"[{self.agent_id}] Generated article body (first 50 chars): '{body[:50]}...'")
@@ -5,16 +5,15 @@ import datetime
 import asyncio
 import json
 import time
-import tempfile
-import hashlib
-import zipfile # Added for Netlify deployment
-from pathlib import Path
 from typing import Dict, List, Any, Optional
 from typing import Union # Added for Union type
 
 import httpx # For Vercel API calls
 from pydantic import BaseModel, Field, HttpUrl, ValidationError
 
+from utils.deploy_manifest import DeployManifest, ManifestFile
+from utils.deployment_watcher import get_deployment_watcher
+
 # ADK Imports
 from google.adk.agents import Agent
 from google.adk.runtime import InvocationContext
@@ -82,9 +81,8 @@ class DeploymentAgent(Agent):
     """
     VERCEL_API_BASE_URL = "https://api.vercel.com"
     NETLIFY_API_BASE_URL = "https://api.netlify.com/api/v1"
-    # Deployment polling settings
-    POLL_INTERVAL_SECONDS = 5
-    MAX_POLL_ATTEMPTS = 24 # 2 minutes total
+    # 'digest' uploads only files Netlify does not have yet; 'zip' streams the whole site as a zip
+    NETLIFY_DEPLOY_MODE = os.environ.get("NETLIFY_DEPLOY_MODE", "digest").lower()
 
     def __init__(self):
         """Initialize the Deployment Agent and load Vercel & Netlify credentials."""
@@ -139,159 +137,59 @@ class DeploymentAgent(Agent):
         # Netlify might add suffixes if name is taken, this is just a suggestion
         return sanitized
 
-    async def _prepare_files_from_dict(self, temp_dir: Path, generated_code_dict: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
-        """Creates files from the provided dictionary and returns Vercel file structure."""
-        print(f"Preparing files from generated_code_dict in {temp_dir}")
-        file_data = {}
+    def _build_vercel_manifest(self, generated_code_dict: Dict[str, str]) -> DeployManifest:
+        """Hashes the generated files in memory and returns the content-addressed manifest."""
+        # Add vercel.json if not provided by the generator, as it's often needed
+        manifest = DeployManifest(generated_code_dict, defaults={"vercel.json": """{"framework": "vite"}"""}) # Minimal default
+        print(f"Prepared {len(manifest)} files ({manifest.total_bytes} bytes, {len(manifest.by_sha)} distinct digests) for Vercel.")
+        return manifest
 
-        try:
-            for relative_path_str, code_content in generated_code_dict.items():
-                # Ensure relative paths are handled correctly (no leading '/')
-                if relative_path_str.startswith('/'):
-                    relative_path_str = relative_path_str[1:]
-
-                absolute_path = temp_dir / relative_path_str
-                print(f"  Processing: {relative_path_str} -> {absolute_path}")
-
-                # Create parent directories if they don't exist
-                absolute_path.parent.mkdir(parents=True, exist_ok=True)
-
-                # Write file content (assuming text, adjust if binary needed)
-                # Vercel API needs bytes for hash/upload, so encode here
-                content_bytes = code_content.encode('utf-8')
-                absolute_path.write_bytes(content_bytes)
-
-                # Calculate hash and size for Vercel API
-                digest = hashlib.sha1(content_bytes).hexdigest()
-                size = len(content_bytes)
-
-                file_data[relative_path_str] = {
-                    "file": relative_path_str, # Use the relative path as the key Vercel expects
-                    "sha": digest,
-                    "size": size,
-                    "path": absolute_path # Keep absolute path for reading during upload
-                }
-                print(f"    Prepared: {relative_path_str} (Size: {size}, SHA: {digest[:7]}...)")
-
-            # Add vercel.json if not provided by the generator, as it's often needed
-            if "vercel.json" not in file_data:
-                 print("  Adding default vercel.json as it was not provided.")
-                 vercel_json_content = """{"framework": "vite"}""" # Minimal default
-                 vercel_json_path = temp_dir / "vercel.json"
-                 content_bytes = vercel_json_content.encode('utf-8')
-                 vercel_json_path.write_bytes(content_bytes)
-                 digest = hashlib.sha1(content_bytes).hexdigest()
-                 size = len(content_bytes)
-                 file_data["vercel.json"] = {
-                     "file": "vercel.json",
-                     "sha": digest,
-                     "size": size,
-                     "path": vercel_json_path
-                 }
-                 print(f"    Prepared: vercel.json (Size: {size}, SHA: {digest[:7]}...)")
-
-
-            return file_data
-
-        except OSError as e:
-            print(f"Error creating deployment files/directories from dict: {e}")
-            raise ValueError(f"Failed to prepare deployment files from dict: {e}") from e
-        except Exception as e:
-            print(f"Unexpected error preparing deployment files from dict: {e}")
-            import traceback
-            traceback.print_exc()
-            raise ValueError(f"Unexpected error preparing deployment files from dict: {e}") from e
-
-    async def _upload_file_to_vercel(self, file_info: Dict[str, Any]):
-        """Uploads a single file to Vercel using the dedicated client."""
+    async def _upload_file_to_vercel(self, manifest_file: ManifestFile) -> bool:
+        """Uploads a single file's content to Vercel using the dedicated client."""
         upload_url = f"{self.VERCEL_API_BASE_URL}/v2/files"
         headers = {
             "Authorization": f"Bearer {self.vercel_api_token}",
-            "Content-Length": str(file_info["size"]),
-            "x-vercel-digest": file_info["sha"],
-            # Potentially add 'x-vercel-content-type' if needed
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(manifest_file.size),
+            "x-vercel-digest": manifest_file.sha,
         }
-        if self.vercel_team_id:
-            headers["TeamId"] = self.vercel_team_id
+        params = {"teamId": self.vercel_team_id} if self.vercel_team_id else None
 
         try:
-            # Read bytes directly from the path stored in file_info
-            file_bytes = file_info["path"].read_bytes()
-            # Use httpx client directly for streaming upload
-            response = await self.vercel_client.post(upload_url, headers=headers, content=file_bytes)
+            response = await self.vercel_client.post(upload_url, headers=headers, params=params, content=manifest_file.content)
 
             if response.status_code == 200:
-                print(f"Successfully uploaded file: {file_info['file']}")
+                print(f"Successfully uploaded file: {manifest_file.path}")
                 return True
             else:
                 error_content = response.text # Read text directly
-                print(f"Error uploading file {file_info['file']}: {response.status_code} - {error_content}")
+                print(f"Error uploading file {manifest_file.path}: {response.status_code} - {error_content}")
                 return False
         except httpx.RequestError as e:
-            print(f"HTTP error uploading file {file_info['file']}: {e}")
+            print(f"HTTP error uploading file {manifest_file.path}: {e}")
             return False
         except Exception as e:
-            print(f"Unexpected error uploading file {file_info['file']}: {e}")
+            print(f"Unexpected error uploading file {manifest_file.path}: {e}")
             import traceback
             traceback.print_exc()
             return False
 
 
-    # --- Netlify file preparation (Zip from Dict) ---
-    async def _prepare_zip_from_dict(self, temp_dir: Path, project_name: str, generated_code_dict: Dict[str, str]) -> Path:
-        """Creates files from the provided dictionary within a site_root and zips it for Netlify."""
-        print(f"Preparing Netlify source zip from generated_code_dict for '{project_name}' in {temp_dir}")
-        site_root_dir = temp_dir / "site_root" # Root of the zip content
-
-        try:
-            # Create the base directory for zip contents
-            site_root_dir.mkdir(parents=True, exist_ok=True)
-
-            # --- Create Files from Dictionary ---
-            for relative_path_str, code_content in generated_code_dict.items():
-                # Ensure relative paths are handled correctly (no leading '/')
-                if relative_path_str.startswith('/'):
-                    relative_path_str = relative_path_str[1:]
-
-                absolute_path = site_root_dir / relative_path_str
-                print(f"  Processing for zip: {relative_path_str} -> {absolute_path}")
-
-                # Create parent directories if they don't exist within site_root_dir
-                absolute_path.parent.mkdir(parents=True, exist_ok=True)
-
-                # Write file content (assuming text)
-                absolute_path.write_text(code_content, encoding='utf-8')
-
-            # --- Create the zip archive ---
-            zip_filename = f"{project_name}-netlify-src.zip"
-            zip_path = temp_dir / zip_filename
-            print(f"Creating Netlify deployment source zip: {zip_path}")
-
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in site_root_dir.rglob('*'):
-                    if file_path.is_file():
-                        # Add file to zip using relative path from site_root_dir
-                        relative_path = file_path.relative_to(site_root_dir)
-                        zipf.write(file_path, relative_path)
-                        print(f"    Adding to zip: {relative_path}")
-
-            print(f"  Created deployment source zip: {zip_path} (Size: {zip_path.stat().st_size} bytes)")
-            # Reminder about Netlify build config is still relevant
-            print("  NOTE: Netlify site must be configured with appropriate build command and publish directory if build is needed.")
-            return zip_path
-
-        except OSError as e:
-            print(f"Error creating Netlify zip files/directories from dict: {e}")
-            raise ValueError(f"Failed to prepare Netlify zip from dict: {e}") from e
-        except Exception as e:
-            print(f"Unexpected error preparing Netlify zip from dict: {e}")
-            import traceback
-            traceback.print_exc()
-            raise ValueError(f"Unexpected error preparing Netlify zip from dict: {e}") from e
+    # --- Netlify file preparation (in memory) ---
+    def _build_netlify_manifest(self, generated_code_dict: Dict[str, str]) -> DeployManifest:
+        """Hashes the generated files in memory for a digest deploy (or a streamed zip)."""
+        manifest = DeployManifest(generated_code_dict)
+        print(f"Prepared {len(manifest)} files ({manifest.total_bytes} bytes, {len(manifest.by_sha)} distinct digests) for Netlify.")
+        # Reminder about Netlify build config is still relevant
+        print("  NOTE: Netlify site must be configured with appropriate build command and publish directory if build is needed.")
+        return manifest
 
 
     async def _trigger_vercel_deployment(self, project_name: str, files_data: List[Dict[str, Any]], target_environment: str) -> Optional[Dict[str, Any]]:
-        """Triggers the Vercel deployment with uploaded file details and target environment."""
+        """
+        Triggers the Vercel deployment with file digests and target environment.
+        If Vercel does not have some of the digests yet, returns {"error": "missing_files", "missing": [...]}.
+        """
         deployment_url = f"{self.VERCEL_API_BASE_URL}/v13/deployments"
         params = {}
         if self.vercel_team_id:
@@ -299,10 +197,7 @@ class DeploymentAgent(Agent):
 
         payload = {
             "name": project_name, # Vercel uses 'name' for the project identifier
-            "files": [
-                {"file": f_data["file"], "sha": f_data["sha"], "size": f_data["size"]}
-                for f_data in files_data
-            ],
+            "files": files_data,
             "projectSettings": { # Basic settings, can be expanded
                 "framework": "vite" # Hint Vercel to use Vite build presets
             },
@@ -323,6 +218,9 @@ class DeploymentAgent(Agent):
                 error_details = e.response.json()
             except json.JSONDecodeError:
                 error_details = {"raw_content": e.response.text}
+            error_info = error_details.get("error") if isinstance(error_details, dict) else None
+            if isinstance(error_info, dict) and error_info.get("code") == "missing_files":
+                return {"error": "missing_files", "missing": error_info.get("missing", [])}
             print(f"HTTP error triggering Vercel deployment for project '{project_name}': {e.response.status_code} - {error_details}")
             return {"error": "trigger_failed", "status_code": e.response.status_code, "details": error_details}
         except httpx.RequestError as e:
@@ -332,61 +230,16 @@ class DeploymentAgent(Agent):
             print(f"Unexpected error triggering Vercel deployment for project '{project_name}': {e}")
             return {"error": "unexpected", "details": str(e)}
 
-    # --- _monitor_vercel_deployment remains the same ---
-    async def _monitor_vercel_deployment(self, deployment_id: str, project_name: str) -> Optional[Dict[str, Any]]:
-        # ... (No changes needed here, but add project_name to logging) ...
-        status_url = f"{self.VERCEL_API_BASE_URL}/v13/deployments/{deployment_id}"
-        params = {}
-        if self.vercel_team_id:
-            params["teamId"] = self.vercel_team_id
-
-        print(f"Monitoring Vercel deployment {deployment_id} for project '{project_name}'...")
-        for attempt in range(self.MAX_POLL_ATTEMPTS):
-            try:
-                response = await self.vercel_client.get(status_url, params=params)
-                response.raise_for_status()
-                status_data = response.json()
-                state = status_data.get("readyState")
-                print(f"  Attempt {attempt + 1}/{self.MAX_POLL_ATTEMPTS}: Project '{project_name}', Deployment {deployment_id}, State = {state}")
-
-                if state == "READY":
-                    print(f"Deployment successful for project '{project_name}'!")
-                    return status_data
-                elif state in ["ERROR", "CANCELED"]:
-                    print(f"Deployment failed or canceled for project '{project_name}'. State: {state}")
-                    return {"error": "deployment_failed", "state": state, "details": status_data.get("error")}
-                elif state in ["BUILDING", "QUEUED", "INITIALIZING"]:
-                    # Continue polling
-                    await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
-                else:
-                    print(f"Unknown deployment state encountered for project '{project_name}': {state}")
-                    # Decide whether to treat as failure or keep polling
-                    await asyncio.sleep(self.POLL_INTERVAL_SECONDS) # Poll anyway for now
-
-            except httpx.HTTPStatusError as e:
-                error_details = None
-                try:
-                    error_details = e.response.json()
-                except json.JSONDecodeError:
-                    error_details = {"raw_content": e.response.text}
-                print(f"HTTP error monitoring deployment {deployment_id} for project '{project_name}': {e.response.status_code} - {error_details}")
-                # Consider if this is a terminal failure or worth retrying
-                if attempt == self.MAX_POLL_ATTEMPTS - 1:
-                    return {"error": "monitoring_http_error", "status_code": e.response.status_code, "details": error_details}
-                await asyncio.sleep(self.POLL_INTERVAL_SECONDS) # Retry after error
-            except httpx.RequestError as e:
-                print(f"Network error monitoring deployment {deployment_id} for project '{project_name}': {e}")
-                if attempt == self.MAX_POLL_ATTEMPTS - 1:
-                    return {"error": "monitoring_network_error", "details": str(e)}
-                await asyncio.sleep(self.POLL_INTERVAL_SECONDS) # Retry after error
-            except Exception as e:
-                 print(f"Unexpected error monitoring deployment {deployment_id} for project '{project_name}': {e}")
-                 if attempt == self.MAX_POLL_ATTEMPTS - 1:
-                     return {"error": "monitoring_unexpected_error", "details": str(e)}
-                 await asyncio.sleep(self.POLL_INTERVAL_SECONDS) # Retry after error
-
-        print(f"Deployment monitoring timed out for project '{project_name}'.")
-        return {"error": "timeout", "details": f"Deployment {deployment_id} did not reach READY state after {self.MAX_POLL_ATTEMPTS * self.POLL_INTERVAL_SECONDS} seconds."}
+    # --- Deployment status (shared watcher: one poll loop with backoff, plus webhooks) ---
+    async def _await_deployment(self, context: InvocationContext, platform: str, deployment_id: str, **meta: Any) -> Dict[str, Any]:
+        """Waits for a deployment to finish; state changes are pushed to clients as 'deployment_status' events."""
+        print(f"Waiting for {platform} deployment {deployment_id} to finish...")
+        return await get_deployment_watcher().watch(
+            platform,
+            deployment_id,
+            invocation_id=getattr(context, "invocation_id", None),
+            **meta,
+        )
 
 
     # --- Netlify API Helpers ---
@@ -426,33 +279,61 @@ class DeploymentAgent(Agent):
             print(f"Unexpected error creating Netlify site: {e}")
             raise ValueError(f"Unexpected error creating Netlify site: {e}") from e
 
-    async def _upload_and_deploy_netlify(self, site_id: str, zip_path: Path) -> Dict[str, Any]:
-        """Uploads the site zip and triggers a deployment on Netlify."""
-        deploy_url = f"/sites/{site_id}/deploys"
-        print(f"Uploading deployment zip '{zip_path.name}' to Netlify site {site_id}...")
-
-        headers = {
-            "Authorization": f"Bearer {self.netlify_auth_token}",
-            "Content-Type": "application/zip", # Crucial for zip deploy
-        }
+    async def _upload_file_to_netlify(self, deployment_id: str, manifest_file: ManifestFile) -> bool:
+        """Uploads a single file's content to a pending Netlify digest deploy."""
+        upload_url = f"/deploys/{deployment_id}/files/{manifest_file.path}"
+        headers = {"Content-Type": "application/octet-stream"}
 
         try:
-            async with zip_path.open("rb") as f:
-                zip_content = await f.read()
+            response = await self.netlify_client.put(upload_url, headers=headers, content=manifest_file.content)
+            if response.status_code == 200:
+                print(f"Successfully uploaded file to Netlify: {manifest_file.path}")
+                return True
+            print(f"Error uploading file {manifest_file.path} to Netlify: {response.status_code} - {response.text}")
+            return False
+        except httpx.RequestError as e:
+            print(f"HTTP error uploading file {manifest_file.path} to Netlify: {e}")
+            return False
+
+    async def _upload_and_deploy_netlify(self, site_id: str, manifest: DeployManifest) -> Dict[str, Any]:
+        """Creates a Netlify deployment from the manifest and uploads what Netlify still needs.
 
-            response = await self.netlify_client.post(deploy_url, headers=headers, content=zip_content)
+        In 'digest' mode (default) Netlify receives the path -> SHA1 map and lists the digests
+        it does not have; only those files are uploaded. In 'zip' mode the site is sent as a
+        zip archive, compressed and streamed in chunks straight from memory.
+        """
+        deploy_url = f"/sites/{site_id}/deploys"
+
+        try:
+            if self.NETLIFY_DEPLOY_MODE == "zip":
+                print(f"Streaming deployment zip ({len(manifest)} files) to Netlify site {site_id}...")
+                response = await self.netlify_client.post(
+                    deploy_url,
+                    headers={"Content-Type": "application/zip"}, # Crucial for zip deploy
+                    content=manifest.iter_zip(),
+                )
+            else:
+                print(f"Creating Netlify digest deploy ({len(manifest)} files) for site {site_id}...")
+                response = await self.netlify_client.post(deploy_url, json={"files": manifest.netlify_files()})
             response.raise_for_status()
             deploy_data = response.json()
             deployment_id = deploy_data.get("id")
-            required_files = deploy_data.get("required", []) # Netlify might ask for specific files if zip is incomplete
+            required_files = deploy_data.get("required", []) # Digests Netlify does not have yet
 
             if not deployment_id:
                  raise ValueError("Netlify API did not return a deployment ID after upload.")
             if required_files:
-                 # This indicates an issue with the zip or Netlify needing specific files uploaded individually
-                 # For simple static sites, this shouldn't happen often if zip is correct
-                 print(f"Warning: Netlify requires additional files: {required_files}. Deployment might be incomplete.")
-                 # Handle this case if necessary - might involve uploading individual files based on 'required' list
+                print(f"Netlify is missing {len(required_files)} of {len(manifest.by_sha)} file digests; uploading them.")
+                # Netlify stores uploads by path, so every path with a required digest is sent
+                failed_files = await manifest.upload_missing(
+                    required_files,
+                    lambda manifest_file: self._upload_file_to_netlify(deployment_id, manifest_file),
+                    every_path=True,
+                )
+                if failed_files:
+                    raise ValueError(f"File upload to Netlify failed for: {', '.join(failed_files)}")
+            else:
+                print(f"Netlify already has every file digest for site {site_id}; nothing to upload.")
 
             print(f"Successfully initiated Netlify deployment: ID {deployment_id} for site {site_id}")
             return deploy_data
@@ -467,65 +348,13 @@ class DeploymentAgent(Agent):
         except httpx.RequestError as e:
             print(f"Network error deploying to Netlify site {site_id}: {e}")
             raise ValueError(f"Network error deploying to Netlify: {e}") from e
+        except ValueError:
+            raise
         except Exception as e:
             print(f"Unexpected error deploying to Netlify site {site_id}: {e}")
             raise ValueError(f"Unexpected error deploying to Netlify: {e}") from e
 
 
-    async def _monitor_netlify_deployment(self, site_id: str, deployment_id: str) -> Dict[str, Any]:
-        """Monitors a Netlify deployment until it succeeds or fails."""
-        # Note: Netlify deployments are often very fast, but monitoring is good practice.
-        # The deploy endpoint response might already contain the final state for simple deploys.
-        status_url = f"/sites/{site_id}/deploys/{deployment_id}"
-        print(f"Monitoring Netlify deployment {deployment_id} for site {site_id}...")
-
-        for attempt in range(self.MAX_POLL_ATTEMPTS):
-            try:
-                response = await self.netlify_client.get(status_url)
-                response.raise_for_status()
-                status_data = response.json()
-                state = status_data.get("state")
-                print(f"  Attempt {attempt + 1}/{self.MAX_POLL_ATTEMPTS}: Site {site_id}, Deployment {deployment_id}, State = {state}")
-
-                if state == "ready":
-                    print(f"Netlify deployment successful for site {site_id}!")
-                    return status_data
-                elif state in ["error", "failed"]: # Check Netlify's specific failure states
-                    error_message = status_data.get("error_message", "Unknown error")
-                    print(f"Netlify deployment failed for site {site_id}. State: {state}, Reason: {error_message}")
-                    return {"error": "deployment_failed", "state": state, "details": error_message}
-                elif state in ["building", "uploading", "processing", "new"]: # Check Netlify's pending states
-                    # Continue polling
-                    await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
-                else:
-                    print(f"Unknown Netlify deployment state encountered for site {site_id}: {state}")
-                    await asyncio.sleep(self.POLL_INTERVAL_SECONDS) # Poll anyway
-
-            except httpx.HTTPStatusError as e:
-                error_details = None
-                try:
-                    error_details = e.response.json()
-                except json.JSONDecodeError:
-                    error_details = {"raw_content": e.response.text}
-                print(f"HTTP error monitoring Netlify deployment {deployment_id}: {e.response.status_code} - {error_details}")
-                if attempt == self.MAX_POLL_ATTEMPTS - 1:
-                    return {"error": "monitoring_http_error", "status_code": e.response.status_code, "details": error_details}
-                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
-            except httpx.RequestError as e:
-                print(f"Network error monitoring Netlify deployment {deployment_id}: {e}")
-                if attempt == self.MAX_POLL_ATTEMPTS - 1:
-                    return {"error": "monitoring_network_error", "details": str(e)}
-                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
-            except Exception as e:
-                 print(f"Unexpected error monitoring Netlify deployment {deployment_id}: {e}")
-                 if attempt == self.MAX_POLL_ATTEMPTS - 1:
-                     return {"error": "monitoring_unexpected_error", "details": str(e)}
-                 await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
-
-        print(f"Netlify deployment monitoring timed out for site {site_id}, deployment {deployment_id}.")
-        return {"error": "timeout", "details": f"Deployment {deployment_id} did not reach 'ready' state after {self.MAX_POLL_ATTEMPTS * self.POLL_INTERVAL_SECONDS} seconds."}
-
-
     async def run_async(self, context: InvocationContext):
         """Executes the deployment workflow for the specified target (Vercel or Netlify)."""
         print("DeploymentAgent run_async started.")
@@ -641,109 +470,96 @@ class DeploymentAgent(Agent):
         """Handles the entire Netlify deployment process using provided code."""
         print("Executing Netlify deployment...")
         brand_name = input_data.brand_name
-        temp_dir_obj = None
         site_id = self.netlify_site_id # Use provided site ID if available
         netlify_deployment_id = None
 
-        try:
-            # 1. Prepare files from dict and zip them
-            temp_dir_obj = tempfile.TemporaryDirectory()
-            temp_dir = Path(temp_dir_obj.name)
-            # Generate a project name suitable for the zip filename etc.
-            netlify_project_name = self._generate_netlify_site_name(brand_name) # Reuse site name logic for consistency
-            # Use the new preparation method
-            zip_path = await self._prepare_zip_from_dict(temp_dir, netlify_project_name, generated_code_dict)
-
-            # 2. Determine Site ID (Create if necessary)
-            if not site_id:
-                print("NETLIFY_SITE_ID not provided, attempting to create a new site...")
-                site_id = await self._create_netlify_site(brand_name)
-                # Store the created site_id for potential error reporting
-                # Note: This assignment won't persist across agent runs, but helps within this run.
-                # Consider storing created site IDs externally if persistence is needed.
-            else:
-                print(f"Using provided NETLIFY_SITE_ID: {site_id}")
-
+        # 1. Hash files in memory from dict (nothing is written to disk)
+        manifest = self._build_netlify_manifest(generated_code_dict)
+        if not len(manifest):
+            raise ValueError("File preparation step from dict returned no files.")
+
+        # 2. Determine Site ID (Create if necessary)
+        if not site_id:
+            print("NETLIFY_SITE_ID not provided, attempting to create a new site...")
+            site_id = await self._create_netlify_site(brand_name)
+            # Store the created site_id for potential error reporting
+            # Note: This assignment won't persist across agent runs, but helps within this run.
+            # Consider storing created site IDs externally if persistence is needed.
+        else:
+            print(f"Using provided NETLIFY_SITE_ID: {site_id}")
 
-            # 3. Upload Zip and Trigger Deployment
-            deploy_result = await self._upload_and_deploy_netlify(site_id, zip_path)
-            netlify_deployment_id = deploy_result.get("id")
-            if not netlify_deployment_id:
-                 raise ValueError("Failed to get deployment ID from Netlify after upload.")
 
-            # 4. Monitor Deployment (Optional but recommended)
-            # Check if deploy_result already indicates readiness (common for simple static deploys)
-            if deploy_result.get("state") == "ready":
-                print("Netlify deployment reported as 'ready' immediately after upload.")
-                monitor_result = deploy_result
-            else:
-                monitor_result = await self._monitor_netlify_deployment(site_id, netlify_deployment_id)
+        # 3. Create Deployment and Upload Missing Files
+        deploy_result = await self._upload_and_deploy_netlify(site_id, manifest)
+        netlify_deployment_id = deploy_result.get("id")
+        if not netlify_deployment_id:
+             raise ValueError("Failed to get deployment ID from Netlify after upload.")
 
-            if not monitor_result or monitor_result.get("error"):
-                reason = f"Netlify deployment failed: {monitor_result.get('error', 'Unknown monitoring error')}"
-                print(f"Deployment failed: {reason}")
-                await context.emit(Event(
-                    type="deployment.failed",
-                    payload=DeploymentFailedPayload(
-                        brand_name=brand_name,
-                        platform='netlify',
-                        reason=reason,
-                        error_details=monitor_result.get("details"),
-                        netlify_site_id=site_id,
-                        netlify_deployment_id=netlify_deployment_id
-                    ).model_dump(exclude_none=True)
-                ))
-                return
-
-            # 5. Emit Success Event
-            # Prefer ssl_url or deploy_ssl_url if available
-            deployment_url = monitor_result.get("ssl_url") or monitor_result.get("deploy_ssl_url") or monitor_result.get("url")
-            if not deployment_url:
-                # Fallback to default site URL if deploy URL isn't immediately available
-                site_info_url = f"/sites/{site_id}"
-                try:
-                    site_info_resp = await self.netlify_client.get(site_info_url)
-                    site_info_resp.raise_for_status()
-                    site_info = site_info_resp.json()
-                    deployment_url = site_info.get("ssl_url") or site_info.get("url")
-                    if not deployment_url:
-                        raise ValueError("Could not determine deployment URL from Netlify site info.")
-                    print(f"Warning: Deployment URL not in monitor result, using site URL: {deployment_url}")
-                except Exception as site_info_err:
-                    print(f"Error fetching site info to get URL: {site_info_err}")
-                    raise ValueError("Could not determine deployment URL from Netlify response or site info.") from site_info_err
-
-
-            features_deployed = [f.get("feature_name", f"Unnamed Feature {i+1}") for i, f in enumerate(input_data.key_features)]
-
-            success_payload = DeploymentResultPayload(
-                deployment_url=deployment_url,
-                brand_name=brand_name,
-                platform='netlify',
-                status=monitor_result.get("state", "READY").upper(), # Use Netlify state or default
-                features_deployed=features_deployed,
-                deployment_details=NetlifyDeploymentDetails(
-                    netlify_deployment_id=netlify_deployment_id,
-                    site_id=site_id,
-                    # deployment_time_utc handled by default factory
-                )
-            )
+        # 4. Monitor Deployment (Optional but recommended)
+        # Check if deploy_result already indicates readiness (common for simple static deploys)
+        if deploy_result.get("state") == "ready":
+            print("Netlify deployment reported as 'ready' immediately after upload.")
+            monitor_result = deploy_result
+        else:
+            monitor_result = await self._await_deployment(context, "netlify", netlify_deployment_id, site_id=site_id, brand_name=brand_name)
 
+        if not monitor_result or monitor_result.get("error"):
+            reason = f"Netlify deployment failed: {monitor_result.get('error', 'Unknown monitoring error')}"
+            print(f"Deployment failed: {reason}")
             await context.emit(Event(
-                type="deployment.succeeded",
-                payload=success_payload.model_dump(exclude_none=True)
+                type="deployment.failed",
+                payload=DeploymentFailedPayload(
+                    brand_name=brand_name,
+                    platform='netlify',
+                    reason=reason,
+                    error_details=monitor_result.get("details"),
+                    netlify_site_id=site_id,
+                    netlify_deployment_id=netlify_deployment_id
+                ).model_dump(exclude_none=True)
             ))
-            print(f"Netlify deployment finished successfully for site '{site_id}'. Status: {success_payload.status}, URL: {deployment_url}")
+            return
 
-        # Error handling is now done in the main run_async try/except block
-        # except ValueError as e: ... # Handled in run_async
-        finally:
-            if temp_dir_obj:
-                try:
-                    temp_dir_obj.cleanup()
-                    print(f"Cleaned up Netlify temp directory: {temp_dir_obj.name}")
-                except Exception as e:
-                    print(f"Warning: Failed to clean up Netlify temporary directory {temp_dir_obj.name}: {e}")
+        # 5. Emit Success Event
+        # Prefer ssl_url or deploy_ssl_url if available
+        deployment_url = monitor_result.get("ssl_url") or monitor_result.get("deploy_ssl_url") or monitor_result.get("url")
+        if not deployment_url:
+            # Fallback to default site URL if deploy URL isn't immediately available
+            site_info_url = f"/sites/{site_id}"
+            try:
+                site_info_resp = await self.netlify_client.get(site_info_url)
+                site_info_resp.raise_for_status()
+                site_info = site_info_resp.json()
+                deployment_url = site_info.get("ssl_url") or site_info.get("url")
+                if not deployment_url:
+                    raise ValueError("Could not determine deployment URL from Netlify site info.")
+                print(f"Warning: Deployment URL not in monitor result, using site URL: {deployment_url}")
+            except Exception as site_info_err:
+                print(f"Error fetching site info to get URL: {site_info_err}")
+                raise ValueError("Could not determine deployment URL from Netlify response or site info.") from site_info_err
+
+
+        features_deployed = [f.get("feature_name", f"Unnamed Feature {i+1}") for i, f in enumerate(input_data.key_features)]
+
+        success_payload = DeploymentResultPayload(
+            deployment_url=deployment_url,
+            brand_name=brand_name,
+            platform='netlify',
+            status=monitor_result.get("state", "READY").upper(), # Use Netlify state or default
+            features_deployed=features_deployed,
+            deployment_details=NetlifyDeploymentDetails(
+                netlify_deployment_id=netlify_deployment_id,
+                site_id=site_id,
+                # deployment_time_utc handled by default factory
+            )
+        )
+
+        await context.emit(Event(
+            type="deployment.succeeded",
+            payload=success_payload.model_dump(exclude_none=True)
+        ))
+        print(f"Netlify deployment finished successfully for site '{site_id}'. Status: {success_payload.status}, URL: {deployment_url}")
+
+        # Error handling is done in the main run_async try/except block
 
     # --- Vercel Deployment Logic (Refactored) ---
     async def _deploy_to_vercel(self, context: InvocationContext, input_data: DeploymentAgentInputData, generated_code_dict: Dict[str, str], project_name: str, deployment_target_env: str):
@@ -751,25 +567,23 @@ class DeploymentAgent(Agent):
         print(f"Executing Vercel deployment for project '{project_name}' to '{deployment_target_env}'...")
         brand_name = input_data.brand_name
         vercel_deployment_id = None
-        temp_dir_obj = None
-        try:
-            # 3. Prepare Files in a Temporary Directory from Dict
-            temp_dir_obj = tempfile.TemporaryDirectory()
-            temp_dir = Path(temp_dir_obj.name)
-            print(f"Preparing deployment files from dict in temporary directory: {temp_dir}")
-            # Use the new preparation method
-            files_data_map = await self._prepare_files_from_dict(temp_dir, generated_code_dict)
-            if not files_data_map:
-                 raise ValueError("File preparation step from dict returned no files.")
-            files_list = list(files_data_map.values()) # Vercel API needs list of file info dicts
-
-            # 4. Upload Files to Vercel
-            print(f"Uploading {len(files_list)} files to Vercel for project '{project_name}'...")
-            upload_tasks = [self._upload_file_to_vercel(file_info) for file_info in files_list]
-            upload_results = await asyncio.gather(*upload_tasks)
-
-            if not all(upload_results):
-                failed_files = [files_list[i]["file"] for i, success in enumerate(upload_results) if not success]
+        # 3. Hash Files in Memory from Dict (content-addressed; nothing is written to disk)
+        manifest = self._build_vercel_manifest(generated_code_dict)
+        if not len(manifest):
+             raise ValueError("File preparation step from dict returned no files.")
+        files_list = manifest.vercel_files() # Vercel API needs list of file info dicts
+
+        # 4./5. Trigger Deployment; Vercel answers with the digests it does not have yet,
+        # which are uploaded (bounded concurrency) before triggering again
+        print(f"Triggering Vercel deployment for project: {project_name} to {deployment_target_env}")
+        trigger_result = await self._trigger_vercel_deployment(project_name, files_list, deployment_target_env)
+
+        if trigger_result and trigger_result.get("error") == "missing_files":
+            missing = trigger_result.get("missing", [])
+            print(f"Vercel is missing {len(missing)} of {len(manifest.by_sha)} file digests for project '{project_name}'; uploading them.")
+            failed_files = await manifest.upload_missing(missing, self._upload_file_to_vercel)
+
+            if failed_files:
                 reason = f"File upload failed for: {', '.join(failed_files)}"
                 print(f"Deployment failed: {reason}")
                 await context.emit(Event(
@@ -779,106 +593,89 @@ class DeploymentAgent(Agent):
                         platform='vercel',
                         reason=reason,
                         error_details={"failed_files": failed_files}
-                        # project_name_attempted=project_name # Removed, project name is part of Vercel details
                     ).model_dump(exclude_none=True)
                 ))
                 return # Exit early
 
-            print(f"All files uploaded successfully for project '{project_name}'.")
-
-            # 5. Trigger Deployment
-            print(f"Triggering Vercel deployment for project: {project_name} to {deployment_target_env}")
+            print(f"All missing files uploaded for project '{project_name}'. Triggering deployment again.")
             trigger_result = await self._trigger_vercel_deployment(project_name, files_list, deployment_target_env)
 
-            if not trigger_result or trigger_result.get("error"):
-                reason = f"Failed to trigger Vercel deployment: {trigger_result.get('error', 'Unknown trigger error')}"
-                print(f"Deployment failed: {reason}")
-                await context.emit(Event(
-                    type="deployment.failed",
-                    payload=DeploymentFailedPayload( # Use the updated model
-                        brand_name=brand_name,
-                        platform='vercel',
-                        reason=reason,
-                        error_details=trigger_result.get("details")
-                        # project_name_attempted=project_name
-                    ).model_dump(exclude_none=True)
-                ))
-                return
-
-            vercel_deployment_id = trigger_result.get("id") # Corrected variable name
-            if not vercel_deployment_id:
-                 reason = "Vercel API did not return a deployment ID after trigger."
-                 print(f"Deployment failed: {reason}")
-                 await context.emit(Event(
-                    type="deployment.failed",
-                    payload=DeploymentFailedPayload( # Use the updated model
-                        brand_name=brand_name,
-                        platform='vercel',
-                        reason=reason,
-                        error_details=trigger_result
-                        # project_name_attempted=project_name
-                    ).model_dump(exclude_none=True)
-                ))
-                 return
+        if not trigger_result or trigger_result.get("error"):
+            reason = f"Failed to trigger Vercel deployment: {trigger_result.get('error', 'Unknown trigger error')}"
+            print(f"Deployment failed: {reason}")
+            await context.emit(Event(
+                type="deployment.failed",
+                payload=DeploymentFailedPayload( # Use the updated model
+                    brand_name=brand_name,
+                    platform='vercel',
+                    reason=reason,
+                    error_details=trigger_result.get("details") or {"missing": trigger_result.get("missing")}
+                    # project_name_attempted=project_name
+                ).model_dump(exclude_none=True)
+            ))
+            return
 
-            # 6. Monitor Deployment Status
-            # Pass project_name for better logging
-            monitor_result = await self._monitor_vercel_deployment(vercel_deployment_id, project_name)
+        vercel_deployment_id = trigger_result.get("id") # Corrected variable name
+        if not vercel_deployment_id:
+             reason = "Vercel API did not return a deployment ID after trigger."
+             print(f"Deployment failed: {reason}")
+             await context.emit(Event(
+                type="deployment.failed",
+                payload=DeploymentFailedPayload( # Use the updated model
+                    brand_name=brand_name,
+                    platform='vercel',
+                    reason=reason,
+                    error_details=trigger_result
+                    # project_name_attempted=project_name
+                ).model_dump(exclude_none=True)
+            ))
+             return
 
-            if not monitor_result or monitor_result.get("error"):
-                reason = f"Deployment failed during monitoring: {monitor_result.get('error', 'Unknown monitoring error')}"
-                print(f"Deployment failed: {reason}")
-                await context.emit(Event(
-                    type="deployment.failed",
-                    payload=DeploymentFailedPayload( # Use the updated model
-                        brand_name=brand_name,
-                        platform='vercel',
-                        reason=reason,
-                        error_details=monitor_result.get("details"),
-                        vercel_deployment_id=vercel_deployment_id, # Corrected variable name
-                        # project_name_attempted=project_name
-                    ).model_dump(exclude_none=True)
-                ))
-                return
-
-            # 7. Deployment Succeeded - Construct Payload and Emit Event
-            deployment_url = f"https://{monitor_result.get('url')}" # Vercel provides the final URL
-            # Extract feature names from the improved spec
-            features_deployed = [f.get("feature_name", f"Unnamed Feature {i+1}") for i, f in enumerate(input_data.key_features)]
-
-            success_payload = DeploymentResultPayload(
-                deployment_url=deployment_url,
-                brand_name=brand_name,
-                platform='vercel',
-                features_deployed=features_deployed,
-                deployment_details=VercelDeploymentDetails( # Assign to the Union field
-                    vercel_deployment_id=vercel_deployment_id, # Corrected variable name
-                    project_name=project_name, # Use the actual project name used
-                    region=monitor_result.get("regions", ["default"])[0], # Get region if available
-                    # environment=monitor_result.get("target", deployment_target_env) # Reflect actual env - Removed, not in VercelDeploymentDetails
-                    # deployment_time_utc is handled by default_factory
-                )
-            )
+        # 6. Monitor Deployment Status
+        # Pass project_name for better logging
+        monitor_result = await self._await_deployment(context, "vercel", vercel_deployment_id, project_name=project_name, brand_name=brand_name)
 
+        if not monitor_result or monitor_result.get("error"):
+            reason = f"Deployment failed during monitoring: {monitor_result.get('error', 'Unknown monitoring error')}"
+            print(f"Deployment failed: {reason}")
             await context.emit(Event(
-                type="deployment.succeeded",
-                payload=success_payload.model_dump(exclude_none=True)
+                type="deployment.failed",
+                payload=DeploymentFailedPayload( # Use the updated model
+                    brand_name=brand_name,
+                    platform='vercel',
+                    reason=reason,
+                    error_details=monitor_result.get("details"),
+                    vercel_deployment_id=vercel_deployment_id, # Corrected variable name
+                    # project_name_attempted=project_name
+                ).model_dump(exclude_none=True)
             ))
-            print(f"Vercel deployment finished successfully for project '{project_name}'. Status: READY, URL: {deployment_url}")
+            return
 
-        # Error handling is now done in the main run_async try/except block
-        # except httpx.HTTPStatusError as e: ...
-        # except httpx.RequestError as e: ...
-        # except Exception as e: ...
-        finally:
-            # 8. Clean up temporary directory
-            if temp_dir_obj:
-                try:
-                    temp_dir_obj.cleanup()
-                    print(f"Cleaned up temporary directory: {temp_dir}")
-                except Exception as e:
-                    print(f"Warning: Failed to clean up temporary directory {temp_dir}: {e}")
-            # Closing the client is handled in run_async's finally block
+        # 7. Deployment Succeeded - Construct Payload and Emit Event
+        deployment_url = f"https://{monitor_result.get('url')}" # Vercel provides the final URL
+        # Extract feature names from the improved spec
+        features_deployed = [f.get("feature_name", f"Unnamed Feature {i+1}") for i, f in enumerate(input_data.key_features)]
+
+        success_payload = DeploymentResultPayload(
+            deployment_url=deployment_url,
+            brand_name=brand_name,
+            platform='vercel',
+            features_deployed=features_deployed,
+            deployment_details=VercelDeploymentDetails( # Assign to the Union field
+                vercel_deployment_id=vercel_deployment_id, # Corrected variable name
+                project_name=project_name, # Use the actual project name used
+                region=monitor_result.get("regions", ["default"])[0], # Get region if available
+                # environment=monitor_result.get("target", deployment_target_env) # Reflect actual env - Removed, not in VercelDeploymentDetails
+                # deployment_time_utc is handled by default_factory
+            )
+        )
+
+        await context.emit(Event(
+            type="deployment.succeeded",
+            payload=success_payload.model_dump(exclude_none=True)
+        ))
+        print(f"Vercel deployment finished successfully for project '{project_name}'. Status: READY, URL: {deployment_url}")
+        # Error handling is done in the main run_async try/except block; it also closes the client
 
 
 
@@ -14,6 +14,9 @@ from google.adk.agents import Agent
 from google.adk.runtime import InvocationContext
 from google.adk.runtime.events import Event, ErrorEvent
 
+from utils.a2a_transport import get_a2a_transport
+from utils.llm_cache import get_llm_cache
+
 # TODO: Potentially align this more closely with the actual MarketOpportunityReport structure
 # if it becomes significantly different. For now, assume the necessary fields are passed.
 class ImprovementAgentInput(BaseModel):
@@ -38,6 +41,14 @@ class ImprovedProductSpec(BaseModel):
     potential_rating: Optional[str] = Field(None, description="Overall potential rating (e.g., 'Low', 'Medium', 'High').")
     assessment_rationale: Optional[str] = Field(None, description="Brief rationale for the feasibility score and potential rating.")
 
+def _is_json_output(text: str) -> bool:
+    """Whether LLM output parses as JSON once markdown fences are stripped."""
+    try:
+        json.loads(text.strip().removeprefix("```json").removesuffix("```").strip())
+        return True
+    except ValueError:
+        return False
+
 # --- Agent Class ---
 
 class ImprovementAgent(Agent): # Inherit from ADK Agent
@@ -78,7 +89,8 @@ class ImprovementAgent(Agent): # Inherit from ADK Agent
         # --- Web Search Agent Integration ---
         self.web_search_agent_url = os.getenv('WEB_SEARCH_AGENT_URL')
         self.brave_api_key = os.getenv('BRAVE_API_KEY') # Needed if WebSearchAgent requires it implicitly
-        self.http_client = httpx.AsyncClient(timeout=60.0) # Increased timeout for A2A calls
+        self.a2a_transport = get_a2a_transport() # Shared, pooled transport for A2A calls
+        self.llm_cache = get_llm_cache() # Shared LLM response cache (same niche/spec => same analysis)
 
         if not self.web_search_agent_url:
             self.logger.warning("WEB_SEARCH_AGENT_URL not found. Web search integration will be disabled.")
@@ -132,7 +144,7 @@ class ImprovementAgent(Agent): # Inherit from ADK Agent
                 a2a_url = f"{self.web_search_agent_url}/a2a/web_search/invoke" # Assuming this is the correct endpoint path
                 self.logger.info(f"Calling WebSearchAgent at {a2a_url} with query: {search_query}")
 
-                response = await self.http_client.post(a2a_url, json=search_payload)
+                response = await self.a2a_transport.post_json(a2a_url, search_payload, timeout=60.0)
                 response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
                 search_response_data = response.json()
@@ -180,9 +192,27 @@ class ImprovementAgent(Agent): # Inherit from ADK Agent
             # TODO: Explore direct JSON output mode if available and reliable for the model
             # generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
             # response = await self.llm.generate_content_async(prompt, generation_config=generation_config)
-            response = await self.llm.generate_content_async(prompt)
+            async def _call_llm() -> str:
+                response = await self.llm.generate_content_async(prompt)
+                return response.text
+
+            # Only cache responses that parse, so a malformed answer is retried next time.
+            # Near-duplicate lookup compares the research inputs only, not the prompt template
+            semantic_text = "\n".join(
+                value if isinstance(value, str) else "; ".join(value) for value in (
+                    inputs.product_concept,
+                    inputs.competitor_weaknesses,
+                    inputs.market_gaps,
+                    inputs.target_audience_suggestions,
+                    inputs.feature_recommendations_from_market,
+                    inputs.business_model_type,
+                ) if value
+            )
+            llm_output_text = await self.llm_cache.generate(
+                'improvement', self.model_name, prompt, _call_llm, validate=_is_json_output,
+                semantic_text=semantic_text,
+            )
             self.logger.info("LLM call completed.")
-            llm_output_text = response.text
 
         except Exception as llm_error:
             self.logger.error(f"LLM call failed: {llm_error}", exc_info=True)
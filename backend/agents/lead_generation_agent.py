@@ -1,14 +1,20 @@
+import os
 import json
+import hashlib
+import time
+import sqlite3
+import asyncio
 import logging
-import requests
-from typing import List, Dict, Any
+import threading
+import httpx
+from typing import AsyncIterator, List, Dict, Any, Optional, Set
+from urllib.parse import urlsplit
 
 from google.adk.agents import Agent
 from google.adk.runtime import InvocationContext
 from google.adk.runtime.events import Event
 # Assuming ADK provides LLM integration, replace if needed
 # from google.adk.llm import LlmClient
-from firecrawl import FirecrawlApp
 from pydantic import BaseModel, Field
 # Keep agno/composio for Sheets writing as per prototype logic transfer
 from agno.agent import Agent as AgnoAgent
@@ -16,6 +22,8 @@ from agno.tools.firecrawl import FirecrawlTools # Might not be needed if using S
 from agno.models.openai import OpenAIChat as AgnoOpenAIChat
 from composio_phidata import Action, ComposioToolSet
 
+from utils.sheets_sink import SINK_ID_PATTERN, SheetSink, SheetsClient, SheetsUnavailableError, SinkOwnershipError
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,11 +41,26 @@ class QuoraUserInteractionSchema(BaseModel):
 class QuoraPageSchema(BaseModel):
     interactions: List[QuoraUserInteractionSchema] = Field(description="List of all user interactions (questions and answers) on the page")
 
+# --- Configuration ---
+FIRECRAWL_API_URL = os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev").rstrip("/")
+# Use Firecrawl's batch scrape endpoint; falls back to concurrent single extracts if unavailable
+LEAD_EXTRACTION_USE_BATCH = os.getenv("LEAD_EXTRACTION_USE_BATCH", "true").lower() in ("1", "true", "yes")
+LEAD_EXTRACTION_CONCURRENCY = int(os.getenv("LEAD_EXTRACTION_CONCURRENCY", 8))
+LEAD_BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("LEAD_BATCH_POLL_INTERVAL_SECONDS", 3))
+LEAD_BATCH_TIMEOUT_SECONDS = float(os.getenv("LEAD_BATCH_TIMEOUT_SECONDS", 1800))
+LEAD_SEEN_USERNAMES_PATH = os.getenv("LEAD_SEEN_USERNAMES_PATH", "lead_seen_usernames.db")
+# Sheet to append leads to across runs (a new sheet per run if unset) and who gets access to new sheets
+LEAD_SHEETS_SPREADSHEET_ID = os.getenv("LEAD_SHEETS_SPREADSHEET_ID")
+LEAD_SHEETS_SHARE_WITH = os.getenv("LEAD_SHEETS_SHARE_WITH")
+LEAD_SHEET_COLUMNS = ["Website URL", "Username", "Bio", "Post Type", "Timestamp", "Upvotes", "Links"]
+
+QUORA_EXTRACTION_PROMPT = 'Extract all user information including username, bio, post type (question/answer), timestamp, upvotes, and any links from Quora posts. Focus on identifying potential leads who are asking questions or providing answers related to the topic.'
+
 # --- Helper Functions (adapted from prototype) ---
 
-def search_for_urls(company_description: str, firecrawl_api_key: str, num_links: int) -> List[str]:
+async def search_for_urls(company_description: str, firecrawl_api_key: str, num_links: int) -> List[str]:
     """Searches Firecrawl for relevant Quora URLs."""
-    url = "https://api.firecrawl.dev/v1/search"
+    url = f"{FIRECRAWL_API_URL}/v1/search"
     headers = {
         "Authorization": f"Bearer {firecrawl_api_key}",
         "Content-Type": "application/json"
@@ -51,7 +74,8 @@ def search_for_urls(company_description: str, firecrawl_api_key: str, num_links:
         "timeout": 60000,
     }
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        async with httpx.AsyncClient(timeout=90.0) as client:
+            response = await client.post(url, json=payload, headers=headers)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         data = response.json()
         if data.get("success"):
@@ -62,58 +86,198 @@ def search_for_urls(company_description: str, firecrawl_api_key: str, num_links:
         else:
             logger.warning(f"Firecrawl search API call was not successful: {data}")
             return []
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error during Firecrawl search API call: {e}")
         return []
 
-def extract_user_info_from_urls(urls: List[str], firecrawl_api_key: str) -> List[dict]:
-    """Extracts user info from URLs using Firecrawl SDK."""
-    user_info_list = []
-    if not urls:
-        return user_info_list
 
-    firecrawl_app = FirecrawlApp(api_key=firecrawl_api_key)
-    logger.info(f"Attempting to extract info from {len(urls)} URLs.")
+class SeenUsernames:
+    """Persistent set of lead usernames already delivered, shared across runs."""
 
-    # Note: FirecrawlApp.extract takes a list of URLs, process them potentially in batch
-    try:
-        # Process URLs one by one as in prototype, though batch might be possible
-        for url in urls:
-             logger.info(f"Extracting from: {url}")
-             # Using extract method as per prototype logic
-             response = firecrawl_app.extract(
-                 url=url, # Pass single URL
-                 params={
-                     'extractorOptions': {
-                         'mode': 'llm-extraction',
-                         'extractionPrompt': 'Extract all user information including username, bio, post type (question/answer), timestamp, upvotes, and any links from Quora posts. Focus on identifying potential leads who are asking questions or providing answers related to the topic.',
-                         'extractionSchema': QuoraPageSchema.model_json_schema(),
-                     }
-                 }
-             )
-
-             # Check response structure - adjust based on actual Firecrawl SDK v0.1.18+ response
-             if response and response.get('data'):
-                 extracted_data = response['data']
-                 # Ensure interactions data is present and is a list
-                 interactions = extracted_data.get('interactions', [])
-                 if isinstance(interactions, list) and interactions:
-                     user_info_list.append({
-                         "website_url": url,
-                         "user_info": interactions # interactions should be list of dicts matching schema
-                     })
-                     logger.info(f"Successfully extracted info from {url}")
-                 else:
-                     logger.warning(f"No interactions found or interactions format incorrect for {url}. Data: {extracted_data}")
-             else:
-                 logger.warning(f"Extraction failed or returned no data for {url}. Response: {response}")
+    def __init__(self, path: Optional[str] = LEAD_SEEN_USERNAMES_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False, isolation_level=None)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen_usernames (username TEXT PRIMARY KEY, first_seen REAL NOT NULL)")
 
-    except Exception as e:
-        logger.error(f"Error during Firecrawl extraction: {e}", exc_info=True)
-        # Continue processing other URLs if one fails
+    @staticmethod
+    def normalize(username: Optional[str]) -> str:
+        return (username or "").strip().lower()
+
+    def __contains__(self, username: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen_usernames WHERE username = ?", (self.normalize(username),)).fetchone()
+        return row is not None
+
+    def add(self, usernames: List[str]) -> None:
+        """Record usernames as delivered."""
+        now = time.time()
+        rows = [(key, now) for key in {self.normalize(username) for username in usernames} if key]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO seen_usernames (username, first_seen) VALUES (?, ?)", rows)
 
-    logger.info(f"Extracted info for {len(user_info_list)} URLs.")
-    return user_info_list
+
+class LeadExtractionEngine:
+    """Async Quora lead extraction through Firecrawl.
+
+    Uses the batch scrape endpoint (one job, results polled as pages finish)
+    when available, otherwise bounded concurrent single-URL extracts. Results
+    are yielded per URL as soon as they are available.
+    """
+
+    def __init__(self, firecrawl_api_key: str, use_batch: bool = LEAD_EXTRACTION_USE_BATCH, concurrency: int = LEAD_EXTRACTION_CONCURRENCY):
+        self.firecrawl_api_key = firecrawl_api_key
+        self.use_batch = use_batch
+        self.concurrency = concurrency
+        self.headers = {
+            "Authorization": f"Bearer {firecrawl_api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def extract(self, urls: List[str]) -> AsyncIterator[dict]:
+        """Yields {"website_url", "user_info"} for each URL with interactions, as extractions finish."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        logger.info(f"Attempting to extract info from {len(urls)} URLs.")
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            # Input URLs the batch job scraped, with or without a lead; never scraped (and billed) again
+            processed: Set[str] = set()
+            if self.use_batch:
+                try:
+                    async for item in self._extract_batch(client, urls, processed):
+                        yield item
+                    return
+                except (httpx.HTTPError, ValueError) as e:
+                    # Fall back for whatever the batch job did not process
+                    logger.warning(f"Firecrawl batch extraction unavailable ({e}); falling back to concurrent extracts for {len(urls) - len(processed)} URL(s).")
+            async for item in self._extract_concurrent(client, [url for url in urls if url not in processed]):
+                yield item
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        """Comparable form of a URL, so a document's sourceURL can be matched to the requested URL."""
+        parts = urlsplit(url.strip())
+        host = parts.netloc.lower()
+        if host.startswith("www."):
+            host = host[4:]
+        return f"{host}{parts.path.rstrip('/')}?{parts.query}"
+
+    async def _extract_batch(self, client: httpx.AsyncClient, urls: List[str], processed: Set[str]) -> AsyncIterator[dict]:
+        """Runs one batch scrape job, adding every input URL it returned a document for to ``processed``."""
+        response = await client.post(
+            f"{FIRECRAWL_API_URL}/v1/batch/scrape",
+            headers=self.headers,
+            json={
+                "urls": urls,
+                "formats": ["json"],
+                "jsonOptions": {"prompt": QUORA_EXTRACTION_PROMPT, "schema": QuoraPageSchema.model_json_schema()},
+                "ignoreInvalidURLs": True,
+            },
+        )
+        response.raise_for_status()
+        job = response.json()
+        if not job.get("success") or not job.get("id"):
+            raise ValueError(f"batch job not started: {job}")
+        status_url = f"{FIRECRAWL_API_URL}/v1/batch/scrape/{job['id']}"
+        logger.info(f"Started Firecrawl batch job {job['id']} for {len(urls)} URLs.")
+
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + LEAD_BATCH_TIMEOUT_SECONDS
+        requested = {self._url_key(url): url for url in urls}
+        delivered: Set[str] = set()
+        while True:
+            status = await self._get_json(client, status_url)
+            documents = list(status.get("data") or [])
+            next_url = status.get("next")
+            finished = status.get("status") in ("completed", "failed", "cancelled")
+            # Later pages only matter once the job is done; earlier polls stream the first page
+            while finished and next_url:
+                page = await self._get_json(client, next_url)
+                documents.extend(page.get("data") or [])
+                next_url = page.get("next")
+
+            for document in documents:
+                metadata = document.get("metadata") or {}
+                source_url = metadata.get("sourceURL") or metadata.get("url")
+                if not source_url or source_url in delivered:
+                    continue
+                delivered.add(source_url)
+                # Report results under the requested URL so the caller can tell which inputs are done
+                url = requested.get(self._url_key(source_url))
+                if url is None:
+                    logger.warning(f"Firecrawl batch job {job['id']} returned an unrequested URL: {source_url}")
+                    url = source_url
+                else:
+                    processed.add(url)
+                item = self._to_user_info(url, document.get("json"))
+                if item:
+                    yield item
+
+            if finished:
+                logger.info(f"Firecrawl batch job {job['id']} {status.get('status')}: {status.get('completed', len(delivered))}/{status.get('total', len(urls))} URLs.")
+                return
+            if loop.time() > give_up_at:
+                raise ValueError(f"batch job {job['id']} did not finish within {LEAD_BATCH_TIMEOUT_SECONDS}s")
+            await asyncio.sleep(LEAD_BATCH_POLL_INTERVAL_SECONDS)
+
+    async def _get_json(self, client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+        response = await client.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _extract_concurrent(self, client: httpx.AsyncClient, urls: List[str]) -> AsyncIterator[dict]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _one(url: str) -> Optional[dict]:
+            async with semaphore:
+                logger.info(f"Extracting from: {url}")
+                try:
+                    response = await client.post(
+                        f"{FIRECRAWL_API_URL}/v1/scrape",
+                        headers=self.headers,
+                        json={
+                            "url": url,
+                            "formats": ["json"],
+                            "jsonOptions": {"prompt": QUORA_EXTRACTION_PROMPT, "schema": QuoraPageSchema.model_json_schema()},
+                        },
+                        timeout=120.0,
+                    )
+                    response.raise_for_status()
+                    data = response.json().get("data") or {}
+                    return self._to_user_info(url, data.get("json"))
+                except Exception as e:
+                    # Continue processing other URLs if one fails
+                    logger.error(f"Error during Firecrawl extraction for {url}: {e}")
+                    return None
+
+        tasks = [asyncio.ensure_future(_one(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                if item:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _to_user_info(url: str, extracted_data: Optional[Dict[str, Any]]) -> Optional[dict]:
+        # Ensure interactions data is present and is a list
+        interactions = (extracted_data or {}).get("interactions", [])
+        if isinstance(interactions, list) and interactions:
+            logger.info(f"Successfully extracted info from {url}")
+            return {
+                "website_url": url,
+                "user_info": interactions # interactions should be list of dicts matching schema
+            }
+        logger.warning(f"No interactions found or interactions format incorrect for {url}. Data: {extracted_data}")
+        return None
+
+
+async def extract_user_info_from_urls(urls: List[str], firecrawl_api_key: str) -> AsyncIterator[dict]:
+    """Extracts user info from URLs using Firecrawl, yielding each URL's result as it arrives."""
+    async for item in LeadExtractionEngine(firecrawl_api_key).extract(urls):
+        yield item
 
 
 def format_user_info_to_flattened_json(user_info_list: List[dict]) -> List[dict]:
@@ -227,11 +391,52 @@ class LeadGenerationAgent(Agent):
 
     def __init__(self, llm_client=None): # Accept optional LLM client if needed
         super().__init__()
+        # Usernames already delivered in earlier runs; leads are never repeated
+        self.seen_usernames = SeenUsernames()
         # Placeholder for ADK LLM Client initialization if needed for transformation
         # self.llm = llm_client or LlmClient() # Example
         # Or initialize OpenAI client directly if ADK doesn't provide one easily
         # self.openai_client = OpenAI(api_key=...) # Needs API key source
 
+    def _open_sheet_sink(self, context: InvocationContext) -> Optional[SheetSink]:
+        """
+        Opens the direct Sheets sink for this run, or None if no Google credentials are configured.
+
+        Raises ValueError for an invalid or unauthenticated ``sheet_sink_id`` and
+        SinkOwnershipError when the spool to resume belongs to another user.
+        """
+        user_id = context.data.get("user_id")
+        sink_id = context.data.get("sheet_sink_id")
+        if sink_id is not None:
+            if not isinstance(sink_id, str) or not SINK_ID_PATTERN.match(sink_id):
+                raise ValueError("Invalid sheet_sink_id.")
+            if not user_id:
+                raise ValueError("Resuming a sheet sink requires an authenticated user.")
+        else:
+            sink_id = str(context.invocation_id)
+            if not SINK_ID_PATTERN.match(sink_id):
+                sink_id = hashlib.sha256(sink_id.encode("utf-8")).hexdigest()[:32]
+        try:
+            client = SheetsClient()
+        except SheetsUnavailableError as e:
+            logger.warning(f"Direct Google Sheets sink unavailable, falling back to Agno/Composio: {e}")
+            return None
+        try:
+            return SheetSink(
+                sink_id=sink_id,
+                # Runs without a user get their own spool scope and cannot be resumed
+                owner=user_id or f"invocation:{context.invocation_id}",
+                columns=LEAD_SHEET_COLUMNS,
+                key_columns=("Website URL", "Username"),
+                client=client,
+                spreadsheet_id=context.data.get("spreadsheet_id") or LEAD_SHEETS_SPREADSHEET_ID,
+                title=f"Leads {context.invocation_id}",
+                share_with=LEAD_SHEETS_SHARE_WITH,
+            )
+        except Exception:
+            asyncio.ensure_future(client.aclose())
+            raise
+
     async def transform_query_async(self, user_query: str, openai_api_key: str) -> str:
         """Transforms the user query into a concise company description using an LLM."""
         # This part replaces the prototype's `create_prompt_transformation_agent`
@@ -285,11 +490,16 @@ Transform this query: "{user_query}"
         - user_query: str - Description of leads to find.
         - firecrawl_api_key: str - Firecrawl API key.
         - openai_api_key: str - OpenAI API key.
-        - composio_api_key: str - Composio API key.
+        - composio_api_key: str (optional) - Composio API key; only used when no Google Sheets credentials are configured.
         - num_links: int (optional, default 3) - Number of links to search.
+        - spreadsheet_id: str (optional) - Existing sheet to append leads to (defaults to LEAD_SHEETS_SPREADSHEET_ID, else a new sheet).
+        - sheet_sink_id: str (optional) - Sink of a failed run to resume; defaults to this invocation's ID.
+          Only the user who owns the sink can resume it.
+        - user_id: str (optional) - Authenticated user the run belongs to; required to resume a sink.
         """
         logger.info(f"LeadGenerationAgent invoked with context ID: {context.invocation_id}")
 
+        sink: Optional[SheetSink] = None
         try:
             # 1. Get inputs from context
             user_query = context.data.get("user_query")
@@ -298,13 +508,25 @@ Transform this query: "{user_query}"
             composio_api_key = context.data.get("composio_api_key")
             num_links = context.data.get("num_links", 3) # Default to 3 links
 
-            if not all([user_query, firecrawl_api_key, openai_api_key, composio_api_key]):
-                missing_keys = [k for k, v in {
-                    "user_query": user_query,
-                    "firecrawl_api_key": firecrawl_api_key,
-                    "openai_api_key": openai_api_key,
-                    "composio_api_key": composio_api_key
-                }.items() if not v]
+            # Direct Sheets sink when Google credentials are available; Agno/Composio otherwise
+            try:
+                sink = self._open_sheet_sink(context)
+            except (ValueError, SinkOwnershipError) as e:
+                logger.warning(f"Rejected sheet sink for invocation {context.invocation_id}: {e}")
+                return Event(
+                    type="lead_generation_failed",
+                    data={"error": str(e)}
+                )
+
+            required = {
+                "user_query": user_query,
+                "firecrawl_api_key": firecrawl_api_key,
+                "openai_api_key": openai_api_key,
+            }
+            if sink is None:
+                required["composio_api_key"] = composio_api_key
+            if not all(required.values()):
+                missing_keys = [k for k, v in required.items() if not v]
                 error_msg = f"Missing required context data: {', '.join(missing_keys)}"
                 logger.error(error_msg)
                 return Event(
@@ -312,40 +534,93 @@ Transform this query: "{user_query}"
                     data={"error": error_msg}
                 )
 
+            if sink is not None and sink.pending:
+                # Resuming a failed run: write what was spooled before
+                logger.info(f"Resuming sheet sink {sink.sink_id} with {sink.pending} uncommitted row(s).")
+                try:
+                    await sink.flush()
+                except httpx.HTTPError as e:
+                    logger.warning(f"Resumed rows could not be written yet; retrying at the end of the run: {e}")
+
             # 2. Transform user query
             # Note: Using await for async function
             company_description = await self.transform_query_async(user_query, openai_api_key)
             await context.post_event_async(Event(type="query_transformed", data={"description": company_description}))
 
-            # 3. Search for URLs (Synchronous function, run in executor if needed)
-            # For simplicity, calling sync function directly in async context (consider thread pool)
-            urls = search_for_urls(company_description, firecrawl_api_key, num_links)
+            # 3. Search for URLs
+            urls = await search_for_urls(company_description, firecrawl_api_key, num_links)
             if not urls:
                 logger.warning("No relevant URLs found.")
                 return Event(type="lead_generation_complete", data={"status": "No URLs found", "google_sheet_link": None})
             await context.post_event_async(Event(type="urls_found", data={"count": len(urls), "urls": urls}))
 
-            # 4. Extract user info (Synchronous function)
-            user_info_list = extract_user_info_from_urls(urls, firecrawl_api_key)
-            if not user_info_list:
+            # 4./5. Extract user info and format it as each URL's results arrive,
+            # dropping usernames delivered by this or any earlier run
+            urls_with_info = 0
+            duplicate_leads = 0
+            run_usernames: Set[str] = set()
+            flattened_data: List[dict] = []
+            async for user_info in extract_user_info_from_urls(urls, firecrawl_api_key):
+                urls_with_info += 1
+                new_records = []
+                for record in format_user_info_to_flattened_json([user_info]):
+                    username = SeenUsernames.normalize(record["Username"])
+                    if username and (username in run_usernames or username in self.seen_usernames):
+                        duplicate_leads += 1
+                        continue
+                    if username:
+                        run_usernames.add(username)
+                    new_records.append(record)
+                flattened_data.extend(new_records)
+                if sink is not None and new_records:
+                    # 6. Spool and append to the sheet in chunks while extraction continues
+                    try:
+                        await sink.add(new_records)
+                    except httpx.HTTPError as e:
+                        # Rows are spooled before the append; the final flush retries them
+                        logger.warning(f"Sheet append failed mid-run, rows stay spooled: {e}")
+                await context.post_event_async(Event(type="info_extracted", data={
+                    "website_url": user_info["website_url"],
+                    "urls_processed": urls_with_info,
+                    "records_formatted": len(flattened_data),
+                }))
+
+            if not urls_with_info:
                  logger.warning("No user information extracted from found URLs.")
-                 # Proceed to formatting, it will handle empty list
-            await context.post_event_async(Event(type="info_extracted", data={"records_found": len(user_info_list)}))
-
-
-            # 5. Format data (Synchronous function)
-            flattened_data = format_user_info_to_flattened_json(user_info_list)
+            if duplicate_leads:
+                 logger.info(f"Skipped {duplicate_leads} lead(s) already delivered in earlier runs.")
             if not flattened_data:
                  logger.warning("No data available after formatting.")
                  # Decide if this is an error or just completion with no results
                  return Event(type="lead_generation_complete", data={"status": "No leads generated after formatting", "google_sheet_link": None})
-            await context.post_event_async(Event(type="data_formatted", data={"records_formatted": len(flattened_data)}))
-
-
-            # 6. Write to Google Sheets (Synchronous function using Agno/Composio)
-            google_sheets_link = write_to_google_sheets(flattened_data, composio_api_key, openai_api_key)
+            await context.post_event_async(Event(type="data_formatted", data={"records_formatted": len(flattened_data), "duplicates_skipped": duplicate_leads}))
+
+
+            # 6. Write remaining rows to Google Sheets
+            if sink is not None:
+                try:
+                    google_sheets_link = await sink.flush()
+                except httpx.HTTPError as e:
+                    logger.error(f"Sheet append failed; {sink.pending} row(s) stay spooled for sink {sink.sink_id}: {e}")
+                    return Event(
+                        type="lead_generation_failed",
+                        data={
+                            "error": f"Failed to write data to Google Sheets: {e}",
+                            "sheet_sink_id": sink.sink_id, # Pass back as sheet_sink_id to resume
+                            "rows_committed": sink.committed,
+                            "rows_pending": sink.pending,
+                        }
+                    )
+                sink.discard_spool()
+            else:
+                # Synchronous Agno/Composio path, kept off the event loop
+                google_sheets_link = await asyncio.get_running_loop().run_in_executor(
+                    None, write_to_google_sheets, flattened_data, composio_api_key, openai_api_key
+                )
 
             if google_sheets_link:
+                # Only leads that were actually delivered are excluded from later runs
+                self.seen_usernames.add(list(run_usernames))
                 logger.info("Lead generation process completed successfully.")
                 return Event(
                     type="lead_generation_complete",
@@ -367,4 +642,7 @@ Transform this query: "{user_query}"
             return Event(
                 type="lead_generation_failed",
                 data={"error": f"An unexpected error occurred: {str(e)}"}
-            )
\ No newline at end of file
+            )
+        finally:
+            if sink is not None:
+                await sink.close()
@@ -4,8 +4,9 @@ import httpx
 import asyncio
 import traceback
 import logging
-from typing import List, Optional, Dict, Any, Union
-from typing import List, Optional, Dict, Any, Union
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple, Union
 from pydantic import BaseModel, Field, HttpUrl, ValidationError
 
 # ADK Imports
@@ -20,6 +21,10 @@ from firecrawl import FirecrawlApp, AsyncFirecrawlApp
 from google import genai # Added Gemini import
 from google.api_core import exceptions as google_exceptions # Added Google API exceptions
 
+from utils.a2a_transport import get_a2a_transport
+from utils.extraction_pipeline import ExtractionPipeline
+from utils.task_stream import publish_delta
+
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -38,6 +43,8 @@ WEB_SEARCH_AGENT_URL = os.getenv("WEB_SEARCH_AGENT_URL")
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash-latest") # Configurable Gemini model
 CONTENT_GENERATION_AGENT_URL = os.getenv("CONTENT_GENERATION_AGENT_URL")
+# Overall budget for discovery, web search and extraction; whatever finished by then is used
+MARKET_RESEARCH_DEADLINE_SECONDS = float(os.getenv("MARKET_RESEARCH_DEADLINE_SECONDS", 120))
 
 # --- Pydantic Models ---
 # ... (Models remain the same) ...
@@ -73,6 +80,7 @@ class MarketOpportunityReport(BaseModel):
     target_audience_suggestions: List[str] = Field(description="Suggestions for potential target demographics or niches.")
     # Optional: Add fields here if web search provides distinct, structured insights consistently
     # web_search_summary: Optional[str] = Field(None, description="Summary of relevant findings from general web search.")
+    phase_timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent in each research phase (discovery, web_search, extraction, analysis, total).")
 
 class FirecrawlExtractSchema(BaseModel):
     """Schema specifically for Firecrawl extraction, based on prototype."""
@@ -83,6 +91,16 @@ class FirecrawlExtractSchema(BaseModel):
     marketing_focus: str = Field(description="Main marketing angles and target audience")
     customer_feedback: str = Field(description="Customer testimonials, reviews, and feedback")
 
+@dataclass
+class ResearchStageResult:
+    """What the concurrent research stage produced before finishing or hitting the deadline."""
+    competitor_urls: List[str] = field(default_factory=list)
+    competitors_data: List[CompetitorInfo] = field(default_factory=list)
+    extraction_errors: List[str] = field(default_factory=list)
+    web_search_results: Optional[Dict[str, Any]] = None
+    phase_timings: Dict[str, float] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+
 
 # --- Agent Class ---
 
@@ -118,11 +136,15 @@ class MarketResearchAgent(Agent):
 
         # Initialize shared httpx client
         self.http_client = httpx.AsyncClient(timeout=30.0)
+        # Shared, pooled transport for A2A calls
+        self.a2a_transport = get_a2a_transport()
 
         # --- Validation & Client Initialization ---
         if not self.firecrawl_api_key:
             raise ValueError("FIRECRAWL_API_KEY environment variable not set.")
         self.firecrawl_client = AsyncFirecrawlApp(api_key=self.firecrawl_api_key)
+        # Bounded, domain-polite, cached Firecrawl extraction
+        self.extraction_pipeline = ExtractionPipeline(provider="firecrawl", extract=self._firecrawl_extract)
 
         if self.search_provider == "exa":
             if not self.exa_api_key:
@@ -242,8 +264,8 @@ class MarketResearchAgent(Agent):
 
         try:
             # Use native async httpx client
-            async with self.http_client as client: # Use the initialized client
-                 response = await client.post(perplexity_url, json=payload, headers=headers) # Removed timeout here, set on client init
+            # Use the shared client directly; `async with` would close it after the first call
+            response = await self.http_client.post(perplexity_url, json=payload, headers=headers) # Timeout set on client init
 
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
             response_data = response.json()
@@ -266,8 +288,8 @@ class MarketResearchAgent(Agent):
             return [] # Return empty list on error
 
 
-    async def _extract_competitor_info(self, competitor_url: str) -> Optional[CompetitorInfo]:
-        """Extracts structured data from a competitor URL using AsyncFirecrawlApp."""
+    async def _firecrawl_extract(self, competitor_url: str) -> Optional[Dict[str, Any]]:
+        """Extracts raw structured data from a competitor URL using AsyncFirecrawlApp."""
         logger.info(f"Extracting data from URL: {competitor_url} using AsyncFirecrawlApp")
         try:
             # Use AsyncFirecrawlApp directly
@@ -299,29 +321,140 @@ class MarketResearchAgent(Agent):
             )
 
             if response and isinstance(response, dict) and response.get('data'):
-                extracted_data = response['data']
-                # Use Pydantic validation during creation
-                info = CompetitorInfo(
-                    competitor_url=competitor_url, # Ensure URL is valid HttpUrl
-                    company_name=extracted_data.get('company_name'),
-                    pricing=extracted_data.get('pricing'),
-                    key_features=extracted_data.get('key_features', []),
-                    tech_stack=extracted_data.get('tech_stack', []),
-                    marketing_focus=extracted_data.get('marketing_focus'),
-                    customer_feedback=extracted_data.get('customer_feedback')
-                )
-                logger.info(f"Successfully extracted data for {competitor_url}")
-                return info
+                return response['data']
             else:
                  logger.warning(f"Firecrawl extraction did not return valid data for {competitor_url}. Response: {response}")
                  return None
 
+        except Exception as e:
+            logger.error(f"Error extracting data from {competitor_url}: {str(e)}", exc_info=True)
+            return None # Return None on error; nothing is cached
+
+    def _to_competitor_info(self, competitor_url: str, extracted_data: Optional[Dict[str, Any]]) -> Optional[CompetitorInfo]:
+        """Builds a CompetitorInfo from (possibly cached) extracted data."""
+        if not extracted_data:
+            return None
+        try:
+            # Use Pydantic validation during creation
+            return CompetitorInfo(
+                competitor_url=competitor_url, # Ensure URL is valid HttpUrl
+                company_name=extracted_data.get('company_name'),
+                pricing=extracted_data.get('pricing'),
+                key_features=extracted_data.get('key_features', []),
+                tech_stack=extracted_data.get('tech_stack', []),
+                marketing_focus=extracted_data.get('marketing_focus'),
+                customer_feedback=extracted_data.get('customer_feedback')
+            )
         except (ValidationError, TypeError) as e:
              logger.error(f"Pydantic validation error processing Firecrawl data for {competitor_url}: {e}", exc_info=True)
              return None
-        except Exception as e:
-            logger.error(f"Error extracting data from {competitor_url}: {str(e)}", exc_info=True)
-            return None # Return None on error, handled in run_async
+
+    async def _extract_competitor_info(self, competitor_url: str) -> Optional[CompetitorInfo]:
+        """Extracts structured data from a competitor URL through the cached extraction pipeline."""
+        extracted_data = await self.extraction_pipeline.get(competitor_url)
+        return self._to_competitor_info(competitor_url, extracted_data)
+
+    async def _iter_competitor_info(self, competitor_urls: List[str]) -> AsyncIterator[Tuple[str, Union[CompetitorInfo, Exception, None]]]:
+        """Yields (url, CompetitorInfo | error | None) for each competitor as soon as its extraction finishes."""
+        async with aclosing(self.extraction_pipeline.stream(competitor_urls)) as results:
+            async for url, extracted_data, error in results:
+                if error is not None:
+                    yield url, error
+                    continue
+                info = self._to_competitor_info(url, extracted_data)
+                if info is not None:
+                    logger.info(f"Successfully extracted data for {url}")
+                yield url, info
+
+    async def _find_competitor_urls(self, topic: str, target_url: Optional[str], num_results: int) -> List[str]:
+        """Finds competitor URLs with the configured search provider."""
+        logger.info(f"Finding competitors using {self.search_provider}...")
+        if self.search_provider == "perplexity":
+            return await self._find_competitor_urls_perplexity(topic=topic, target_url=target_url, num_results=num_results)
+        return await self._find_competitor_urls_exa(topic=topic, target_url=target_url, num_results=num_results)
+
+    async def _run_research_stage(self, inputs: MarketResearchInput, context: InvocationContext) -> ResearchStageResult:
+        """Runs discovery, general web search and per-URL extraction as a task graph under one deadline.
+
+        The web search does not depend on discovery, so both start at once.
+        Extraction of each competitor starts as soon as discovery returns and
+        results are collected as they finish. Phases still running at the
+        deadline are cancelled and whatever already finished is returned.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + MARKET_RESEARCH_DEADLINE_SECONDS
+        result = ResearchStageResult()
+
+        def remaining() -> float:
+            return max(0.0, deadline - loop.time())
+
+        async def timed(phase: str, coro: Any) -> Any:
+            phase_start = loop.time()
+            try:
+                return await coro
+            finally:
+                result.phase_timings[phase] = round(loop.time() - phase_start, 3)
+
+        finished: set = set()
+
+        async def extract_all() -> None:
+            async for url, res in self._iter_competitor_info(result.competitor_urls):
+                finished.add(url)
+                if isinstance(res, CompetitorInfo):
+                    result.competitors_data.append(res)
+                    publish_delta(f"Extracted competitor {len(result.competitors_data)}/{len(result.competitor_urls)}: {res.company_name or url}\n")
+                else:
+                    result.extraction_errors.append(f"URL: {url}, Error: {str(res)}")
+                    logger.warning(f"Failed extraction for {url}. Error: {res}", exc_info=res if isinstance(res, Exception) else None)
+
+        stage_start = loop.time()
+        logger.info(f"Starting competitor discovery and web search for topic: '{inputs.initial_topic}' concurrently...")
+        web_search_task = asyncio.create_task(timed('web_search', self._call_web_search_agent(
+            query=inputs.initial_topic,
+            parent_context=context
+        )))
+        try:
+            target_url_str = str(inputs.target_url) if inputs.target_url else None
+            try:
+                result.competitor_urls = await asyncio.wait_for(
+                    timed('discovery', self._find_competitor_urls(
+                        topic=inputs.initial_topic,
+                        target_url=target_url_str,
+                        num_results=inputs.num_competitors
+                    )),
+                    timeout=remaining()
+                )
+            except asyncio.TimeoutError:
+                result.timed_out.append('discovery')
+                logger.warning("Competitor discovery did not finish before the research deadline.")
+
+            if result.competitor_urls:
+                logger.info(f"Attempting to extract data for {len(result.competitor_urls)} competitors: {result.competitor_urls}")
+                try:
+                    await asyncio.wait_for(timed('extraction', extract_all()), timeout=remaining())
+                except asyncio.TimeoutError:
+                    result.timed_out.append('extraction')
+                    for url in result.competitor_urls:
+                        if url not in finished:
+                            result.extraction_errors.append(f"URL: {url}, Error: research deadline exceeded")
+                    logger.warning(f"Extraction did not finish before the research deadline; using {len(result.competitors_data)} finished competitor(s).")
+                logger.info(f"Extraction pipeline stats: {self.extraction_pipeline.stats()}")
+
+            try:
+                result.web_search_results = await asyncio.wait_for(web_search_task, timeout=remaining())
+            except asyncio.TimeoutError:
+                result.timed_out.append('web_search')
+                logger.warning("Web search did not finish before the research deadline.")
+        finally:
+            if not web_search_task.done():
+                web_search_task.cancel()
+
+        if result.web_search_results:
+            logger.info("Successfully received web search results via A2A.")
+        else:
+            logger.warning("Web search via A2A failed or returned no results. Proceeding without web context.")
+        result.phase_timings['research'] = round(loop.time() - stage_start, 3)
+        return result
 
     # --- New Method for WebSearchAgent A2A Call ---
     async def _call_web_search_agent(self, query: str, parent_context: InvocationContext) -> Optional[Dict[str, Any]]:
@@ -352,12 +485,7 @@ class MarketResearchAgent(Agent):
         }
 
         try:
-            async with self.http_client as client: # Reuse the client
-                 response = await client.post(
-                     a2a_endpoint,
-                     json=a2a_payload,
-                     headers={"Content-Type": "application/json", "Accept": "application/json"}
-                 )
+            response = await self.a2a_transport.post_json(a2a_endpoint, a2a_payload, timeout=30.0)
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
             # Parse the Event response from WebSearchAgent
@@ -468,12 +596,7 @@ class MarketResearchAgent(Agent):
         }
 
         try:
-            async with self.http_client as client:
-                 response = await client.post(
-                     a2a_endpoint,
-                     json=a2a_payload,
-                     headers={"Content-Type": "application/json", "Accept": "application/json"}
-                 )
+            response = await self.a2a_transport.post_json(a2a_endpoint, a2a_payload, timeout=30.0)
             response.raise_for_status()
 
             event_data = response.json()
@@ -530,6 +653,7 @@ class MarketResearchAgent(Agent):
         agent_id = context.agent_id
         invocation_id = context.invocation_id
         web_search_results = None # Initialize web search results
+        run_start = asyncio.get_running_loop().time()
 
         try:
             # 1. Parse and Validate Input from context
@@ -549,22 +673,9 @@ class MarketResearchAgent(Agent):
                     payload={"error": str(e), "received_input": context.input}
                 )
 
-            # 2. Find Competitor URLs (using configured provider)
-            logger.info(f"Finding competitors using {self.search_provider}...")
-            target_url_str = str(inputs.target_url) if inputs.target_url else None
-            if self.search_provider == "exa":
-                competitor_urls = await self._find_competitor_urls_exa(
-                    topic=inputs.initial_topic,
-                    target_url=target_url_str,
-                    num_results=inputs.num_competitors
-                )
-            elif self.search_provider == "perplexity":
-                 competitor_urls = await self._find_competitor_urls_perplexity(
-                    topic=inputs.initial_topic,
-                    target_url=target_url_str,
-                    num_results=inputs.num_competitors
-                )
-            else:
+            # 2. Research stage: competitor discovery, general web search (A2A) and
+            #    per-competitor extraction, run concurrently under one deadline
+            if self.search_provider not in ("exa", "perplexity"):
                  # This case should be caught by __init__, but handle defensively
                  return Event(
                     agent_id=agent_id,
@@ -573,19 +684,13 @@ class MarketResearchAgent(Agent):
                     message=f"Internal configuration error: Invalid search provider '{self.search_provider}'",
                     payload={"error": "Configuration error"}
                  )
-
-            # --- New Step 2b: Perform General Web Search via A2A ---
-            logger.info(f"Performing general web search for topic: '{inputs.initial_topic}' via A2A...")
-            web_search_results = await self._call_web_search_agent(
-                query=inputs.initial_topic,
-                parent_context=context
-            )
-            if web_search_results:
-                logger.info("Successfully received web search results via A2A.")
-            else:
-                logger.warning("Web search via A2A failed or returned no results. Proceeding without web context.")
-            # --- End New Step ---
-
+            research = await self._run_research_stage(inputs, context)
+            competitor_urls = research.competitor_urls
+            competitors_data = research.competitors_data
+            extraction_errors = research.extraction_errors
+            web_search_results = research.web_search_results
+            phase_timings = research.phase_timings
+            deadline_note = f" Research deadline reached during: {', '.join(research.timed_out)}." if research.timed_out else ""
 
             if not competitor_urls:
                 warning_msg = "No competitor URLs found for the given topic/URL."
@@ -604,40 +709,24 @@ class MarketResearchAgent(Agent):
                     feature_recommendations=[],
                     target_audience_suggestions=[]
                 )
+                empty_report.phase_timings = phase_timings
                 payload = empty_report.model_dump()
 
                 return Event(
                     agent_id=agent_id,
                     invocation_id=invocation_id,
                     severity=EventSeverity.INFO,
-                    message=warning_msg + (" Web search performed." if web_search_results else " Web search failed or skipped."),
+                    message=warning_msg + (" Web search performed." if web_search_results else " Web search failed or skipped.") + deadline_note,
                     payload=payload
                 )
 
-            # 3. Extract Data for each Competitor (concurrently)
-            logger.info(f"Attempting to extract data for {len(competitor_urls)} competitors: {competitor_urls}")
-            extraction_tasks = [self._extract_competitor_info(url) for url in competitor_urls]
-            results = await asyncio.gather(*extraction_tasks, return_exceptions=True)
-
-            competitors_data: List[CompetitorInfo] = []
-            failed_extractions = 0
-            extraction_errors = []
-            for i, res in enumerate(results):
-                if isinstance(res, CompetitorInfo):
-                    competitors_data.append(res)
-                else:
-                    failed_extractions += 1
-                    error_detail = f"URL: {competitor_urls[i]}, Error: {str(res)}"
-                    extraction_errors.append(error_detail)
-                    logger.warning(f"Failed extraction for {competitor_urls[i]}. Error: {res}", exc_info=res if isinstance(res, Exception) else None)
-
-
             if not competitors_data:
                  error_msg = "Could not extract data from any identified competitor URLs."
                  logger.error(f"{error_msg} Errors: {extraction_errors}")
                  payload = {
                      "competitor_urls_found": competitor_urls,
-                     "extraction_errors": extraction_errors
+                     "extraction_errors": extraction_errors,
+                     "phase_timings": phase_timings
                  }
                  return Event(
                      agent_id=agent_id,
@@ -649,17 +738,20 @@ class MarketResearchAgent(Agent):
 
             # Log a warning if some extractions failed but not all
             partial_extraction_warning = ""
+            failed_extractions = len(extraction_errors)
             if failed_extractions > 0:
                 partial_extraction_warning = f" Failed to extract data for {failed_extractions} URL(s)."
                 logger.warning(f"Proceeding with data from {len(competitors_data)} out of {len(competitor_urls)} competitors. Errors: {extraction_errors}")
 
             # 4. Generate Final Analysis Report via ContentGenerationAgent A2A
             logger.info(f"Calling ContentGenerationAgent A2A to generate report based on data from {len(competitors_data)} competitors and web search results...")
+            analysis_start = asyncio.get_running_loop().time()
             analysis_payload = await self._call_content_generation_agent(
                 competitors_data=competitors_data,
                 web_search_results=web_search_results,
                 parent_context=context
             )
+            phase_timings['analysis'] = round(asyncio.get_running_loop().time() - analysis_start, 3)
 
             if not analysis_payload or not isinstance(analysis_payload, dict):
                 error_msg = "Failed to generate analysis report via ContentGenerationAgent A2A or received invalid payload."
@@ -683,7 +775,8 @@ class MarketResearchAgent(Agent):
                     competitors=competitors_data, # Add back the competitor data
                     analysis=MarketAnalysis(**analysis_payload.get("analysis", {})),
                     feature_recommendations=analysis_payload.get("feature_recommendations", []),
-                    target_audience_suggestions=analysis_payload.get("target_audience_suggestions", [])
+                    target_audience_suggestions=analysis_payload.get("target_audience_suggestions", []),
+                    phase_timings=dict(phase_timings, total=round(asyncio.get_running_loop().time() - run_start, 3))
                 )
                 logger.info("Successfully constructed final report from ContentGenerationAgent response.")
             except (ValidationError, TypeError) as e:
@@ -705,7 +798,7 @@ class MarketResearchAgent(Agent):
 
 
             success_message = f"Market research completed. Analyzed {len(competitors_data)} competitors. Report generated via ContentGenerationAgent."
-            success_message += partial_extraction_warning
+            success_message += partial_extraction_warning + deadline_note
             success_message += (" Incorporated web search results." if web_search_results else " Web search failed or skipped.")
             logger.info(success_message)
 
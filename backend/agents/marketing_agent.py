@@ -8,6 +8,8 @@ from pydantic import BaseModel, Field
 from google.adk.agents import Agent
 from google.adk.runtime import InvocationContext, Event, Status
 
+from utils.a2a_transport import get_a2a_transport
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -57,10 +59,11 @@ class MarketingAgent(Agent):
         # Ensure the URL ends with the specific A2A endpoint
         if not self.content_generation_agent_url.endswith('/a2a/content_generation/invoke'):
              self.content_generation_agent_url = self.content_generation_agent_url.rstrip('/') + '/a2a/content_generation/invoke'
+        self.a2a_transport = get_a2a_transport() # Shared, pooled transport for A2A calls
         logger.info(f"MarketingAgent initialized. ContentGenerationAgent URL: {self.content_generation_agent_url}")
 
 
-    async def generate_content(self, client: httpx.AsyncClient, prompt: str, context_data: Dict[str, Any]) -> Optional[str]:
+    async def generate_content(self, prompt: str, context_data: Dict[str, Any]) -> Optional[str]:
         """
         Helper function to make a single A2A call to the ContentGenerationAgent.
         """
@@ -71,9 +74,9 @@ class MarketingAgent(Agent):
         )
         try:
             logger.info(f"Sending request to ContentGenerationAgent: {prompt[:100]}...")
-            response = await client.post(
+            response = await self.a2a_transport.post_json(
                 self.content_generation_agent_url,
-                json=payload.model_dump(mode='json'), # Use model_dump for Pydantic v2
+                payload.model_dump(mode='json'), # Use model_dump for Pydantic v2
                 timeout=60.0 # Set a reasonable timeout
             )
             response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
@@ -136,19 +139,18 @@ class MarketingAgent(Agent):
 
             # 3. Delegate to ContentGenerationAgent Concurrently
             results = {}
-            async with httpx.AsyncClient() as client:
-                tasks = []
-                for key, prompt in content_requests.items():
-                    # Pass original invocation ID for traceability if available
-                    helper_context = {"original_invocation_id": context.invocation_id}
-                    tasks.append(self.generate_content(client, prompt, helper_context))
-
-                logger.info(f"Dispatching {len(tasks)} content generation tasks concurrently.")
-                generated_contents = await asyncio.gather(*tasks)
-                logger.info("Received responses from ContentGenerationAgent tasks.")
-
-                # Map results back to keys
-                results = dict(zip(content_requests.keys(), generated_contents))
+            tasks = []
+            for key, prompt in content_requests.items():
+                # Pass original invocation ID for traceability if available
+                helper_context = {"original_invocation_id": context.invocation_id}
+                tasks.append(self.generate_content(prompt, helper_context))
+
+            logger.info(f"Dispatching {len(tasks)} content generation tasks concurrently.")
+            generated_contents = await asyncio.gather(*tasks)
+            logger.info("Received responses from ContentGenerationAgent tasks.")
+
+            # Map results back to keys
+            results = dict(zip(content_requests.keys(), generated_contents))
 
             # Check for failures
             failed_tasks = [key for key, content in results.items() if content is None]
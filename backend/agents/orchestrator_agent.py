@@ -1,6 +1,6 @@
 import os
 import asyncio
-from typing import Any, Dict, List, Optional, Union, Tuple
+from typing import Any, Dict, List, Optional, Set, Union, Tuple
 
 from flask_socketio import SocketIO
 from google.ai import generativelanguage as glm
@@ -11,9 +11,15 @@ from google.adk.tools import ToolContext
 from google.adk.events import Event, EventActions, Action, Content, Part
 from google.adk.sessions import InvocationContext
 from utils.logger import setup_logger
+from utils.intent_classifier import IntentClassifier, IntentPrediction, INTENT_LABELS
+from utils.llm_cache import get_llm_cache
+from utils.task_stream import get_task_stream_registry, use_task_stream, stream_completion, publish_delta
 
 logger = setup_logger('agents.orchestrator')
 
+# Background shadow classifications, referenced until they finish
+_shadow_tasks: Set["asyncio.Task[Tuple[str, Optional[str]]]"] = set()
+
 class OrchestratorAgent(LlmAgent):
     """
     Orchestrator agent refactored to use ADK patterns.
@@ -24,11 +30,14 @@ class OrchestratorAgent(LlmAgent):
 
     agents: Dict[str, BaseAgent] # Dictionary to hold references to other agents
 
+    intent_classifier: IntentClassifier # Local fast path in front of LLM intent classification
+
     def __init__(
         self,
         socketio: SocketIO,
         agents: Dict[str, BaseAgent], # Add agents parameter
         model_name: Optional[str] = None, # Changed from 'model' to 'model_name'
+        intent_classifier: Optional[IntentClassifier] = None,
         instruction: Optional[str] = None,
         name: str = "OrchestratorAgent",
         description: str = "Handles user prompts and orchestrates tasks, potentially delegating to specialized agents.",
@@ -42,6 +51,8 @@ class OrchestratorAgent(LlmAgent):
             agents: A dictionary mapping agent names to agent instances.
             model_name: The name of the Gemini model to use (e.g., 'gemini-1.5-pro-latest').
                         Defaults to a suitable model for orchestration if None.
+            intent_classifier: Local classifier tried before the LLM for routing.
+                               Defaults to one trained on the logged LLM decisions.
             instruction: Default instruction for the LLM agent.
             name: Name of the agent.
             description: Description of the agent.
@@ -67,6 +78,7 @@ class OrchestratorAgent(LlmAgent):
         )
         self.socketio = socketio
         self.agents = agents # Store the agents dictionary
+        self.intent_classifier = intent_classifier or IntentClassifier()
         # Use self.model_name which holds the string name, self.model.model also works if super().__init__ sets it
         logger.info(f"{self.name} initialized with SocketIO, model: {self.model_name}, and agents: {list(self.agents.keys())}.")
 
@@ -104,6 +116,9 @@ class OrchestratorAgent(LlmAgent):
 
         target_agent = self.agents.get(target_agent_key)
 
+        # Model output is streamed to clients as sequenced 'streaming' task_update deltas
+        stream = get_task_stream_registry().open(task_id, self.socketio.emit)
+
         # --- Handle Delegation or Direct Processing ---
         if target_agent_key != "self" and target_agent:
             logger.info(f"Task {task_id} classified for delegation to {target_agent_key}.")
@@ -121,15 +136,16 @@ class OrchestratorAgent(LlmAgent):
                 # For now, pass the original context. Specific agents might need tailored metadata.
                 delegated_context = self._prepare_delegation_context(context, target_agent_key, prompt)
 
-                # Invoke the target agent
-                delegated_output_event = await target_agent.run_async(delegated_context)
+                # Invoke the target agent; its LLM output streams to this task
+                with use_task_stream(stream):
+                    delegated_output_event = await target_agent.run_async(delegated_context)
 
                 # Extract result from the delegated agent's response
                 delegated_result_text = self._extract_text_from_event(delegated_output_event, f"No text response from {target_agent_key}.")
 
                 # Emit final completion update
                 completion_message = f"Task completed by {target_agent.name}."
-                self.socketio.emit('task_update', {
+                stream.finish({
                     'task_id': task_id,
                     'status': 'completed',
                     'message': completion_message,
@@ -141,7 +157,7 @@ class OrchestratorAgent(LlmAgent):
             except Exception as e:
                 error_message = f"Delegation to {target_agent_key} failed: {str(e)}"
                 logger.error(f"Task {task_id} delegation to {target_agent_key} failed: {error_message}", exc_info=True)
-                self.socketio.emit('task_update', {
+                stream.finish({
                     'task_id': task_id,
                     'status': 'failed',
                     'message': error_message,
@@ -175,9 +191,9 @@ class OrchestratorAgent(LlmAgent):
             logger.info(f"Emitted 'task_update' (working by orchestrator) for task {task_id}")
 
             try:
-                # Execute the core LLM logic using the parent LlmAgent's run_async
-                # Use the original context here
-                output_event = await super().run_async(context)
+                # Execute the core LLM logic, streaming output to the client as it arrives
+                with use_task_stream(stream):
+                    output_event = await self._run_llm_streamed(context, prompt)
 
                 # Extract the result text
                 llm_response_text = self._extract_text_from_event(output_event, "No text response generated by orchestrator.")
@@ -188,7 +204,7 @@ class OrchestratorAgent(LlmAgent):
 
                 # Emit final completion update
                 completion_message = "Task completed successfully by Orchestrator."
-                self.socketio.emit('task_update', {
+                stream.finish({
                     'task_id': task_id,
                     'status': 'completed',
                     'message': completion_message,
@@ -200,7 +216,7 @@ class OrchestratorAgent(LlmAgent):
             except Exception as e:
                 error_message = f"Orchestrator processing failed: {str(e)}"
                 logger.error(f"Task {task_id} failed during orchestrator processing: {error_message}", exc_info=True)
-                self.socketio.emit('task_update', {
+                stream.finish({
                     'task_id': task_id,
                     'status': 'failed',
                     'message': error_message,
@@ -210,14 +226,87 @@ class OrchestratorAgent(LlmAgent):
                 return self._create_error_event(error_message, context.input_event)
 
 
+    async def _run_llm_streamed(self, context: InvocationContext, prompt: str) -> Event:
+        """
+        Runs the orchestrator's own LLM call, publishing chunks to the active task stream.
+        Uses the model client's streaming API when it has one, with the same instruction and
+        session history the LlmAgent sends; otherwise runs the parent LlmAgent's run_async
+        and publishes the whole response as a single delta
+        """
+        if hasattr(self.llm_client, 'generate_text_stream_async'):
+            response_text = await stream_completion(self.llm_client, self._build_agent_prompt(context, prompt))
+            return Event(
+                author=self.name,
+                actions=[Action(content=Content(parts=[Part(text=response_text)]))]
+            )
+
+        # Use the original context here
+        output_event = await super().run_async(context)
+        publish_delta(self._extract_text_from_event(output_event, ""))
+        return output_event
+
+    def _build_agent_prompt(self, context: InvocationContext, prompt: str) -> str:
+        """
+        Builds the prompt LlmAgent.run_async would send: the agent instruction, the session's
+        earlier turns and the current prompt
+        """
+        sections = []
+        if self.instruction:
+            sections.append(f"System instruction:\n{self.instruction}")
+
+        history = []
+        for event in getattr(context.session, 'events', None) or []:
+            if event is context.input_event:
+                continue
+            text = self._extract_text_from_event(event, "")
+            if text:
+                history.append(f"{event.author or 'user'}: {text}")
+        if history:
+            sections.append("Conversation so far:\n" + "\n".join(history))
+
+        sections.append(f"user: {prompt}")
+        return "\n\n".join(sections)
+
     async def _classify_intent(self, user_prompt: str, task_id: str) -> Tuple[str, Optional[str]]:
         """
-        Uses the agent's LLM to classify the user prompt's intent.
+        Classifies the user prompt's intent, answering from the local rule/nearest-neighbour
+        classifier when it is confident and otherwise asking the agent's LLM.
+        LLM decisions are recorded as training data for the local classifier. A sampled share
+        of confident local answers is also classified by the LLM in the background (shadow
+        evaluation), so rule and nearest-neighbour routing can be scored against LLM labels.
 
         Args:
             user_prompt: The user's input prompt.
             task_id: The ID of the current task for logging.
 
+        Returns:
+            A tuple containing the classified agent key (str) and an optional error message (str).
+            Defaults to "self" on error.
+        """
+        # Fast path: skip the LLM round trip when the local classifier is confident
+        local_prediction = self.intent_classifier.classify(user_prompt)
+        if self.intent_classifier.accepts(local_prediction):
+            logger.info(f"Task {task_id}: Classified locally as '{local_prediction.label}' via {local_prediction.source} (confidence {local_prediction.confidence:.2f}).")
+            if self.intent_classifier.should_shadow(local_prediction):
+                task = asyncio.ensure_future(self._classify_with_llm(user_prompt, task_id, local_prediction, shadow=True))
+                _shadow_tasks.add(task)
+                task.add_done_callback(_shadow_tasks.discard)
+            return local_prediction.label, None
+
+        return await self._classify_with_llm(user_prompt, task_id, local_prediction)
+
+    async def _classify_with_llm(self, user_prompt: str, task_id: str, local_prediction: IntentPrediction,
+                                 shadow: bool = False) -> Tuple[str, Optional[str]]:
+        """
+        Classifies the user prompt with the agent's LLM and records the decision, together with
+        the local prediction, for the local classifier.
+
+        Args:
+            user_prompt: The user's input prompt.
+            task_id: The ID of the current task for logging.
+            local_prediction: The local classifier's prediction for the same prompt.
+            shadow: True when the local answer was already used and this call only labels it.
+
         Returns:
             A tuple containing the classified agent key (str) and an optional error message (str).
             Defaults to "self" on error.
@@ -239,10 +328,7 @@ User Prompt:
 
 Based on the user prompt, output ONLY the key of the most appropriate agent from the list above (market_analyzer, content_generator, lead_generator, freelance_tasker, web_searcher, workflow_manager, self). Do not add any explanation or other text.
 """
-        VALID_AGENT_KEYS = [
-            "market_analyzer", "content_generator", "lead_generator",
-            "freelance_tasker", "web_searcher", "workflow_manager", "self"
-        ]
+        VALID_AGENT_KEYS = list(INTENT_LABELS)
 
         classification_prompt = CLASSIFICATION_PROMPT_TEMPLATE.format(user_prompt=user_prompt)
         logger.debug(f"Task {task_id}: Sending classification prompt to LLM: {classification_prompt}")
@@ -263,15 +349,28 @@ Based on the user prompt, output ONLY the key of the most appropriate agent from
 
             # Call the LLM using the base class method but with the classification prompt
             # Note: We are calling super().run_async which uses the agent's configured model (Gemini)
-            classification_output_event = await super().run_async(temp_context)
+            llm_called = False
 
-            # Extract the classification result
-            llm_response_text = self._extract_text_from_event(classification_output_event, "").strip()
+            async def _call_llm() -> str:
+                nonlocal llm_called
+                llm_called = True
+                classification_output_event = await super(OrchestratorAgent, self).run_async(temp_context)
+                return self._extract_text_from_event(classification_output_event, "")
+
+            # Extract the classification result (repeated prompts are served from the shared LLM cache).
+            # Exact matches only: a near-duplicate request can need a different agent
+            llm_response_text = (await get_llm_cache().generate(
+                'orchestrator', self.model_name, classification_prompt, _call_llm,
+                validate=lambda text: text.strip() in VALID_AGENT_KEYS,
+            )).strip()
 
             logger.debug(f"Task {task_id}: Received classification response from LLM: '{llm_response_text}'")
 
             # Validate the response
             if llm_response_text in VALID_AGENT_KEYS:
+                # A cached answer was recorded when the LLM first gave it
+                if llm_called:
+                    self.intent_classifier.record(user_prompt, llm_response_text, local=local_prediction, shadow=shadow)
                 return llm_response_text, None
             else:
                 logger.warning(f"Task {task_id}: LLM classification returned invalid key: '{llm_response_text}'. Valid keys: {VALID_AGENT_KEYS}")
@@ -283,14 +382,25 @@ Based on the user prompt, output ONLY the key of the most appropriate agent from
             return "self", error_message
 
 
+    @staticmethod
+    def _submitter_id(context: InvocationContext) -> Optional[str]:
+        """User who submitted the task: set in the task data by the orchestrator route, else the session."""
+        task_data = getattr(context, 'invocation_data', None) or {}
+        session_metadata = getattr(getattr(context, 'session', None), 'metadata', None) or {}
+        return task_data.get('user_id') or session_metadata.get('user_id')
+
     def _prepare_delegation_context(self, original_context: InvocationContext, target_agent_key: str, prompt: str) -> InvocationContext:
         """
         Prepares the InvocationContext for the delegated agent.
         Currently passes the original context but adds agent-specific metadata if needed.
+        The submitting user's id is passed to every agent as 'user_id'.
         """
         # Start with the original event
         input_event = original_context.input_event
         metadata = (input_event.metadata or {}).copy() # Start with existing metadata
+        user_id = self._submitter_id(original_context)
+        if user_id:
+            metadata['user_id'] = user_id
 
         # --- Add agent-specific metadata ---
         # This section can be expanded based on the specific needs of each agent
@@ -314,7 +424,7 @@ Based on the user prompt, output ONLY the key of the most appropriate agent from
              action = 'execute_task' # Default
              if any(k in prompt.lower() for k in ["bid", "monitor"]):
                  action = 'monitor_and_bid'
-             user_identifier = original_context.session.metadata.get('user_id', 'placeholder_user_id')
+             user_identifier = user_id or 'placeholder_user_id'
              metadata.update({
                  'action': action,
                  'user_identifier': user_identifier,
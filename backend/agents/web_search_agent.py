@@ -8,6 +8,8 @@ import logfire
 from google.adk.agents import Agent
 from google.adk.runtime import InvocationContext, Event
 
+from utils.search_service import SearchQuotaExceededError, get_search_service
+
 # Load API key from environment variable - consider moving to a config manager
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 
@@ -40,26 +42,11 @@ class WebSearchAgent(Agent):
             # return Event(data={"results": "This is a test web search result. BRAVE_API_KEY not configured."})
             return Event(data={"error": "Brave API key not configured."})
 
-        headers = {
-            'X-Subscription-Token': BRAVE_API_KEY,
-            'Accept': 'application/json',
-        }
-        params = {
-            'q': query,
-            'count': 5,  # Number of results
-            'text_decorations': True,
-            'search_lang': 'en'
-        }
-        search_url = 'https://api.search.brave.com/res/v1/web/search'
-
         try:
-            async with httpx.AsyncClient() as client:
-                with logfire.span('Calling Brave Search API', query=query) as span:
-                    response = await client.get(search_url, params=params, headers=headers)
-                    response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-                    data = response.json()
-                    span.set_attribute('response_status', response.status_code)
-                    # span.set_attribute('response_data', data) # Be cautious logging full response data
+            with logfire.span('Calling Brave Search API', query=query) as span:
+                # Shared service: pooled client, result cache, coalescing and rate limiting
+                data = await get_search_service().search(query, count=5)
+                span.set_attribute('search_stats', get_search_service().stats())
 
             # Format results
             results_list = []
@@ -80,6 +67,9 @@ class WebSearchAgent(Agent):
             else:
                 return Event(data={"message": f"No results found for query: '{query}'"})
 
+        except SearchQuotaExceededError as e:
+            logfire.warn(f"Brave search quota exhausted: {e}")
+            return Event(data={"error": f"Search rate limit reached, try again shortly: {e}"})
         except httpx.HTTPStatusError as e:
             logfire.error(f"Brave API request failed: {e.response.status_code} - {e.response.text}", exc_info=True)
             return Event(data={"error": f"Brave API request failed: {e.response.status_code}"})
@@ -6,7 +6,7 @@ import httpx
 import asyncio # Already imported
 import uuid
 from enum import Enum
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 import logging # Import logging
 
 # Firestore client
@@ -25,11 +25,16 @@ from google.adk.agents import Agent
 from google.adk.runtime import InvocationContext
 from google.adk.runtime.event import Event, EventType
 
+from utils.a2a_transport import get_a2a_transport
+from utils.circuit_breaker import get_circuit_breaker, get_retry_budget, full_jitter_backoff
+from utils.workflow_state_store import WorkflowStateStore, FirestoreStateBackend
+
 # --- Configuration ---
 AGENT_TIMEOUT_SECONDS = int(os.getenv("AGENT_TIMEOUT_SECONDS", 300)) # Timeout for A2A calls
 # --- Retry Configuration ---
 A2A_MAX_RETRIES = int(os.getenv("A2A_MAX_RETRIES", 3)) # Max retries for A2A calls
-A2A_RETRY_DELAY_SECONDS = int(os.getenv("A2A_RETRY_DELAY_SECONDS", 2)) # Delay between retries
+A2A_RETRY_DELAY_SECONDS = int(os.getenv("A2A_RETRY_DELAY_SECONDS", 2)) # Base delay for exponential backoff
+A2A_RETRY_MAX_DELAY_SECONDS = int(os.getenv("A2A_RETRY_MAX_DELAY_SECONDS", 30)) # Cap on backoff delay
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO)
@@ -152,8 +157,8 @@ class MarketingMaterialsPackage(BaseModel):
 
 # --- Workflow State Tracking (Internal) ---
 class WorkflowStatus(str, Enum):
-   STARTING = "STARTING"
-   RUNNING_MARKET_RESEARCH = "RUNNING_MARKET_RESEARCH"
+    STARTING = "STARTING"
+    RUNNING_MARKET_RESEARCH = "RUNNING_MARKET_RESEARCH"
     PENDING_APPROVAL = "PENDING_APPROVAL"
     APPROVED_RESUMING = "APPROVED_RESUMING"
     RUNNING_IMPROVEMENT = "RUNNING_IMPROVEMENT"
@@ -178,12 +183,75 @@ class WorkflowStep(str, Enum):
     DEPLOYMENT = "DEPLOYMENT"
     MARKETING = "MARKETING" # New Marketing step
 
+# --- Workflow DAG ---
+# Each step lists the steps whose results it consumes. Steps whose dependencies
+# are all complete run concurrently; e.g. marketing only needs the product spec
+# and brand, so it runs alongside code generation and deployment.
+WORKFLOW_DAG: Dict[WorkflowStep, Tuple[WorkflowStep, ...]] = {
+    WorkflowStep.MARKET_RESEARCH: (),
+    WorkflowStep.IMPROVEMENT: (WorkflowStep.MARKET_RESEARCH,),
+    WorkflowStep.BRANDING: (WorkflowStep.IMPROVEMENT,),
+    WorkflowStep.CODE_GENERATION: (WorkflowStep.IMPROVEMENT, WorkflowStep.BRANDING),
+    WorkflowStep.DEPLOYMENT: (WorkflowStep.IMPROVEMENT, WorkflowStep.BRANDING, WorkflowStep.CODE_GENERATION),
+    WorkflowStep.MARKETING: (WorkflowStep.IMPROVEMENT, WorkflowStep.BRANDING),
+}
+
+# Firestore field holding each step's checkpointed result
+STEP_RESULT_FIELDS: Dict[WorkflowStep, str] = {
+    WorkflowStep.MARKET_RESEARCH: "market_research_result",
+    WorkflowStep.IMPROVEMENT: "improvement_result",
+    WorkflowStep.BRANDING: "branding_result",
+    WorkflowStep.CODE_GENERATION: "code_generation_result",
+    WorkflowStep.DEPLOYMENT: "deployment_result",
+    WorkflowStep.MARKETING: "marketing_result",
+}
+
+# (agent name, URL attribute on the manager, A2A endpoint suffix, result model)
+STEP_AGENTS: Dict[WorkflowStep, Tuple[str, str, str, type]] = {
+    WorkflowStep.MARKET_RESEARCH: ("Market Research", "market_research_agent_url", "market_research", MarketOpportunityReport),
+    WorkflowStep.IMPROVEMENT: ("Improvement", "improvement_agent_url", "improvement", ImprovedProductSpec),
+    WorkflowStep.BRANDING: ("Branding", "branding_agent_url", "branding", BrandPackage),
+    WorkflowStep.CODE_GENERATION: ("Code Generation", "code_generation_agent_url", "code_generation", CodeGenerationResult),
+    WorkflowStep.DEPLOYMENT: ("Deployment", "deployment_agent_url", "deployment", DeploymentResult),
+    WorkflowStep.MARKETING: ("Marketing", "marketing_agent_url", "marketing", MarketingMaterialsPackage),
+}
+
+STEP_RUNNING_STATUS: Dict[WorkflowStep, WorkflowStatus] = {
+    WorkflowStep.MARKET_RESEARCH: WorkflowStatus.RUNNING_MARKET_RESEARCH,
+    WorkflowStep.IMPROVEMENT: WorkflowStatus.RUNNING_IMPROVEMENT,
+    WorkflowStep.BRANDING: WorkflowStatus.RUNNING_BRANDING,
+    WorkflowStep.CODE_GENERATION: WorkflowStatus.RUNNING_CODE_GENERATION,
+    WorkflowStep.DEPLOYMENT: WorkflowStatus.RUNNING_DEPLOYMENT,
+    WorkflowStep.MARKETING: WorkflowStatus.RUNNING_MARKETING,
+}
+
+STEP_COMPLETED_STATUS: Dict[WorkflowStep, WorkflowStatus] = {
+    WorkflowStep.MARKET_RESEARCH: WorkflowStatus.APPROVED_RESUMING, # Only reached once approved
+    WorkflowStep.IMPROVEMENT: WorkflowStatus.COMPLETED_IMPROVEMENT,
+    WorkflowStep.BRANDING: WorkflowStatus.COMPLETED_BRANDING,
+    WorkflowStep.CODE_GENERATION: WorkflowStatus.COMPLETED_CODE_GENERATION,
+    WorkflowStep.DEPLOYMENT: WorkflowStatus.COMPLETED_DEPLOYMENT,
+    WorkflowStep.MARKETING: WorkflowStatus.COMPLETED_MARKETING,
+}
+
+
+class StepFailure(Exception):
+    """Raised by a workflow step when its agent call fails or the agent reports failure."""
+
+    def __init__(self, step: WorkflowStep, agent_name: str, error_details: str):
+        super().__init__(error_details)
+        self.step = step
+        self.agent_name = agent_name
+        self.error_details = error_details
+
+
 # --- Workflow Manager Agent ---
 
 class WorkflowManagerAgent(Agent):
     """
-    Orchestrates the 4-step autonomous income generation workflow using ADK.
-    Manages state and asynchronous communication between specialized agents via REST APIs.
+    Orchestrates the autonomous income generation workflow using ADK.
+    Manages state and asynchronous communication between specialized agents via REST APIs,
+    running independent steps of WORKFLOW_DAG concurrently.
     Includes retry logic for A2A calls.
     """
 
@@ -199,6 +267,7 @@ class WorkflowManagerAgent(Agent):
         deployment_agent_url: Optional[str],
         marketing_agent_url: Optional[str], # Added Marketing Agent URL
         timeout_seconds: int = AGENT_TIMEOUT_SECONDS,
+        state_store: Optional[WorkflowStateStore] = None, # Overrides the Firestore-backed store (e.g. InMemoryStateBackend offline)
     ):
         super().__init__(agent_id="workflow_manager_agent")
         self.socketio = socketio
@@ -213,18 +282,26 @@ class WorkflowManagerAgent(Agent):
         self.timeout_seconds = timeout_seconds
         self.max_retries = A2A_MAX_RETRIES
         self.retry_delay = A2A_RETRY_DELAY_SECONDS
-
-        if not self.db:
-            logger.warning("WorkflowManagerAgent initialized without a valid Firestore client. State persistence will fail.")
+        self.retry_max_delay = A2A_RETRY_MAX_DELAY_SECONDS
+        self._retry_budget = get_retry_budget() # Shared across workflows so retries stay a fraction of traffic
+
+        # Write-behind state store: status transitions are coalesced per run and
+        # flushed in batches, with immediate flushes at durability points
+        if state_store is not None:
+            self._state_store = state_store
+            logger.info(f"WorkflowManagerAgent initialized with state backend: {type(state_store.backend).__name__}")
+        elif self.db:
+            self._state_store = WorkflowStateStore(FirestoreStateBackend(self.db, self.collection_name))
+            logger.info(f"WorkflowManagerAgent initialized with Firestore collection: {self.collection_name}")
         else:
-             logger.info(f"WorkflowManagerAgent initialized with Firestore collection: {self.collection_name}")
+            self._state_store = None
+            logger.warning("WorkflowManagerAgent initialized without a valid Firestore client. State persistence will fail.")
 
-        # Async HTTP client for A2A calls
-        self._http_client = httpx.AsyncClient(timeout=self.timeout_seconds)
+        # Shared, pooled transport for A2A calls
+        self._transport = get_a2a_transport()
 
     async def close(self):
-        """Clean up resources, like the HTTP client."""
-        await self._http_client.aclose()
+        """Clean up resources. The A2A transport is shared, so its pools stay open."""
         logger.info("WorkflowManagerAgent closed.")
 
     async def _invoke_a2a_agent(
@@ -237,6 +314,8 @@ class WorkflowManagerAgent(Agent):
     ) -> Event:
         """
         Helper function to invoke another agent's A2A endpoint asynchronously with retry logic.
+        Calls are guarded by a per-endpoint circuit breaker, and retries use exponential
+        backoff with full jitter drawn from the shared retry budget.
 
         Args:
             agent_name: User-friendly name of the agent (for logging).
@@ -254,20 +333,26 @@ class WorkflowManagerAgent(Agent):
             return Event(type=EventType.ERROR, data={"error": error_msg})
 
         endpoint_url = f"{agent_url.rstrip('/')}/a2a/{endpoint_suffix}/invoke"
-        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
         last_exception: Optional[Exception] = None
+        breaker = get_circuit_breaker(endpoint_url)
 
-        logger.info(f"[{invocation_id}] Invoking {agent_name} A2A endpoint at {endpoint_url} (Retries: {self.max_retries}, Delay: {self.retry_delay}s)...")
+        logger.info(f"[{invocation_id}] Invoking {agent_name} A2A endpoint at {endpoint_url} (Retries: {self.max_retries}, Base delay: {self.retry_delay}s)...")
+        self._retry_budget.record_request()
 
         for attempt in range(self.max_retries):
+            if not breaker.allow_request():
+                error_msg = f"Circuit breaker for {agent_name} is open; not calling {endpoint_url}."
+                logger.error(f"[{invocation_id}] Error: {error_msg}")
+                return Event(type=EventType.ERROR, data={"error": error_msg, "details": "Circuit Open"})
+
             try:
-                response = await self._http_client.post(
+                response = await self._transport.post_json(
                     endpoint_url,
-                    json=payload,
-                    headers=headers,
+                    payload,
                     timeout=self.timeout_seconds
                 )
                 response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+                breaker.record_success()
 
                 # --- Success Case ---
                 try:
@@ -288,6 +373,7 @@ class WorkflowManagerAgent(Agent):
 
             except (httpx.TimeoutException, httpx.ConnectError) as e:
                 last_exception = e
+                breaker.record_failure()
                 logger.warning(f"[{invocation_id}] A2A call to {agent_name} failed (Attempt {attempt + 1}/{self.max_retries}): Timeout or Connection Error ({type(e).__name__}).")
                 # Fall through to retry logic
 
@@ -295,10 +381,13 @@ class WorkflowManagerAgent(Agent):
                 last_exception = e
                 # Retry only on 5xx server errors
                 if e.response.status_code >= 500:
+                    breaker.record_failure()
                     logger.warning(f"[{invocation_id}] A2A call to {agent_name} failed (Attempt {attempt + 1}/{self.max_retries}): Server Error ({e.response.status_code}).")
                     # Fall through to retry logic
                 else:
                     # Non-5xx HTTP error (e.g., 4xx), likely not transient. Don't retry.
+                    # The endpoint itself answered, so it counts as healthy for the breaker.
+                    breaker.record_success()
                     error_detail = str(e)
                     try:
                         error_detail += f" | Status: {e.response.status_code} | Response: {e.response.text[:500]}"
@@ -310,12 +399,14 @@ class WorkflowManagerAgent(Agent):
             except httpx.RequestError as e:
                 # Catch other potential request errors (less common)
                 last_exception = e
+                breaker.record_failure()
                 logger.warning(f"[{invocation_id}] A2A call to {agent_name} failed (Attempt {attempt + 1}/{self.max_retries}): Request Error ({type(e).__name__}: {e}).")
                 # Fall through to retry logic
 
             except Exception as e:
                  # Catch unexpected errors during the call itself (not response processing)
                  last_exception = e
+                 breaker.record_failure()
                  logger.error(f"[{invocation_id}] Unexpected error during {agent_name} A2A call attempt {attempt + 1}/{self.max_retries}: {type(e).__name__}: {e}", exc_info=True)
                  # If it's the last attempt, let it be handled below. Otherwise, retry.
                  if attempt >= self.max_retries - 1:
@@ -323,8 +414,12 @@ class WorkflowManagerAgent(Agent):
 
             # --- Retry Logic ---
             if attempt < self.max_retries - 1:
-                logger.info(f"[{invocation_id}] Retrying in {self.retry_delay}s...")
-                await asyncio.sleep(self.retry_delay)
+                if not self._retry_budget.try_acquire_retry():
+                    logger.warning(f"[{invocation_id}] Retry budget exhausted; not retrying {agent_name}.")
+                    break
+                delay = full_jitter_backoff(attempt, self.retry_delay, self.retry_max_delay)
+                logger.info(f"[{invocation_id}] Retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
             else:
                 logger.error(f"[{invocation_id}] A2A call to {agent_name} failed after {self.max_retries} attempts.")
                 break # Exit loop after last attempt
@@ -348,22 +443,34 @@ class WorkflowManagerAgent(Agent):
         return Event(type=EventType.ERROR, data={"error": error_msg, "details": error_details})
 
 
-    async def _update_workflow_state(self, workflow_run_id: str, state_data: Dict[str, Any]):
-        """Helper to update workflow state in Firestore."""
-        if not self.db:
+    async def _update_workflow_state(self, workflow_run_id: str, state_data: Dict[str, Any], durable: bool = False):
+        """
+        Helper to update workflow state through the write-behind store.
+        Updates are coalesced and flushed shortly after; pass durable=True at
+        points that must be persisted before continuing (step results, approval, failure, completion).
+        """
+        if not self._state_store:
             logger.error(f"[{workflow_run_id}] Error: Firestore client not available. Cannot update state.")
             return
 
         try:
             # Add timestamp for tracking
             state_data['last_updated'] = firestore.SERVER_TIMESTAMP
-            doc_ref = self.db.collection(self.collection_name).document(workflow_run_id)
-            await doc_ref.set(state_data, merge=True)
-            logger.info(f"[{workflow_run_id}] Firestore state updated: Status={state_data.get('status')}, Step={state_data.get('current_step')}")
+            await self._state_store.update(workflow_run_id, state_data, durable=durable)
+            logger.info(f"[{workflow_run_id}] Workflow state {'flushed' if durable else 'queued'}: Status={state_data.get('status')}, Step={state_data.get('current_step')}")
         except Exception as e:
             logger.error(f"[{workflow_run_id}] Error updating Firestore state: {type(e).__name__}: {e}", exc_info=True)
             # Decide if this error should propagate or just be logged
 
+    async def _flush_workflow_state(self, workflow_run_id: Optional[str]):
+        """Flushes queued state updates so nothing is lost when the run's event loop ends."""
+        if not self._state_store:
+            return
+        try:
+            await self._state_store.flush()
+        except Exception as e:
+            logger.error(f"[{workflow_run_id}] Error flushing workflow state: {type(e).__name__}: {e}", exc_info=True)
+
 
     async def _handle_step_failure(self, workflow_run_id: str, current_step: WorkflowStep, error_details: str, agent_name: str) -> Event:
         """Handles Firestore update, SocketIO emit, and returns final error event for a failed step."""
@@ -373,17 +480,184 @@ class WorkflowManagerAgent(Agent):
             "status": current_status.value,
             "current_step": current_step.value,
             "error_message": error_details
-        })
+        }, durable=True)
         self.socketio.emit('workflow_failed', {'workflow_run_id': workflow_run_id, 'failed_step': current_step.value, 'error': error_details})
         return Event(type=EventType.ERROR, data={"error": error_details, "stage": current_step.value, "workflow_run_id": workflow_run_id})
 
+    def _ready_steps(self, results: Dict[WorkflowStep, Dict], running: Set[WorkflowStep], approved: bool) -> List[WorkflowStep]:
+        """Steps whose dependencies are all checkpointed and that are not done or in flight."""
+        ready = []
+        for step, dependencies in WORKFLOW_DAG.items():
+            if step in results or step in running:
+                continue
+            if not all(dep in results for dep in dependencies):
+                continue
+            # Nothing downstream of market research runs until the user approves it
+            if WorkflowStep.MARKET_RESEARCH in dependencies and not approved:
+                continue
+            ready.append(step)
+        return ready
+
+    def _build_step_payload(
+        self,
+        step: WorkflowStep,
+        initial_topic: str,
+        target_url: Optional[str],
+        results: Dict[WorkflowStep, Dict],
+    ) -> Dict[str, Any]:
+        """Builds the A2A request payload for a step from its dependencies' results."""
+        if step == WorkflowStep.MARKET_RESEARCH:
+            return MarketResearchInput(
+                initial_topic=initial_topic,
+                target_url=target_url
+            ).model_dump(exclude_none=True)
+
+        if step == WorkflowStep.IMPROVEMENT:
+            market_report_data = results[WorkflowStep.MARKET_RESEARCH]
+            return ImprovementAgentInput(
+                product_concept=initial_topic,
+                competitor_weaknesses=market_report_data.get('competitor_weaknesses', []),
+                market_gaps=market_report_data.get('market_gaps', []),
+                target_audience_suggestions=market_report_data.get('target_audience_suggestions', []),
+                feature_recommendations_from_market=market_report_data.get('feature_recommendations', []),
+                business_model_type="saas" # Placeholder
+            ).model_dump(exclude_none=True)
+
+        product_spec_data = results[WorkflowStep.IMPROVEMENT]
+
+        if step == WorkflowStep.BRANDING:
+            keywords = product_spec_data.get('product_concept', '').lower().split()[:5]
+            return BrandingAgentInput(
+                product_concept=product_spec_data.get('product_concept', initial_topic),
+                target_audience=product_spec_data.get('target_audience', []),
+                keywords=keywords,
+                business_model_type="saas" # Placeholder
+            ).model_dump(exclude_none=True)
+
+        brand_package_data = results[WorkflowStep.BRANDING]
+
+        if step == WorkflowStep.DEPLOYMENT:
+            code_generation_result_data = results[WorkflowStep.CODE_GENERATION]
+            return DeploymentAgentInput(
+                brand_name=brand_package_data.get('brand_name', 'Unnamed Brand'),
+                product_concept=product_spec_data.get('product_concept', initial_topic),
+                key_features=product_spec_data.get('key_features', []),
+                generated_code_dict=code_generation_result_data.get('generated_code_dict') # Pass the generated code
+            ).model_dump(exclude_none=True)
+
+        # Re-validate/parse data into expected Pydantic models for the input
+        try:
+            product_spec_model = ImprovedProductSpec(**product_spec_data)
+            brand_package_model = BrandPackage(**brand_package_data)
+        except ValidationError as ve:
+            raise RuntimeError(f"Failed to validate data for {step.value} input: {ve}")
+
+        if step == WorkflowStep.CODE_GENERATION:
+            return CodeGenerationAgentInput(
+                product_spec=product_spec_model,
+                brand_package=brand_package_model
+            ).model_dump(exclude_none=True)
+
+        if step == WorkflowStep.MARKETING:
+            # Marketing runs alongside code generation/deployment, so the URL is
+            # only included when deployment already finished (e.g. on resume).
+            deployment_result_data = results.get(WorkflowStep.DEPLOYMENT) or {}
+            return MarketingAgentInput(
+                product_spec=product_spec_model,
+                brand_package=brand_package_model,
+                deployment_url=deployment_result_data.get('deployment_url')
+            ).model_dump(exclude_none=True)
+
+        raise ValueError(f"No payload builder for step {step.value}.")
+
+    async def _run_step(
+        self,
+        step: WorkflowStep,
+        invocation_id: str,
+        initial_topic: str,
+        target_url: Optional[str],
+        results: Dict[WorkflowStep, Dict],
+    ) -> Dict[str, Any]:
+        """
+        Runs one workflow node: invokes its agent and validates the result.
+
+        Returns:
+            The validated result as a serializable dict.
+
+        Raises:
+            StepFailure: If the agent call failed or the agent reported failure.
+        """
+        agent_name, url_attr, endpoint_suffix, result_model = STEP_AGENTS[step]
+        payload = self._build_step_payload(step, initial_topic, target_url, results)
+
+        event = await self._invoke_a2a_agent(
+            agent_name=agent_name, agent_url=getattr(self, url_attr),
+            endpoint_suffix=endpoint_suffix, invocation_id=invocation_id,
+            payload=payload,
+        )
+
+        if event.type == EventType.ERROR:
+            # A2A call itself failed (handled by _invoke_a2a_agent returning ERROR event)
+            raise StepFailure(step, agent_name, event.data.get('error', f'{agent_name} A2A call failed'))
+        if not event.data: raise RuntimeError(f"{agent_name} Agent returned no data.")
+
+        try:
+            result = result_model(**event.data)
+        except ValidationError as ve:
+            raise StepFailure(step, agent_name, f"{agent_name} Agent response validation failed: {ve}")
+
+        # Check if the agent reported failure *within* the successful event
+        reported_status = result.status.lower()
+        if step == WorkflowStep.DEPLOYMENT:
+            # Treat 'failed' or non-'active' status as failure
+            if reported_status != 'active':
+                raise StepFailure(step, agent_name, result.error_message or f"Deployment Agent reported status '{result.status}'.")
+        elif reported_status == 'failed':
+            raise StepFailure(step, agent_name, result.error_message or f"{agent_name} Agent reported failure without details.")
+
+        result_data = result.model_dump()
+        if step == WorkflowStep.CODE_GENERATION and not result_data.get('generated_code_dict'):
+            raise StepFailure(step, agent_name, "Code Generation Agent response validation failed or missing data: response missing 'generated_code_dict'.")
+
+        try:
+            # Ensure data is serializable before checkpointing and emitting
+            return json.loads(json.dumps(result_data))
+        except (TypeError, ValueError) as json_err:
+            raise RuntimeError(f"{agent_name} result could not be serialized: {json_err}")
+
+    def _passes_feasibility_check(self, workflow_run_id: str, product_spec_data: Dict[str, Any]) -> bool:
+        """Decides whether the improved product has enough potential to continue past improvement."""
+        logger.info(f"[{workflow_run_id}] Performing feasibility check based on Improvement result.")
+        potential_rating = (product_spec_data.get('potential_rating') or 'Low').capitalize() # Default to Low if missing
+        feasibility_score = product_spec_data.get('feasibility_score') # Optional score
+
+        # Define threshold (e.g., Medium or High potential, or score >= 0.6)
+        if potential_rating in ['Medium', 'High']:
+            logger.info(f"[{workflow_run_id}] Feasibility check passed (Potential: {potential_rating}). Proceeding to Branding.")
+            return True
+        if feasibility_score is not None:
+            try:
+                if float(feasibility_score) >= 0.6:
+                    logger.info(f"[{workflow_run_id}] Feasibility check passed (Score: {feasibility_score} >= 0.6). Proceeding to Branding.")
+                    return True
+                logger.warning(f"[{workflow_run_id}] Feasibility check failed (Score: {feasibility_score} < 0.6). Stopping workflow.")
+            except (ValueError, TypeError):
+                logger.warning(f"[{workflow_run_id}] Invalid feasibility_score format ('{feasibility_score}'). Treating as low potential.")
+            return False
+        logger.warning(f"[{workflow_run_id}] Feasibility check failed (Potential: {potential_rating}). Stopping workflow.")
+        return False
+
     async def run_async(self, context: InvocationContext) -> Event:
         """
-        ADK entry point to orchestrate the 4-step workflow asynchronously using Firestore for state.
-        This method handles both initial invocation and resumption based on Firestore state.
+        ADK entry point to orchestrate the workflow asynchronously using Firestore for state.
+        Steps are scheduled from WORKFLOW_DAG: every step whose dependencies are complete
+        runs concurrently, and each result is checkpointed as soon as it arrives, so a
+        resumed run picks up from whatever set of steps already finished.
         """
         invocation_id = context.invocation_id # ADK's invocation ID
         input_data = context.input.data or {}
+        # Submitting user: in the input data (resume tasks) or the event metadata (orchestrator delegations)
+        user_id = input_data.get("user_id") or (getattr(context.input, "metadata", None) or {}).get("user_id")
 
         # Determine if starting new or potentially resuming
         workflow_run_id = input_data.get("workflow_run_id")
@@ -395,16 +669,12 @@ class WorkflowManagerAgent(Agent):
         error_message: Optional[str] = None
         initial_topic: Optional[str] = None
         target_url: Optional[str] = None
-        market_report_data: Optional[Dict] = None
-        product_spec_data: Optional[Dict] = None
-        brand_package_data: Optional[Dict] = None
-        code_generation_result_data: Optional[Dict] = None # Added
-        deployment_result_data: Optional[Dict] = None
-        marketing_result_data: Optional[Dict] = None # Added Marketing result
+        approved = False # Whether the user approved the market research result
+        results: Dict[WorkflowStep, Dict] = {} # Checkpointed result per completed step
         state: Dict[str, Any] = {} # To hold the loaded Firestore state
 
         # --- Firestore Check ---
-        if not self.db:
+        if not self._state_store:
              logger.critical(f"[{workflow_run_id or 'NEW'}] FATAL ERROR: Firestore client is not initialized. Aborting workflow.")
              return Event(type=EventType.ERROR, data={
                  "error": "Firestore client not available. Workflow cannot proceed or record state.",
@@ -431,30 +701,40 @@ class WorkflowManagerAgent(Agent):
                     "initial_topic": initial_topic,
                     "target_url": target_url,
                     "invocation_id": invocation_id,
+                    "user_id": user_id, # Owner; only they can approve, reject or resume the run
                     "current_step": None,
+                    "completed_steps": [],
+                    "running_steps": [],
                 }
                 await self._update_workflow_state(workflow_run_id, state)
             else:
                 # Load existing state from Firestore
                 logger.info(f"[{invocation_id}/{workflow_run_id}] Attempting to load existing workflow run.")
-                doc_ref = self.db.collection(self.collection_name).document(workflow_run_id)
-                doc_snapshot = await doc_ref.get()
-                if not doc_snapshot.exists:
-                    raise ValueError(f"Workflow run ID '{workflow_run_id}' not found in Firestore.")
+                state = await self._state_store.get(workflow_run_id)
+                # Runs owned by another user are reported as missing, without touching their state
+                if state is None or state.get("user_id") != user_id:
+                    logger.warning(f"[{invocation_id}/{workflow_run_id}] Workflow run not found for user {user_id}.")
+                    return Event(type=EventType.ERROR, data={
+                        "error": f"Workflow run ID '{workflow_run_id}' not found.",
+                        "workflow_run_id": workflow_run_id,
+                        "stage": None
+                    })
 
-                state = doc_snapshot.to_dict()
                 initial_topic = state.get("initial_topic")
                 target_url = state.get("target_url")
-                market_report_data = state.get("market_research_result")
-                product_spec_data = state.get("improvement_result")
-                brand_package_data = state.get("branding_result")
-                code_generation_result_data = state.get("code_generation_result") # Added
-                deployment_result_data = state.get("deployment_result") # Load deployment result too
-                marketing_result_data = state.get("marketing_result") # Load marketing result
-                current_status = WorkflowStatus(state.get("status", WorkflowStatus.FAILED.value)) # Default to FAILED if missing
+                # Any step with a checkpointed result counts as complete, which also
+                # covers runs persisted before DAG scheduling was introduced
+                results = {
+                    step: state[field] for step, field in STEP_RESULT_FIELDS.items() if state.get(field)
+                }
+                # Status may have been written in lowercase by the resume route
+                current_status = WorkflowStatus(str(state.get("status", WorkflowStatus.FAILED.value)).upper()) # Default to FAILED if missing
                 current_step = WorkflowStep(state["current_step"]) if state.get("current_step") else None
+                approved = bool(state.get("approved")) or current_status not in (
+                    WorkflowStatus.STARTING, WorkflowStatus.RUNNING_MARKET_RESEARCH, WorkflowStatus.PENDING_APPROVAL
+                )
 
-                logger.info(f"[{workflow_run_id}] State loaded from Firestore. Status: {current_status.value}, Last Step: {current_step.value if current_step else 'None'}")
+                logger.info(f"[{workflow_run_id}] State loaded from Firestore. Status: {current_status.value}, Completed Steps: {[step.value for step in results]}")
 
                 # Handle the case where the frontend signals approval
                 # The frontend might trigger a resume call after user clicks 'approve'
@@ -462,465 +742,156 @@ class WorkflowManagerAgent(Agent):
                 if current_status == WorkflowStatus.PENDING_APPROVAL:
                     logger.info(f"[{workflow_run_id}] Workflow was pending approval. Transitioning to APPROVED_RESUMING.")
                     current_status = WorkflowStatus.APPROVED_RESUMING
-                    await self._update_workflow_state(workflow_run_id, {"status": current_status.value})
-                    # State is now updated, the logic below will pick up from here
-
-                # Validation: Ensure necessary data exists for the expected next step
-                if current_status == WorkflowStatus.APPROVED_RESUMING and not market_report_data:
-                    raise ValueError("Cannot resume from improvement: Market research result missing in Firestore.")
-                if current_status == WorkflowStatus.COMPLETED_IMPROVEMENT and not product_spec_data:
-                     raise ValueError("Cannot resume from branding: Improvement result missing in Firestore.")
-                if current_status == WorkflowStatus.COMPLETED_BRANDING and (not product_spec_data or not brand_package_data):
-                     raise ValueError("Cannot resume from code generation: Improvement or Branding result missing in Firestore.")
-                if current_status == WorkflowStatus.COMPLETED_CODE_GENERATION and (not brand_package_data or not code_generation_result_data): # Added check
-                     raise ValueError("Cannot resume from deployment: Branding or Code Generation result missing in Firestore.")
-                if current_status == WorkflowStatus.COMPLETED_DEPLOYMENT and (not product_spec_data or not brand_package_data or not deployment_result_data): # Added check
-                     raise ValueError("Cannot resume from marketing: Product Spec, Branding, or Deployment result missing in Firestore.")
+                    approved = True
+                    await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "approved": True})
+
                 if not initial_topic: # Should always exist if state was loaded
                      raise ValueError("Cannot resume: Initial topic missing in Firestore state.")
 
+            # Handle terminal states (e.g., if status is already COMPLETED or FAILED when invoked)
+            if current_status in [WorkflowStatus.COMPLETED, WorkflowStatus.FAILED, WorkflowStatus.STOPPED_LOW_POTENTIAL]:
+                 logger.warning(f"[{workflow_run_id}] Workflow is already in a terminal state ({current_status.value}). No further action taken.")
+                 # Return the final result if completed, or an error if failed/stopped
+                 final_data = state.get("final_result") if current_status == WorkflowStatus.COMPLETED else state.get("error", "Workflow previously failed.")
+                 event_type = EventType.RESULT if current_status == WorkflowStatus.COMPLETED else EventType.ERROR
+                 return Event(type=event_type, data=final_data)
 
             # --- Workflow Execution Logic ---
-            # Determine which steps need to run based on the current status
-
-            # Step 1: Market Research
-            if current_status == WorkflowStatus.STARTING:
-                current_step = WorkflowStep.MARKET_RESEARCH
-                logger.info(f"\n[{workflow_run_id}] --- Running Step: {current_step.value} ---")
-                current_status = WorkflowStatus.RUNNING_MARKET_RESEARCH # Set specific running status
-                await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "current_step": current_step.value})
-
-                market_research_payload = MarketResearchInput(
-                    initial_topic=initial_topic,
-                    target_url=target_url
-                ).model_dump(exclude_none=True)
-
-                market_event = await self._invoke_a2a_agent(
-                    agent_name="Market Research", agent_url=self.market_research_agent_url,
-                    endpoint_suffix="market_research", invocation_id=invocation_id,
-                    payload=market_research_payload,
-                )
-
-                if market_event.type == EventType.ERROR:
-                    # A2A call itself failed (handled by _invoke_a2a_agent returning ERROR event)
-                    error_details = market_event.data.get('error', 'Market Research A2A call failed')
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Market Research")
-                if not market_event.data: raise RuntimeError("Market Research Agent returned no data.")
-
-                try:
-                    market_report = MarketOpportunityReport(**market_event.data)
-                    market_report_data = market_report.model_dump()
-                    # Check if the agent reported failure *within* the successful event
-                    if market_report.status.lower() == 'failed':
-                        error_details = market_report.error_message or "Market Research Agent reported failure without details."
-                        return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Market Research")
-                except ValidationError as ve:
-                    error_details = f"Market Research Agent response validation failed: {ve}"
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Market Research")
-
-                logger.info(f"[{workflow_run_id}] --- Step {current_step.value} Complete ---")
-
-                # --- Pause for Approval ---
-                logger.info(f"[{workflow_run_id}] Pausing for user approval after Market Research.")
-                try:
-                    # Ensure data is serializable before saving and emitting
-                    serializable_market_data = json.loads(json.dumps(market_report_data))
-                except (TypeError, ValueError) as json_err:
-                    raise RuntimeError(f"Market research result could not be serialized: {json_err}")
-
-                current_status = WorkflowStatus.PENDING_APPROVAL
-                await self._update_workflow_state(workflow_run_id, {
-                    "status": current_status.value,
-                    "current_step": current_step.value, # Keep track of the last completed step
-                    "market_research_result": serializable_market_data
-                })
-
-                logger.info(f"[{workflow_run_id}] Emitting 'workflow_approval_required' via SocketIO.")
-                self.socketio.emit('workflow_approval_required', {
-                    'workflow_run_id': workflow_run_id,
-                    'data_to_approve': serializable_market_data
-                })
-
-                # End execution here; resumption happens in a new invocation triggered by approval
-                return Event(type=EventType.RESULT, data={
-                    "status": current_status.value,
-                    "workflow_run_id": workflow_run_id,
-                    "message": "Workflow paused for approval after market research."
-                })
-
-            # Step 2: Product Improvement
-            # Run if status is APPROVED_RESUMING (meaning market research is done and approved)
-            if current_status == WorkflowStatus.APPROVED_RESUMING:
-                current_step = WorkflowStep.IMPROVEMENT
-                logger.info(f"\n[{workflow_run_id}] --- Running Step: {current_step.value} ---")
-                current_status = WorkflowStatus.RUNNING_IMPROVEMENT # Set specific running status
-                await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "current_step": current_step.value})
-
-                if not market_report_data: raise ValueError("Market research data missing for improvement step.") # Should be loaded
-
-                improvement_payload = ImprovementAgentInput(
-                    product_concept=initial_topic,
-                    competitor_weaknesses=market_report_data.get('competitor_weaknesses', []),
-                    market_gaps=market_report_data.get('market_gaps', []),
-                    target_audience_suggestions=market_report_data.get('target_audience_suggestions', []),
-                    feature_recommendations_from_market=market_report_data.get('feature_recommendations', []),
-                    business_model_type="saas" # Placeholder
-                ).model_dump(exclude_none=True)
-
-                improvement_event = await self._invoke_a2a_agent(
-                    agent_name="Improvement", agent_url=self.improvement_agent_url,
-                    endpoint_suffix="improvement", invocation_id=invocation_id,
-                    payload=improvement_payload,
-                )
-
-                if improvement_event.type == EventType.ERROR:
-                    error_details = improvement_event.data.get('error', 'Improvement A2A call failed')
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Improvement")
-                if not improvement_event.data: raise RuntimeError("Improvement Agent returned no data.")
-
-                try:
-                    product_spec = ImprovedProductSpec(**improvement_event.data)
-                    product_spec_data = product_spec.model_dump()
-                    # Check if the agent reported failure *within* the successful event
-                    if product_spec.status.lower() == 'failed':
-                        error_details = product_spec.error_message or "Improvement Agent reported failure without details."
-                        return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Improvement")
-                except ValidationError as ve:
-                    error_details = f"Improvement Agent response validation failed: {ve}"
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Improvement")
-
-                logger.info(f"[{workflow_run_id}] --- Step {current_step.value} Complete ---")
-                current_status = WorkflowStatus.COMPLETED_IMPROVEMENT # Set completed status
-                await self._update_workflow_state(workflow_run_id, {
-                    "status": current_status.value,
-                    "current_step": current_step.value,
-                    "improvement_result": product_spec_data # Save the result
-                })
-
-                # --- Feasibility Check ---
-                logger.info(f"[{workflow_run_id}] Performing feasibility check based on Improvement result.")
-                potential_rating = product_spec_data.get('potential_rating', 'Low').capitalize() # Default to Low if missing
-                feasibility_score = product_spec_data.get('feasibility_score') # Optional score
-                assessment_rationale = product_spec_data.get('assessment_rationale', 'Assessment rationale not provided.')
-
-                # Define threshold (e.g., Medium or High potential, or score >= 0.6)
-                proceed_to_branding = False
-                if potential_rating in ['Medium', 'High']:
-                    proceed_to_branding = True
-                    logger.info(f"[{workflow_run_id}] Feasibility check passed (Potential: {potential_rating}). Proceeding to Branding.")
-                elif feasibility_score is not None:
-                    try:
-                        if float(feasibility_score) >= 0.6:
-                             proceed_to_branding = True
-                             logger.info(f"[{workflow_run_id}] Feasibility check passed (Score: {feasibility_score} >= 0.6). Proceeding to Branding.")
-                        else:
-                             logger.warning(f"[{workflow_run_id}] Feasibility check failed (Score: {feasibility_score} < 0.6). Stopping workflow.")
-                    except (ValueError, TypeError):
-                         logger.warning(f"[{workflow_run_id}] Invalid feasibility_score format ('{feasibility_score}'). Treating as low potential.")
-                         # proceed_to_branding remains False
-                else:
-                    logger.warning(f"[{workflow_run_id}] Feasibility check failed (Potential: {potential_rating}). Stopping workflow.")
-
-
-                if not proceed_to_branding:
-                    # Stop the workflow due to low potential
-                    current_status = WorkflowStatus.STOPPED_LOW_POTENTIAL
-                    stop_message = f"Workflow stopped: Potential rated '{potential_rating}'"
-                    if feasibility_score is not None:
-                        stop_message += f" (Score: {feasibility_score})"
-                    stop_message += "."
-
-                    logger.warning(f"[{workflow_run_id}] {stop_message} Rationale: {assessment_rationale}")
-
-                    await self._update_workflow_state(workflow_run_id, {
-                        "status": current_status.value,
-                        "current_step": current_step.value, # Still IMPROVEMENT step technically
-                        "error": stop_message # Use error field for stop reason
-                    })
-
-                    # Emit SocketIO update
-                    self.socketio.emit('task_update', {
-                        'workflow_run_id': workflow_run_id,
-                        'status': current_status.value,
-                        'message': stop_message,
-                        'rationale': assessment_rationale,
-                        'step': current_step.value
-                    })
-
-                    # Return a final event indicating controlled stop
-                    return Event(type=EventType.RESULT, data={
-                        "status": current_status.value,
-                        "workflow_run_id": workflow_run_id,
-                        "message": stop_message,
-                        "rationale": assessment_rationale
-                    })
-                # --- End Feasibility Check ---
-
-                # Fall through to Branding ONLY IF feasibility check passed
-
-            # Step 3: Rebranding
-            # Run if status is COMPLETED_IMPROVEMENT (meaning improvement step finished successfully AND passed feasibility)
-            if current_status == WorkflowStatus.COMPLETED_IMPROVEMENT:
-                current_step = WorkflowStep.BRANDING
-                logger.info(f"\n[{workflow_run_id}] --- Running Step: {current_step.value} ---")
-                current_status = WorkflowStatus.RUNNING_BRANDING # Set specific running status
-                await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "current_step": current_step.value})
-
-                if not product_spec_data: raise ValueError("Product spec data missing for branding step.") # Should be loaded or just generated
-
-                keywords = product_spec_data.get('product_concept', '').lower().split()[:5]
-                branding_payload = BrandingAgentInput(
-                    product_concept=product_spec_data.get('product_concept', initial_topic),
-                    target_audience=product_spec_data.get('target_audience', []),
-                    keywords=keywords,
-                    business_model_type="saas" # Placeholder
-                ).model_dump(exclude_none=True)
-
-                branding_event = await self._invoke_a2a_agent(
-                    agent_name="Branding", agent_url=self.branding_agent_url,
-                    endpoint_suffix="branding", invocation_id=invocation_id,
-                    payload=branding_payload,
-                )
-
-                if branding_event.type == EventType.ERROR:
-                    error_details = branding_event.data.get('error', 'Branding A2A call failed')
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Branding")
-                if not branding_event.data: raise RuntimeError("Branding Agent returned no data.")
-
-                try:
-                    brand_package = BrandPackage(**branding_event.data)
-                    brand_package_data = brand_package.model_dump()
-                    # Check if the agent reported failure *within* the successful event
-                    if brand_package.status.lower() == 'failed':
-                        error_details = brand_package.error_message or "Branding Agent reported failure without details."
-                        return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Branding")
-                except ValidationError as ve:
-                    error_details = f"Branding Agent response validation failed: {ve}"
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Branding")
-
-                logger.info(f"[{workflow_run_id}] --- Step {current_step.value} Complete ---")
-                current_status = WorkflowStatus.COMPLETED_BRANDING # Set completed status
-                await self._update_workflow_state(workflow_run_id, {
-                    "status": current_status.value,
-                    "current_step": current_step.value,
-                    "branding_result": brand_package_data # Save the result
-                })
-                # Fall through to Code Generation
-
-            # Step 4: Code Generation
-            # Run if status is COMPLETED_BRANDING
-            if current_status == WorkflowStatus.COMPLETED_BRANDING:
-                current_step = WorkflowStep.CODE_GENERATION
-                logger.info(f"\n[{workflow_run_id}] --- Running Step: {current_step.value} ---")
-                current_status = WorkflowStatus.RUNNING_CODE_GENERATION
-                await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "current_step": current_step.value})
-
-                if not product_spec_data or not brand_package_data:
-                    raise ValueError("Product spec or brand package data missing for code generation step.")
-
-                # Re-validate/parse data into expected Pydantic models for the input
-                try:
-                    product_spec_model = ImprovedProductSpec(**product_spec_data)
-                    brand_package_model = BrandPackage(**brand_package_data)
-                except ValidationError as ve:
-                    raise RuntimeError(f"Failed to validate data for Code Generation input: {ve}")
-
-                code_gen_payload = CodeGenerationAgentInput(
-                    product_spec=product_spec_model,
-                    brand_package=brand_package_model
-                ).model_dump(exclude_none=True)
-
-                code_gen_event = await self._invoke_a2a_agent(
-                    agent_name="Code Generation", agent_url=self.code_generation_agent_url,
-                    endpoint_suffix="code_generation", invocation_id=invocation_id,
-                    payload=code_gen_payload,
-                )
-
-                if code_gen_event.type == EventType.ERROR:
-                    error_details = code_gen_event.data.get('error', 'Code Generation A2A call failed')
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Code Generation")
-                if not code_gen_event.data: raise RuntimeError("Code Generation Agent returned no data.")
-
-                try:
-                    code_gen_result = CodeGenerationResult(**code_gen_event.data)
-                    code_generation_result_data = code_gen_result.model_dump()
-                    # Check if the agent reported failure *within* the successful event
-                    if code_gen_result.status.lower() == 'failed':
-                        error_details = code_gen_result.error_message or "Code Generation Agent reported failure without details."
-                        return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Code Generation")
-
-                    if not code_generation_result_data.get('generated_code_dict'):
-                         raise ValueError("Code Generation Agent response missing 'generated_code_dict'.")
-                except (ValidationError, ValueError) as ve:
-                    error_details = f"Code Generation Agent response validation failed or missing data: {ve}"
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Code Generation")
-
-                logger.info(f"[{workflow_run_id}] --- Step {current_step.value} Complete ---")
-                current_status = WorkflowStatus.COMPLETED_CODE_GENERATION
-                await self._update_workflow_state(workflow_run_id, {
-                    "status": current_status.value,
-                    "current_step": current_step.value,
-                    "code_generation_result": code_generation_result_data # Save the result
-                })
-                # Fall through to Deployment
-
-            # Step 5: Deployment (was Step 4)
-            # Run if status is COMPLETED_CODE_GENERATION
-            if current_status == WorkflowStatus.COMPLETED_CODE_GENERATION:
-                current_step = WorkflowStep.DEPLOYMENT
-                logger.info(f"\n[{workflow_run_id}] --- Running Step: {current_step.value} ---")
-                current_status = WorkflowStatus.RUNNING_DEPLOYMENT # Set specific running status
-                await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "current_step": current_step.value})
-
-                # Need brand package for brand name, code generation result for the code
-                if not brand_package_data or not code_generation_result_data:
-                    raise ValueError("Brand package or code generation data missing for deployment step.")
-                # Also need product spec for concept/features (load from state if not already loaded)
-                if not product_spec_data:
-                    product_spec_data = state.get("improvement_result")
-                    if not product_spec_data:
-                         raise ValueError("Product spec data missing for deployment step (failed to load from state).")
-
-
-                deployment_payload = DeploymentAgentInput(
-                    brand_name=brand_package_data.get('brand_name', 'Unnamed Brand'),
-                    product_concept=product_spec_data.get('product_concept', initial_topic), # Use spec data
-                    key_features=product_spec_data.get('key_features', []), # Use spec data
-                    generated_code_dict=code_generation_result_data.get('generated_code_dict') # Pass the generated code
-                ).model_dump(exclude_none=True)
-
-                deployment_event = await self._invoke_a2a_agent(
-                    agent_name="Deployment", agent_url=self.deployment_agent_url,
-                    endpoint_suffix="deployment", invocation_id=invocation_id,
-                    payload=deployment_payload,
-                )
-
-                if deployment_event.type == EventType.ERROR:
-                    error_details = deployment_event.data.get('error', 'Deployment A2A call failed')
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Deployment")
-                if not deployment_event.data: raise RuntimeError("Deployment Agent returned no data.")
-
-                try:
-                    deployment_result = DeploymentResult(**deployment_event.data)
-                    deployment_result_data = deployment_result.model_dump()
-                    # Check if the agent reported failure *within* the successful event
-                    # Treat 'failed' or non-'active' status as failure
-                    agent_reported_status = deployment_result.status.lower()
-                    if agent_reported_status == 'failed' or agent_reported_status != 'active':
-                        error_details = deployment_result.error_message or f"Deployment Agent reported status '{deployment_result.status}'."
-                        return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Deployment")
-
-                except ValidationError as ve:
-                    error_details = f"Deployment Agent response validation failed: {ve}"
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Deployment")
-
-                logger.info(f"[{workflow_run_id}] --- Step {current_step.value} Complete ---")
-                current_status = WorkflowStatus.COMPLETED_DEPLOYMENT # Set intermediate status
-                await self._update_workflow_state(workflow_run_id, {
-                    "status": current_status.value,
-                    "current_step": current_step.value,
-                    "deployment_result": deployment_result_data # Save the result
-                })
-                # Fall through to Marketing
-
-            # Step 6: Marketing (New)
-            # Run if status is COMPLETED_DEPLOYMENT
-            if current_status == WorkflowStatus.COMPLETED_DEPLOYMENT:
-                current_step = WorkflowStep.MARKETING
-                logger.info(f"\n[{workflow_run_id}] --- Running Step: {current_step.value} ---")
-                current_status = WorkflowStatus.RUNNING_MARKETING
-                await self._update_workflow_state(workflow_run_id, {"status": current_status.value, "current_step": current_step.value})
-
-                # Need product spec, brand package, and deployment result
-                if not product_spec_data or not brand_package_data or not deployment_result_data:
-                    raise ValueError("Product spec, brand package, or deployment data missing for marketing step.")
-
-                # Re-validate/parse data into expected Pydantic models for the input
-                try:
-                    product_spec_model = ImprovedProductSpec(**product_spec_data)
-                    brand_package_model = BrandPackage(**brand_package_data)
-                    # Deployment URL is optional in the result model
-                    deployment_url = deployment_result_data.get('deployment_url')
-                except ValidationError as ve:
-                    raise RuntimeError(f"Failed to validate data for Marketing input: {ve}")
-
-                marketing_payload = MarketingAgentInput(
-                    product_spec=product_spec_model,
-                    brand_package=brand_package_model,
-                    deployment_url=deployment_url
-                ).model_dump(exclude_none=True)
-
-                marketing_event = await self._invoke_a2a_agent(
-                    agent_name="Marketing", agent_url=self.marketing_agent_url,
-                    endpoint_suffix="marketing", invocation_id=invocation_id,
-                    payload=marketing_payload,
-                )
-
-                if marketing_event.type == EventType.ERROR:
-                    error_details = marketing_event.data.get('error', 'Marketing A2A call failed')
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Marketing")
-                if not marketing_event.data: raise RuntimeError("Marketing Agent returned no data.")
-
-                try:
-                    marketing_result = MarketingMaterialsPackage(**marketing_event.data)
-                    marketing_result_data = marketing_result.model_dump()
-                    # Check if the agent reported failure *within* the successful event
-                    if marketing_result.status.lower() == 'failed':
-                        error_details = marketing_result.error_message or "Marketing Agent reported failure without details."
-                        return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Marketing")
-
-                except ValidationError as ve:
-                    error_details = f"Marketing Agent response validation failed: {ve}"
-                    return await self._handle_step_failure(workflow_run_id, current_step, error_details, "Marketing")
-
-                logger.info(f"[{workflow_run_id}] --- Step {current_step.value} Complete ---")
-                current_status = WorkflowStatus.COMPLETED_MARKETING
-                await self._update_workflow_state(workflow_run_id, {
-                    "status": current_status.value,
-                    "current_step": current_step.value,
-                    "marketing_result": marketing_result_data # Save the result
-                })
-                # Fall through to final completion
+            # Launch every ready step, then wait for whichever finishes first,
+            # checkpoint it and re-evaluate which steps became ready.
+            running: Dict[asyncio.Task, WorkflowStep] = {}
+            try:
+                while True:
+                    for step in self._ready_steps(results, set(running.values()), approved):
+                        current_step = step
+                        current_status = STEP_RUNNING_STATUS[step]
+                        logger.info(f"\n[{workflow_run_id}] --- Running Step: {step.value} ---")
+                        task = asyncio.create_task(self._run_step(step, invocation_id, initial_topic, target_url, results))
+                        running[task] = step
+                        await self._update_workflow_state(workflow_run_id, {
+                            "status": current_status.value,
+                            "current_step": step.value,
+                            "running_steps": [s.value for s in running.values()],
+                        })
+
+                    if not running:
+                        break
+
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        step = running.pop(task)
+                        current_step = step
+                        try:
+                            step_result = task.result()
+                        except StepFailure as failure:
+                            return await self._handle_step_failure(workflow_run_id, failure.step, failure.error_details, failure.agent_name)
+
+                        results[step] = step_result
+                        logger.info(f"[{workflow_run_id}] --- Step {step.value} Complete ---")
+
+                        # --- Pause for Approval ---
+                        if step == WorkflowStep.MARKET_RESEARCH and not approved:
+                            logger.info(f"[{workflow_run_id}] Pausing for user approval after Market Research.")
+                            current_status = WorkflowStatus.PENDING_APPROVAL
+                            await self._update_workflow_state(workflow_run_id, {
+                                "status": current_status.value,
+                                "current_step": step.value, # Keep track of the last completed step
+                                STEP_RESULT_FIELDS[step]: step_result,
+                                "completed_steps": [s.value for s in results],
+                                "running_steps": [s.value for s in running.values()],
+                            }, durable=True)
+
+                            logger.info(f"[{workflow_run_id}] Emitting 'workflow_approval_required' via SocketIO.")
+                            self.socketio.emit('workflow_approval_required', {
+                                'workflow_run_id': workflow_run_id,
+                                'data_to_approve': step_result
+                            })
+
+                            # End execution here; resumption happens in a new invocation triggered by approval
+                            return Event(type=EventType.RESULT, data={
+                                "status": current_status.value,
+                                "workflow_run_id": workflow_run_id,
+                                "message": "Workflow paused for approval after market research."
+                            })
+
+                        # --- Checkpoint ---
+                        # Flushed right away: a resumed run skips every step recorded here
+                        current_status = STEP_COMPLETED_STATUS[step]
+                        await self._update_workflow_state(workflow_run_id, {
+                            "status": current_status.value,
+                            "current_step": step.value,
+                            STEP_RESULT_FIELDS[step]: step_result, # Save the result
+                            "completed_steps": [s.value for s in results],
+                            "running_steps": [s.value for s in running.values()],
+                        }, durable=True)
+
+                        # --- Feasibility Check ---
+                        if step == WorkflowStep.IMPROVEMENT and not self._passes_feasibility_check(workflow_run_id, step_result):
+                            # Stop the workflow due to low potential
+                            potential_rating = (step_result.get('potential_rating') or 'Low').capitalize()
+                            feasibility_score = step_result.get('feasibility_score')
+                            assessment_rationale = step_result.get('assessment_rationale', 'Assessment rationale not provided.')
+                            current_status = WorkflowStatus.STOPPED_LOW_POTENTIAL
+                            stop_message = f"Workflow stopped: Potential rated '{potential_rating}'"
+                            if feasibility_score is not None:
+                                stop_message += f" (Score: {feasibility_score})"
+                            stop_message += "."
+
+                            logger.warning(f"[{workflow_run_id}] {stop_message} Rationale: {assessment_rationale}")
+
+                            await self._update_workflow_state(workflow_run_id, {
+                                "status": current_status.value,
+                                "current_step": step.value, # Still IMPROVEMENT step technically
+                                "error": stop_message # Use error field for stop reason
+                            }, durable=True)
+
+                            # Emit SocketIO update
+                            self.socketio.emit('task_update', {
+                                'workflow_run_id': workflow_run_id,
+                                'status': current_status.value,
+                                'message': stop_message,
+                                'rationale': assessment_rationale,
+                                'step': step.value
+                            })
+
+                            # Return a final event indicating controlled stop
+                            return Event(type=EventType.RESULT, data={
+                                "status": current_status.value,
+                                "workflow_run_id": workflow_run_id,
+                                "message": stop_message,
+                                "rationale": assessment_rationale
+                            })
+            finally:
+                # On failure or early return, don't leave sibling steps running
+                for task in running:
+                    task.cancel()
+                if running:
+                    await asyncio.gather(*running, return_exceptions=True)
 
             # --- Workflow Completion ---
-            # Run if status is COMPLETED_MARKETING
-            if current_status == WorkflowStatus.COMPLETED_MARKETING:
+            if all(step in results for step in WORKFLOW_DAG):
                 current_status = WorkflowStatus.COMPLETED # Final status
                 logger.info(f"\n[{workflow_run_id}] --- Workflow COMPLETED Successfully (including Marketing) ---")
                 final_result = {
                     "workflow_run_id": workflow_run_id,
                     "status": current_status.value,
                     "initial_topic": initial_topic,
-                    "deployment_details": deployment_result_data,
-                    "marketing_materials": marketing_result_data, # Include marketing materials
-                    # Optionally include other results if needed for the final output
-                    # "market_research_result": market_report_data, # Already in state
-                    # "improvement_result": product_spec_data,
-                    # "branding_result": brand_package_data,
-                    # "code_generation_result": code_generation_result_data, # Already in state
+                    "deployment_details": results[WorkflowStep.DEPLOYMENT],
+                    "marketing_materials": results[WorkflowStep.MARKETING], # Include marketing materials
+                    # Other step results are already checkpointed in state
                 }
                 await self._update_workflow_state(workflow_run_id, {
                     "status": current_status.value,
-                    "current_step": current_step.value, # Mark final step completed
-                    # marketing_result already saved in the previous step
+                    "current_step": current_step.value if current_step else None, # Mark final step completed
                     "final_result": final_result # Store final summary result
-                })
+                }, durable=True)
                 # Emit final success event
                 self.socketio.emit('workflow_completed', {'workflow_run_id': workflow_run_id, 'result': final_result})
                 return Event(type=EventType.RESULT, data=final_result)
 
-            # Handle unexpected states (e.g., if status is already COMPLETED or FAILED when invoked)
-            if current_status in [WorkflowStatus.COMPLETED, WorkflowStatus.FAILED]:
-                 logger.warning(f"[{workflow_run_id}] Workflow is already in a terminal state ({current_status.value}). No further action taken.")
-                 # Return the final result if completed, or an error if failed
-                 final_data = state.get("final_result") if current_status == WorkflowStatus.COMPLETED else state.get("error", "Workflow previously failed.")
-                 event_type = EventType.RESULT if current_status == WorkflowStatus.COMPLETED else EventType.ERROR
-                 return Event(type=event_type, data=final_data)
-
-            # If execution reaches here without returning, it means the status didn't match any step logic
-            # This might happen if the status is RUNNING_... but the process restarts unexpectedly
-            # Or if the status is somehow invalid.
-            raise RuntimeError(f"Invalid state or logic error: Reached end of workflow execution checks with status '{current_status.value}'")
+            # If execution reaches here, no step could be scheduled even though the DAG is incomplete.
+            # This might happen if the status is somehow invalid.
+            raise RuntimeError(f"Invalid state or logic error: No runnable steps with status '{current_status.value}' and completed steps {[step.value for step in results]}")
 
 
         except (ValueError, TypeError, ConnectionError, TimeoutError, RuntimeError, ValidationError, httpx.RequestError, json.JSONDecodeError) as e:
@@ -937,7 +908,7 @@ class WorkflowManagerAgent(Agent):
                 "status": current_status.value,
                 "current_step": current_step.value if current_step else state.get("current_step"), # Use last known step
                 "error": error_message
-            })
+            }, durable=True)
             # Emit SocketIO event for general exceptions caught here
             self.socketio.emit('workflow_failed', {'workflow_run_id': workflow_run_id, 'failed_step': failed_step_value, 'error': error_message})
             return Event(type=EventType.ERROR, data={"error": error_message, "stage": failed_step_value, "workflow_run_id": workflow_run_id})
@@ -953,10 +924,13 @@ class WorkflowManagerAgent(Agent):
                 "status": current_status.value,
                 "current_step": current_step.value if current_step else state.get("current_step"), # Use last known step
                 "error": "An unexpected internal error occurred."
-            })
+            }, durable=True)
             # Emit SocketIO event for unexpected exceptions
             self.socketio.emit('workflow_failed', {'workflow_run_id': workflow_run_id, 'failed_step': failed_step_value, 'error': "An unexpected internal error occurred."})
             return Event(type=EventType.ERROR, data={"error": "An unexpected internal error occurred.", "stage": failed_step_value, "workflow_run_id": workflow_run_id})
+        finally:
+            # Debounced updates must not outlive the event loop running this workflow
+            await self._flush_workflow_state(workflow_run_id)
 
 # Note: The `if __name__ == "__main__":` block is removed as agent execution
 # is handled by the ADK runtime.
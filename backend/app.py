@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import json
+import atexit
 import logging
 from typing import Dict, Any, Optional, List, Union
 
@@ -13,9 +14,13 @@ from middleware.security_headers import security_headers
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from werkzeug.middleware.proxy_fix import ProxyFix
+from google.adk.runtime import InvocationContext
 
 from config import Config
 from utils.logger import setup_logger
+from utils.task_queue import TaskQueue, create_task_backend
+from utils.task_stream import get_task_stream_registry
+from utils.deployment_watcher import get_deployment_watcher
 from routes import auth, market, business, features, deployment, cashflow, workflows, analytics, insights, customers
 from routes import auth, market, business, features, deployment, cashflow, workflows, analytics, insights, customers, revenue
 from routes import orchestrator # Import the new orchestrator blueprint
@@ -97,6 +102,8 @@ socketio_cors_origins = allowed_origins if allowed_origins else "*"
 socketio = SocketIO(app, cors_allowed_origins=socketio_cors_origins, async_mode='threading') # Using threading for simplicity, consider eventlet/gevent for production
 
 app.socketio = socketio # Attach SocketIO instance to app context
+get_deployment_watcher().set_emit(socketio.emit) # Push deployment state changes to clients
+atexit.register(get_deployment_watcher().shutdown)
 # Initialize Agents
 # market_analysis_agent = MarketAnalysisAgent(model_name=Config.MARKET_ANALYSIS_MODEL if hasattr(Config, 'MARKET_ANALYSIS_MODEL') else Config.ORCHESTRATOR_MODEL) # Use specific model or fallback # Keep MarketAnalysisAgent as is for now, wasn't in scope
 market_analysis_agent = MarketAnalysisAgent() # Assuming MarketAnalysisAgent doesn't need model_name yet or handles it internally
@@ -176,6 +183,23 @@ agents = {
 # Initialize the Orchestrator Agent with SocketIO instance and other agents
 orchestrator_agent = OrchestratorAgent(socketio=socketio, model_name=orchestrator_model, agents=agents) # Use orchestrator_model
 app.orchestrator_agent = orchestrator_agent # Attach orchestrator agent to app context
+
+# Background task queue: bounded workers, per-user limits and durable task records
+# (TASK_QUEUE_URL selects SQLite or Redis). Replaces socketio.start_background_task.
+async def run_orchestrator_task(payload: Dict[str, Any]):
+    context = InvocationContext(invocation_id=payload['invocation_id'], invocation_data=payload['task_data'])
+    return await orchestrator_agent.run_async(context)
+
+async def run_workflow_resume_task(payload: Dict[str, Any]):
+    context = InvocationContext(invocation_id=payload['invocation_id'], data=payload['data'])
+    return await workflow_manager_agent.run_async(context)
+
+task_queue = TaskQueue(create_task_backend())
+task_queue.register('orchestrator.run', run_orchestrator_task)
+task_queue.register('workflow.resume', run_workflow_resume_task)
+task_queue.start()
+atexit.register(task_queue.shutdown) # Drain queued work on shutdown; leftovers are recovered on restart
+app.task_queue = task_queue
 # Optionally attach other agents if needed globally
 app.market_analysis_agent = market_analysis_agent # Attach market analysis agent
 
@@ -263,6 +287,20 @@ def handle_connect():
 def handle_disconnect():
     logger.info(f"Client disconnected: {request.sid}")
 
+@socketio.on('task_stream_resume')
+def handle_task_stream_resume(data):
+    """Re-sends the task_update events a reconnecting client missed after `last_seq`."""
+    data = data or {}
+    task_id = data.get('task_id')
+    try:
+        last_seq = int(data.get('last_seq', 0))
+    except (TypeError, ValueError):
+        last_seq = 0
+    missed = get_task_stream_registry().replay(task_id, last_seq) if task_id else []
+    logger.info(f"Client {request.sid} resuming task {task_id} after seq {last_seq}: replaying {len(missed)} update(s).")
+    for update in missed:
+        socketio.emit('task_update', update, room=request.sid)
+
 @socketio.on('message')
 def handle_message(data):
     logger.info(f"Received message from {request.sid}: {data}")
@@ -15,6 +15,7 @@ This module integrates all production enhancements:
 from __future__ import annotations
 
 import os
+import atexit
 import logging
 from typing import Dict, Any, Optional, List, Union
 
@@ -27,6 +28,7 @@ import redis
 from config import Config
 from utils.logger import setup_logger
 from routes import auth, market, business, features, deployment, cashflow
+from routes import analytics as analytics_routes
 
 # Import production enhancements
 from utils.security_enhancements import (
@@ -119,16 +121,20 @@ def create_app(config_class=Config) -> Flask:
     register_blueprint_with_error_handling(features.bp, '/api/features')
     register_blueprint_with_error_handling(deployment.bp, '/api/deployment')
     register_blueprint_with_error_handling(cashflow.bp, '/api/cashflow')
+    register_blueprint_with_error_handling(analytics_routes.bp, '/api/analytics')
     
     # ===== Analytics Integration =====
     
     # Initialize analytics
     analytics = init_analytics(app)
+    atexit.register(analytics.shutdown)  # Send events still buffered
     
     # ===== Accessibility Compliance =====
     
     # Initialize accessibility checking
     accessibility = init_accessibility(app)
+    if 'accessibility_auditor' in app.extensions:
+        atexit.register(app.extensions['accessibility_auditor'].shutdown)
     
     # ===== Legal Compliance =====
     
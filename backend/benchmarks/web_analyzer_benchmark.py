@@ -0,0 +1,152 @@
+"""
+Benchmark for the single-pass web analyzer (modules.web_analyzer)
+
+Generates synthetic HTML, CSS and JavaScript pages from 10 KB to 50 MB and
+times a full scan of each, fed in 1 MB chunks like a file read. Time per MB
+should stay flat as pages grow (linear scaling); the last column shows each
+size's time per MB relative to the smallest page of that type.
+
+With --legacy, the regex checks WebDevAgent used before the tokenizer are
+timed as well, for pages up to --legacy-max-kb (they scale quadratically on
+single-line pages, so large sizes would run for minutes).
+
+Usage (from the backend directory):
+    python benchmarks/web_analyzer_benchmark.py
+    python benchmarks/web_analyzer_benchmark.py --sizes 10K,1M --types html --legacy
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.web_analyzer import CHUNK_CHARS, analyze_chunks  # noqa: E402
+
+DEFAULT_SIZES = "10K,100K,1M,10M,50M"
+UNITS = {'K': 1024, 'M': 1024 * 1024}
+
+HTML_BLOCKS = [
+    '<div class="card"><h2>Feature</h2><p>Generated copy for the landing page.</p>',
+    '<img src="/assets/hero.png" alt="Hero"><img src="/assets/icon.png">',
+    '<ul><li>One<li>Two<li>Three</ul><br><span>label</span></div>',
+    '<!-- section separator --><section><a href="#top">Top</a></section>',
+    '<script>addEventListener("click", onClick); console.log("x");</script>',
+    '<table><tr><td>1<td>2</table><form><input name="q"></form>',
+]
+CSS_BLOCKS = [
+    '.card{width: 320px;display:flex;margin:0 auto}',
+    '/* layout */ .grid{display:grid;grid-template-columns:1fr 1fr}',
+    '@media (max-width: 600px){.card{width:100%}}',
+    '.btn{transform:scale(1.02);-webkit-transform:scale(1.02)}',
+]
+JS_BLOCKS = [
+    'function render(items){ return items.map(i => `<li>${i}</li>`).join(""); }\n',
+    'el.addEventListener("click", onClick); // console.log("debug")\n',
+    'const msg = "console.log(inside string)"; console.log(msg);\n',
+    '/* cleanup */ el.removeEventListener("click", onClick);\n',
+    'const ratio = total / count; const re = /a+b/g;\n',
+]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def synthetic_page(file_type: str, size: int) -> str:
+    """Build a page of roughly ``size`` characters from repeated blocks"""
+    blocks = {'html': HTML_BLOCKS, 'css': CSS_BLOCKS, 'js': JS_BLOCKS}[file_type]
+    unit = ''.join(blocks)
+    body = unit * (size // len(unit) + 1)
+    if file_type == 'html':
+        head = '<!DOCTYPE html><html><head><meta name="viewport" content="width=device-width"></head><body>'
+        return head + body[:max(0, size - len(head) - 14)] + '</body></html>'
+    return body[:size]
+
+
+def legacy_analyze(file_type: str, content: str) -> int:
+    """The regex checks WebDevAgent ran before the tokenizer; returns the number of issues"""
+    issues = 0
+    if file_type == 'html':
+        issues += bool(re.findall(r"<([a-z]+)[^>]*>(?!.*</\1>)", content))
+        issues += '<img' in content and not re.search(r'<img[^>]*alt=["\'][^"\']*["\'"]', content)
+        issues += not re.search(r'<meta[^>]*name=["\'"]viewport["\'"]', content)
+        issues += 'google.accounts.id.initialize' in content and not re.search(r'google\.accounts\.id\.renderButton', content)
+    elif file_type == 'css':
+        issues += len(re.findall(r"width:\s*\d+px", content)) > 3
+        issues += bool(not re.search(r"-webkit-|-moz-|-ms-", content) and re.search(r"flex|grid|transform", content))
+        issues += '@media' not in content
+    else:
+        issues += len(re.findall(r"console\.log\(", content)) > 0
+        issues += len(re.findall(r"addEventListener\(", content)) > len(re.findall(r"removeEventListener\(", content)) + 2
+        issues += 'google.accounts.id.initialize' in content and not re.search(r'callback:\s*\w+', content)
+    return issues
+
+
+def tokenizer_analyze(file_type: str, content: str) -> int:
+    chunks = (content[i:i + CHUNK_CHARS] for i in range(0, len(content), CHUNK_CHARS))
+    return len(analyze_chunks(file_type, chunks))
+
+
+def best_of(repeat: int, func: Callable[[], int]) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(types: List[str], sizes: List[int], repeat: int, legacy: bool, legacy_max: int) -> None:
+    header = f"{'type':<5} {'size':>10} {'seconds':>9} {'MB/s':>8} {'s/MB':>8} {'vs smallest':>11}"
+    if legacy:
+        header += f" {'legacy s':>9}"
+    print(header)
+    for file_type in types:
+        baseline: Dict[str, float] = {}
+        for size in sizes:
+            page = synthetic_page(file_type, size)
+            megabytes = len(page) / UNITS['M']
+            # Repeat small pages more often for stable timings
+            runs = repeat if size >= UNITS['M'] else repeat * 5
+            seconds = best_of(runs, lambda: tokenizer_analyze(file_type, page))
+            per_mb = seconds / megabytes
+            baseline.setdefault('per_mb', per_mb)
+            line = (
+                f"{file_type:<5} {len(page):>10} {seconds:>9.4f} {megabytes / seconds:>8.1f} "
+                f"{per_mb:>8.4f} {per_mb / baseline['per_mb']:>10.2f}x"
+            )
+            if legacy:
+                if size <= legacy_max:
+                    line += f" {best_of(runs, lambda: legacy_analyze(file_type, page)):>9.4f}"
+                else:
+                    line += f" {'skipped':>9}"
+            print(line, flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"Comma-separated page sizes (default {DEFAULT_SIZES})")
+    parser.add_argument('--types', default='html,css,js', help="Comma-separated file types (html, css, js)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the best is reported")
+    parser.add_argument('--legacy', action='store_true', help="Also time the previous regex checks")
+    parser.add_argument('--legacy-max-kb', type=int, default=100, help="Largest page the regex checks are timed on")
+    args = parser.parse_args()
+
+    run(
+        types=[t.strip() for t in args.types.split(',') if t.strip()],
+        sizes=[parse_size(s) for s in args.sizes.split(',') if s.strip()],
+        repeat=args.repeat,
+        legacy=args.legacy,
+        legacy_max=args.legacy_max_kb * UNITS['K'],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,10 @@ class Config:
     # Cache settings
     CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
     CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # In-process L1 tier used when CACHE_TYPE is 'tiered'
+    CACHE_L1_MAX_SIZE = int(os.environ.get('CACHE_L1_MAX_SIZE', 1024))
+    CACHE_L1_TIMEOUT = int(os.environ.get('CACHE_L1_TIMEOUT', 30))
 
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
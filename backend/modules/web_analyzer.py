@@ -0,0 +1,504 @@
+"""
+Single-pass HTML/CSS/JavaScript analyzer
+
+Each file is scanned once by a small tokenizer for its language. The scanners
+jump from token to token with one compiled pattern per state, skip comments,
+string literals and (in JavaScript) regular expression literals, and collect
+every issue type WebDevAgent reports during that one pass. Input is fed in
+chunks; only an incomplete token (bounded by MAX_TOKEN_CHARS) is carried
+between chunks, and the open-element stack is capped at MAX_STACK_DEPTH, so
+memory per file does not grow with file size. Tags longer than MAX_TOKEN_CHARS
+(e.g. with a data URI attribute) are still checked, on the first and last
+MAX_TOKEN_CHARS characters of their attributes.
+
+Usage:
+    scanner = create_scanner('html')
+    for chunk in chunks:
+        scanner.feed(chunk)
+    issues = scanner.close()
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
+# Longest token (tag, comment delimiter, pattern match) carried between chunks
+MAX_TOKEN_CHARS = 4096
+# Longest tag name matched; a longer name is read as name plus attributes
+MAX_TAG_NAME_CHARS = 64
+# Deepest element nesting tracked for the unclosed-tag check
+MAX_STACK_DEPTH = 1024
+# Distinct unclosed tag names listed in an issue description
+MAX_REPORTED_TAGS = 20
+# Chunk size used when analyzing an in-memory string
+CHUNK_CHARS = 1 << 20
+
+# Elements that never have an end tag
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr', '!doctype'
+])
+# Elements whose end tag may be omitted
+OPTIONAL_END_ELEMENTS = frozenset([
+    'html', 'head', 'body', 'p', 'li', 'dt', 'dd', 'option', 'optgroup', 'tr', 'td',
+    'th', 'thead', 'tbody', 'tfoot', 'colgroup', 'caption', 'rb', 'rt', 'rtc', 'rp'
+])
+# Elements whose content is raw text rather than markup
+RAW_TEXT_ELEMENTS = frozenset(['script', 'style', 'textarea', 'title'])
+
+# A tag whose attributes run past MAX_TOKEN_CHARS matches without group 3 and is read in a separate state
+_HTML_TOKEN = re.compile(
+    r'<!--|<(/?)([A-Za-z!][A-Za-z0-9:_-]{0,%d})(?:([^>]{0,%d})>|(?![A-Za-z0-9:_-])(?=[^>]{%d}))'
+    % (MAX_TAG_NAME_CHARS - 1, MAX_TOKEN_CHARS, MAX_TOKEN_CHARS + 1)
+)
+_ALT_ATTR = re.compile(r'(?:^|\s)alt(?:\s*=|\s|/|$)', re.IGNORECASE)
+_VIEWPORT_ATTR = re.compile(r'name\s*=\s*["\']?viewport', re.IGNORECASE)
+
+# Token patterns start with a lookahead on the possible first characters, which lets
+# the regex engine skip other positions without trying every alternative
+_CSS_TOKEN = re.compile(
+    r'(?=[-/@fgtw])'
+    r'(?:(/\*)|(width:\s{0,32}\d{1,16}px)|(-webkit-|-moz-|-ms-)|(flex|grid|transform)|(@media))'
+)
+
+_JS_TOKEN = re.compile(
+    r'(?=[/"\'`acgr])'
+    r'(?:(//)|(/\*)|(/)|(["\'`])'
+    r'|(console\.log\()'
+    r'|(addEventListener\()'
+    r'|(removeEventListener\()'
+    r'|(google\.accounts\.id\.initialize)'
+    r'|(google\.accounts\.id\.renderButton)'
+    r'|(callback:\s{0,32}[A-Za-z_$]))'
+)
+_JS_REGEX_END = re.compile(r'\\.|[\[\]/\n]', re.DOTALL)
+# A '/' after one of these tokens starts a regular expression literal; after anything
+# else (an identifier, number, ')' or ']') it is a division
+_JS_REGEX_PRECEDERS = frozenset('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+    'case', 'do', 'else', 'yield', 'await',
+])
+_JS_STRING_END = {
+    '"': re.compile(r'\\.|"|\n', re.DOTALL),
+    "'": re.compile(r"\\.|'|\n", re.DOTALL),
+    '`': re.compile(r'\\.|`', re.DOTALL),
+}
+
+
+def _issue(issue_type: str, severity: str, description: str) -> Dict[str, str]:
+    return {"type": issue_type, "severity": severity, "description": description}
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char in '_$'
+
+
+class _Scanner:
+    """
+    Base class for chunked scanners
+
+    Subclasses implement ``_scan(buffer, final)``, which consumes tokens from
+    the buffer and returns the index up to which it has been consumed.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self.chars_scanned = 0
+
+    def feed(self, text: str) -> None:
+        """Scan the next chunk of the file"""
+        if not text:
+            return
+        self.chars_scanned += len(text)
+        buffer = self._buffer + text if self._buffer else text
+        self._buffer = buffer[self._scan(buffer, False):]
+
+    def close(self) -> List[Dict[str, str]]:
+        """Finish scanning and return the issues found"""
+        self._scan(self._buffer, True)
+        self._buffer = ''
+        return self.issues()
+
+    def issues(self) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def _scan(self, buffer: str, final: bool) -> int:
+        raise NotImplementedError
+
+
+class JsScanner(_Scanner):
+    """
+    Tokenizer for JavaScript/TypeScript that skips comments, string literals
+    and regular expression literals
+
+    Whether a '/' starts a regular expression is decided from the previous
+    significant token, as JavaScript parsers do.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # None, 'line_comment', 'block_comment', 'regex', 'regex_class' or a quote character
+        self._state = None
+        # Previous significant token before the unscanned input: a punctuator, a word,
+        # or '' at the start of the file
+        self._prev = ''
+        self.console_logs = 0
+        self.listeners_added = 0
+        self.listeners_removed = 0
+        self.google_initialize = False
+        self.google_render_button = False
+        self.google_callback = False
+
+    def _prev_token(self, buffer: str, index: int, floor: int) -> str:
+        """Significant token before ``index``, looking back no further than ``floor``"""
+        i = index - 1
+        while i >= floor and buffer[i].isspace():
+            i -= 1
+        if i < floor:
+            return self._prev
+        if not _is_word(buffer[i]):
+            return buffer[i]
+        start = i
+        while start > floor and _is_word(buffer[start - 1]):
+            start -= 1
+        return buffer[start:i + 1]
+
+    def _scan(self, buffer: str, final: bool) -> int:
+        end = len(buffer)
+        limit = end if final else end - 64
+        pos = 0
+        # Start of the code since the last skipped literal; self._prev is the token before it
+        floor = 0
+        while pos < end:
+            state = self._state
+            if state == 'line_comment':
+                found = buffer.find('\n', pos)
+                if found < 0:
+                    return end
+                self._state = None
+                pos = floor = found + 1
+            elif state == 'block_comment':
+                found = buffer.find('*/', pos)
+                if found < 0:
+                    return end - 1 if not final else end
+                self._state = None
+                pos = floor = found + 2
+            elif state is not None:
+                regex = state in ('regex', 'regex_class')
+                match = (_JS_REGEX_END if regex else _JS_STRING_END[state]).search(buffer, pos)
+                if match is None:
+                    # Keep a trailing backslash: it may escape the next chunk's first character
+                    return end - 1 if buffer.endswith('\\') and not final else end
+                pos = match.end()
+                char = match.group()[0]
+                if char == '\\':
+                    continue
+                if state == 'regex' and char == '[':
+                    self._state = 'regex_class'
+                elif state == 'regex_class':
+                    if char == ']':
+                        self._state = 'regex'
+                    elif char == '\n':
+                        self._state = None
+                elif not regex or char in '/\n':
+                    # End of the literal; a '/' after it is a division
+                    self._state = None
+                    self._prev = 'a'
+                    floor = pos
+            else:
+                for match in _JS_TOKEN.finditer(buffer, pos):
+                    if match.start() >= limit:
+                        self._prev = self._prev_token(buffer, match.start(), floor)
+                        return match.start()
+                    group = match.lastindex
+                    if group <= 4:
+                        prev = self._prev_token(buffer, match.start(), floor)
+                        if group == 3 and not (prev == '' or prev in _JS_REGEX_PRECEDERS or prev in _JS_REGEX_KEYWORDS):
+                            continue  # Division
+                        # Comments keep the token before them; literals are followed by a value
+                        self._prev = prev
+                    pos = match.end()
+                    if group == 1:
+                        self._state = 'line_comment'
+                        break
+                    elif group == 2:
+                        self._state = 'block_comment'
+                        break
+                    elif group == 3:
+                        self._state = 'regex'
+                        break
+                    elif group == 4:
+                        self._state = match.group(4)
+                        break
+                    elif group == 5:
+                        self.console_logs += 1
+                    elif group == 6:
+                        self.listeners_added += 1
+                    elif group == 7:
+                        self.listeners_removed += 1
+                    elif group == 8:
+                        self.google_initialize = True
+                    elif group == 9:
+                        self.google_render_button = True
+                    else:
+                        self.google_callback = True
+                else:
+                    resume = max(pos, limit)
+                    # Do not split a word: its tail would look like a different token
+                    while resume > pos and resume < end and _is_word(buffer[resume - 1]) and _is_word(buffer[resume]):
+                        resume -= 1
+                    self._prev = self._prev_token(buffer, resume, floor)
+                    return resume
+        return pos
+
+    def issues(self) -> List[Dict[str, str]]:
+        issues = []
+        if self.console_logs > 0:
+            issues.append(_issue(
+                "js_errors", "warning",
+                f"Found {self.console_logs} console.log statements that should be removed in production"
+            ))
+        if self.listeners_added > self.listeners_removed + 2:  # Allow some disparity
+            issues.append(_issue(
+                "performance_issues", "warning",
+                f"Potential memory leak: {self.listeners_added} event listeners added but only {self.listeners_removed} removed"
+            ))
+        if self.google_initialize and not self.google_callback:
+            issues.append(_issue("auth_issues", "critical", "Google Sign-In missing callback configuration"))
+        return issues
+
+
+class CssScanner(_Scanner):
+    """
+    Tokenizer for CSS that skips comments
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._in_comment = False
+        self.fixed_widths = 0
+        self.vendor_prefixes = 0
+        self.modern_properties = 0
+        self.media_queries = 0
+
+    def _scan(self, buffer: str, final: bool) -> int:
+        end = len(buffer)
+        limit = end if final else end - 64
+        pos = 0
+        while pos < end:
+            if self._in_comment:
+                found = buffer.find('*/', pos)
+                if found < 0:
+                    return end - 1 if not final else end
+                self._in_comment = False
+                pos = found + 2
+                continue
+            for match in _CSS_TOKEN.finditer(buffer, pos):
+                if match.start() >= limit:
+                    return match.start()
+                group = match.lastindex
+                pos = match.end()
+                if group == 1:
+                    self._in_comment = True
+                    break
+                elif group == 2:
+                    self.fixed_widths += 1
+                elif group == 3:
+                    self.vendor_prefixes += 1
+                elif group == 4:
+                    self.modern_properties += 1
+                else:
+                    self.media_queries += 1
+            else:
+                return max(pos, limit)
+        return pos
+
+    def issues(self) -> List[Dict[str, str]]:
+        issues = []
+        if self.fixed_widths > 3:  # Some fixed widths are OK, but too many suggest responsive issues
+            issues.append(_issue(
+                "responsive_issues", "warning",
+                f"Found {self.fixed_widths} fixed-width elements that may cause responsive design issues"
+            ))
+        if not self.vendor_prefixes and self.modern_properties:
+            issues.append(_issue("compatibility", "warning", "Modern CSS properties used without vendor prefixes"))
+        if not self.media_queries:
+            issues.append(_issue("responsive_issues", "warning", "No media queries found for responsive design"))
+        return issues
+
+
+class HtmlScanner(_Scanner):
+    """
+    Tokenizer for HTML that tracks open elements and scans inline scripts
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._in_comment = False
+        self._raw_text: Optional[str] = None  # Element whose raw text content is being skipped
+        self._raw_end: Optional[re.Pattern] = None
+        # Over-long tag being read: (is end tag, name), with the first and last
+        # MAX_TOKEN_CHARS characters of its attributes
+        self._long_tag: Optional[Tuple[bool, str]] = None
+        self._long_head = ''
+        self._long_tail = ''
+        self._stack: List[str] = []
+        self._script = JsScanner()
+        self.unclosed: Dict[str, None] = {}
+        self.images = 0
+        self.images_without_alt = 0
+        self.has_viewport = False
+
+    def _scan(self, buffer: str, final: bool) -> int:
+        end = len(buffer)
+        pos = 0
+        while pos < end:
+            if self._in_comment:
+                found = buffer.find('-->', pos)
+                if found < 0:
+                    return end - 2 if not final else end
+                self._in_comment = False
+                pos = found + 3
+                continue
+
+            if self._long_tag is not None:
+                found = buffer.find('>', pos)
+                attrs = buffer[pos:] if found < 0 else buffer[pos:found]
+                if len(self._long_head) < MAX_TOKEN_CHARS:
+                    self._long_head += attrs[:MAX_TOKEN_CHARS - len(self._long_head)]
+                self._long_tail = (self._long_tail + attrs[-MAX_TOKEN_CHARS:])[-MAX_TOKEN_CHARS:]
+                if found < 0:
+                    return end
+                is_end_tag, name = self._long_tag
+                self._long_tag = None
+                if is_end_tag:
+                    self._close_element(name)
+                else:
+                    self._open_element(name, f"{self._long_head} {self._long_tail}")
+                self._long_head = self._long_tail = ''
+                pos = found + 1
+                continue
+
+            if self._raw_text is not None:
+                match = self._raw_end.search(buffer, pos)
+                if match is None:
+                    # Keep enough text for an end tag split across chunks
+                    keep = end if final else max(pos, end - 64)
+                    if self._raw_text == 'script':
+                        self._script.feed(buffer[pos:keep])
+                    return keep
+                if self._raw_text == 'script':
+                    self._script.feed(buffer[pos:match.start()])
+                self._close_element(self._raw_text)
+                self._raw_text = None
+                pos = match.end()
+                continue
+
+            for match in _HTML_TOKEN.finditer(buffer, pos):
+                pos = match.end()
+                name = match.group(2)
+                if name is None:
+                    self._in_comment = True
+                    break
+                if match.group(3) is None:
+                    self._long_tag = (bool(match.group(1)), name.lower())
+                    break
+                if match.group(1):
+                    self._close_element(name.lower())
+                else:
+                    self._open_element(name.lower(), match.group(3))
+                    if self._raw_text is not None:
+                        break
+            else:
+                if final:
+                    return end
+                # No tag matched after pos; a tag starting close enough to the end may
+                # still be completed, or found to be over-long, by the next chunk
+                tail = buffer.find('<', max(pos, end - (MAX_TOKEN_CHARS + MAX_TAG_NAME_CHARS + 2)))
+                return end if tail < 0 else tail
+        return pos
+
+    def _open_element(self, name: str, attrs: str) -> None:
+        if name == 'img':
+            self.images += 1
+            if not _ALT_ATTR.search(attrs):
+                self.images_without_alt += 1
+        elif name == 'meta' and not self.has_viewport:
+            self.has_viewport = bool(_VIEWPORT_ATTR.search(attrs))
+
+        if name in VOID_ELEMENTS or name.startswith('!') or attrs.endswith('/'):
+            return
+        if name in RAW_TEXT_ELEMENTS:
+            self._raw_text = name
+            self._raw_end = re.compile(rf'</{name}\s*>', re.IGNORECASE)
+        if len(self._stack) < MAX_STACK_DEPTH:
+            self._stack.append(name)
+
+    def _close_element(self, name: str) -> None:
+        stack = self._stack
+        if name not in stack:
+            return  # Stray end tag
+        while stack:
+            open_name = stack.pop()
+            if open_name == name:
+                return
+            self._record_unclosed(open_name)
+
+    def _record_unclosed(self, name: str) -> None:
+        if name not in OPTIONAL_END_ELEMENTS and len(self.unclosed) < MAX_REPORTED_TAGS:
+            self.unclosed[name] = None
+
+    def close(self) -> List[Dict[str, str]]:
+        self._scan(self._buffer, True)
+        self._buffer = ''
+        self._script.close()
+        for name in self._stack:
+            self._record_unclosed(name)
+        self._stack = []
+        return self.issues()
+
+    def issues(self) -> List[Dict[str, str]]:
+        issues = []
+        if self.unclosed:
+            issues.append(_issue("malformed_html", "critical", f"Unclosed HTML tags: {', '.join(self.unclosed)}"))
+        if self.images_without_alt:
+            issues.append(_issue("accessibility", "warning", "Images missing alt attributes"))
+        if not self.has_viewport:
+            issues.append(_issue("responsive_issues", "warning", "Missing viewport meta tag for responsive design"))
+        if self._script.google_initialize and not self._script.google_render_button:
+            issues.append(_issue(
+                "auth_issues", "critical",
+                "Google Sign-In initialization present but renderButton is missing"
+            ))
+        return issues
+
+
+SCANNERS = {
+    'html': HtmlScanner,
+    'css': CssScanner,
+    'js': JsScanner,
+    'jsx': JsScanner,
+    'ts': JsScanner,
+    'tsx': JsScanner,
+}
+
+
+def create_scanner(file_ext: str) -> Optional[_Scanner]:
+    """Create the scanner for a file extension, or None if the type has no checks"""
+    scanner_class = SCANNERS.get(file_ext.lower())
+    return scanner_class() if scanner_class else None
+
+
+def analyze_chunks(file_ext: str, chunks: Iterable[str]) -> List[Dict[str, Any]]:
+    """Scan a file given as text chunks and return its issues"""
+    scanner = create_scanner(file_ext)
+    if scanner is None:
+        return []
+    for chunk in chunks:
+        scanner.feed(chunk)
+    return scanner.close()
+
+
+def analyze_text(file_ext: str, content: str) -> List[Dict[str, Any]]:
+    """Scan an in-memory file and return its issues"""
+    return analyze_chunks(file_ext, (content[i:i + CHUNK_CHARS] for i in range(0, len(content), CHUNK_CHARS)))
@@ -1,15 +1,87 @@
+import os
+import json
+import zlib
 import logging
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from google.adk.runtime import InvocationContext, Event
 from backend.agents.code_generation_agent import CodeGenerationAgent
+from utils.a2a_transport import get_a2a_transport
+from utils.circuit_breaker import breaker_metrics
+from utils.task_queue import QueueFullError, QueueClosedError
+from utils.decorators import authenticate_request
 # Firestore and SocketIO are accessed via current_app, specific imports might not be needed here
 # but ensure they are initialized in app.py
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Largest inflated gzip body accepted when the app sets no MAX_CONTENT_LENGTH
+A2A_MAX_BODY_BYTES = int(os.getenv("A2A_MAX_BODY_BYTES", 16 * 1024 * 1024))
+# Compressed input fed to the decompressor per step
+_INFLATE_CHUNK_BYTES = 64 * 1024
+
 a2a_bp = Blueprint('a2a', __name__, url_prefix='/a2a')
 
+class _BodyTooLarge(Exception):
+    pass
+
+def _inflate_gzip(data: bytes, limit: int) -> bytes:
+    """Inflate a gzip body, raising _BodyTooLarge once it exceeds ``limit`` bytes."""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    inflated = bytearray()
+    for start in range(0, len(data), _INFLATE_CHUNK_BYTES):
+        pending = data[start:start + _INFLATE_CHUNK_BYTES]
+        while pending:
+            inflated += inflater.decompress(pending, limit + 1 - len(inflated))
+            if len(inflated) > limit:
+                raise _BodyTooLarge()
+            pending = inflater.unconsumed_tail
+        if inflater.eof:
+            break
+    if not inflater.eof:
+        raise zlib.error("truncated gzip stream")
+    return bytes(inflated)
+
+@a2a_bp.before_request
+def decompress_gzip_body():
+    """
+    Inflate gzip-encoded request bodies sent by the shared A2A transport.
+
+    The inflated body is capped at MAX_CONTENT_LENGTH (A2A_MAX_BODY_BYTES when
+    unset) and its parsed JSON is stored on ``g`` for _get_json().
+    """
+    if request.headers.get('Content-Encoding', '').lower() != 'gzip':
+        return None
+    limit = current_app.config.get('MAX_CONTENT_LENGTH') or A2A_MAX_BODY_BYTES
+    try:
+        body = _inflate_gzip(request.get_data(), limit)
+    except _BodyTooLarge:
+        logger.warning(f"Rejected A2A request whose gzip body inflates past {limit} bytes.")
+        return jsonify({"error": "Request body too large."}), 413
+    except zlib.error as e:
+        logger.warning(f"Rejected A2A request with invalid gzip body: {e}")
+        return jsonify({"error": "Invalid gzip-encoded request body."}), 400
+    try:
+        g.a2a_json = json.loads(body) if body else None
+    except ValueError as e:
+        logger.warning(f"Rejected A2A request with invalid JSON body: {e}")
+        return jsonify({"error": "Invalid JSON request body."}), 400
+    return None
+
+def _get_json():
+    """Request JSON, taken from the inflated body when the request was gzip-encoded."""
+    if 'a2a_json' in g:
+        return g.a2a_json
+    return request.get_json()
+
+@a2a_bp.route('/metrics', methods=['GET'])
+def a2a_metrics():
+    """Returns circuit breaker states, retry budget usage and transport counters for A2A calls."""
+    metrics = breaker_metrics()
+    metrics['transport'] = get_a2a_transport().stats()
+    return jsonify(metrics), 200
+
+
 @a2a_bp.route('/market_research/invoke', methods=['POST'])
 async def invoke_market_research():
     """
@@ -19,7 +91,7 @@ async def invoke_market_research():
     """
     logger.info("Received A2A request for MarketResearchAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -92,7 +164,7 @@ async def invoke_improvement_agent():
     """
     logger.info("Received A2A request for ImprovementAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload for ImprovementAgent.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -165,7 +237,7 @@ async def invoke_branding_agent():
     """
     logger.info("Received A2A request for BrandingAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload for BrandingAgent.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -239,7 +311,7 @@ async def invoke_deployment_agent():
     """
     logger.info("Received A2A request for DeploymentAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload for DeploymentAgent.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -314,7 +386,7 @@ async def invoke_content_generation_agent():
     """
     logger.info("Received A2A request for ContentGenerationAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload for ContentGenerationAgent.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -388,7 +460,7 @@ async def invoke_code_generation_agent():
     """
     logger.info("Received A2A request for CodeGenerationAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload for CodeGenerationAgent.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -462,7 +534,7 @@ async def invoke_marketing_agent():
     """
     logger.info("Received A2A request for MarketingAgent invocation.")
     try:
-        context_data = request.get_json()
+        context_data = _get_json()
         if not context_data:
             logger.warning("A2A request received with empty payload for MarketingAgent.")
             return jsonify({"error": "Request body must contain JSON data."}), 400
@@ -531,12 +603,16 @@ async def resume_workflow(workflow_run_id): # Make async
     """
     Endpoint for resuming or rejecting a paused workflow step.
     Expects a JSON payload with a 'decision' field ('approved' or 'rejected').
-    Updates Firestore state and triggers agent resumption via SocketIO if approved.
+    Updates Firestore state and queues agent resumption on the background task queue if approved.
+    Only the user who started the workflow can decide; the resumption task is queued under their quota.
     """
     logger.info(f"Received request to resume/reject workflow: {workflow_run_id}")
+    user_id, error_response = authenticate_request()
+    if error_response:
+        return error_response
     try:
         # Get decision from request body
-        data = request.get_json()
+        data = _get_json()
         if not data or 'decision' not in data:
             logger.warning(f"Missing 'decision' in request body for workflow {workflow_run_id}")
             return jsonify({"error": "Request body must contain a 'decision' field ('approved' or 'rejected')."}), 400
@@ -547,18 +623,17 @@ async def resume_workflow(workflow_run_id): # Make async
         # Get Firestore client and SocketIO instance from app context
         try:
             db = current_app.firestore_db
-            socketio = current_app.socketio
+            task_queue = current_app.task_queue
             workflow_collection_name = current_app.config['WORKFLOW_COLLECTION']
-            agent = current_app.workflow_manager_agent # Get agent instance
         except AttributeError as e:
-             logger.error(f"App context missing required component (firestore_db, socketio, WORKFLOW_COLLECTION, or workflow_manager_agent): {e}", exc_info=True)
+             logger.error(f"App context missing required component (firestore_db, task_queue or WORKFLOW_COLLECTION): {e}", exc_info=True)
              return jsonify({"error": "Server configuration error."}), 500
         except KeyError as e:
             logger.error(f"App config missing required key 'WORKFLOW_COLLECTION': {e}", exc_info=True)
             return jsonify({"error": "Server configuration error (missing WORKFLOW_COLLECTION)."}), 500
 
-        if not all([db, socketio, workflow_collection_name, agent]):
-             logger.error("One or more required components (db, socketio, collection name, agent) are None.")
+        if not all([db, task_queue, workflow_collection_name]):
+             logger.error("One or more required components (db, task_queue, collection name) are None.")
              return jsonify({"error": "Server configuration error (component not initialized)."}), 500
 
 
@@ -573,11 +648,15 @@ async def resume_workflow(workflow_run_id): # Make async
                 return jsonify({'error': f'Workflow {workflow_run_id} not found.'}), 404
 
             workflow_data = doc.to_dict()
+            # Runs recorded without an owner cannot be decided through the API
+            if workflow_data.get('user_id') != user_id:
+                logger.warning(f"User {user_id} attempted to decide workflow {workflow_run_id} owned by another user.")
+                return jsonify({'error': f'Workflow {workflow_run_id} not found.'}), 404
             current_status = workflow_data.get('status')
             logger.debug(f"Current status for workflow {workflow_run_id}: {current_status}")
 
-            # Check if the workflow is actually pending approval
-            if current_status != 'pending_approval':
+            # Check if the workflow is actually pending approval (the agent writes upper-case statuses)
+            if str(current_status).lower() != 'pending_approval':
                 logger.warning(f"Workflow {workflow_run_id} is not pending approval (status: {current_status}). Cannot resume/reject.")
                 return jsonify({'error': f'Workflow is not pending approval (current status: {current_status}).'}), 409 # Conflict
 
@@ -592,19 +671,26 @@ async def resume_workflow(workflow_run_id): # Make async
                 logger.info(f"Approving workflow {workflow_run_id}. Updating Firestore status to 'approved_resuming'.")
                 await doc_ref.update({'status': 'approved_resuming'})
 
-                # Prepare context for agent resumption
-                resume_context = InvocationContext(
-                    invocation_id=f"resume-{workflow_run_id}",
-                    data={'workflow_run_id': workflow_run_id, 'resume': True}
+                # Queue agent resumption; the worker builds the InvocationContext from this payload.
+                # Approved workflows jump ahead of new orchestrator tasks.
+                task_id = task_queue.submit(
+                    'workflow.resume',
+                    {
+                        'invocation_id': f"resume-{workflow_run_id}",
+                        'data': {'workflow_run_id': workflow_run_id, 'resume': True, 'user_id': user_id},
+                    },
+                    user_id=user_id,
+                    priority='high',
                 )
-                logger.info(f"Prepared resume context for agent: {resume_context.invocation_id}")
 
-                # Asynchronously invoke the agent's run method
-                logger.info(f"Starting background task to resume WorkflowManagerAgent for {workflow_run_id}")
-                socketio.start_background_task(agent.run_async, resume_context)
+                logger.info(f"Workflow {workflow_run_id} approved and agent resumption queued as task {task_id}.")
+                return jsonify({'status': 'Workflow approved and resuming', 'task_id': task_id})
 
-                logger.info(f"Workflow {workflow_run_id} approved and agent resumption triggered.")
-                return jsonify({'status': 'Workflow approved and resuming'})
+            except (QueueFullError, QueueClosedError) as e:
+                logger.warning(f"Could not queue resumption for workflow {workflow_run_id}: {e}")
+                # Put the workflow back so the approval can be retried
+                await doc_ref.update({'status': current_status})
+                return jsonify({"error": "Server is busy, please retry the approval shortly."}), 503, {'Retry-After': '5'}
 
             except Exception as e:
                 logger.error(f"Error during approval process for workflow {workflow_run_id}: {e}", exc_info=True)
@@ -1,5 +1,12 @@
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
+import time
 import traceback
+from datetime import datetime, timezone
+
+from utils.decorators import require_subscription_or_local
+from utils.event_store import GROUP_BY_FIELDS, get_event_store
+
+DEFAULT_RANGE_SECONDS = 24 * 3600
 
 # Define the blueprint for analytics routes
 bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
@@ -33,4 +40,65 @@ async def get_analytics_data():
             'error': 'Failed to retrieve analytics data',
             'message': str(e),
             'status': 500
-        }), 500
\ No newline at end of file
+        }), 500
+
+def _parse_time(value, default: float) -> float:
+    """Parse a query time given as Unix seconds or ISO 8601 (UTC unless an offset is given)."""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+@bp.route('/requests', methods=['GET'])
+@require_subscription_or_local
+async def query_requests(user_id: str):
+    """
+    Request volumes, error rates and latency percentiles from the local event store.
+
+    Query parameters:
+      start, end: Unix seconds or ISO 8601 (default: the last 24 hours)
+      interval: minute, hour, total or auto (default auto: minutes up to 6 hours, hours beyond)
+      group_by: comma-separated event, method, path, status (status class, e.g. 5xx)
+      event, method, path, status: filters (path accepts globs such as /api/*)
+      limit: maximum number of rows, keeping the busiest
+    """
+    args = request.args
+    try:
+        end = _parse_time(args.get('end'), time.time())
+        start = _parse_time(args.get('start'), end - DEFAULT_RANGE_SECONDS)
+        if start >= end:
+            raise ValueError("start must be before end")
+        group_by = [name.strip() for name in args.get('group_by', '').split(',') if name.strip()]
+        filters = {name: args[name] for name in GROUP_BY_FIELDS if args.get(name)}
+        limit = int(args['limit']) if args.get('limit') else None
+
+        result = get_event_store().query(
+            start,
+            end,
+            group_by=group_by,
+            interval=args.get('interval', 'auto'),
+            filters=filters,
+            limit=limit,
+        )
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid analytics query',
+            'message': str(e),
+            'status': 400
+        }), 400
+
+    except Exception as e:
+        current_app.logger.error(f"Error querying analytics events: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Failed to query analytics events',
+            'message': str(e),
+            'status': 500
+        }), 500
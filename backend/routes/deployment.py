@@ -1,4 +1,5 @@
 from flask import Blueprint, request, jsonify
+import json
 import uuid
 from typing import Dict, Any, List
 
@@ -6,6 +7,7 @@ from typing import Dict, Any, List
 from utils.decorators import require_subscription_or_local
 from modules.action_agent import ActionAgentManager
 from utils.logger import setup_logger
+from utils.deployment_watcher import get_deployment_watcher
 
 bp = Blueprint('deployment', __name__, url_prefix='/api/deployment') # Added url_prefix
 logger = setup_logger('routes.deployment')
@@ -94,4 +96,31 @@ def get_deployment_status(user_id: str, deployment_url: str): # Add user_id from
             'error': 'Error retrieving deployment status',
             'message': str(e),
             'status': 500
-        }), 500
\ No newline at end of file
+        }), 500
+
+@bp.route('/webhooks/<provider>', methods=['POST'])
+def deployment_webhook(provider: str):
+    """Receive deployment events from Vercel or Netlify.
+
+    Enabled per provider by VERCEL_WEBHOOK_SECRET / NETLIFY_WEBHOOK_SECRET. The event only
+    wakes the deployment watcher, which confirms the state with the provider's API.
+    """
+    watcher = get_deployment_watcher()
+    source = watcher.sources.get(provider)
+    if source is None or not source.webhook_secret:
+        return jsonify({'error': 'Webhook not configured', 'status': 404}), 404
+
+    body = request.get_data()
+    if not source.verify_webhook(body, request.headers):
+        logger.warning(f"Rejected {provider} deployment webhook with an invalid signature")
+        return jsonify({'error': 'Invalid signature', 'status': 401}), 401
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return jsonify({'error': 'Invalid JSON payload', 'status': 400}), 400
+
+    deployment_id = source.webhook_deployment_id(payload) if isinstance(payload, dict) else None
+    tracked = bool(deployment_id) and watcher.notify(provider, deployment_id)
+    logger.info(f"Received {provider} deployment webhook for {deployment_id} (tracked: {tracked})")
+    return jsonify({'success': True, 'tracked': tracked})
@@ -1,11 +1,10 @@
 from flask import Blueprint, request, jsonify, current_app
-import jwt
-import os
 import uuid
 from datetime import datetime
 
 from utils.logger import setup_logger
-from google.adk.runtime import InvocationContext # Import ADK InvocationContext
+from utils.decorators import authenticate_request
+from utils.task_queue import QueueFullError, QueueClosedError
 # Import necessary components from the main app
 # We will instantiate the agent in app.py and import it here
 # from backend.app import socketio, orchestrator_agent # Adjusted import path
@@ -17,46 +16,30 @@ logger = setup_logger('routes.orchestrator')
 
 # Note: Agent instantiation moved to app.py to ensure single instance with socketio
 
+# Task record fields exposed through the status endpoint
+TASK_STATUS_FIELDS = ('id', 'kind', 'status', 'priority', 'attempts', 'created_at', 'started_at', 'finished_at', 'result', 'error')
+
 @orchestrator_bp.route('/tasks', methods=['POST'])
 def create_orchestrator_task():
     """
     Handles the creation of a new task for the Orchestrator Agent.
-    Authenticates the user, validates input, and forwards the task
-    to the Orchestrator Agent via a background task.
-    Returns an immediate acknowledgment; results are sent via WebSocket.
+    Authenticates the user, validates input, and enqueues the task
+    on the shared background task queue.
+    Returns an immediate acknowledgment with a task ID that can be polled;
+    results are also sent via WebSocket.
     """
-    # Import here to avoid circular dependency issues at module load time
-    # and ensure we get the initialized instances from app context
+    # Get the initialized queue from app context
     try:
-        socketio = current_app.extensions['socketio']
-        orchestrator_agent = current_app.orchestrator_agent
+        task_queue = current_app.task_queue
     except AttributeError:
-         logger.error("SocketIO or OrchestratorAgent not initialized or attached to Flask app context.")
+         logger.error("Task queue not initialized or attached to Flask app context.")
          return jsonify({"error": "Server configuration error"}), 500
 
 
-    # 1. Authentication (Keep existing logic)
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        logger.warning("Orchestrator Task: Missing or invalid Authorization header")
-        return jsonify({'error': 'Authorization required', 'status': 401}), 401
-
-    token = auth_header.split(' ')[1]
-    secret_key = os.environ.get('JWT_SECRET_KEY', 'dev-jwt-secret-change-in-production')
-
-    try:
-        payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        user_id = payload['user_id']
-        logger.info(f"Orchestrator Task: Authenticated user_id: {user_id}")
-    except jwt.ExpiredSignatureError:
-        logger.warning("Orchestrator Task: JWT token expired")
-        return jsonify({'error': 'Token expired', 'status': 401}), 401
-    except jwt.InvalidTokenError as e:
-        logger.error(f"Orchestrator Task: Invalid JWT token: {str(e)}")
-        return jsonify({'error': 'Invalid token', 'status': 401}), 401
-    except Exception as e:
-         logger.error(f"Orchestrator Task: Error decoding JWT token: {str(e)}", exc_info=True)
-         return jsonify({'error': 'Authentication error', 'status': 500}), 500
+    # 1. Authentication
+    user_id, error_response = authenticate_request()
+    if error_response:
+        return error_response
 
     # 2. Get and Validate Data
     data = request.get_json()
@@ -70,25 +53,22 @@ def create_orchestrator_task():
     task_data = {"prompt": prompt, "user_id": user_id}
     logger.info(f"Orchestrator Task: Received prompt '{prompt}' from user {user_id}")
 
-    # 3. Forward Task to Orchestrator Agent (Run in Background)
+    # 3. Enqueue Task for the Orchestrator Agent
     try:
-        logger.info(f"Orchestrator Task: Forwarding task for prompt '{prompt}' to Orchestrator Agent using run_async...")
-
-        # Create InvocationContext for ADK agent
         invocation_id = str(uuid.uuid4())
-        context = InvocationContext(
-            invocation_id=invocation_id,
-            invocation_data=task_data # Pass prompt and user_id
+        # The worker builds the InvocationContext from this payload
+        task_id = task_queue.submit(
+            'orchestrator.run',
+            {"invocation_id": invocation_id, "task_data": task_data},
+            user_id=user_id,
         )
-        logger.debug(f"Orchestrator Task: Created InvocationContext with ID {invocation_id} and data: {task_data}")
-
-        # Use socketio.start_background_task to run the agent's run_async
-        # without blocking the HTTP response.
-        socketio.start_background_task(orchestrator_agent.run_async, context)
-        logger.info(f"Orchestrator Task: Background task started for invocation_id {invocation_id} (prompt: '{prompt}').")
+        logger.info(f"Orchestrator Task: Queued task {task_id} for invocation_id {invocation_id} (prompt: '{prompt}').")
 
+    except (QueueFullError, QueueClosedError) as e:
+        logger.warning(f"Orchestrator Task: Rejected task from user {user_id}: {e}")
+        return jsonify({"error": "Server is busy, please retry shortly"}), 503, {'Retry-After': '5'}
     except Exception as e:
-        logger.error(f"Orchestrator Task: Failed to create context or start background task for agent: {str(e)}", exc_info=True)
+        logger.error(f"Orchestrator Task: Failed to enqueue task for agent: {str(e)}", exc_info=True)
         return jsonify({"error": "Failed to submit task to orchestrator"}), 500
 
     # 4. Return Immediate Acknowledgment
@@ -97,8 +77,37 @@ def create_orchestrator_task():
     # Client should listen on WebSocket for updates.
     return jsonify({
         "status": "Task received",
-        "message": "Task processing initiated. Listen for updates via WebSocket."
+        "task_id": task_id,
+        "status_url": f"{orchestrator_bp.url_prefix}/tasks/{task_id}",
+        "message": "Task processing initiated. Poll the status URL or listen for updates via WebSocket."
     }), 202
 
-# TODO: Add GET /tasks/{taskId} endpoint (could use agent.get_task_status)
+@orchestrator_bp.route('/tasks/<string:task_id>', methods=['GET'])
+def get_orchestrator_task(task_id):
+    """
+    Returns the status of a queued orchestrator task.
+    Only the user who submitted the task can see it.
+    """
+    try:
+        task_queue = current_app.task_queue
+    except AttributeError:
+         logger.error("Task queue not initialized or attached to Flask app context.")
+         return jsonify({"error": "Server configuration error"}), 500
+
+    user_id, error_response = authenticate_request()
+    if error_response:
+        return error_response
+
+    try:
+        record = task_queue.get(task_id)
+    except Exception as e:
+        logger.error(f"Orchestrator Task: Failed to load task {task_id}: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to retrieve task status"}), 500
+
+    # Report tasks of other users as missing rather than forbidden
+    if not record or record.get('user_id') != user_id:
+        return jsonify({"error": "Task not found", "status": 404}), 404
+
+    return jsonify({field: record.get(field) for field in TASK_STATUS_FIELDS}), 200
+
 # TODO: Add GET /agents endpoint (optional)
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""Pytest setup: backend modules are imported as top-level packages (``utils.*``, ``modules.*``),
+and the repository root is importable for modules that use ``backend.*`` imports."""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,73 @@
+"""In-memory LRU cache and the ``cached`` decorator."""
+
+import asyncio
+
+from utils import cache as cache_module
+from utils.cache import SimpleCache, cached
+
+
+def _store(**kwargs):
+    return SimpleCache(sweep_interval=0, **kwargs)
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = []
+
+    @cached(cache_instance=_store())
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*[fetch(21) for _ in range(5)])
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == [21]
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = _store(max_size=2)
+    store.set('a', 1)
+    store.set('b', 2)
+    assert store.get('a') == 1  # 'b' is now least recently used
+    store.set('c', 3)
+
+    assert store.get('b') is None
+    assert store.get('a') == 1 and store.get('c') == 3
+    assert store.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_their_timeout(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    store = _store(default_timeout=10)
+    store.set('a', 1)
+    store.set('b', 2, timeout=60)
+
+    now[0] += 30
+    assert store.get('a') is None
+    assert store.get('b') == 2
+    assert store.stats()['expirations'] == 1
+
+
+def test_waiter_takes_over_when_the_running_call_is_cancelled():
+    calls = []
+
+    @cached(cache_instance=_store())
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        leader = asyncio.create_task(fetch(21))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(fetch(21)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == [42] * 3
+    # The cancelled call plus a single retry shared by every waiter
+    assert calls == [21, 21]
@@ -0,0 +1,33 @@
+"""Rule tier of the local intent classifier."""
+
+import pytest
+
+from utils.intent_classifier import IntentClassifier, RuleTable
+
+
+@pytest.mark.parametrize("prompt", [
+    "Who is the lead singer of Queen?",
+    "Explain how interest rates lead to inflation",
+    "Help me price my next gig as a DJ",
+    "What niches does the Python library cover?",
+    "Rewrite this paragraph so it sounds friendlier",
+])
+def test_incidental_keywords_do_not_match_a_rule(prompt):
+    assert RuleTable().predict(prompt).label is None
+
+
+def test_rules_without_logged_agreement_defer_to_the_llm():
+    classifier = IntentClassifier(log_path=None)
+    prediction = classifier.predict("Find leads on Quora for my SaaS")
+    assert prediction.label == "lead_generator"
+    assert not classifier.accepts(prediction)
+
+
+def test_rule_confidence_follows_llm_agreement():
+    agreeing = [{'prompt': f"Find leads for product {i}", 'label': 'lead_generator'} for i in range(20)]
+    classifier = IntentClassifier(log_path=None).fit(agreeing)
+    assert classifier.accepts(classifier.predict("Find leads for my bakery"))
+
+    mixed = agreeing[:10] + [{'prompt': f"Find leads for product {i}", 'label': 'web_searcher'} for i in range(10)]
+    classifier = IntentClassifier(log_path=None, min_examples=10**6).fit(mixed)
+    assert not classifier.accepts(classifier.predict("Find leads for my bakery"))
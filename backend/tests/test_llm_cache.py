@@ -0,0 +1,34 @@
+"""Near-duplicate lookup in the shared LLM response cache."""
+
+import asyncio
+
+from utils.llm_cache import LLMCache, LLMCacheStore
+
+TEMPLATE = (
+    "Classify the user's request into one of the following agents: market_analyzer, "
+    "content_generator, lead_generator, freelance_tasker, web_searcher, self. "
+    "Respond with only the agent key.\n\nUser request: \"{}\""
+)
+
+
+def _cache():
+    return LLMCache(store=LLMCacheStore(None), semantic=True, semantic_threshold=0.95)
+
+
+def _generate(cache, prompt, answer, **kwargs):
+    async def call():
+        return answer
+    return asyncio.run(cache.generate('orchestrator', 'model', prompt, call, **kwargs))
+
+
+def test_templated_prompts_without_semantic_text_use_exact_matches_only():
+    cache = _cache()
+    assert _generate(cache, TEMPLATE.format("Find leads on Quora for my SaaS"), "lead_generator") == "lead_generator"
+    assert _generate(cache, TEMPLATE.format("Write a blog post about vegan recipes"), "content_generator") == "content_generator"
+
+
+def test_semantic_text_matches_near_duplicate_inputs_only():
+    cache = _cache()
+    _generate(cache, "prompt A", "first", semantic_text="AI customer support chatbots for e-commerce stores")
+    assert _generate(cache, "prompt B", "second", semantic_text="AI customer support chatbots for e-commerce stores.") == "first"
+    assert _generate(cache, "prompt C", "third", semantic_text="Vegan recipe newsletter for busy parents") == "third"
@@ -0,0 +1,149 @@
+"""Only the user who started a workflow can approve and resume it."""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("google.adk.runtime")
+
+# Importing the routes package builds agents that require an API key
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+import jwt
+from flask import Flask
+
+from agents.workflow_manager_agent import WorkflowManagerAgent
+from config import Config
+from routes.a2a import a2a_bp
+
+COLLECTION = "workflows"
+
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = dict(data) if data is not None else None
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, documents, doc_id):
+        self.documents = documents
+        self.doc_id = doc_id
+
+    async def get(self):
+        return FakeSnapshot(self.documents.get(self.doc_id))
+
+    async def update(self, data):
+        self.documents[self.doc_id].update(data)
+
+
+class FakeBatch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, doc_ref, data, merge=False):
+        self.writes.append((doc_ref, data))
+
+    async def commit(self):
+        for doc_ref, data in self.writes:
+            doc_ref.documents.setdefault(doc_ref.doc_id, {}).update(data)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.documents = {}
+
+    def collection(self, name):
+        return SimpleNamespace(document=lambda doc_id: FakeDocument(self.documents, doc_id))
+
+    def batch(self):
+        return FakeBatch()
+
+
+class FakeTaskQueue:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, kind, payload, user_id=None, priority=None):
+        self.submitted.append((kind, payload, user_id))
+        return f"task-{len(self.submitted)}"
+
+
+@pytest.fixture
+def setup():
+    db = FakeFirestore()
+    agent = WorkflowManagerAgent(
+        socketio=SimpleNamespace(emit=lambda *args, **kwargs: None),
+        firestore_db=db,
+        collection_name=COLLECTION,
+        market_research_agent_url=None,
+        improvement_agent_url=None,
+        branding_agent_url=None,
+        code_generation_agent_url=None,
+        deployment_agent_url=None,
+        marketing_agent_url=None,
+    )
+    app = Flask(__name__)
+    app.register_blueprint(a2a_bp)
+    app.config['WORKFLOW_COLLECTION'] = COLLECTION
+    app.firestore_db = db
+    app.task_queue = FakeTaskQueue()
+    return db, agent, app
+
+
+def _run(agent, data):
+    context = SimpleNamespace(invocation_id="inv", input=SimpleNamespace(data=data, metadata=None))
+    return asyncio.run(agent.run_async(context))
+
+
+def _decide(app, workflow_run_id, user_id):
+    token = jwt.encode({'user_id': user_id}, os.environ.get('JWT_SECRET_KEY', Config.JWT_SECRET_KEY), algorithm='HS256')
+    return app.test_client().post(
+        f"/a2a/workflow/{workflow_run_id}/resume",
+        json={'decision': 'approved'},
+        headers={'Authorization': f"Bearer {token}"},
+    )
+
+
+def _start_pending_workflow(db, agent):
+    _run(agent, {'initial_topic': "vegan snacks", 'user_id': "alice"})
+    (workflow_run_id, document), = db.documents.items()
+    assert document['user_id'] == "alice"
+    # Park the run at the approval gate
+    document.update({'status': "PENDING_APPROVAL", 'approved': False})
+    return workflow_run_id
+
+
+def test_owner_can_approve_and_resume(setup):
+    db, agent, app = setup
+    workflow_run_id = _start_pending_workflow(db, agent)
+
+    response = _decide(app, workflow_run_id, "alice")
+    assert response.status_code == 200
+    (kind, payload, queued_user), = app.task_queue.submitted
+    assert kind == 'workflow.resume' and queued_user == "alice"
+
+    # The run picks up past the approval gate; no agent URLs are configured, so it stops there
+    event = _run(agent, payload['data'])
+    assert event.data['stage'] == "MARKET_RESEARCH"
+    assert db.documents[workflow_run_id]['status'] == "FAILED"
+
+
+def test_other_user_gets_404_and_cannot_resume(setup):
+    db, agent, app = setup
+    workflow_run_id = _start_pending_workflow(db, agent)
+    before = dict(db.documents[workflow_run_id])
+
+    response = _decide(app, workflow_run_id, "bob")
+    assert response.status_code == 404
+    assert app.task_queue.submitted == []
+
+    event = _run(agent, {'workflow_run_id': workflow_run_id, 'resume': True, 'user_id': "bob"})
+    assert "not found" in event.data['error']
+    assert db.documents[workflow_run_id] == before
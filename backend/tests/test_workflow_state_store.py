@@ -0,0 +1,143 @@
+"""Behaviour of the write-behind workflow state store under concurrent workers."""
+
+import asyncio
+import threading
+
+from utils.workflow_state_store import InMemoryStateBackend, WorkflowStateStore
+
+
+class GatedBackend(InMemoryStateBackend):
+    """In-memory backend whose first commit blocks until released, optionally failing."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = False
+
+    async def commit(self, updates):
+        if self.started.is_set():
+            await super().commit(updates)
+            return
+        self.started.set()
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        if self.fail:
+            raise RuntimeError("commit failed")
+        await super().commit(updates)
+
+
+def _run_in_thread(coro_factory):
+    """Run a coroutine on its own event loop in another thread, like a task-queue worker."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = asyncio.run(coro_factory())
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def test_durable_update_waits_for_other_workers_inflight_commit():
+    backend = GatedBackend()
+    store = WorkflowStateStore(backend, flush_interval=60)
+
+    async def queue_and_flush():
+        await store.update('run-1', {'status': 'STEP_DONE', 'result': 1})
+        await store.flush()
+
+    flusher, _ = _run_in_thread(queue_and_flush)
+    assert backend.started.wait(2)
+
+    durable_done = threading.Event()
+
+    async def durable_update():
+        await store.update('run-1', {'current_step': 'b'}, durable=True)
+        durable_done.set()
+
+    worker, outcome = _run_in_thread(durable_update)
+    # The other worker's commit holds 'result'; the durable update must not return before it lands
+    assert not durable_done.wait(0.1)
+    backend.release.set()
+    flusher.join(2)
+    worker.join(2)
+    assert 'error' not in outcome
+    assert backend.documents['run-1'] == {'status': 'STEP_DONE', 'result': 1, 'current_step': 'b'}
+
+
+def test_durable_update_fails_when_other_workers_commit_fails():
+    backend = GatedBackend()
+    backend.fail = True
+    store = WorkflowStateStore(backend, flush_interval=60)
+
+    async def queue_and_flush():
+        await store.update('run-1', {'result': 1})
+        await store.flush()
+
+    flusher, flush_outcome = _run_in_thread(queue_and_flush)
+    assert backend.started.wait(2)
+
+    worker, outcome = _run_in_thread(lambda: store.update('run-1', {'current_step': 'b'}, durable=True))
+    backend.release.set()
+    flusher.join(2)
+    worker.join(2)
+    assert isinstance(flush_outcome.get('error'), RuntimeError)
+    assert isinstance(outcome.get('error'), RuntimeError)
+    # The failed fields are pending again for the next flush
+    assert store._pending['run-1']['result'] == 1
+
+
+def test_get_includes_updates_being_committed():
+    backend = GatedBackend()
+    store = WorkflowStateStore(backend, flush_interval=60)
+
+    async def queue_and_flush():
+        await store.update('run-1', {'status': 'RUNNING'})
+        await store.flush()
+
+    flusher, _ = _run_in_thread(queue_and_flush)
+    assert backend.started.wait(2)
+    try:
+        state = asyncio.run(store.get('run-1'))
+        assert state == {'status': 'RUNNING'}
+    finally:
+        backend.release.set()
+        flusher.join(2)
+    assert asyncio.run(store.get('run-1')) == {'status': 'RUNNING'}
+
+
+def test_debounced_updates_coalesce_into_one_commit():
+    backend = InMemoryStateBackend()
+    store = WorkflowStateStore(backend, flush_interval=0.01)
+
+    async def run():
+        await store.update('run-1', {'status': 'A'})
+        await store.update('run-1', {'status': 'B', 'step': 1})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert backend.commit_count == 1
+    assert backend.documents['run-1'] == {'status': 'B', 'step': 1}
+
+
+def test_timer_of_closed_loop_does_not_block_scheduling():
+    backend = InMemoryStateBackend()
+    store = WorkflowStateStore(backend, flush_interval=60)
+
+    async def queue_only():
+        await store.update('run-1', {'status': 'A'})
+
+    # The loop closes before its debounce timer fires
+    asyncio.run(queue_only())
+
+    async def queue_and_wait():
+        store.flush_interval = 0.01
+        await store.update('run-2', {'status': 'B'})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(queue_and_wait())
+    assert backend.documents == {'run-1': {'status': 'A'}, 'run-2': {'status': 'B'}}
@@ -0,0 +1,228 @@
+"""
+Shared transport for agent-to-agent (A2A) HTTP calls.
+
+Agents used to create their own ``httpx.AsyncClient`` for every call or
+workflow. This module keeps one pooled client per agent host (HTTP/2 when the
+``h2`` package is available), gzips larger request bodies to hosts known to
+accept them and coalesces
+identical in-flight requests so concurrent workflows asking the same agent the
+same thing share a single call.
+"""
+
+import os
+import json
+import gzip
+import asyncio
+import hashlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.a2a_transport')
+
+# --- Configuration ---
+A2A_TIMEOUT_SECONDS = float(os.getenv("A2A_TIMEOUT_SECONDS", 300))
+A2A_HTTP2 = os.getenv("A2A_HTTP2", "true").lower() == "true"
+A2A_MAX_CONNECTIONS_PER_HOST = int(os.getenv("A2A_MAX_CONNECTIONS_PER_HOST", 50))
+A2A_MAX_KEEPALIVE_PER_HOST = int(os.getenv("A2A_MAX_KEEPALIVE_PER_HOST", 20))
+A2A_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("A2A_KEEPALIVE_EXPIRY_SECONDS", 30))
+# Request bodies at least this large are gzip-compressed (negative disables)
+A2A_GZIP_MIN_BYTES = int(os.getenv("A2A_GZIP_MIN_BYTES", 1024))
+# Comma-separated hosts (``host`` or ``host:port``) whose A2A endpoints accept
+# gzip-encoded bodies; nothing is compressed for any other host
+A2A_GZIP_HOSTS = frozenset(
+    host.strip().lower() for host in os.getenv("A2A_GZIP_HOSTS", "").split(",") if host.strip()
+)
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+class A2ATransport:
+    """Pooled, coalescing HTTP transport for A2A calls."""
+
+    def __init__(
+        self,
+        timeout: float = A2A_TIMEOUT_SECONDS,
+        http2: bool = A2A_HTTP2,
+        max_connections: int = A2A_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections: int = A2A_MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry: float = A2A_KEEPALIVE_EXPIRY_SECONDS,
+        gzip_min_bytes: int = A2A_GZIP_MIN_BYTES,
+        gzip_hosts: Iterable[str] = A2A_GZIP_HOSTS,
+    ):
+        """Initialize the transport.
+
+        Args:
+            timeout: Default request timeout in seconds
+            http2: Use HTTP/2 multiplexing when the ``h2`` package is installed
+            max_connections: Connection cap per agent host
+            max_keepalive_connections: Idle connections kept open per agent host
+            keepalive_expiry: Seconds an idle connection is kept alive
+            gzip_min_bytes: Minimum body size to gzip (negative disables compression)
+            gzip_hosts: Hosts (``host`` or ``host:port``) that accept gzip-encoded bodies
+        """
+        if http2 and not _HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested for A2A transport but 'h2' is not installed. Falling back to HTTP/1.1.")
+        self.timeout = timeout
+        self.http2 = http2 and _HTTP2_AVAILABLE
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.gzip_min_bytes = gzip_min_bytes
+        self.gzip_hosts = frozenset(host.lower() for host in gzip_hosts)
+        # httpx connections are bound to the event loop that opened them, so
+        # pools are keyed on (loop, origin) as well as the agent host
+        self._clients: Dict[Tuple[int, str], Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[httpx.Response]"] = {}
+        self._stats = {'requests': 0, 'coalesced': 0, 'gzipped': 0}
+
+    def _client_for(self, url: str) -> httpx.AsyncClient:
+        """Get (or create) the pooled client for the URL's origin on the running loop."""
+        loop = asyncio.get_running_loop()
+        parts = urlsplit(url)
+        key = (id(loop), f"{parts.scheme}://{parts.netloc}")
+
+        entry = self._clients.get(key)
+        if entry is not None and entry[0] is loop:
+            return entry[1]
+
+        self._prune_closed_loops()
+        client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+        )
+        self._clients[key] = (loop, client)
+        logger.info(f"Opened A2A connection pool for {key[1]} (HTTP/2: {self.http2})")
+        return client
+
+    def _prune_closed_loops(self) -> None:
+        """Forget clients whose event loop has been closed."""
+        for key, (loop, _) in list(self._clients.items()):
+            if loop.is_closed():
+                del self._clients[key]
+
+    def _accepts_gzip(self, url: str) -> bool:
+        """Whether the URL's host opted in to gzip-encoded request bodies."""
+        parts = urlsplit(url)
+        return bool(self.gzip_hosts) and (
+            parts.netloc.lower() in self.gzip_hosts or (parts.hostname or '') in self.gzip_hosts
+        )
+
+    def _encode_body(self, url: str, payload: Any) -> Tuple[bytes, Dict[str, str]]:
+        """Serialize a JSON payload, gzipping it when it is large enough and the host accepts it."""
+        body = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if 0 <= self.gzip_min_bytes <= len(body) and self._accepts_gzip(url):
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+            self._stats['gzipped'] += 1
+        return body, headers
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Any,
+        timeout: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        coalesce: bool = True,
+    ) -> httpx.Response:
+        """POST a JSON payload to an agent endpoint.
+
+        Identical concurrent requests (same URL, headers and body) share one HTTP call
+        unless ``coalesce`` is False. The response is returned unchecked so
+        callers keep their own ``raise_for_status`` handling.
+
+        Args:
+            url: Full A2A endpoint URL
+            payload: JSON-serializable request body
+            timeout: Request timeout in seconds (uses the transport default if None)
+            headers: Extra request headers
+            coalesce: Share the result with identical in-flight requests
+
+        Returns:
+            The httpx response
+        """
+        body, request_headers = self._encode_body(url, payload)
+        if headers:
+            request_headers.update(headers)
+
+        if not coalesce:
+            return await self._send(url, body, request_headers, timeout)
+
+        loop = asyncio.get_running_loop()
+        # Headers are part of the key so calls made with different credentials never share a response
+        header_lines = sorted(f"{name.lower()}:{value}" for name, value in request_headers.items())
+        digest = hashlib.sha256(
+            '\n'.join([url, *header_lines]).encode('utf-8') + b'\0' + body
+        ).hexdigest()
+        inflight_key = (id(loop), digest)
+
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self._stats['coalesced'] += 1
+            logger.debug(f"Coalescing A2A request to {url} with an identical in-flight call.")
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[httpx.Response]" = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            response = await self._send(url, body, request_headers, timeout)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    async def _send(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]) -> httpx.Response:
+        self._stats['requests'] += 1
+        client = self._client_for(url)
+        return await client.post(
+            url,
+            content=body,
+            headers=headers,
+            timeout=timeout if timeout is not None else self.timeout,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request, coalescing and compression counters."""
+        stats = dict(self._stats)
+        stats['open_pools'] = len(self._clients)
+        stats['inflight'] = len(self._inflight)
+        return stats
+
+    async def aclose(self) -> None:
+        """Close the pools opened on the running event loop."""
+        loop = asyncio.get_running_loop()
+        for key, (client_loop, client) in list(self._clients.items()):
+            if client_loop is loop:
+                await client.aclose()
+                del self._clients[key]
+
+
+_transport: Optional[A2ATransport] = None
+
+
+def get_a2a_transport() -> A2ATransport:
+    """Get the process-wide A2A transport."""
+    global _transport
+    if _transport is None:
+        _transport = A2ATransport()
+    return _transport
@@ -7,23 +7,41 @@ This module provides:
 3. Automated accessibility testing
 4. Accessibility report generation
 5. Remediation suggestions
+6. Sampled background auditing of HTML responses
 """
 
 import os
 import json
 import re
+import time
+import queue
+import random
+import fnmatch
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional, Tuple, Set, Union
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, Deque, FrozenSet, List, Optional, Tuple, Set, Union
 from functools import wraps
 
-from flask import request, Response, g, current_app, render_template_string
-from bs4 import BeautifulSoup
+from flask import request, Response, current_app, render_template_string
+from bs4 import BeautifulSoup, Tag
 
 from utils.logger import setup_logger
 
+try:
+    import lxml  # noqa: F401
+    DEFAULT_HTML_PARSER = 'lxml'
+except ImportError:  # lxml is optional; BeautifulSoup's bundled parser is used instead
+    DEFAULT_HTML_PARSER = 'html.parser'
+
 # Set up module logger
 logger = setup_logger('utils.accessibility')
 
+# Written (and replaced) by AccessibilityAuditor in AccessibilityConfig.report_path
+ROLLING_REPORT_FILENAME = 'accessibility_report_rolling.json'
+
 # ===== Accessibility Configuration =====
 
 class AccessibilityConfig:
@@ -44,9 +62,22 @@ class AccessibilityConfig:
         self.check_heading_hierarchy = self.config.get('check_heading_hierarchy', True)
         self.check_link_text = self.config.get('check_link_text', True)
         
+        # Parser used to build the shared document (lxml when installed)
+        self.html_parser = self.config.get('html_parser', DEFAULT_HTML_PARSER)
+        
         # Reporting
         self.generate_reports = self.config.get('generate_reports', False)
         self.report_path = self.config.get('report_path', './accessibility_reports')
+        self.report_interval = float(self.config.get('report_interval', 300))  # seconds between rolling report writes
+        
+        # Background auditing of sampled HTML responses
+        self.sample_rate = float(self.config.get('sample_rate', 0.1))
+        self.route_sample_rates = self.config.get('route_sample_rates', [])  # [(path glob, rate)], first match wins
+        self.max_audit_bytes = int(self.config.get('max_audit_bytes', 1024 * 1024))
+        self.audit_workers = int(self.config.get('audit_workers', 2))
+        self.audit_queue_size = int(self.config.get('audit_queue_size', 100))
+        self.audit_dedupe_size = int(self.config.get('audit_dedupe_size', 1024))  # body hashes remembered
+        self.audit_report_window = int(self.config.get('audit_report_window', 500))  # audits in the rolling report
         
         # Automated testing
         self.run_automated_tests = self.config.get('run_automated_tests', False)
@@ -63,8 +94,15 @@ class AccessibilityConfig:
             'check_aria_attributes': os.environ.get('ACCESSIBILITY_CHECK_ARIA', 'true').lower() == 'true',
             'check_heading_hierarchy': os.environ.get('ACCESSIBILITY_CHECK_HEADINGS', 'true').lower() == 'true',
             'check_link_text': os.environ.get('ACCESSIBILITY_CHECK_LINK_TEXT', 'true').lower() == 'true',
+            'html_parser': os.environ.get('ACCESSIBILITY_HTML_PARSER', DEFAULT_HTML_PARSER),
             'generate_reports': os.environ.get('ACCESSIBILITY_GENERATE_REPORTS', 'false').lower() == 'true',
             'report_path': os.environ.get('ACCESSIBILITY_REPORT_PATH', './accessibility_reports'),
+            'report_interval': float(os.environ.get('ACCESSIBILITY_REPORT_INTERVAL', 300)),
+            'sample_rate': float(os.environ.get('ACCESSIBILITY_SAMPLE_RATE', 0.1)),
+            'route_sample_rates': parse_route_sample_rates(os.environ.get('ACCESSIBILITY_ROUTE_SAMPLE_RATES', '')),
+            'max_audit_bytes': int(os.environ.get('ACCESSIBILITY_MAX_AUDIT_BYTES', 1024 * 1024)),
+            'audit_workers': int(os.environ.get('ACCESSIBILITY_AUDIT_WORKERS', 2)),
+            'audit_queue_size': int(os.environ.get('ACCESSIBILITY_AUDIT_QUEUE_SIZE', 100)),
             'run_automated_tests': os.environ.get('ACCESSIBILITY_RUN_AUTOMATED_TESTS', 'false').lower() == 'true',
         }
         
@@ -159,286 +197,254 @@ WCAG_GUIDELINES = {
     }
 }
 
-# ===== Accessibility Checkers =====
+# ===== Parsed Document =====
 
-def check_alt_text(html: str) -> List[AccessibilityIssue]:
-    """Check for missing alt text on images.
+HEADING_LEVELS = {f'h{level}': level for level in range(1, 7)}
+
+class AccessibilityDocument:
+    """HTML parsed once and indexed for all accessibility rules.
     
-    Args:
-        html: HTML content to check
+    A single traversal collects the elements in document order, an
+    id -> label index (``<label for=...>``) and the headings, so rules never
+    search the whole tree themselves.
+    """
+    
+    def __init__(self, html: str, parser: Optional[str] = None):
+        """Parse and index HTML.
         
-    Returns:
-        List of accessibility issues
+        Args:
+            html: HTML content to check
+            parser: BeautifulSoup parser name (defaults to lxml when installed)
+        """
+        self.parser = parser or DEFAULT_HTML_PARSER
+        self.soup = BeautifulSoup(html, self.parser)
+        self.elements: List[Tag] = self.soup.find_all(True)
+        self.labels_by_for: Dict[str, Tag] = {}
+        self.headings: List[Tuple[int, Tag]] = []
+        
+        for element in self.elements:
+            name = element.name
+            if name == 'label':
+                label_for = element.get('for')
+                if label_for:
+                    self.labels_by_for.setdefault(label_for, element)
+            elif name in HEADING_LEVELS:
+                self.headings.append((HEADING_LEVELS[name], element))
+    
+    def has_label(self, element: Tag) -> bool:
+        """Whether a form control has a ``for`` label or sits inside a label."""
+        element_id = element.get('id')
+        if element_id and element_id in self.labels_by_for:
+            return True
+        return element.find_parent('label') is not None
+
+def _element_snippet(element: Tag) -> str:
+    """Markup of an element, truncated to 100 characters for reports."""
+    markup = str(element)
+    return markup[:100] + ('...' if len(markup) > 100 else '')
+
+# ===== Accessibility Rules =====
+
+class AccessibilityRule:
+    """A check run as a visitor over an ``AccessibilityDocument``.
+    
+    ``visit`` is called, in document order, for every element whose tag is in
+    ``tags`` or that carries one of ``attributes``; ``finish`` runs once after
+    the traversal. Rules keep no per-document state, so one instance can be
+    shared by all checkers and threads.
     """
-    issues = []
-    soup = BeautifulSoup(html, 'html.parser')
     
-    # Check images
-    for img in soup.find_all('img'):
-        if not img.get('alt'):
+    name = 'rule'
+    config_flag: Optional[str] = None  # AccessibilityConfig attribute enabling the rule
+    tags: FrozenSet[str] = frozenset()
+    attributes: FrozenSet[str] = frozenset()
+    
+    def visit(self, element: Tag, document: AccessibilityDocument, issues: List[AccessibilityIssue]) -> None:
+        """Check one element."""
+    
+    def finish(self, document: AccessibilityDocument, issues: List[AccessibilityIssue]) -> None:
+        """Check the document as a whole."""
+
+class AltTextRule(AccessibilityRule):
+    """Missing alt text on images."""
+    
+    name = 'alt_text'
+    config_flag = 'check_alt_text'
+    tags = frozenset({'img'})
+    
+    def visit(self, element, document, issues):
+        alt = element.get('alt')
+        if alt is None:
             issues.append(AccessibilityIssue(
                 code='missing-alt',
                 message='Image missing alt text',
-                element=str(img)[:100] + ('...' if len(str(img)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='1.1.1',
                 remediation='Add descriptive alt text to the image'
             ))
-        elif img.get('alt') == '':
+        elif alt == '':
             # Empty alt is valid for decorative images, but let's flag it as info
             issues.append(AccessibilityIssue(
                 code='empty-alt',
                 message='Image has empty alt text (acceptable for decorative images)',
-                element=str(img)[:100] + ('...' if len(str(img)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='info',
                 wcag_criterion='1.1.1',
                 remediation='Ensure this image is truly decorative'
             ))
-    
-    return issues
 
-def check_form_labels(html: str) -> List[AccessibilityIssue]:
-    """Check for form inputs without associated labels.
+class FormLabelRule(AccessibilityRule):
+    """Form inputs, selects and textareas without associated labels."""
     
-    Args:
-        html: HTML content to check
-        
-    Returns:
-        List of accessibility issues
-    """
-    issues = []
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Check form inputs
-    for input_tag in soup.find_all('input'):
-        # Skip hidden inputs and submit/button inputs
-        input_type = input_tag.get('type', '').lower()
-        if input_type in ['hidden', 'submit', 'button', 'image']:
-            continue
+    name = 'form_labels'
+    config_flag = 'check_form_labels'
+    tags = frozenset({'input', 'select', 'textarea'})
+    
+    skipped_input_types = frozenset({'hidden', 'submit', 'button', 'image'})
+    
+    # Tag -> (message without id, message without label)
+    messages = {
+        'input': ('Input ({type}) has no id attribute for label association',
+                  'Input ({type}) with id "{id}" has no associated label'),
+        'select': ('Select element has no id attribute for label association',
+                   'Select with id "{id}" has no associated label'),
+        'textarea': ('Textarea has no id attribute for label association',
+                     'Textarea with id "{id}" has no associated label'),
+    }
+    
+    def visit(self, element, document, issues):
+        kind = element.name
+        input_type = ''
+        if kind == 'input':
+            # Skip hidden inputs and submit/button inputs
+            input_type = element.get('type', '').lower()
+            if input_type in self.skipped_input_types:
+                return
         
-        # Check for id attribute
-        input_id = input_tag.get('id')
-        if not input_id:
+        no_id_message, no_label_message = self.messages[kind]
+        element_id = element.get('id')
+        if not element_id:
             issues.append(AccessibilityIssue(
-                code='input-no-id',
-                message=f'Input ({input_type}) has no id attribute for label association',
-                element=str(input_tag)[:100] + ('...' if len(str(input_tag)) > 100 else ''),
+                code=f'{kind}-no-id',
+                message=no_id_message.format(type=input_type),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='3.3.2',
-                remediation='Add an id attribute to the input and associate it with a label'
+                remediation=f'Add an id attribute to the {kind} and associate it with a label'
             ))
-            continue
-        
-        # Check for associated label
-        label = soup.find('label', attrs={'for': input_id})
-        if not label:
-            # Check if input is inside a label
-            parent_label = input_tag.find_parent('label')
-            if not parent_label:
-                issues.append(AccessibilityIssue(
-                    code='input-no-label',
-                    message=f'Input ({input_type}) with id "{input_id}" has no associated label',
-                    element=str(input_tag)[:100] + ('...' if len(str(input_tag)) > 100 else ''),
-                    severity='error',
-                    wcag_criterion='3.3.2',
-                    remediation='Add a label element with a for attribute matching the input id'
-                ))
-    
-    # Check select elements
-    for select in soup.find_all('select'):
-        select_id = select.get('id')
-        if not select_id:
+        elif not document.has_label(element):
             issues.append(AccessibilityIssue(
-                code='select-no-id',
-                message='Select element has no id attribute for label association',
-                element=str(select)[:100] + ('...' if len(str(select)) > 100 else ''),
+                code=f'{kind}-no-label',
+                message=no_label_message.format(type=input_type, id=element_id),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='3.3.2',
-                remediation='Add an id attribute to the select and associate it with a label'
+                remediation=f'Add a label element with a for attribute matching the {kind} id'
             ))
-            continue
+
+class HeadingHierarchyRule(AccessibilityRule):
+    """Skipped heading levels, a first heading other than H1 and multiple H1s."""
+    
+    name = 'heading_hierarchy'
+    config_flag = 'check_heading_hierarchy'
+    
+    def finish(self, document, issues):
+        # document.headings is already in document order
+        headings = document.headings
         
-        # Check for associated label
-        label = soup.find('label', attrs={'for': select_id})
-        if not label:
-            # Check if select is inside a label
-            parent_label = select.find_parent('label')
-            if not parent_label:
+        # Check for skipped levels
+        prev_level = 0
+        for level, heading in headings:
+            if prev_level > 0 and level > prev_level + 1:
                 issues.append(AccessibilityIssue(
-                    code='select-no-label',
-                    message=f'Select with id "{select_id}" has no associated label',
-                    element=str(select)[:100] + ('...' if len(str(select)) > 100 else ''),
-                    severity='error',
-                    wcag_criterion='3.3.2',
-                    remediation='Add a label element with a for attribute matching the select id'
+                    code='heading-skipped-level',
+                    message=f'Heading level skipped from H{prev_level} to H{level}',
+                    element=_element_snippet(heading),
+                    severity='warning',
+                    wcag_criterion='1.3.1',
+                    remediation=f'Use H{prev_level + 1} instead of H{level} or add missing heading levels'
                 ))
-    
-    # Check textarea elements
-    for textarea in soup.find_all('textarea'):
-        textarea_id = textarea.get('id')
-        if not textarea_id:
+            prev_level = level
+        
+        # Check for first heading not being H1
+        if headings and headings[0][0] != 1:
             issues.append(AccessibilityIssue(
-                code='textarea-no-id',
-                message='Textarea has no id attribute for label association',
-                element=str(textarea)[:100] + ('...' if len(str(textarea)) > 100 else ''),
-                severity='error',
-                wcag_criterion='3.3.2',
-                remediation='Add an id attribute to the textarea and associate it with a label'
+                code='heading-first-not-h1',
+                message=f'First heading is H{headings[0][0]}, not H1',
+                element=_element_snippet(headings[0][1]),
+                severity='warning',
+                wcag_criterion='1.3.1',
+                remediation='Start the document with an H1 heading'
             ))
-            continue
-        
-        # Check for associated label
-        label = soup.find('label', attrs={'for': textarea_id})
-        if not label:
-            # Check if textarea is inside a label
-            parent_label = textarea.find_parent('label')
-            if not parent_label:
-                issues.append(AccessibilityIssue(
-                    code='textarea-no-label',
-                    message=f'Textarea with id "{textarea_id}" has no associated label',
-                    element=str(textarea)[:100] + ('...' if len(str(textarea)) > 100 else ''),
-                    severity='error',
-                    wcag_criterion='3.3.2',
-                    remediation='Add a label element with a for attribute matching the textarea id'
-                ))
-    
-    return issues
-
-def check_heading_hierarchy(html: str) -> List[AccessibilityIssue]:
-    """Check for proper heading hierarchy.
-    
-    Args:
-        html: HTML content to check
         
-    Returns:
-        List of accessibility issues
-    """
-    issues = []
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Find all headings
-    headings = []
-    for i in range(1, 7):
-        for heading in soup.find_all(f'h{i}'):
-            headings.append((i, heading))
-    
-    # Sort headings by their position in the document
-    headings.sort(key=lambda x: soup.get_text().find(x[1].get_text()))
-    
-    # Check for skipped levels
-    prev_level = 0
-    for level, heading in headings:
-        if prev_level > 0 and level > prev_level + 1:
+        # Check for multiple H1 headings
+        h1_count = sum(1 for level, _ in headings if level == 1)
+        if h1_count > 1:
             issues.append(AccessibilityIssue(
-                code='heading-skipped-level',
-                message=f'Heading level skipped from H{prev_level} to H{level}',
-                element=str(heading)[:100] + ('...' if len(str(heading)) > 100 else ''),
+                code='heading-multiple-h1',
+                message=f'Multiple H1 headings found ({h1_count})',
+                element=None,
                 severity='warning',
                 wcag_criterion='1.3.1',
-                remediation=f'Use H{prev_level + 1} instead of H{level} or add missing heading levels'
+                remediation='Use only one H1 heading per page'
             ))
-        prev_level = level
-    
-    # Check for first heading not being H1
-    if headings and headings[0][0] != 1:
-        issues.append(AccessibilityIssue(
-            code='heading-first-not-h1',
-            message=f'First heading is H{headings[0][0]}, not H1',
-            element=str(headings[0][1])[:100] + ('...' if len(str(headings[0][1])) > 100 else ''),
-            severity='warning',
-            wcag_criterion='1.3.1',
-            remediation='Start the document with an H1 heading'
-        ))
-    
-    # Check for multiple H1 headings
-    h1_count = sum(1 for level, _ in headings if level == 1)
-    if h1_count > 1:
-        issues.append(AccessibilityIssue(
-            code='heading-multiple-h1',
-            message=f'Multiple H1 headings found ({h1_count})',
-            element=None,
-            severity='warning',
-            wcag_criterion='1.3.1',
-            remediation='Use only one H1 heading per page'
-        ))
-    
-    return issues
-
-def check_link_text(html: str) -> List[AccessibilityIssue]:
-    """Check for meaningful link text.
+
+class LinkTextRule(AccessibilityRule):
+    """Empty, generic or very short link text."""
     
-    Args:
-        html: HTML content to check
-        
-    Returns:
-        List of accessibility issues
-    """
-    issues = []
-    soup = BeautifulSoup(html, 'html.parser')
+    name = 'link_text'
+    config_flag = 'check_link_text'
+    tags = frozenset({'a'})
     
     # Problematic link texts
-    problematic_texts = [
+    problematic_texts = frozenset({
         'click here', 'click', 'here', 'more', 'read more', 'link',
         'this link', 'learn more', 'details', 'more info'
-    ]
+    })
     
-    for link in soup.find_all('a'):
-        # Get link text
-        link_text = link.get_text().strip().lower()
+    def visit(self, element, document, issues):
+        link_text = element.get_text().strip().lower()
         
-        # Skip links with no text but with aria-label or title
-        if not link_text and (link.get('aria-label') or link.get('title')):
-            continue
-        
-        # Check for empty links
-        if not link_text and not link.find('img'):
+        if not link_text:
+            # Skip links with no text but with aria-label, title or an image
+            if element.get('aria-label') or element.get('title') or element.find('img'):
+                return
             issues.append(AccessibilityIssue(
                 code='link-empty',
                 message='Link has no text content',
-                element=str(link)[:100] + ('...' if len(str(link)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='2.4.4',
                 remediation='Add descriptive text to the link or use aria-label'
             ))
-        
-        # Check for problematic link text
-        elif link_text in problematic_texts:
+        elif link_text in self.problematic_texts:
             issues.append(AccessibilityIssue(
                 code='link-generic-text',
                 message=f'Link has generic text: "{link_text}"',
-                element=str(link)[:100] + ('...' if len(str(link)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='warning',
                 wcag_criterion='2.4.4',
                 remediation='Use descriptive text that indicates the link purpose'
             ))
-        
-        # Check for very short link text
-        elif len(link_text) < 4 and not link.find('img'):
+        elif len(link_text) < 4 and not element.find('img'):
             issues.append(AccessibilityIssue(
                 code='link-short-text',
                 message=f'Link text is very short: "{link_text}"',
-                element=str(link)[:100] + ('...' if len(str(link)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='warning',
                 wcag_criterion='2.4.4',
                 remediation='Use more descriptive link text'
             ))
-    
-    return issues
 
-def check_aria_attributes(html: str) -> List[AccessibilityIssue]:
-    """Check for proper ARIA attribute usage.
+class AriaAttributesRule(AccessibilityRule):
+    """Invalid roles, aria-hidden on focusable elements and missing ARIA states."""
     
-    Args:
-        html: HTML content to check
-        
-    Returns:
-        List of accessibility issues
-    """
-    issues = []
-    soup = BeautifulSoup(html, 'html.parser')
+    name = 'aria_attributes'
+    config_flag = 'check_aria_attributes'
+    attributes = frozenset({'role', 'aria-hidden'})
     
-    # Check for invalid role values
-    valid_roles = {
+    valid_roles = frozenset({
         'alert', 'alertdialog', 'application', 'article', 'banner', 'button',
         'cell', 'checkbox', 'columnheader', 'combobox', 'complementary',
         'contentinfo', 'definition', 'dialog', 'directory', 'document',
@@ -450,62 +456,175 @@ def check_aria_attributes(html: str) -> List[AccessibilityIssue]:
         'scrollbar', 'search', 'searchbox', 'separator', 'slider', 'spinbutton',
         'status', 'switch', 'tab', 'table', 'tablist', 'tabpanel', 'term',
         'textbox', 'timer', 'toolbar', 'tooltip', 'tree', 'treegrid', 'treeitem'
-    }
+    })
+    focusable_tags = frozenset({'a', 'button', 'input', 'select', 'textarea'})
     
-    for element in soup.find_all(attrs={'role': True}):
-        role = element.get('role')
-        if role not in valid_roles:
+    def visit(self, element, document, issues):
+        attrs = element.attrs
+        role = attrs.get('role')
+        
+        if role is not None and role not in self.valid_roles:
             issues.append(AccessibilityIssue(
                 code='aria-invalid-role',
                 message=f'Invalid ARIA role: "{role}"',
-                element=str(element)[:100] + ('...' if len(str(element)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='4.1.2',
-                remediation=f'Use a valid ARIA role from the list of allowed values'
+                remediation='Use a valid ARIA role from the list of allowed values'
+            ))
+        
+        # Check for aria-hidden="true" on focusable elements
+        if attrs.get('aria-hidden') == 'true' and (element.name in self.focusable_tags or 'tabindex' in attrs):
+            issues.append(AccessibilityIssue(
+                code='aria-hidden-focusable',
+                message='aria-hidden="true" used on a focusable element',
+                element=_element_snippet(element),
+                severity='error',
+                wcag_criterion='4.1.2',
+                remediation='Remove aria-hidden from focusable elements or make them non-focusable'
             ))
-    
-    # Check for aria-hidden="true" on focusable elements
-    focusable_selectors = ['a', 'button', 'input', 'select', 'textarea', '[tabindex]']
-    for selector in focusable_selectors:
-        for element in soup.select(selector):
-            if element.get('aria-hidden') == 'true':
-                issues.append(AccessibilityIssue(
-                    code='aria-hidden-focusable',
-                    message='aria-hidden="true" used on a focusable element',
-                    element=str(element)[:100] + ('...' if len(str(element)) > 100 else ''),
-                    severity='error',
-                    wcag_criterion='4.1.2',
-                    remediation='Remove aria-hidden from focusable elements or make them non-focusable'
-                ))
-    
-    # Check for required ARIA attributes
-    elements_with_role = soup.find_all(attrs={'role': True})
-    for element in elements_with_role:
-        role = element.get('role')
         
         # Elements with role="checkbox" or role="radio" should have aria-checked
-        if role in ['checkbox', 'radio', 'switch'] and 'aria-checked' not in element.attrs:
+        if role in ('checkbox', 'radio', 'switch') and 'aria-checked' not in attrs:
             issues.append(AccessibilityIssue(
                 code='aria-missing-state',
                 message=f'Element with role="{role}" is missing aria-checked attribute',
-                element=str(element)[:100] + ('...' if len(str(element)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='4.1.2',
                 remediation=f'Add aria-checked attribute to the {role} element'
             ))
         
         # Elements with role="combobox" should have aria-expanded
-        if role == 'combobox' and 'aria-expanded' not in element.attrs:
+        if role == 'combobox' and 'aria-expanded' not in attrs:
             issues.append(AccessibilityIssue(
                 code='aria-missing-state',
                 message='Element with role="combobox" is missing aria-expanded attribute',
-                element=str(element)[:100] + ('...' if len(str(element)) > 100 else ''),
+                element=_element_snippet(element),
                 severity='error',
                 wcag_criterion='4.1.2',
                 remediation='Add aria-expanded attribute to the combobox element'
             ))
+
+ALT_TEXT_RULE = AltTextRule()
+FORM_LABEL_RULE = FormLabelRule()
+HEADING_HIERARCHY_RULE = HeadingHierarchyRule()
+LINK_TEXT_RULE = LinkTextRule()
+ARIA_ATTRIBUTES_RULE = AriaAttributesRule()
+
+DEFAULT_RULES: List[AccessibilityRule] = [
+    ALT_TEXT_RULE,
+    FORM_LABEL_RULE,
+    HEADING_HIERARCHY_RULE,
+    LINK_TEXT_RULE,
+    ARIA_ATTRIBUTES_RULE,
+]
+
+def run_rules(document: AccessibilityDocument, rules: List[AccessibilityRule],
+              timings: Optional[Dict[str, float]] = None) -> List[AccessibilityIssue]:
+    """Run rules as visitors in one pass over a parsed document.
+    
+    Args:
+        document: Parsed document
+        rules: Rules to run
+        timings: If given, receives each rule's run time in seconds by rule name
+    
+    Returns:
+        List of accessibility issues, grouped by rule in ``rules`` order
+    """
+    issues_by_rule: Dict[str, List[AccessibilityIssue]] = {rule.name: [] for rule in rules}
+    elapsed: Dict[str, float] = {rule.name: 0.0 for rule in rules}
     
-    return issues
+    # Dispatch tables: tag name -> rules, and rules selected by attribute
+    rules_by_tag: Dict[str, List[AccessibilityRule]] = {}
+    for rule in rules:
+        for tag in rule.tags:
+            rules_by_tag.setdefault(tag, []).append(rule)
+    attribute_rules = [rule for rule in rules if rule.attributes]
+    
+    clock = time.perf_counter
+    for element in document.elements:
+        targets = rules_by_tag.get(element.name, ())
+        if attribute_rules:
+            attrs = element.attrs
+            extra = [rule for rule in attribute_rules
+                     if rule not in targets and not rule.attributes.isdisjoint(attrs)]
+            if extra:
+                targets = list(targets) + extra
+        for rule in targets:
+            start = clock()
+            rule.visit(element, document, issues_by_rule[rule.name])
+            elapsed[rule.name] += clock() - start
+    
+    for rule in rules:
+        start = clock()
+        rule.finish(document, issues_by_rule[rule.name])
+        elapsed[rule.name] += clock() - start
+    
+    if timings is not None:
+        timings.update(elapsed)
+    return [issue for rule in rules for issue in issues_by_rule[rule.name]]
+
+def _run_rule(rule: AccessibilityRule, html: Union[str, AccessibilityDocument]) -> List[AccessibilityIssue]:
+    document = html if isinstance(html, AccessibilityDocument) else AccessibilityDocument(html)
+    return run_rules(document, [rule])
+
+# ===== Accessibility Checkers =====
+
+def check_alt_text(html: Union[str, AccessibilityDocument]) -> List[AccessibilityIssue]:
+    """Check for missing alt text on images.
+    
+    Args:
+        html: HTML content or an already parsed document
+    
+    Returns:
+        List of accessibility issues
+    """
+    return _run_rule(ALT_TEXT_RULE, html)
+
+def check_form_labels(html: Union[str, AccessibilityDocument]) -> List[AccessibilityIssue]:
+    """Check for form inputs without associated labels.
+    
+    Args:
+        html: HTML content or an already parsed document
+    
+    Returns:
+        List of accessibility issues
+    """
+    return _run_rule(FORM_LABEL_RULE, html)
+
+def check_heading_hierarchy(html: Union[str, AccessibilityDocument]) -> List[AccessibilityIssue]:
+    """Check for proper heading hierarchy.
+    
+    Args:
+        html: HTML content or an already parsed document
+    
+    Returns:
+        List of accessibility issues
+    """
+    return _run_rule(HEADING_HIERARCHY_RULE, html)
+
+def check_link_text(html: Union[str, AccessibilityDocument]) -> List[AccessibilityIssue]:
+    """Check for meaningful link text.
+    
+    Args:
+        html: HTML content or an already parsed document
+    
+    Returns:
+        List of accessibility issues
+    """
+    return _run_rule(LINK_TEXT_RULE, html)
+
+def check_aria_attributes(html: Union[str, AccessibilityDocument]) -> List[AccessibilityIssue]:
+    """Check for proper ARIA attribute usage.
+    
+    Args:
+        html: HTML content or an already parsed document
+    
+    Returns:
+        List of accessibility issues
+    """
+    return _run_rule(ARIA_ATTRIBUTES_RULE, html)
 
 # ===== Accessibility Checker =====
 
@@ -515,33 +634,45 @@ class AccessibilityChecker:
     def __init__(self, config: Optional[AccessibilityConfig] = None):
         """Initialize accessibility checker."""
         self.config = config or AccessibilityConfig()
+        self._timing_lock = threading.Lock()
+        self._timing_totals: Dict[str, List[float]] = {}  # name -> [runs, seconds]
     
     def check_html(self, html: str) -> List[AccessibilityIssue]:
         """Check HTML content for accessibility issues.
         
         Args:
             html: HTML content to check
-            
+        
         Returns:
             List of accessibility issues
         """
-        issues = []
-        
-        # Run enabled checks
-        if self.config.check_alt_text:
-            issues.extend(check_alt_text(html))
+        issues, _ = self.check_html_timed(html)
+        return issues
+    
+    def check_html_timed(self, html: Union[str, AccessibilityDocument]) -> Tuple[List[AccessibilityIssue], Dict[str, float]]:
+        """Check HTML content and time each step.
         
-        if self.config.check_form_labels:
-            issues.extend(check_form_labels(html))
+        The HTML is parsed once; every enabled rule then runs as a visitor over
+        the shared document.
         
-        if self.config.check_heading_hierarchy:
-            issues.extend(check_heading_hierarchy(html))
+        Args:
+            html: HTML content or an already parsed document
         
-        if self.config.check_link_text:
-            issues.extend(check_link_text(html))
+        Returns:
+            Tuple of (issues, seconds spent parsing ('parse') and in each rule)
+        """
+        timings: Dict[str, float] = {}
+        if isinstance(html, AccessibilityDocument):
+            document = html
+        else:
+            start = time.perf_counter()
+            document = AccessibilityDocument(html, self.config.html_parser)
+            timings['parse'] = time.perf_counter() - start
         
-        if self.config.check_aria_attributes:
-            issues.extend(check_aria_attributes(html))
+        # Run enabled checks
+        rules = [rule for rule in DEFAULT_RULES if getattr(self.config, rule.config_flag, True)]
+        issues = run_rules(document, rules, timings)
+        self._record_timings(timings)
         
         # Filter issues based on WCAG level
         if self.config.wcag_level in ['A', 'AA', 'AAA']:
@@ -565,7 +696,30 @@ class AccessibilityChecker:
             
             issues = filtered_issues
         
-        return issues
+        return issues, timings
+    
+    def _record_timings(self, timings: Dict[str, float]) -> None:
+        with self._timing_lock:
+            for name, seconds in timings.items():
+                totals = self._timing_totals.setdefault(name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+    
+    def timing_stats(self) -> Dict[str, Dict[str, float]]:
+        """Cumulative time spent parsing and in each rule.
+        
+        Returns:
+            Step name -> runs, total_ms and avg_ms
+        """
+        with self._timing_lock:
+            return {
+                name: {
+                    'runs': runs,
+                    'total_ms': round(seconds * 1000, 3),
+                    'avg_ms': round(seconds * 1000 / runs, 3) if runs else 0.0,
+                }
+                for name, (runs, seconds) in self._timing_totals.items()
+            }
     
     def generate_report(self, issues: List[AccessibilityIssue], url: Optional[str] = None) -> Dict[str, Any]:
         """Generate accessibility report.
@@ -635,11 +789,263 @@ class AccessibilityChecker:
         
         return report_path
 
+# ===== Accessibility Auditing =====
+
+def parse_route_sample_rates(text: str) -> List[Tuple[str, float]]:
+    """Parse ``pattern=rate`` pairs, e.g. ``/pricing*=1.0,/admin/*=0``.
+    
+    Args:
+        text: Comma-separated pairs; patterns are fnmatch globs on the request path
+    
+    Returns:
+        List of (pattern, rate) in the given order
+    """
+    rates = []
+    for pair in text.split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        pattern, _, rate = pair.rpartition('=')
+        try:
+            if not pattern.strip():
+                raise ValueError(pair)
+            rates.append((pattern.strip(), min(1.0, max(0.0, float(rate)))))
+        except ValueError:
+            logger.warning(f"Ignoring invalid accessibility sample rate: {pair}")
+    return rates
+
+class RollingAccessibilityReport:
+    """Aggregate of the most recent page audits.
+    
+    Keeps the last ``window`` audited pages and summarizes them on demand:
+    issue counts by code, severity and WCAG criterion, one example per issue
+    code, the pages with the most issues and average time per rule.
+    """
+    
+    def __init__(self, window: int = 500):
+        """Initialize the report.
+        
+        Args:
+            window: Number of most recent audits kept
+        """
+        self.audits: Deque[Dict[str, Any]] = deque(maxlen=window)
+        self.examples: Dict[str, Dict[str, Any]] = {}
+        self.started_at = datetime.utcnow().isoformat()
+    
+    def add(self, url: str, route: str, digest: str, issues: List[AccessibilityIssue],
+            timings: Dict[str, float]) -> None:
+        """Record one audited page."""
+        codes: Dict[str, int] = {}
+        severities: Dict[str, int] = {}
+        criteria: Dict[str, int] = {}
+        for issue in issues:
+            codes[issue.code] = codes.get(issue.code, 0) + 1
+            severities[issue.severity] = severities.get(issue.severity, 0) + 1
+            if issue.wcag_criterion:
+                criteria[issue.wcag_criterion] = criteria.get(issue.wcag_criterion, 0) + 1
+            if issue.code not in self.examples:
+                self.examples[issue.code] = dict(issue.to_dict(), url=url)
+        
+        self.audits.append({
+            'url': url,
+            'route': route,
+            'digest': digest,
+            'timestamp': datetime.utcnow().isoformat(),
+            'total_issues': len(issues),
+            'codes': codes,
+            'severities': severities,
+            'criteria': criteria,
+            'timings': timings,
+        })
+    
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the audits currently in the window."""
+        code_counts: Dict[str, int] = {}
+        severity_counts = {'error': 0, 'warning': 0, 'info': 0}
+        criterion_counts: Dict[str, int] = {}
+        timing_totals: Dict[str, float] = {}
+        for audit in self.audits:
+            for totals, counts in ((code_counts, audit['codes']),
+                                   (severity_counts, audit['severities']),
+                                   (criterion_counts, audit['criteria'])):
+                for key, count in counts.items():
+                    totals[key] = totals.get(key, 0) + count
+            for name, seconds in audit['timings'].items():
+                timing_totals[name] = timing_totals.get(name, 0.0) + seconds
+        
+        audited = len(self.audits)
+        worst = sorted(self.audits, key=lambda audit: audit['total_issues'], reverse=True)[:10]
+        return {
+            'pages_audited': audited,
+            'window_started_at': self.audits[0]['timestamp'] if audited else None,
+            'total_issues': sum(code_counts.values()),
+            'severity_counts': severity_counts,
+            'criterion_counts': criterion_counts,
+            'issue_counts': dict(sorted(code_counts.items(), key=lambda item: item[1], reverse=True)),
+            'examples': {code: self.examples[code] for code in code_counts if code in self.examples},
+            'worst_pages': [
+                {'url': audit['url'], 'route': audit['route'], 'total_issues': audit['total_issues']}
+                for audit in worst if audit['total_issues']
+            ],
+            'avg_timings_ms': {
+                name: round(seconds * 1000 / audited, 3) for name, seconds in timing_totals.items()
+            },
+        }
+
+class AccessibilityAuditor:
+    """Audits sampled HTML responses in background worker threads.
+    
+    The request path only decides whether to sample, hashes the body and
+    enqueues it; parsing and checking happen on a small worker pool. Pages
+    whose body hash was audited recently are skipped, and a full queue drops
+    the sample instead of slowing the response. Results are aggregated in a
+    ``RollingAccessibilityReport``, which can be written to a single file.
+    """
+    
+    def __init__(self, checker: AccessibilityChecker, config: Optional[AccessibilityConfig] = None):
+        """Initialize the auditor and start its workers.
+        
+        Args:
+            checker: Checker running the audits
+            config: Accessibility configuration (defaults to the checker's)
+        """
+        self.checker = checker
+        self.config = config or checker.config
+        self.report = RollingAccessibilityReport(self.config.audit_report_window)
+        self.stats = {'sampled': 0, 'audited': 0, 'duplicates': 0, 'dropped': 0, 'failed': 0}
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=self.config.audit_queue_size)
+        self._seen: 'OrderedDict[str, None]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_saved = time.monotonic()
+        self._workers = [
+            threading.Thread(target=self._run, name=f'accessibility-audit-{index}', daemon=True)
+            for index in range(max(1, self.config.audit_workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def sample_rate(self, path: str) -> float:
+        """Sampling rate for a request path: first matching route rule, else the default."""
+        for pattern, rate in self.config.route_sample_rates:
+            if fnmatch.fnmatchcase(path, pattern):
+                return rate
+        return self.config.sample_rate
+    
+    def should_sample(self, path: str) -> bool:
+        """Decide whether to audit a response for ``path``."""
+        rate = self.sample_rate(path)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+    
+    def submit(self, url: str, route: str, body: bytes, charset: str = 'utf-8') -> bool:
+        """Queue a response body for auditing.
+        
+        Args:
+            url: Request URL (for the report)
+            route: Request path
+            body: Raw HTML body
+            charset: Body encoding
+        
+        Returns:
+            True if the page was queued, False if it was a duplicate or the queue was full
+        """
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self._lock:
+            self.stats['sampled'] += 1
+            if digest in self._seen:
+                self._seen.move_to_end(digest)
+                self.stats['duplicates'] += 1
+                return False
+            self._seen[digest] = None
+            if len(self._seen) > self.config.audit_dedupe_size:
+                self._seen.popitem(last=False)
+        
+        try:
+            self._queue.put_nowait((url, route, digest, body, charset))
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+                # Forget the hash so the page can be sampled again later
+                self._seen.pop(digest, None)
+            return False
+        return True
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._audit(*item)
+            finally:
+                self._queue.task_done()
+    
+    def _audit(self, url: str, route: str, digest: str, body: bytes, charset: str) -> None:
+        try:
+            html = body.decode(charset or 'utf-8', errors='replace')
+            issues, timings = self.checker.check_html_timed(html)
+        except Exception as e:
+            logger.error(f"Error auditing accessibility of {url}: {str(e)}")
+            with self._lock:
+                self.stats['failed'] += 1
+            return
+        
+        with self._lock:
+            self.stats['audited'] += 1
+            self.report.add(url, route, digest, issues, timings)
+            save_due = (self.config.generate_reports
+                        and time.monotonic() - self._last_saved >= self.config.report_interval)
+            if save_due:
+                self._last_saved = time.monotonic()
+        if save_due:
+            self.save_report()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current rolling report with sampling counters."""
+        with self._lock:
+            summary = self.report.summary()
+            stats = dict(self.stats)
+        summary.update({
+            'generated_at': datetime.utcnow().isoformat(),
+            'report_started_at': self.report.started_at,
+            'wcag_level': self.config.wcag_level,
+            'sample_rate': self.config.sample_rate,
+            'sampling': stats,
+            'queue_depth': self._queue.qsize(),
+        })
+        return summary
+    
+    def save_report(self) -> Optional[str]:
+        """Write the rolling report, replacing the previous one.
+        
+        Returns:
+            Path to the report, or None if it could not be written
+        """
+        try:
+            return self.checker.save_report(self.snapshot(), ROLLING_REPORT_FILENAME)
+        except OSError as e:
+            logger.error(f"Error saving accessibility report: {str(e)}")
+            return None
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers after the queued audits and write a final report."""
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join(timeout=30)
+        if self.config.generate_reports and self.stats['audited']:
+            self.save_report()
+
 # ===== Flask Integration =====
 
 def init_accessibility(app, config: Optional[AccessibilityConfig] = None):
     """Initialize accessibility checking with Flask application.
     
+    HTML responses are sampled and audited in the background by an
+    ``AccessibilityAuditor`` (``app.extensions['accessibility_auditor']``),
+    so checks add no parse time to the response.
+    
     Args:
         app: Flask application
         config: Accessibility configuration
@@ -650,49 +1056,36 @@ def init_accessibility(app, config: Optional[AccessibilityConfig] = None):
     checker = AccessibilityChecker(config)
     app.extensions['accessibility'] = checker
     
-    # Add after_request handler to check HTML responses
+    if config.sample_rate <= 0 and not any(rate > 0 for _, rate in config.route_sample_rates):
+        logger.info("Accessibility auditing disabled (sample rate 0)")
+        return checker
+    
+    auditor = AccessibilityAuditor(checker, config)
+    app.extensions['accessibility_auditor'] = auditor
+    
+    # Add after_request handler to sample HTML responses
     @app.after_request
     def check_accessibility(response):
-        # Skip if not HTML
-        content_type = response.headers.get('Content-Type', '')
-        if 'text/html' not in content_type:
+        # Skip if not HTML, or streamed (reading it here would buffer the stream)
+        if response.mimetype != 'text/html' or response.is_streamed or response.direct_passthrough:
             return response
         
         # Skip if response is too large
-        if response.content_length and response.content_length > 1024 * 1024:  # 1MB
-            logger.warning("Skipping accessibility check for large response")
+        if response.content_length and response.content_length > config.max_audit_bytes:
             return response
         
         try:
-            # Check HTML content
-            html = response.get_data(as_text=True)
-            issues = checker.check_html(html)
-            
-            # Store issues in Flask g object for access in templates
-            g.accessibility_issues = issues
-            
-            # Generate report if configured
-            if config.generate_reports and issues:
-                report = checker.generate_report(issues, request.url)
-                checker.save_report(report)
-                
-                # Log issues
-                logger.info(f"Accessibility check found {len(issues)} issues for {request.url}")
-                for severity in ['error', 'warning']:
-                    severity_issues = [i for i in issues if i.severity == severity]
-                    if severity_issues:
-                        logger.warning(f"Accessibility {severity}s ({len(severity_issues)}):")
-                        for issue in severity_issues[:5]:  # Log first 5 issues
-                            logger.warning(f"- {issue.message}")
-                        if len(severity_issues) > 5:
-                            logger.warning(f"- ... and {len(severity_issues) - 5} more")
-        
+            if auditor.should_sample(request.path):
+                body = response.get_data()
+                if len(body) <= config.max_audit_bytes:
+                    auditor.submit(request.url, request.path, body,
+                                   response.mimetype_params.get('charset', 'utf-8'))
         except Exception as e:
-            logger.error(f"Error checking accessibility: {str(e)}")
+            logger.error(f"Error sampling response for accessibility audit: {str(e)}")
         
         return response
     
     return checker
 
 # Initialize with default configuration
-accessibility_checker = AccessibilityChecker()
\ No newline at end of file
+accessibility_checker = AccessibilityChecker()
@@ -6,22 +6,27 @@ This module provides:
 2. Event tracking
 3. Integration with analytics services (Google Analytics, Mixpanel, etc.)
 4. Privacy-compliant data collection
+5. Buffered, batched delivery to providers off the request path
 """
 
 import os
+import glob
 import json
 import time
 import uuid
 import hashlib
 import logging
+import threading
 import requests
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Union, Callable
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Deque, Optional, List, Tuple, Union, Callable
 from functools import wraps
 
 from flask import request, g, current_app, Response, jsonify
 
 from utils.logger import setup_logger
+from utils.event_store import get_event_store
 
 # Set up module logger
 logger = setup_logger('utils.analytics')
@@ -46,7 +51,19 @@ class AnalyticsConfig:
         
         # Internal analytics
         self.internal_enabled = self.config.get('internal_enabled', True)
-        self.internal_storage = self.config.get('internal_storage', 'memory')
+        self.internal_storage = self.config.get('internal_storage', 'columnar')  # 'columnar' (utils.event_store) or 'memory'
+        self.memory_max_events = int(self.config.get('memory_max_events', 1000))
+        
+        # Event pipeline (buffering and batched delivery to providers)
+        self.buffer_size = int(self.config.get('buffer_size', 10000))  # oldest events are dropped when full
+        self.batch_size = int(self.config.get('batch_size', 100))  # flush once this many events are buffered
+        self.flush_interval = float(self.config.get('flush_interval', 5.0))  # ... or after this many seconds
+        self.request_timeout = float(self.config.get('request_timeout', 10.0))
+        
+        # Spill batches that providers rejected to disk and resend them later
+        self.spill_enabled = self.config.get('spill_enabled', False)
+        self.spill_path = self.config.get('spill_path', './analytics_spill')
+        self.spill_max_bytes = int(self.config.get('spill_max_bytes', 50 * 1024 * 1024))  # per provider and process
         
         # Privacy settings
         self.anonymize_ip = self.config.get('anonymize_ip', True)
@@ -67,7 +84,17 @@ class AnalyticsConfig:
             
             # Internal analytics
             'internal_enabled': os.environ.get('ANALYTICS_INTERNAL_ENABLED', 'true').lower() == 'true',
-            'internal_storage': os.environ.get('ANALYTICS_INTERNAL_STORAGE', 'memory'),
+            'internal_storage': os.environ.get('ANALYTICS_INTERNAL_STORAGE', 'columnar'),
+            'memory_max_events': int(os.environ.get('ANALYTICS_MEMORY_MAX_EVENTS', 1000)),
+            
+            # Event pipeline
+            'buffer_size': int(os.environ.get('ANALYTICS_BUFFER_SIZE', 10000)),
+            'batch_size': int(os.environ.get('ANALYTICS_BATCH_SIZE', 100)),
+            'flush_interval': float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 5.0)),
+            'request_timeout': float(os.environ.get('ANALYTICS_REQUEST_TIMEOUT', 10.0)),
+            'spill_enabled': os.environ.get('ANALYTICS_SPILL_ENABLED', 'false').lower() == 'true',
+            'spill_path': os.environ.get('ANALYTICS_SPILL_PATH', './analytics_spill'),
+            'spill_max_bytes': int(os.environ.get('ANALYTICS_SPILL_MAX_BYTES', 50 * 1024 * 1024)),
             
             # Privacy settings
             'anonymize_ip': os.environ.get('ANALYTICS_ANONYMIZE_IP', 'true').lower() == 'true',
@@ -165,6 +192,19 @@ class AnalyticsEvent:
             'anonymous_id': self.anonymous_id,
             'timestamp': self.timestamp.isoformat()
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AnalyticsEvent':
+        """Rebuild an event from ``to_dict`` output, keeping its id and timestamp."""
+        event = cls(
+            event_name=data['event'],
+            properties=data.get('properties'),
+            user_id=data.get('user_id'),
+            anonymous_id=data.get('anonymous_id'),
+            timestamp=datetime.fromisoformat(data['timestamp'])
+        )
+        event.event_id = data.get('event_id', event.event_id)
+        return event
 
 class AnalyticsManager:
     """Analytics tracking and management."""
@@ -173,9 +213,11 @@ class AnalyticsManager:
         """Initialize analytics manager."""
         self.config = config or AnalyticsConfig()
         self.providers = []
+        self.pipeline: Optional[AnalyticsPipeline] = None
+        self.event_store = None  # utils.event_store.EventStore, opened on first columnar event
         
-        # Initialize in-memory storage
-        self._events = []
+        # Initialize in-memory storage (most recent events only)
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=self.config.memory_max_events)
         
         if app is not None:
             self.init_app(app)
@@ -189,14 +231,22 @@ class AnalyticsManager:
         if self.config.ga_enabled and self.config.ga_measurement_id:
             self.providers.append(GoogleAnalyticsProvider(
                 self.config.ga_measurement_id,
-                self.config.ga_api_secret
+                self.config.ga_api_secret,
+                timeout=self.config.request_timeout
             ))
         
         if self.config.mixpanel_enabled and self.config.mixpanel_token:
             self.providers.append(MixpanelProvider(
-                self.config.mixpanel_token
+                self.config.mixpanel_token,
+                timeout=self.config.request_timeout
             ))
         
+        # Providers are called from the pipeline's flusher thread, never the request
+        if self.providers and self.pipeline is None:
+            self.pipeline = AnalyticsPipeline(self.providers, self.config)
+        
+        self._events = deque(self._events, maxlen=self.config.memory_max_events)
+        
         # Register extension with app
         app.extensions['analytics'] = self
         
@@ -223,7 +273,10 @@ class AnalyticsManager:
             # Calculate request duration
             duration_ms = 0
             if hasattr(g, 'request_start_time'):
-                duration_ms = int((time.time() - g.request_start_time) * 1000)
+                duration_ms = round((time.time() - g.request_start_time) * 1000, 2)
+            
+            # Route template (e.g. /api/items/<id>) so stored paths stay low-cardinality
+            route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
             
             # Track page view or API request
             if request.path.startswith('/api/'):
@@ -232,6 +285,7 @@ class AnalyticsManager:
                     'api_request',
                     {
                         'path': request.path,
+                        'route': route,
                         'method': request.method,
                         'status_code': response.status_code,
                         'duration_ms': duration_ms
@@ -243,7 +297,9 @@ class AnalyticsManager:
                     'page_view',
                     {
                         'page_path': request.path,
+                        'route': route,
                         'referrer': request.referrer,
+                        'status_code': response.status_code,
                         'duration_ms': duration_ms
                     }
                 )
@@ -278,12 +334,9 @@ class AnalyticsManager:
         if self.config.internal_enabled:
             self._store_event(event)
         
-        # Send to providers
-        for provider in self.providers:
-            try:
-                provider.track(event)
-            except Exception as e:
-                logger.error(f"Error tracking event: {str(e)}")
+        # Queue for providers
+        if self.pipeline is not None:
+            self.pipeline.track(event)
         
         return event.event_id
     
@@ -299,30 +352,62 @@ class AnalyticsManager:
             user_info = get_user_id()
             anonymous_id = user_info.get('anonymous_id')
         
-        # Send to providers
-        for provider in self.providers:
-            try:
-                provider.identify(user_id, traits or {}, anonymous_id)
-            except Exception as e:
-                logger.error(f"Error identifying user: {str(e)}")
+        # Queue for providers
+        if self.pipeline is not None:
+            self.pipeline.identify(user_id, traits or {}, anonymous_id)
+    
+    def flush(self) -> None:
+        """Send buffered events to providers now."""
+        if self.pipeline is not None:
+            self.pipeline.flush()
+    
+    def shutdown(self) -> None:
+        """Flush buffered events, stop the pipeline and write stored events."""
+        if self.pipeline is not None:
+            self.pipeline.shutdown()
+        if self.event_store is not None:
+            self.event_store.close()
+    
+    def pipeline_stats(self) -> Dict[str, int]:
+        """Pipeline counters (sent, failed, dropped, spilled, replayed) and buffer depth."""
+        if self.pipeline is None:
+            return {}
+        return dict(self.pipeline.stats, buffered=self.pipeline.buffered())
     
     def _store_event(self, event: AnalyticsEvent) -> None:
         """Store event internally."""
         storage_type = self.config.internal_storage
         
-        if storage_type == 'memory':
-            # Store in memory
+        if storage_type == 'columnar':
+            # Append to the local event store, queryable through /api/analytics/requests
+            if self.event_store is None:
+                self.event_store = get_event_store()
+            properties = event.properties
+            self.event_store.append(
+                event.event_name,
+                properties.get('route') or properties.get('path') or properties.get('page_path') or '',
+                method=properties.get('method', ''),
+                status=properties.get('status_code', 0),
+                duration_ms=properties.get('duration_ms', 0.0),
+                timestamp=event.timestamp.replace(tzinfo=timezone.utc).timestamp()
+            )
+        
+        elif storage_type == 'memory':
+            # Store in memory; the deque discards the oldest events past memory_max_events
             self._events.append(event.to_dict())
-            
-            # Limit memory storage size
-            max_events = 1000
-            if len(self._events) > max_events:
-                self._events = self._events[-max_events:]
 
 # ===== Analytics Providers =====
 
 class AnalyticsProvider:
-    """Base class for analytics providers."""
+    """Base class for analytics providers.
+    
+    Providers deliver events in batches from the pipeline's flusher thread.
+    ``track_batch`` and ``identify_batch`` return the items that were not
+    accepted, so the pipeline can spill just those; the defaults send one item
+    at a time through ``track``/``identify`` for providers without a batch API.
+    """
+    
+    name = 'provider'
     
     def track(self, event: AnalyticsEvent) -> None:
         """Track an event."""
@@ -332,129 +417,389 @@ class AnalyticsProvider:
                 anonymous_id: Optional[str] = None) -> None:
         """Identify a user."""
         raise NotImplementedError
+    
+    def track_batch(self, events: List[AnalyticsEvent]) -> List[AnalyticsEvent]:
+        """Track a batch of events; returns the events that were not accepted."""
+        for event in events:
+            self.track(event)
+        return []
+    
+    def identify_batch(self, identities: List[Tuple[str, Dict[str, Any], Optional[str]]]
+                       ) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+        """Identify a batch of (user_id, traits, anonymous_id); returns the identities that were not accepted."""
+        for user_id, traits, anonymous_id in identities:
+            self.identify(user_id, traits, anonymous_id)
+        return []
 
-class GoogleAnalyticsProvider(AnalyticsProvider):
+class HTTPAnalyticsProvider(AnalyticsProvider):
+    """Provider posting batches over a pooled HTTP session."""
+    
+    def __init__(self, timeout: float = 10.0):
+        """Initialize the HTTP session."""
+        self.session = requests.Session()
+        self.timeout = timeout
+    
+    def _post(self, url: str, label: str, **kwargs) -> bool:
+        """POST a request; returns True on a 2xx response."""
+        try:
+            response = self.session.post(url, timeout=self.timeout, **kwargs)
+            if not 200 <= response.status_code < 300:
+                logger.warning(f"{label} error: {response.status_code}")
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"{label} request failed: {str(e)}")
+            return False
+    
+    def track(self, event: AnalyticsEvent) -> None:
+        """Track an event immediately."""
+        self.track_batch([event])
+    
+    def identify(self, user_id: str, traits: Dict[str, Any],
+                anonymous_id: Optional[str] = None) -> None:
+        """Identify a user immediately."""
+        self.identify_batch([(user_id, traits, anonymous_id)])
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class GoogleAnalyticsProvider(HTTPAnalyticsProvider):
     """Google Analytics 4 provider."""
     
-    def __init__(self, measurement_id: str, api_secret: Optional[str] = None):
+    name = 'google_analytics'
+    
+    # Measurement Protocol limit on events per request
+    max_batch_events = 25
+    
+    def __init__(self, measurement_id: str, api_secret: Optional[str] = None, timeout: float = 10.0):
         """Initialize Google Analytics provider."""
+        super().__init__(timeout)
         self.measurement_id = measurement_id
         self.api_secret = api_secret
         self.base_url = 'https://www.google-analytics.com/mp/collect'
     
-    def track(self, event: AnalyticsEvent) -> None:
-        """Track an event with Google Analytics."""
-        # Build GA4 event
-        ga_event = {
-            'name': event.event_name,
-            'params': {}
-        }
-        
-        # Add event parameters
-        for key, value in event.properties.items():
-            # GA4 has restrictions on parameter names and values
-            if isinstance(value, (str, int, float, bool)):
-                ga_event['params'][key] = value
-        
-        # Build request payload
-        payload = {
-            'client_id': event.anonymous_id or str(uuid.uuid4()),
-            'events': [ga_event]
-        }
-        
-        # Add user ID if available
-        if event.user_id:
-            payload['user_id'] = event.user_id
+    def track_batch(self, events: List[AnalyticsEvent]) -> List[AnalyticsEvent]:
+        """Track events with Google Analytics, one request per client and 25 events."""
+        # Group events by client, since a request carries one client_id/user_id
+        by_client: Dict[Tuple[str, Optional[str]], List[Tuple[AnalyticsEvent, Dict[str, Any]]]] = {}
+        for event in events:
+            # Build GA4 event
+            ga_event = {
+                'name': event.event_name,
+                'params': {}
+            }
+            
+            # Add event parameters
+            for key, value in event.properties.items():
+                # GA4 has restrictions on parameter names and values
+                if isinstance(value, (str, int, float, bool)):
+                    ga_event['params'][key] = value
+            
+            client = (event.anonymous_id or str(uuid.uuid4()), event.user_id)
+            by_client.setdefault(client, []).append((event, ga_event))
         
         # Build URL with API secret if available
         url = f"{self.base_url}?measurement_id={self.measurement_id}"
         if self.api_secret:
             url += f"&api_secret={self.api_secret}"
         
-        # Send request
-        try:
-            response = requests.post(url, json=payload)
-            if response.status_code != 204 and response.status_code != 200:
-                logger.warning(f"Google Analytics error: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Google Analytics request failed: {str(e)}")
+        # Send requests; only the chunks GA did not accept are returned
+        failed: List[AnalyticsEvent] = []
+        for (client_id, user_id), pairs in by_client.items():
+            for chunk in _chunks(pairs, self.max_batch_events):
+                payload = {
+                    'client_id': client_id,
+                    'events': [ga_event for _, ga_event in chunk]
+                }
+                # Add user ID if available
+                if user_id:
+                    payload['user_id'] = user_id
+                if not self._post(url, 'Google Analytics', json=payload):
+                    failed.extend(event for event, _ in chunk)
+        return failed
     
-    def identify(self, user_id: str, traits: Dict[str, Any],
-                anonymous_id: Optional[str] = None) -> None:
-        """Identify a user with Google Analytics."""
+    def identify_batch(self, identities: List[Tuple[str, Dict[str, Any], Optional[str]]]
+                       ) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+        """Identify users with Google Analytics."""
         # GA4 doesn't have a specific identify method
         # We'll send a user_data event instead
-        self.track(AnalyticsEvent(
-            event_name='user_data',
-            properties=traits,
-            user_id=user_id,
-            anonymous_id=anonymous_id
-        ))
+        events = [
+            AnalyticsEvent(
+                event_name='user_data',
+                properties=traits,
+                user_id=user_id,
+                anonymous_id=anonymous_id
+            )
+            for user_id, traits, anonymous_id in identities
+        ]
+        failed = {id(event) for event in self.track_batch(events)}
+        return [identity for identity, event in zip(identities, events) if id(event) in failed]
 
-class MixpanelProvider(AnalyticsProvider):
+class MixpanelProvider(HTTPAnalyticsProvider):
     """Mixpanel analytics provider."""
     
-    def __init__(self, token: str):
+    name = 'mixpanel'
+    
+    # Mixpanel limit on events (or profile updates) per request
+    max_batch_events = 50
+    
+    def __init__(self, token: str, timeout: float = 10.0):
         """Initialize Mixpanel provider."""
+        super().__init__(timeout)
         self.token = token
         self.base_url = 'https://api.mixpanel.com'
     
-    def track(self, event: AnalyticsEvent) -> None:
-        """Track an event with Mixpanel."""
-        # Build Mixpanel event
-        mp_event = {
-            'event': event.event_name,
-            'properties': {
-                'token': self.token,
-                'time': int(event.timestamp.timestamp()),
-                'distinct_id': event.user_id or event.anonymous_id or str(uuid.uuid4()),
-                '$insert_id': event.event_id
+    def track_batch(self, events: List[AnalyticsEvent]) -> List[AnalyticsEvent]:
+        """Track events with Mixpanel, up to 50 per request."""
+        mp_events = []
+        for event in events:
+            # Build Mixpanel event
+            mp_event = {
+                'event': event.event_name,
+                'properties': {
+                    'token': self.token,
+                    'time': int(event.timestamp.timestamp()),
+                    'distinct_id': event.user_id or event.anonymous_id or str(uuid.uuid4()),
+                    '$insert_id': event.event_id
+                }
             }
-        }
-        
-        # Add event properties
-        for key, value in event.properties.items():
-            mp_event['properties'][key] = value
+            
+            # Add event properties
+            for key, value in event.properties.items():
+                mp_event['properties'][key] = value
+            mp_events.append(mp_event)
         
-        # Send request
-        try:
-            response = requests.post(
+        # Send requests; only the chunks Mixpanel did not accept are returned
+        failed: List[AnalyticsEvent] = []
+        for start in range(0, len(mp_events), self.max_batch_events):
+            if not self._post(
                 f"{self.base_url}/track",
-                data=json.dumps([mp_event]),
+                'Mixpanel',
+                data=json.dumps(mp_events[start:start + self.max_batch_events]),
                 headers={'Content-Type': 'application/json'}
-            )
-            if response.status_code != 200:
-                logger.warning(f"Mixpanel error: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Mixpanel request failed: {str(e)}")
+            ):
+                failed.extend(events[start:start + self.max_batch_events])
+        return failed
     
-    def identify(self, user_id: str, traits: Dict[str, Any],
-                anonymous_id: Optional[str] = None) -> None:
-        """Identify a user with Mixpanel."""
-        # Build Mixpanel profile update
-        profile = {
-            '$token': self.token,
-            '$distinct_id': user_id,
-            '$set': traits
-        }
+    def identify_batch(self, identities: List[Tuple[str, Dict[str, Any], Optional[str]]]
+                       ) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+        """Identify users with Mixpanel, up to 50 profile updates per request."""
+        # Build Mixpanel profile updates
+        profiles = [
+            {
+                '$token': self.token,
+                '$distinct_id': user_id,
+                '$set': traits
+            }
+            for user_id, traits, _ in identities
+        ]
         
-        # Send request
-        try:
-            response = requests.post(
+        # Send requests; only the chunks Mixpanel did not accept are returned
+        failed: List[Tuple[str, Dict[str, Any], Optional[str]]] = []
+        for start in range(0, len(profiles), self.max_batch_events):
+            if not self._post(
                 f"{self.base_url}/engage",
-                data=json.dumps([profile]),
+                'Mixpanel',
+                data=json.dumps(profiles[start:start + self.max_batch_events]),
                 headers={'Content-Type': 'application/json'}
-            )
-            if response.status_code != 200:
-                logger.warning(f"Mixpanel error: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Mixpanel request failed: {str(e)}")
+            ):
+                failed.extend(identities[start:start + self.max_batch_events])
+        return failed
+
+# ===== Event Pipeline =====
+
+class AnalyticsPipeline:
+    """Buffers events and delivers them to providers in batches.
+    
+    ``track``/``identify`` only append to a bounded ring buffer (a
+    ``deque``; appends and pops are atomic, so the request path takes no
+    lock). When the buffer is full the oldest entry is dropped. A flusher
+    thread drains the buffer once ``batch_size`` entries are waiting or every
+    ``flush_interval`` seconds and sends provider-native batch requests.
+    
+    With spilling enabled, the items a provider did not accept are appended
+    to a JSON lines file per provider and resent after that provider's next
+    successful flush; chunks it accepted are never spilled, so they are not
+    sent twice. A spill file that cannot be read is moved aside with a
+    ``.corrupt`` suffix.
+    """
+    
+    def __init__(self, providers: List[AnalyticsProvider], config: AnalyticsConfig):
+        """Initialize the pipeline and start its flusher thread.
+        
+        Args:
+            providers: Providers receiving the batches
+            config: Analytics configuration
+        """
+        self.providers = providers
+        self.config = config
+        self._buffer: Deque[Tuple[str, Any]] = deque(maxlen=config.buffer_size)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        
+        # Counters; 'dropped' is updated without a lock and may undercount under contention
+        self.stats = {'dropped': 0, 'sent': 0, 'failed': 0, 'spilled': 0, 'replayed': 0}
+        
+        # Providers with spilled batches waiting to be resent (including ones left by earlier runs)
+        self._pending_spill = {
+            provider.name for provider in providers
+            if config.spill_enabled and glob.glob(self._spill_pattern(provider))
+        }
+        
+        self._thread = threading.Thread(target=self._run, name='analytics-flusher', daemon=True)
+        self._thread.start()
+    
+    def track(self, event: AnalyticsEvent) -> None:
+        """Queue an event for all providers."""
+        self._enqueue(('track', event))
+    
+    def identify(self, user_id: str, traits: Dict[str, Any], anonymous_id: Optional[str] = None) -> None:
+        """Queue a user identification for all providers."""
+        self._enqueue(('identify', (user_id, traits, anonymous_id)))
+    
+    def _enqueue(self, item: Tuple[str, Any]) -> None:
+        buffer = self._buffer
+        if len(buffer) >= buffer.maxlen:
+            self.stats['dropped'] += 1
+        buffer.append(item)  # drops the oldest entry when full
+        if len(buffer) >= self.config.batch_size and not self._wake.is_set():
+            self._wake.set()
+    
+    def buffered(self) -> int:
+        """Number of entries waiting to be sent."""
+        return len(self._buffer)
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.config.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing analytics events: {str(e)}")
+    
+    def flush(self) -> None:
+        """Send everything currently buffered."""
+        with self._flush_lock:
+            while self._buffer:
+                events: List[AnalyticsEvent] = []
+                identities: List[Tuple[str, Dict[str, Any], Optional[str]]] = []
+                # Drain one bounded batch at a time so memory stays flat
+                while self._buffer and len(events) + len(identities) < self.config.batch_size:
+                    try:
+                        kind, payload = self._buffer.popleft()
+                    except IndexError:
+                        break
+                    if kind == 'track':
+                        events.append(payload)
+                    else:
+                        identities.append(payload)
+                for provider in self.providers:
+                    self._deliver(provider, events, identities)
+    
+    def _deliver(self, provider: AnalyticsProvider, events: List[AnalyticsEvent],
+                 identities: List[Tuple[str, Dict[str, Any], Optional[str]]], replay: bool = False) -> bool:
+        """Send one batch to a provider, spilling the parts it did not accept."""
+        records: List[Dict[str, Any]] = []
+        for items, send, to_record in (
+            (events, provider.track_batch, lambda event: {'kind': 'track', 'event': event.to_dict()}),
+            (identities, provider.identify_batch, lambda identity: {
+                'kind': 'identify', 'user_id': identity[0], 'traits': identity[1], 'anonymous_id': identity[2]
+            }),
+        ):
+            if not items:
+                continue
+            try:
+                failed = send(items)
+            except Exception as e:
+                logger.error(f"Error sending analytics batch to {provider.name}: {str(e)}")
+                failed = items
+            self.stats['replayed' if replay else 'sent'] += len(items) - len(failed)
+            if failed:
+                self.stats['failed'] += len(failed)
+                records.extend(to_record(item) for item in failed)
+        
+        if records:
+            if self.config.spill_enabled:
+                self._spill(provider, records)
+            return False
+        if provider.name in self._pending_spill and not replay:
+            self._replay(provider)
+        return True
+    
+    # --- Spill to disk ---
+    
+    def _spill_pattern(self, provider: AnalyticsProvider) -> str:
+        return os.path.join(self.config.spill_path, f"{provider.name}-*.jsonl")
+    
+    def _spill(self, provider: AnalyticsProvider, records: List[Dict[str, Any]]) -> None:
+        """Append records to this process's spill file for a provider."""
+        path = os.path.join(self.config.spill_path, f"{provider.name}-{os.getpid()}.jsonl")
+        try:
+            os.makedirs(self.config.spill_path, exist_ok=True)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size >= self.config.spill_max_bytes:
+                logger.warning(f"Analytics spill file for {provider.name} is full; dropping {len(records)} entries")
+                return
+            with open(path, 'a') as f:
+                f.write(''.join(json.dumps(record) + '\n' for record in records))
+            self.stats['spilled'] += len(records)
+            self._pending_spill.add(provider.name)
+        except OSError as e:
+            logger.error(f"Error spilling analytics events for {provider.name}: {str(e)}")
+    
+    def _replay(self, provider: AnalyticsProvider) -> None:
+        """Resend spilled records for a provider once it accepts batches again."""
+        self._pending_spill.discard(provider.name)
+        for path in sorted(glob.glob(self._spill_pattern(provider))):
+            # Claim the file by renaming it, so concurrent processes never replay it twice
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                with open(claimed) as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading analytics spill file {path}: {str(e)}")
+                # Keep it for inspection without retrying it on every flush
+                try:
+                    os.replace(claimed, f"{path}.{os.getpid()}.corrupt")
+                except OSError:
+                    pass
+                continue
+            os.remove(claimed)
+            
+            logger.info(f"Replaying {len(records)} spilled analytics entries for {provider.name}")
+            batch_size = self.config.batch_size
+            for start in range(0, len(records), batch_size):
+                batch = records[start:start + batch_size]
+                events = [AnalyticsEvent.from_dict(r['event']) for r in batch if r.get('kind') == 'track']
+                identities = [
+                    (r['user_id'], r.get('traits') or {}, r.get('anonymous_id'))
+                    for r in batch if r.get('kind') == 'identify'
+                ]
+                # A failed batch is spilled again by _deliver; keep the rest for the next attempt
+                if not self._deliver(provider, events, identities, replay=True):
+                    if records[start + batch_size:]:
+                        self._spill(provider, records[start + batch_size:])
+                    return
+    
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and send what is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        self.flush()
 
 # Initialize analytics manager
 analytics = AnalyticsManager()
 
 def init_analytics(app):
     """Initialize analytics with Flask application."""
-    config = AnalyticsConfig.from_env()
+    analytics.config = AnalyticsConfig.from_env()
     analytics.init_app(app)
     return analytics
@@ -1,22 +1,63 @@
+import asyncio
 import functools
+import inspect
+import threading
 import time
 import json
 import hashlib
-from typing import Any, Dict, Optional, Callable, TypeVar, cast
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Optional, Callable, Tuple, TypeVar, cast
 
 T = TypeVar('T')
 
+# Sentinel distinguishing "not cached" from a cached ``None`` result
+_MISSING = object()
+
+
 class SimpleCache:
-    """Simple in-memory cache with expiration."""
+    """Bounded in-memory LRU cache with per-entry expiration.
 
-    def __init__(self, default_timeout: int = 300):
+    Entries are evicted least-recently-used first once ``max_size`` is
+    reached, and a background sweeper thread drops expired entries so
+    keys that are never read again do not pile up.
+    """
+
+    def __init__(self, default_timeout: int = 300, max_size: int = 1024,
+                 sweep_interval: float = 60.0):
         """Initialize cache.
 
         Args:
             default_timeout: Default cache expiration in seconds
+            max_size: Maximum number of entries kept before LRU eviction
+            sweep_interval: Seconds between background expiry sweeps (0 disables)
         """
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
         self.default_timeout = default_timeout
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def _lookup(self, key: str) -> Any:
+        """Return the cached value for ``key`` or ``_MISSING``, updating counters."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return _MISSING
+
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._cache[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return _MISSING
+
+            self._cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
 
     def get(self, key: str) -> Optional[Any]:
         """Get item from cache if it exists and hasn't expired.
@@ -27,18 +68,11 @@ class SimpleCache:
         Returns:
             Cached value or None if not found/expired
         """
-        if key not in self._cache:
-            return None
-
-        entry = self._cache[key]
-        if entry['expires_at'] < time.time():
-            del self._cache[key]
-            return None
-
-        return entry['value']
+        value = self._lookup(key)
+        return None if value is _MISSING else value
 
     def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
-        """Set cache item with expiration.
+        """Set cache item with expiration, evicting the LRU entry if full.
 
         Args:
             key: Cache key
@@ -46,10 +80,13 @@ class SimpleCache:
             timeout: Expiration time in seconds (uses default if None)
         """
         expires_at = time.time() + (timeout if timeout is not None else self.default_timeout)
-        self._cache[key] = {
-            'value': value,
-            'expires_at': expires_at
-        }
+        with self._lock:
+            self._cache[key] = (value, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self._stats['evictions'] += 1
+        self._ensure_sweeper()
 
     def delete(self, key: str) -> None:
         """Delete item from cache.
@@ -57,52 +94,170 @@ class SimpleCache:
         Args:
             key: Cache key to delete
         """
-        if key in self._cache:
-            del self._cache[key]
+        with self._lock:
+            self._cache.pop(key, None)
 
     def clear(self) -> None:
         """Clear all cache entries."""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+
+    def sweep_expired(self) -> int:
+        """Remove every expired entry.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._cache.items() if expires_at < now]
+            for key in expired:
+                del self._cache[key]
+            self._stats['expirations'] += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters.
+
+        Returns:
+            Hit/miss/eviction/expiration counts plus current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._cache)
+            stats['max_size'] = self.max_size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _ensure_sweeper(self) -> None:
+        """Start the background expiry sweeper on first use."""
+        if self.sweep_interval <= 0 or (self._sweeper is not None and self._sweeper.is_alive()):
+            return
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop_sweeper.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop_sweeper.wait(self.sweep_interval):
+            self.sweep_expired()
+
+    def close(self) -> None:
+        """Stop the background sweeper."""
+        self._stop_sweeper.set()
+
 
 # Global cache instance
 cache = SimpleCache()
 
-def cached(timeout: Optional[int] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+# In-flight coroutine results, keyed by (event loop id, cache key), so that
+# concurrent callers share a single computation
+_inflight: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+
+
+def _make_key(func: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+    """Create cache key from function name and arguments."""
+    key_parts = [func.__module__, func.__qualname__]
+
+    for arg in args:
+        key_parts.append(str(arg))
+
+    for k, v in sorted(kwargs.items()):
+        key_parts.append(f"{k}:{v}")
+
+    key_string = ":".join(key_parts)
+    return hashlib.md5(key_string.encode()).hexdigest()
+
+
+def _cancelling(task: Optional["asyncio.Task[Any]"]) -> bool:
+    """Whether cancellation of ``task`` was requested (``Task.cancelling`` is Python 3.11+)."""
+    cancelling = getattr(task, 'cancelling', None)
+    return bool(cancelling and cancelling())
+
+
+def cached(timeout: Optional[int] = None, cache_instance: Optional[SimpleCache] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
     """Decorator to cache function results.
 
+    Works with both regular functions and ``async def`` coroutines. For
+    coroutines the awaited result is cached, and concurrent calls with the
+    same arguments await one shared in-flight computation. If the caller
+    running it is cancelled, one of the waiting callers runs it again.
+
     Args:
         timeout: Cache expiration time in seconds
+        cache_instance: Cache to store results in (uses the global cache if None)
 
     Returns:
         Decorated function with caching
     """
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
-        @functools.wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> T:
-            # Create cache key from function name and arguments
-            key_parts = [func.__name__]
+        store = cache_instance if cache_instance is not None else cache
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                cache_key = _make_key(func, args, kwargs)
+                loop = asyncio.get_running_loop()
+                inflight_key = (id(loop), cache_key)
 
-            # Add args and kwargs to key
-            for arg in args:
-                key_parts.append(str(arg))
+                while True:
+                    # Check cache
+                    cached_value = store._lookup(cache_key)
+                    if cached_value is not _MISSING:
+                        return cached_value
 
-            for k, v in sorted(kwargs.items()):
-                key_parts.append(f"{k}:{v}")
+                    # Join an identical call that is already running
+                    pending = _inflight.get(inflight_key)
+                    if pending is None:
+                        break
+                    try:
+                        return await asyncio.shield(pending)
+                    except asyncio.CancelledError:
+                        # The caller running the shared call was cancelled, not this one:
+                        # the first waiter to get here runs it again, the others join it
+                        if pending.cancelled() and not _cancelling(asyncio.current_task()):
+                            continue
+                        raise
 
-            key_string = ":".join(key_parts)
-            cache_key = hashlib.md5(key_string.encode()).hexdigest()
+                future: "asyncio.Future[Any]" = loop.create_future()
+                _inflight[inflight_key] = future
+                try:
+                    result = await cast(Callable[..., Awaitable[Any]], func)(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    future.set_exception(e)
+                    # Mark retrieved so a failure nobody else awaited is not logged
+                    future.exception()
+                    raise
+                else:
+                    store.set(cache_key, result, timeout)
+                    future.set_result(result)
+                    return result
+                finally:
+                    _inflight.pop(inflight_key, None)
+
+            return cast(Callable[..., T], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            cache_key = _make_key(func, args, kwargs)
 
             # Check cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
+            cached_value = store._lookup(cache_key)
+            if cached_value is not _MISSING:
                 return cast(T, cached_value)
 
             # Call original function
             result = func(*args, **kwargs)
 
             # Cache result
-            cache.set(cache_key, result, timeout)
+            store.set(cache_key, result, timeout)
             return result
 
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
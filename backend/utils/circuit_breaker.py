@@ -0,0 +1,340 @@
+"""
+Circuit breakers and retry budgets for outbound agent calls.
+
+A ``CircuitBreaker`` tracks the error rate of one endpoint over a rolling
+window. When the rate crosses a threshold it opens and fails calls fast; after
+a cool-down it lets a single probe through (half-open) and closes again if
+that probe succeeds.
+
+A ``RetryBudget`` caps retries to a fraction of recent traffic so that a
+degraded dependency is not hit by every caller retrying in lockstep.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.logger import setup_logger
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:  # Metrics are optional; snapshots are still available
+    Counter = Gauge = None
+
+logger = setup_logger('utils.circuit_breaker')
+
+# --- Configuration ---
+BREAKER_WINDOW_SECONDS = int(os.getenv("A2A_BREAKER_WINDOW_SECONDS", 30))
+BREAKER_MIN_REQUESTS = int(os.getenv("A2A_BREAKER_MIN_REQUESTS", 10))
+BREAKER_FAILURE_RATE = float(os.getenv("A2A_BREAKER_FAILURE_RATE", 0.5))
+BREAKER_OPEN_SECONDS = float(os.getenv("A2A_BREAKER_OPEN_SECONDS", 30))
+RETRY_BUDGET_RATIO = float(os.getenv("A2A_RETRY_BUDGET_RATIO", 0.2))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("A2A_RETRY_BUDGET_MIN_PER_SECOND", 1))
+RETRY_BUDGET_WINDOW_SECONDS = int(os.getenv("A2A_RETRY_BUDGET_WINDOW_SECONDS", 10))
+
+if Gauge is not None:
+    _STATE_GAUGE = Gauge(
+        'a2a_circuit_breaker_state',
+        'Circuit breaker state per endpoint (0=closed, 1=half_open, 2=open)',
+        ['endpoint']
+    )
+    _REJECTED_COUNTER = Counter(
+        'a2a_circuit_breaker_rejected_total',
+        'Calls rejected because the circuit was open',
+        ['endpoint']
+    )
+    _RETRY_DENIED_COUNTER = Counter(
+        'a2a_retry_budget_denied_total',
+        'Retries skipped because the retry budget was exhausted'
+    )
+else:
+    _STATE_GAUGE = _REJECTED_COUNTER = _RETRY_DENIED_COUNTER = None
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class _RollingCounter:
+    """Per-second success/failure buckets over a fixed window."""
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self._buckets: Deque[List[int]] = deque()  # [second, successes, failures]
+
+    def _bucket(self, now: float) -> List[int]:
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._expire(now)
+        return self._buckets[-1]
+
+    def _expire(self, now: float) -> None:
+        horizon = int(now) - self.window_seconds
+        while self._buckets and self._buckets[0][0] <= horizon:
+            self._buckets.popleft()
+
+    def add(self, success: bool, now: float) -> None:
+        bucket = self._bucket(now)
+        bucket[1 if success else 2] += 1
+
+    def totals(self, now: float) -> tuple:
+        self._expire(now)
+        successes = sum(b[1] for b in self._buckets)
+        failures = sum(b[2] for b in self._buckets)
+        return successes, failures
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+
+class CircuitBreaker:
+    """Rolling error-rate circuit breaker with a half-open probe state."""
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: int = BREAKER_WINDOW_SECONDS,
+        min_requests: int = BREAKER_MIN_REQUESTS,
+        failure_rate_threshold: float = BREAKER_FAILURE_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+    ):
+        """Initialize the breaker.
+
+        Args:
+            name: Endpoint name used in logs and metrics
+            window_seconds: Length of the rolling error-rate window
+            min_requests: Calls needed in the window before the breaker may trip
+            failure_rate_threshold: Failure ratio (0-1) that opens the circuit
+            open_seconds: Cool-down before a half-open probe is allowed
+        """
+        self.name = name
+        self.min_requests = min_requests
+        self.failure_rate_threshold = failure_rate_threshold
+        self.open_seconds = open_seconds
+        self._counter = _RollingCounter(window_seconds)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+        self._publish_state()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> CircuitState:
+        if self._state == CircuitState.OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def _transition(self, new_state: CircuitState) -> None:
+        if new_state == self._state:
+            return
+        logger.warning(f"Circuit breaker '{self.name}' {self._state.value} -> {new_state.value}")
+        self._state = new_state
+        self._probe_in_flight = False
+        if new_state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif new_state == CircuitState.CLOSED:
+            self._counter.reset()
+        self._publish_state()
+
+    def _publish_state(self) -> None:
+        if _STATE_GAUGE is not None:
+            _STATE_GAUGE.labels(endpoint=self.name).set(_STATE_VALUES[self._state])
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed.
+
+        In the half-open state only one probe call is let through at a time;
+        a probe that never reports back is replaced after ``open_seconds``.
+
+        Returns:
+            True if the call should be attempted
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.HALF_OPEN and (
+                not self._probe_in_flight or now - self._probe_started_at >= self.open_seconds
+            ):
+                self._probe_in_flight = True
+                self._probe_started_at = now
+                return True
+
+        if _REJECTED_COUNTER is not None:
+            _REJECTED_COUNTER.labels(endpoint=self.name).inc()
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == CircuitState.HALF_OPEN:
+                self._transition(CircuitState.CLOSED)
+            else:
+                self._counter.add(True, now)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit if the error rate is too high."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CircuitState.HALF_OPEN:
+                self._transition(CircuitState.OPEN)
+                return
+            self._counter.add(False, now)
+            if state == CircuitState.CLOSED:
+                successes, failures = self._counter.totals(now)
+                total = successes + failures
+                if total >= self.min_requests and failures / total >= self.failure_rate_threshold:
+                    self._transition(CircuitState.OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the breaker's current state and window counts."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            successes, failures = self._counter.totals(now)
+            total = successes + failures
+            return {
+                'endpoint': self.name,
+                'state': state.value,
+                'successes': successes,
+                'failures': failures,
+                'failure_rate': failures / total if total else 0.0,
+                'retry_after_seconds': max(0.0, self.open_seconds - (now - self._opened_at)) if state == CircuitState.OPEN else 0.0,
+            }
+
+
+class RetryBudget:
+    """Limits retries to a fraction of requests over a sliding window.
+
+    A retry is allowed while retries in the window stay below
+    ``max(min_per_second * window, ratio * requests)``.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+        window_seconds: int = RETRY_BUDGET_WINDOW_SECONDS,
+    ):
+        """Initialize the budget.
+
+        Args:
+            ratio: Maximum retries as a fraction of requests
+            min_per_second: Retries always allowed regardless of traffic volume
+            window_seconds: Length of the sliding window
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self._denied = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] <= horizon:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """Record a first attempt, which adds to the retry allowance."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._requests.append(now)
+
+    def try_acquire_retry(self) -> bool:
+        """Reserve one retry if the budget allows it.
+
+        Returns:
+            True if the caller may retry
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            allowance = max(self.min_per_second * self.window_seconds, self.ratio * len(self._requests))
+            if len(self._retries) < allowance:
+                self._retries.append(now)
+                return True
+            self._denied += 1
+
+        if _RETRY_DENIED_COUNTER is not None:
+            _RETRY_DENIED_COUNTER.inc()
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get window counts for the budget."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                'requests': len(self._requests),
+                'retries': len(self._retries),
+                'denied_total': self._denied,
+                'ratio': self.ratio,
+            }
+
+
+def full_jitter_backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter.
+
+    Args:
+        attempt: Zero-based retry number
+        base_delay: Delay ceiling for the first retry in seconds
+        max_delay: Upper bound on the delay ceiling in seconds
+
+    Returns:
+        Seconds to sleep, drawn uniformly from [0, min(max_delay, base_delay * 2**attempt)]
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_retry_budget: Optional[RetryBudget] = None
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide breaker for an endpoint, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def get_retry_budget() -> RetryBudget:
+    """Get the process-wide retry budget shared by all A2A calls."""
+    global _retry_budget
+    with _breakers_lock:
+        if _retry_budget is None:
+            _retry_budget = RetryBudget()
+        return _retry_budget
+
+
+def breaker_metrics() -> Dict[str, Any]:
+    """Snapshot of every breaker and the shared retry budget."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {
+        'circuit_breakers': [breaker.snapshot() for breaker in breakers],
+        'retry_budget': get_retry_budget().snapshot(),
+    }
@@ -57,6 +57,40 @@ def has_active_subscription(user_profile_or_entity):
 
     return False
 
+# --- Authentication Helper ---
+def authenticate_request():
+    """
+    Decodes the Bearer JWT on the current request.
+    Returns (user_id, None) on success or (None, error_response) on failure.
+    """
+    logger = current_app.logger
+
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        logger.warning("Authorization header missing or invalid.")
+        return None, (jsonify({'error': 'Authorization required', 'status': 401}), 401)
+
+    token = auth_header.split(' ')[1]
+    secret_key = os.environ.get('JWT_SECRET_KEY', Config.JWT_SECRET_KEY)
+
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=['HS256'])
+        user_id = payload['user_id']
+        logger.info(f"Authenticated user_id: {user_id}")
+        return user_id, None
+    except jwt.ExpiredSignatureError:
+        logger.warning("JWT token expired.")
+        return None, (jsonify({'error': 'Token expired', 'status': 401}), 401)
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Invalid JWT token: {e}")
+        return None, (jsonify({'error': 'Invalid token', 'status': 401}), 401)
+    except KeyError:
+        logger.warning("user_id missing from JWT payload.")
+        return None, (jsonify({'error': 'Invalid token payload', 'status': 401}), 401)
+    except Exception as e:
+        logger.error(f"Error decoding JWT token: {e}", exc_info=True)
+        return None, (jsonify({'error': 'Authentication error', 'status': 500}), 500)
+
 # --- Access Control Decorator ---
 def require_subscription_or_local(f):
     """
@@ -0,0 +1,170 @@
+"""
+In-memory, content-addressed manifests for deployments.
+
+Generated sites arrive as a ``{path: content}`` dict. ``DeployManifest``
+encodes and SHA1-hashes each file once, straight from the strings, with no
+temp directory. Vercel and Netlify both address uploaded files by SHA1 and
+report which digests they do not have yet, so a deploy only has to upload
+those (``upload_missing``). Files with identical content are uploaded once.
+
+For zip-based deploys ``iter_zip`` streams the archive in chunks as it is
+compressed, so it never exists as a whole on disk or in memory.
+"""
+
+import io
+import os
+import asyncio
+import hashlib
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.deploy_manifest')
+
+# --- Configuration ---
+DEPLOY_UPLOAD_CONCURRENCY = int(os.getenv("DEPLOY_UPLOAD_CONCURRENCY", 8))
+DEPLOY_ZIP_CHUNK_BYTES = int(os.getenv("DEPLOY_ZIP_CHUNK_BYTES", 64 * 1024))
+
+
+@dataclass(frozen=True)
+class ManifestFile:
+    """One deployable file."""
+    path: str
+    content: bytes
+    sha: str
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+
+class _ZipChunkSink(io.RawIOBase):
+    """Unseekable write target that collects zip output until it is drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class DeployManifest:
+    """Files of one deployment, indexed by path and by SHA1 digest."""
+
+    def __init__(self, files: Dict[str, str], defaults: Optional[Dict[str, str]] = None):
+        """Build the manifest.
+
+        Args:
+            files: Relative path -> text content (leading '/' is ignored)
+            defaults: Files added only if ``files`` does not contain that path
+        """
+        self.files: Dict[str, ManifestFile] = {}
+        for path, content in files.items():
+            self._add(path, content)
+        for path, content in (defaults or {}).items():
+            if path.lstrip('/') not in self.files:
+                self._add(path, content)
+        self.by_sha: Dict[str, ManifestFile] = {}
+        for manifest_file in self.files.values():
+            self.by_sha.setdefault(manifest_file.sha, manifest_file)
+
+    def _add(self, path: str, content: str) -> None:
+        path = path.lstrip('/')
+        data = content.encode('utf-8')
+        self.files[path] = ManifestFile(path=path, content=data, sha=hashlib.sha1(data).hexdigest())
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(manifest_file.size for manifest_file in self.files.values())
+
+    def vercel_files(self) -> List[Dict[str, Any]]:
+        """File list for the Vercel deployments API."""
+        return [{"file": f.path, "sha": f.sha, "size": f.size} for f in self.files.values()]
+
+    def netlify_files(self) -> Dict[str, str]:
+        """Path -> digest map for the Netlify file digest deploy API."""
+        return {f"/{f.path}": f.sha for f in self.files.values()}
+
+    async def upload_missing(
+        self,
+        missing: Iterable[str],
+        upload: Callable[[ManifestFile], Awaitable[bool]],
+        concurrency: int = DEPLOY_UPLOAD_CONCURRENCY,
+        every_path: bool = False,
+    ) -> List[str]:
+        """Upload each missing digest once, at most ``concurrency`` at a time.
+
+        Args:
+            missing: Digests the platform asked for
+            upload: Coroutine uploading one file, returning success
+            concurrency: Concurrent uploads
+            every_path: Upload each path with a missing digest, not one file per digest
+                (for APIs that store uploads by path)
+
+        Returns:
+            Paths whose upload failed (or whose digest is not in the manifest)
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        digests = list(dict.fromkeys(missing))
+        unknown = [sha for sha in digests if sha not in self.by_sha]
+
+        async def _upload(manifest_file: ManifestFile) -> bool:
+            async with semaphore:
+                return await upload(manifest_file)
+
+        if every_path:
+            wanted = set(digests)
+            to_upload = [f for f in self.files.values() if f.sha in wanted]
+        else:
+            to_upload = [self.by_sha[sha] for sha in digests if sha in self.by_sha]
+        results = await asyncio.gather(*[_upload(f) for f in to_upload])
+        failed = [f.path for f, ok in zip(to_upload, results) if not ok]
+        logger.info(
+            f"Uploaded {len(to_upload) - len(failed)}/{len(to_upload)} missing file(s); "
+            f"{len(self.by_sha) - len({f.sha for f in to_upload})} digest(s) already on the platform."
+        )
+        return failed + unknown
+
+    async def iter_zip(self, chunk_size: int = DEPLOY_ZIP_CHUNK_BYTES) -> AsyncIterator[bytes]:
+        """Yield a deflated zip of all files, chunk by chunk, as it is produced.
+
+        Usable directly as an httpx request body (sent chunked). Only the
+        compressed output of one ``chunk_size`` slice is buffered at a time.
+        """
+        sink = _ZipChunkSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for manifest_file in self.files.values():
+                with archive.open(manifest_file.path, 'w') as entry:
+                    for start in range(0, manifest_file.size, chunk_size):
+                        entry.write(manifest_file.content[start:start + chunk_size])
+                        data = sink.drain()
+                        if data:
+                            yield data
+                        # Let other tasks run between slices of large files
+                        await asyncio.sleep(0)
+                data = sink.drain()
+                if data:
+                    yield data
+        # Central directory
+        data = sink.drain()
+        if data:
+            yield data
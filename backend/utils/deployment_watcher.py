@@ -0,0 +1,505 @@
+"""
+Status tracking for every in-flight deployment.
+
+Agents used to poll each deployment from their own coroutine at a fixed
+interval. ``DeploymentWatcher`` runs a single poll loop (on its own thread
+and event loop) for all of them:
+
+- a deployment is polled soon after it starts and then less often, from
+  ``DEPLOY_WATCH_MIN_INTERVAL_SECONDS`` growing by ``DEPLOY_WATCH_BACKOFF``
+  up to ``DEPLOY_WATCH_MAX_INTERVAL_SECONDS``,
+- watching a deployment that is already watched shares the existing entry,
+  and due Netlify deploys of one site are fetched with a single list call,
+- provider webhooks (``POST /api/deployment/webhooks/<provider>``, enabled by
+  ``VERCEL_WEBHOOK_SECRET`` / ``NETLIFY_WEBHOOK_SECRET``) trigger an
+  immediate status check. With webhooks configured, polling only runs every
+  ``DEPLOY_WATCH_WEBHOOK_POLL_SECONDS`` as a safety net,
+- every state change is pushed to clients as a ``deployment_status``
+  SocketIO event.
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import asyncio
+import binascii
+import hashlib
+import threading
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.deployment_watcher')
+
+# --- Configuration ---
+DEPLOY_WATCH_MIN_INTERVAL_SECONDS = float(os.getenv("DEPLOY_WATCH_MIN_INTERVAL_SECONDS", 2))
+DEPLOY_WATCH_MAX_INTERVAL_SECONDS = float(os.getenv("DEPLOY_WATCH_MAX_INTERVAL_SECONDS", 20))
+DEPLOY_WATCH_BACKOFF = float(os.getenv("DEPLOY_WATCH_BACKOFF", 1.5))
+DEPLOY_WATCH_WEBHOOK_POLL_SECONDS = float(os.getenv("DEPLOY_WATCH_WEBHOOK_POLL_SECONDS", 60))
+DEPLOY_WATCH_TIMEOUT_SECONDS = float(os.getenv("DEPLOY_WATCH_TIMEOUT_SECONDS", 600))
+
+# Status data a source reports for one deployment, or the exception raised fetching it
+FetchResult = Any
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class StatusSource:
+    """Abstract base class for a deployment provider's status API and webhooks."""
+
+    provider = ""
+
+    def __init__(self, webhook_secret: Optional[str] = None):
+        self.webhook_secret = webhook_secret
+
+    def client(self) -> httpx.AsyncClient:
+        """Create the HTTP client used from the watcher loop."""
+        raise NotImplementedError
+
+    async def fetch(self, client: httpx.AsyncClient, watches: List["Watch"]) -> Dict[str, FetchResult]:
+        """Fetch the status of several deployments.
+
+        Returns:
+            Deployment ID -> status data (or the exception raised fetching it)
+        """
+        raise NotImplementedError
+
+    def classify(self, data: Dict[str, Any]) -> Tuple[str, str, Any]:
+        """Map status data to (provider state, phase, failure details); phase is 'pending', 'ready' or 'failed'."""
+        raise NotImplementedError
+
+    def deployment_url(self, data: Dict[str, Any]) -> Optional[str]:
+        return None
+
+    def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        """Check the webhook signature against ``webhook_secret``."""
+        raise NotImplementedError
+
+    def webhook_deployment_id(self, payload: Dict[str, Any]) -> Optional[str]:
+        raise NotImplementedError
+
+
+class VercelStatusSource(StatusSource):
+    """Vercel deployments API (``readyState``) and ``x-vercel-signature`` webhooks."""
+
+    provider = "vercel"
+    API_BASE_URL = "https://api.vercel.com"
+
+    def __init__(self, api_token: Optional[str] = None, team_id: Optional[str] = None, webhook_secret: Optional[str] = None):
+        super().__init__(webhook_secret if webhook_secret is not None else os.getenv("VERCEL_WEBHOOK_SECRET"))
+        self.api_token = api_token or os.getenv("VERCEL_API_TOKEN")
+        self.team_id = team_id or os.getenv("VERCEL_TEAM_ID")
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.API_BASE_URL,
+            headers={"Authorization": f"Bearer {self.api_token}"},
+            timeout=30.0,
+        )
+
+    async def fetch(self, client: httpx.AsyncClient, watches: List["Watch"]) -> Dict[str, FetchResult]:
+        params = {"teamId": self.team_id} if self.team_id else None
+
+        async def _one(deployment_id: str) -> Dict[str, Any]:
+            response = await client.get(f"/v13/deployments/{deployment_id}", params=params)
+            response.raise_for_status()
+            return response.json()
+
+        ids = [watch.deployment_id for watch in watches]
+        results = await asyncio.gather(*[_one(deployment_id) for deployment_id in ids], return_exceptions=True)
+        return dict(zip(ids, results))
+
+    def classify(self, data: Dict[str, Any]) -> Tuple[str, str, Any]:
+        state = data.get("readyState") or "UNKNOWN"
+        if state == "READY":
+            return state, "ready", None
+        if state in ("ERROR", "CANCELED"):
+            return state, "failed", data.get("error")
+        return state, "pending", None
+
+    def deployment_url(self, data: Dict[str, Any]) -> Optional[str]:
+        url = data.get("url")
+        return f"https://{url}" if url and not url.startswith("http") else url
+
+    def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        signature = headers.get("x-vercel-signature", "")
+        expected = hmac.new(self.webhook_secret.encode("utf-8"), body, hashlib.sha1).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def webhook_deployment_id(self, payload: Dict[str, Any]) -> Optional[str]:
+        event = payload.get("payload") or {}
+        return (event.get("deployment") or {}).get("id") or event.get("deploymentId")
+
+
+class NetlifyStatusSource(StatusSource):
+    """Netlify deploys API (``state``) and JWS-signed deploy notifications."""
+
+    provider = "netlify"
+    API_BASE_URL = "https://api.netlify.com/api/v1"
+
+    def __init__(self, auth_token: Optional[str] = None, webhook_secret: Optional[str] = None):
+        super().__init__(webhook_secret if webhook_secret is not None else os.getenv("NETLIFY_WEBHOOK_SECRET"))
+        self.auth_token = auth_token or os.getenv("NETLIFY_AUTH_TOKEN")
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.API_BASE_URL,
+            headers={"Authorization": f"Bearer {self.auth_token}"},
+            timeout=30.0,
+        )
+
+    async def fetch(self, client: httpx.AsyncClient, watches: List["Watch"]) -> Dict[str, FetchResult]:
+        by_site: Dict[str, List[str]] = {}
+        for watch in watches:
+            by_site.setdefault(watch.meta.get("site_id", ""), []).append(watch.deployment_id)
+
+        async def _one(site_id: str, deployment_id: str) -> Dict[str, Any]:
+            url = f"/sites/{site_id}/deploys/{deployment_id}" if site_id else f"/deploys/{deployment_id}"
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.json()
+
+        async def _site(site_id: str, deployment_ids: List[str]) -> Dict[str, FetchResult]:
+            results: Dict[str, FetchResult] = {}
+            if site_id and len(deployment_ids) > 1:
+                # One list call covers every in-flight deploy of the site (they are the most recent ones)
+                try:
+                    response = await client.get(f"/sites/{site_id}/deploys", params={"per_page": min(100, len(deployment_ids) + 10)})
+                    response.raise_for_status()
+                    wanted = set(deployment_ids)
+                    results = {deploy["id"]: deploy for deploy in response.json() if deploy.get("id") in wanted}
+                except (httpx.HTTPError, ValueError) as e:
+                    logger.debug(f"Listing Netlify deploys for site {site_id} failed: {e}")
+            missing = [deployment_id for deployment_id in deployment_ids if deployment_id not in results]
+            fetched = await asyncio.gather(*[_one(site_id, deployment_id) for deployment_id in missing], return_exceptions=True)
+            results.update(zip(missing, fetched))
+            return results
+
+        merged: Dict[str, FetchResult] = {}
+        for results in await asyncio.gather(*[_site(site_id, ids) for site_id, ids in by_site.items()]):
+            merged.update(results)
+        return merged
+
+    def classify(self, data: Dict[str, Any]) -> Tuple[str, str, Any]:
+        state = data.get("state") or "unknown"
+        if state == "ready":
+            return state, "ready", None
+        if state in ("error", "failed"):
+            return state, "failed", data.get("error_message", "Unknown error")
+        return state, "pending", None
+
+    def deployment_url(self, data: Dict[str, Any]) -> Optional[str]:
+        return data.get("ssl_url") or data.get("deploy_ssl_url") or data.get("url")
+
+    def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        # X-Webhook-Signature is an HS256 JWS whose claims carry the body's SHA256
+        token = headers.get("x-webhook-signature", "")
+        try:
+            header, claims, signature = token.split(".")
+            expected = hmac.new(self.webhook_secret.encode("utf-8"), f"{header}.{claims}".encode("ascii"), hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, _b64url_decode(signature)):
+                return False
+            claims_data = json.loads(_b64url_decode(claims))
+        except (ValueError, binascii.Error, UnicodeEncodeError):
+            return False
+        return claims_data.get("iss") == "netlify" and claims_data.get("sha256") == hashlib.sha256(body).hexdigest()
+
+    def webhook_deployment_id(self, payload: Dict[str, Any]) -> Optional[str]:
+        return payload.get("id")
+
+
+@dataclass
+class Watch:
+    """One watched deployment and everyone waiting for its outcome."""
+    provider: str
+    deployment_id: str
+    meta: Dict[str, Any]
+    deadline: float
+    interval: float
+    next_poll: float
+    waiters: List[concurrent.futures.Future] = field(default_factory=list)
+    state: Optional[str] = None
+    last_error: Optional[str] = None
+    polls: int = 0
+
+
+class DeploymentWatcher:
+    """Single poll loop for all in-flight deployments, with webhook wake-ups and SocketIO updates."""
+
+    def __init__(
+        self,
+        sources: Optional[List[StatusSource]] = None,
+        min_interval: float = DEPLOY_WATCH_MIN_INTERVAL_SECONDS,
+        max_interval: float = DEPLOY_WATCH_MAX_INTERVAL_SECONDS,
+        backoff: float = DEPLOY_WATCH_BACKOFF,
+        webhook_poll_interval: float = DEPLOY_WATCH_WEBHOOK_POLL_SECONDS,
+        timeout: float = DEPLOY_WATCH_TIMEOUT_SECONDS,
+        emit: Optional[Callable[..., Any]] = None,
+    ):
+        """Initialize watcher; its thread starts with the first watched deployment.
+
+        Args:
+            sources: Provider sources (Vercel and Netlify from the environment if None)
+            min_interval: Delay before the first poll, in seconds
+            max_interval: Longest delay between polls without webhooks
+            backoff: Factor the delay grows by after each poll
+            webhook_poll_interval: Delay between safety-net polls for providers with webhooks
+            timeout: Default time a deployment may take before it is reported as timed out
+            emit: SocketIO emit function (``socketio.emit``); see ``set_emit``
+        """
+        sources = sources if sources is not None else [VercelStatusSource(), NetlifyStatusSource()]
+        self.sources: Dict[str, StatusSource] = {source.provider: source for source in sources}
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.webhook_poll_interval = webhook_poll_interval
+        self.timeout = timeout
+        self.emit = emit
+        self._watches: Dict[Tuple[str, str], Watch] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+
+    def set_emit(self, emit: Optional[Callable[..., Any]]) -> None:
+        """Set the function state changes are pushed with (``socketio.emit``)."""
+        self.emit = emit
+
+    # --- Public API ---
+
+    async def watch(self, provider: str, deployment_id: str, timeout: Optional[float] = None, **meta: Any) -> Dict[str, Any]:
+        """Wait until a deployment is ready, has failed or timed out.
+
+        Args:
+            provider: 'vercel' or 'netlify'
+            deployment_id: Provider deployment ID
+            timeout: Seconds to wait (``timeout`` of the watcher if None)
+            **meta: Extra fields for status events (e.g. ``site_id`` for Netlify, ``invocation_id``)
+
+        Returns:
+            The provider's status data when ready, otherwise a dict with ``error``
+            ('deployment_failed' or 'timeout') and ``details``
+        """
+        return await asyncio.wrap_future(self.submit(provider, deployment_id, timeout=timeout, **meta))
+
+    def submit(self, provider: str, deployment_id: str, timeout: Optional[float] = None, **meta: Any) -> concurrent.futures.Future:
+        """Thread-safe variant of ``watch`` returning a ``concurrent.futures.Future``."""
+        if provider not in self.sources:
+            raise ValueError(f"No status source for provider '{provider}'.")
+        self._ensure_started()
+        waiter: concurrent.futures.Future = concurrent.futures.Future()
+        now = time.monotonic()
+        with self._lock:
+            watch = self._watches.get((provider, deployment_id))
+            if watch is None:
+                watch = Watch(
+                    provider=provider,
+                    deployment_id=deployment_id,
+                    meta=dict(meta),
+                    deadline=now + (timeout or self.timeout),
+                    interval=self.min_interval,
+                    next_poll=now + self.min_interval,
+                )
+                self._watches[(provider, deployment_id)] = watch
+                logger.info(f"Watching {provider} deployment {deployment_id} ({len(self._watches)} in flight).")
+            else:
+                watch.meta.update(meta)
+                watch.deadline = max(watch.deadline, now + (timeout or self.timeout))
+            watch.waiters.append(waiter)
+        self._wake()
+        return waiter
+
+    def notify(self, provider: str, deployment_id: str) -> bool:
+        """Check a deployment right away (called for provider webhooks).
+
+        Returns:
+            True if the deployment is being watched
+        """
+        with self._lock:
+            watch = self._watches.get((provider, deployment_id))
+            if watch is None:
+                return False
+            watch.next_poll = time.monotonic()
+        self._wake()
+        return True
+
+    def in_flight(self) -> List[Dict[str, Any]]:
+        """Snapshot of the watched deployments."""
+        with self._lock:
+            return [
+                {"provider": w.provider, "deployment_id": w.deployment_id, "state": w.state, "polls": w.polls}
+                for w in self._watches.values()
+            ]
+
+    def shutdown(self) -> None:
+        """Stop the watcher thread; pending waiters are cancelled."""
+        loop = self._loop
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            for watch in self._watches.values():
+                for waiter in watch.waiters:
+                    waiter.cancel()
+            self._watches.clear()
+        self._loop = self._thread = None
+        self._ready.clear()
+
+    # --- Loop ---
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._thread_main, name="deployment-watcher", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _thread_main(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        task = loop.create_task(self._run())
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+            loop.close()
+
+    def _wake(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _run(self) -> None:
+        clients: Dict[str, httpx.AsyncClient] = {}
+        try:
+            while True:
+                now = time.monotonic()
+                with self._lock:
+                    self._drop_abandoned()
+                    due = [w for w in self._watches.values() if w.next_poll <= now or w.deadline <= now]
+                    upcoming = [min(w.next_poll, w.deadline) for w in self._watches.values() if w not in due]
+                if due:
+                    await self._poll(due, clients)
+                    continue
+                self._wakeup.clear()
+                delay = max(0.0, min(upcoming) - time.monotonic()) if upcoming else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for client in clients.values():
+                await client.aclose()
+
+    def _drop_abandoned(self) -> None:
+        """Forget deployments nobody waits for anymore (all waiters cancelled)."""
+        for key, watch in list(self._watches.items()):
+            watch.waiters = [waiter for waiter in watch.waiters if not waiter.done()]
+            if not watch.waiters:
+                del self._watches[key]
+
+    async def _poll(self, due: List[Watch], clients: Dict[str, httpx.AsyncClient]) -> None:
+        by_provider: Dict[str, List[Watch]] = {}
+        for watch in due:
+            by_provider.setdefault(watch.provider, []).append(watch)
+
+        async def _provider(provider: str, watches: List[Watch]) -> None:
+            source = self.sources[provider]
+            if provider not in clients:
+                clients[provider] = source.client()
+            try:
+                results = await source.fetch(clients[provider], watches)
+            except Exception as e:
+                results = {watch.deployment_id: e for watch in watches}
+            for watch in watches:
+                self._apply(source, watch, results.get(watch.deployment_id))
+
+        await asyncio.gather(*[_provider(provider, watches) for provider, watches in by_provider.items()])
+
+    def _apply(self, source: StatusSource, watch: Watch, result: FetchResult) -> None:
+        now = time.monotonic()
+        watch.polls += 1
+        if isinstance(result, dict):
+            state, phase, details = source.classify(result)
+            if state != watch.state:
+                watch.state = state
+                self._publish(source, watch, phase, result)
+            if phase == "ready":
+                self._resolve(watch, result)
+                return
+            if phase == "failed":
+                self._resolve(watch, {"error": "deployment_failed", "state": state, "details": details})
+                return
+            watch.last_error = None
+        else:
+            watch.last_error = str(result) if result is not None else "no status returned"
+            logger.warning(f"Status check for {watch.provider} deployment {watch.deployment_id} failed: {watch.last_error}")
+
+        if now >= watch.deadline:
+            elapsed = f"Deployment {watch.deployment_id} did not become ready in time (last state: {watch.state})."
+            details = f"{elapsed} Last error: {watch.last_error}" if watch.last_error else elapsed
+            self._publish(source, watch, "timeout", {})
+            self._resolve(watch, {"error": "timeout", "details": details})
+            return
+
+        watch.interval = min(self.max_interval, watch.interval * self.backoff)
+        interval = max(watch.interval, self.webhook_poll_interval) if source.webhook_secret else watch.interval
+        watch.next_poll = min(now + interval, watch.deadline)
+
+    def _resolve(self, watch: Watch, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._watches.pop((watch.provider, watch.deployment_id), None)
+            waiters, watch.waiters = watch.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+        logger.info(
+            f"{watch.provider} deployment {watch.deployment_id} finished after {watch.polls} status check(s): "
+            f"{result.get('error') or watch.state}"
+        )
+
+    def _publish(self, source: StatusSource, watch: Watch, phase: str, data: Dict[str, Any]) -> None:
+        if self.emit is None:
+            return
+        payload = {
+            **watch.meta,
+            "provider": watch.provider,
+            "deployment_id": watch.deployment_id,
+            "state": watch.state,
+            "phase": phase,
+            "url": source.deployment_url(data) if data else None,
+        }
+        try:
+            self.emit('deployment_status', payload)
+        except Exception as e:
+            logger.warning(f"Failed to emit deployment status for {watch.deployment_id}: {e}")
+
+
+_watcher: Optional[DeploymentWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def get_deployment_watcher() -> DeploymentWatcher:
+    """Get the process-wide deployment watcher."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = DeploymentWatcher()
+        return _watcher
@@ -0,0 +1,650 @@
+"""
+Embedded columnar store for request analytics.
+
+``AnalyticsManager`` records tracked requests here when
+``ANALYTICS_INTERNAL_STORAGE`` is ``columnar``. Rows are buffered in memory
+and a background thread appends them to one segment file per UTC hour and
+process (``events-YYYYMMDDHH-<pid>.seg``). A segment is a sequence of
+blocks, each holding typed column arrays (timestamp, event, method, path,
+status, duration); event, method and path are dictionary-encoded per
+segment.
+
+Next to every segment, ``events-YYYYMMDDHH-<pid>.rollup.json`` keeps
+pre-aggregated minute and hour counts, 5xx errors and latency histograms
+per (event, method, path, status class). Queries only read rollups, so
+dashboards over millions of events never scan raw rows. A rollup that is
+missing or behind its segment (e.g. after a crash) is rebuilt from it.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import array
+import struct
+import fnmatch
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.event_store')
+
+# --- Configuration ---
+ANALYTICS_STORE_PATH = os.getenv("ANALYTICS_STORE_PATH", "./analytics_store")
+ANALYTICS_STORE_FLUSH_ROWS = int(os.getenv("ANALYTICS_STORE_FLUSH_ROWS", 2000))
+ANALYTICS_STORE_FLUSH_SECONDS = float(os.getenv("ANALYTICS_STORE_FLUSH_SECONDS", 5))
+ANALYTICS_STORE_RETENTION_HOURS = int(os.getenv("ANALYTICS_STORE_RETENTION_HOURS", 24 * 90))
+ANALYTICS_STORE_CACHED_ROLLUPS = int(os.getenv("ANALYTICS_STORE_CACHED_ROLLUPS", 512))
+
+# Segment block layout: header, JSON of dictionary entries new in this block, then the columns
+BLOCK_MAGIC = b'AEB1'
+BLOCK_HEADER = struct.Struct('<4sII')  # magic, rows, dictionary JSON length
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('ts', 'd'),           # Unix seconds
+    ('event', 'I'),        # dictionary id
+    ('method', 'I'),       # dictionary id
+    ('path', 'I'),         # dictionary id
+    ('status', 'H'),       # HTTP status, 0 if not a request
+    ('duration_ms', 'f'),
+)
+DICTIONARY_COLUMNS = ('event', 'method', 'path')
+
+# Latency histogram: bucket 0 is <= LATENCY_BASE_MS, bucket i ends at LATENCY_BASE_MS * LATENCY_GROWTH**i
+LATENCY_BASE_MS = 0.5
+LATENCY_GROWTH = 1.2
+LATENCY_BUCKETS = 70  # up to ~145 s
+
+GROUP_BY_FIELDS = ('event', 'method', 'path', 'status')
+INTERVALS = ('minute', 'hour', 'total', 'auto')
+AUTO_MINUTE_SPAN_SECONDS = 6 * 3600  # 'auto' uses minute buckets up to this range
+
+
+def _latency_bucket(duration_ms: float) -> int:
+    if duration_ms <= LATENCY_BASE_MS:
+        return 0
+    return min(LATENCY_BUCKETS - 1, int(math.log(duration_ms / LATENCY_BASE_MS, LATENCY_GROWTH)) + 1)
+
+
+def _bucket_value(index: int) -> float:
+    """Representative latency of a bucket (its geometric midpoint)."""
+    if index == 0:
+        return LATENCY_BASE_MS
+    return LATENCY_BASE_MS * LATENCY_GROWTH ** (index - 0.5)
+
+
+def status_class(status: int) -> str:
+    """'2xx', '4xx', ... or '-' for events that are not requests."""
+    return f"{status // 100}xx" if status else '-'
+
+
+def _hour_name(hour: int) -> str:
+    return datetime.fromtimestamp(hour, tz=timezone.utc).strftime('%Y%m%d%H')
+
+
+def _parse_hour_name(name: str) -> int:
+    return int(datetime.strptime(name, '%Y%m%d%H').replace(tzinfo=timezone.utc).timestamp())
+
+
+# --- Aggregates ---
+# An aggregate is [count, errors (5xx), total_ms, max_ms, {latency bucket: count}]
+
+def _new_aggregate() -> list:
+    return [0, 0, 0.0, 0.0, {}]
+
+
+def _add_row(aggregate: list, status: int, duration_ms: float) -> None:
+    aggregate[0] += 1
+    if status >= 500:
+        aggregate[1] += 1
+    aggregate[2] += duration_ms
+    if duration_ms > aggregate[3]:
+        aggregate[3] = duration_ms
+    histogram = aggregate[4]
+    bucket = _latency_bucket(duration_ms)
+    histogram[bucket] = histogram.get(bucket, 0) + 1
+
+
+def _merge(into: list, other: list) -> None:
+    into[0] += other[0]
+    into[1] += other[1]
+    into[2] += other[2]
+    into[3] = max(into[3], other[3])
+    histogram = into[4]
+    for bucket, count in other[4].items():
+        histogram[bucket] = histogram.get(bucket, 0) + count
+
+
+def _percentile(aggregate: list, quantile: float) -> float:
+    count, histogram = aggregate[0], aggregate[4]
+    if not count:
+        return 0.0
+    rank = quantile * count
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return min(_bucket_value(bucket), aggregate[3])
+    return aggregate[3]
+
+
+def summarize(aggregate: list) -> Dict[str, Any]:
+    """Counts and latency statistics of an aggregate (percentiles are approximate, within ~10%)."""
+    count = aggregate[0]
+    return {
+        'count': count,
+        'errors': aggregate[1],
+        'error_rate': round(aggregate[1] / count, 4) if count else 0.0,
+        'avg_ms': round(aggregate[2] / count, 2) if count else 0.0,
+        'p50_ms': round(_percentile(aggregate, 0.50), 2),
+        'p95_ms': round(_percentile(aggregate, 0.95), 2),
+        'p99_ms': round(_percentile(aggregate, 0.99), 2),
+        'max_ms': round(aggregate[3], 2),
+    }
+
+
+class HourRollup:
+    """Minute and hour aggregates of one segment, keyed by (event, method, path, status class)."""
+
+    def __init__(self, hour: int):
+        self.hour = hour
+        self.minutes: Dict[int, Dict[Tuple[str, str, str, str], list]] = {}
+        self.total: Dict[Tuple[str, str, str, str], list] = {}
+        self.rows = 0
+        self.segment_bytes = 0
+
+    def add(self, ts: float, event: str, method: str, path: str, status: int, duration_ms: float) -> None:
+        key = (event, method, path, status_class(status))
+        minute = self.minutes.setdefault(int(ts // 60) * 60, {})
+        aggregate = minute.get(key)
+        if aggregate is None:
+            aggregate = minute[key] = _new_aggregate()
+        _add_row(aggregate, status, duration_ms)
+        aggregate = self.total.get(key)
+        if aggregate is None:
+            aggregate = self.total[key] = _new_aggregate()
+        _add_row(aggregate, status, duration_ms)
+        self.rows += 1
+
+    def to_json(self) -> Dict[str, Any]:
+        keys = list(self.total)
+        index = {key: position for position, key in enumerate(keys)}
+
+        def encode(aggregates: Dict[Tuple, list]) -> List[list]:
+            return [[index[key]] + aggregate[:4] + [aggregate[4]] for key, aggregate in aggregates.items()]
+
+        return {
+            'version': 1,
+            'hour': self.hour,
+            'rows': self.rows,
+            'segment_bytes': self.segment_bytes,
+            'keys': keys,
+            'total': encode(self.total),
+            'minutes': {str(minute): encode(aggregates) for minute, aggregates in self.minutes.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'HourRollup':
+        rollup = cls(data['hour'])
+        rollup.rows = data['rows']
+        rollup.segment_bytes = data['segment_bytes']
+        keys = [tuple(key) for key in data['keys']]
+
+        def decode(entries: List[list]) -> Dict[Tuple, list]:
+            return {
+                keys[entry[0]]: [entry[1], entry[2], entry[3], entry[4], {int(b): n for b, n in entry[5].items()}]
+                for entry in entries
+            }
+
+        rollup.total = decode(data['total'])
+        rollup.minutes = {int(minute): decode(entries) for minute, entries in data['minutes'].items()}
+        return rollup
+
+
+# --- Segments ---
+
+def read_segment(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]], int]:
+    """Decode a segment file.
+
+    Args:
+        path: Segment file
+
+    Returns:
+        Tuple of (blocks as column name -> array, dictionaries, bytes of complete blocks).
+        A block cut short by a crash and anything after it are ignored.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    view = memoryview(data)
+    blocks: List[Dict[str, Any]] = []
+    dictionaries: Dict[str, List[str]] = {name: [] for name in DICTIONARY_COLUMNS}
+    offset = 0
+    while offset + BLOCK_HEADER.size <= len(data):
+        magic, rows, dictionary_length = BLOCK_HEADER.unpack_from(data, offset)
+        if magic != BLOCK_MAGIC:
+            break
+        position = offset + BLOCK_HEADER.size
+        end = position + dictionary_length + sum(rows * array.array(code).itemsize for _, code in COLUMNS)
+        if end > len(data):
+            break
+        additions = json.loads(bytes(view[position:position + dictionary_length]))
+        position += dictionary_length
+        block = {}
+        for name, code in COLUMNS:
+            column = array.array(code)
+            size = rows * column.itemsize
+            column.frombytes(view[position:position + size])
+            if sys.byteorder != 'little':
+                column.byteswap()
+            block[name] = column
+            position += size
+        for name in DICTIONARY_COLUMNS:
+            dictionaries[name].extend(additions.get(name, []))
+        blocks.append(block)
+        offset = end
+    return blocks, dictionaries, offset
+
+
+class _Segment:
+    """This process's segment for one hour, open for appending."""
+
+    def __init__(self, directory: str, hour: int):
+        base = os.path.join(directory, f"events-{_hour_name(hour)}-{os.getpid()}")
+        self.path = base + '.seg'
+        self.rollup_path = base + '.rollup.json'
+        self.rollup = HourRollup(hour)
+        self.ids: Dict[str, Dict[str, int]] = {name: {} for name in DICTIONARY_COLUMNS}
+        self.size = 0
+
+        if os.path.exists(self.path):
+            # Same pid as an earlier run: continue its dictionaries and drop a torn last block
+            blocks, dictionaries, valid_bytes = read_segment(self.path)
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+            for name, values in dictionaries.items():
+                self.ids[name] = {value: index for index, value in enumerate(values)}
+            self.rollup = _rollup_from_blocks(hour, blocks, dictionaries)
+            self.size = self.rollup.segment_bytes = valid_bytes
+
+    def append(self, rows: Sequence[Tuple[float, str, str, str, int, float]]) -> None:
+        """Write rows as one block and add them to the rollup."""
+        additions: Dict[str, List[str]] = {}
+        columns = {name: array.array(code) for name, code in COLUMNS}
+        for ts, event, method, path, status, duration_ms in rows:
+            columns['ts'].append(ts)
+            for name, value in (('event', event), ('method', method), ('path', path)):
+                ids = self.ids[name]
+                value_id = ids.get(value)
+                if value_id is None:
+                    value_id = ids[value] = len(ids)
+                    additions.setdefault(name, []).append(value)
+                columns[name].append(value_id)
+            columns['status'].append(min(max(int(status), 0), 0xFFFF))
+            columns['duration_ms'].append(duration_ms)
+            self.rollup.add(ts, event, method, path, status, duration_ms)
+
+        dictionary_json = json.dumps(additions).encode('utf-8')
+        parts = [BLOCK_HEADER.pack(BLOCK_MAGIC, len(rows), len(dictionary_json)), dictionary_json]
+        for name, _ in COLUMNS:
+            column = columns[name]
+            if sys.byteorder != 'little':
+                column.byteswap()
+            parts.append(column.tobytes())
+        block = b''.join(parts)
+        with open(self.path, 'ab') as f:
+            f.write(block)
+        self.size += len(block)
+        self.rollup.segment_bytes = self.size
+        _write_rollup(self.rollup_path, self.rollup)
+
+
+def _rollup_from_blocks(hour: int, blocks: List[Dict[str, Any]], dictionaries: Dict[str, List[str]]) -> HourRollup:
+    rollup = HourRollup(hour)
+    events, methods, paths = (dictionaries[name] for name in DICTIONARY_COLUMNS)
+    for block in blocks:
+        for ts, event, method, path, status, duration_ms in zip(*(block[name] for name, _ in COLUMNS)):
+            rollup.add(ts, events[event], methods[method], paths[path], status, duration_ms)
+    return rollup
+
+
+def _write_rollup(path: str, rollup: HourRollup) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(rollup.to_json(), f, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+# --- Store ---
+
+class EventStore:
+    """Append-only columnar event store with minute/hour rollup queries."""
+
+    def __init__(self, path: str = ANALYTICS_STORE_PATH,
+                 flush_rows: int = ANALYTICS_STORE_FLUSH_ROWS,
+                 flush_seconds: float = ANALYTICS_STORE_FLUSH_SECONDS,
+                 retention_hours: int = ANALYTICS_STORE_RETENTION_HOURS):
+        """Initialize the store and start its flush thread.
+
+        Args:
+            path: Directory for segment and rollup files
+            flush_rows: Buffered rows that trigger a flush
+            flush_seconds: Maximum time rows stay buffered
+            retention_hours: Segments older than this are deleted
+        """
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.retention_hours = retention_hours
+        os.makedirs(self.path, exist_ok=True)
+
+        self._pending: List[Tuple[float, str, str, str, int, float]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()  # also held by queries, which read the live rollups
+        self._segments: Dict[int, _Segment] = {}
+        self._rollup_cache: 'OrderedDict[str, HourRollup]' = OrderedDict()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='analytics-event-store', daemon=True)
+        self._thread.start()
+
+    # --- Writing ---
+
+    def append(self, event: str, path: str, method: str = '', status: int = 0,
+               duration_ms: float = 0.0, timestamp: Optional[float] = None) -> None:
+        """Buffer one row; it is written by the flush thread.
+
+        Args:
+            event: Event name (e.g. 'api_request', 'page_view')
+            path: Route or path the event belongs to
+            method: HTTP method
+            status: HTTP status code (0 if not a request)
+            duration_ms: Request duration
+            timestamp: Unix time of the event (defaults to now)
+        """
+        row = (time.time() if timestamp is None else timestamp, event, method or '', path or '',
+               int(status or 0), float(duration_ms or 0.0))
+        with self._lock:
+            self._pending.append(row)
+            pending = len(self._pending)
+        if pending >= self.flush_rows and not self._wake.is_set():
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing analytics events: {str(e)}")
+
+    def flush(self) -> int:
+        """Write buffered rows to their hour segments.
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+
+            by_hour: Dict[int, List[Tuple[float, str, str, str, int, float]]] = {}
+            for row in rows:
+                by_hour.setdefault(int(row[0] // 3600) * 3600, []).append(row)
+            for hour, hour_rows in sorted(by_hour.items()):
+                segment = self._segments.get(hour)
+                if segment is None:
+                    segment = self._segments[hour] = _Segment(self.path, hour)
+                    self._roll(hour)
+                segment.append(hour_rows)
+            return len(rows)
+
+    def _roll(self, newest_hour: int) -> None:
+        """Close segments of past hours and delete expired files."""
+        for hour in [h for h in self._segments if h < newest_hour - 3600]:
+            del self._segments[hour]
+        cutoff = newest_hour - self.retention_hours * 3600
+        for hour, names in self._files_by_hour().items():
+            if hour < cutoff:
+                for name in names:
+                    for suffix in ('.seg', '.rollup.json'):
+                        try:
+                            os.remove(os.path.join(self.path, name + suffix))
+                        except FileNotFoundError:
+                            pass
+
+    def close(self) -> None:
+        """Stop the flush thread and write what is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self.flush()
+
+    # --- Reading ---
+
+    def _files_by_hour(self) -> Dict[int, List[str]]:
+        """Hour -> segment base names (without suffix) of all processes."""
+        files: Dict[int, List[str]] = {}
+        for filename in os.listdir(self.path):
+            if not (filename.startswith('events-') and filename.endswith('.seg')):
+                continue
+            base = filename[:-len('.seg')]
+            try:
+                hour = _parse_hour_name(base.split('-')[1])
+            except (IndexError, ValueError):
+                continue
+            files.setdefault(hour, []).append(base)
+        return files
+
+    def _load_rollup(self, base: str, hour: int) -> Optional[HourRollup]:
+        """Rollup of a segment, rebuilt from the segment if missing or stale."""
+        segment_path = os.path.join(self.path, base + '.seg')
+        rollup_path = os.path.join(self.path, base + '.rollup.json')
+        try:
+            segment_bytes = os.path.getsize(segment_path)
+        except OSError:
+            return None
+
+        cached = self._rollup_cache.get(base)
+        if cached and cached.segment_bytes == segment_bytes:
+            self._rollup_cache.move_to_end(base)
+            return cached
+
+        rollup = None
+        try:
+            with open(rollup_path) as f:
+                rollup = HourRollup.from_json(json.load(f))
+        except (OSError, ValueError, KeyError):
+            pass
+        if rollup is None or rollup.segment_bytes != segment_bytes:
+            logger.info(f"Rebuilding analytics rollup for {base}")
+            blocks, dictionaries, valid_bytes = read_segment(segment_path)
+            rollup = _rollup_from_blocks(hour, blocks, dictionaries)
+            rollup.segment_bytes = segment_bytes
+            if valid_bytes == segment_bytes:
+                # Only persist when the segment is complete; a segment being written is rechecked later
+                _write_rollup(rollup_path, rollup)
+
+        self._rollup_cache[base] = rollup
+        while len(self._rollup_cache) > ANALYTICS_STORE_CACHED_ROLLUPS:
+            self._rollup_cache.popitem(last=False)
+        return rollup
+
+    def _rollups(self, first_hour: int, end: float) -> Iterator[HourRollup]:
+        """Rollups of all segments for hours in [first_hour, end); the caller holds the flush lock."""
+        own = {os.path.basename(segment.path)[:-len('.seg')]: segment for segment in self._segments.values()}
+        for hour, bases in sorted(self._files_by_hour().items()):
+            if hour < first_hour or hour >= end:
+                continue
+            for base in bases:
+                if base in own:
+                    # This process's live segment: its in-memory rollup is current
+                    yield own[base].rollup
+                    continue
+                rollup = self._load_rollup(base, hour)
+                if rollup is not None:
+                    yield rollup
+
+    def query(self, start: float, end: float, group_by: Sequence[str] = (),
+              interval: str = 'auto', filters: Optional[Dict[str, str]] = None,
+              limit: Optional[int] = None) -> Dict[str, Any]:
+        """Aggregate events between two times from the rollups.
+
+        Buckets are aligned to the minute or hour. Hours only partly inside
+        [start, end) are summed from their minute rollups, so at either
+        resolution the range is honoured to the minute.
+
+        Args:
+            start: Range start (Unix seconds, inclusive)
+            end: Range end (Unix seconds, exclusive)
+            group_by: Any of 'event', 'method', 'path', 'status' (status class)
+            interval: 'minute', 'hour', 'total' (no time buckets) or 'auto'
+                (minutes up to a 6 hour range, hours beyond)
+            filters: Field -> value; 'path' accepts fnmatch globs
+            limit: Maximum rows (the busiest groups are kept)
+
+        Returns:
+            Dictionary with the resolved interval, rows and overall totals
+
+        Raises:
+            ValueError: For an unknown group-by field, filter or interval
+        """
+        unknown = [name for name in list(group_by) + list(filters or {}) if name not in GROUP_BY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}; expected {', '.join(GROUP_BY_FIELDS)}")
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval '{interval}'; expected {', '.join(INTERVALS)}")
+        if interval in ('auto', 'total'):
+            resolution = 'minute' if end - start <= AUTO_MINUTE_SPAN_SECONDS else 'hour'
+        else:
+            resolution = interval
+        bucketed = interval != 'total'
+
+        field_index = {name: position for position, name in enumerate(GROUP_BY_FIELDS)}
+        group_positions = [field_index[name] for name in group_by]
+        path_filter = (filters or {}).get('path')
+        exact_filters = [(field_index[name], value) for name, value in (filters or {}).items() if name != 'path']
+
+        groups: Dict[Tuple, list] = {}
+        totals = _new_aggregate()
+        first_hour = int(start // 3600) * 3600
+        first_minute = int(start // 60) * 60
+        with self._flush_lock:
+            # Include rows still buffered in memory
+            self.flush()
+            for rollup in self._rollups(first_hour, end):
+                if resolution == 'hour' and first_minute <= rollup.hour and rollup.hour + 3600 <= end:
+                    buckets = [(rollup.hour, rollup.total)]
+                elif resolution == 'hour':
+                    # Edge hour: only the minutes inside the range, reported under the hour
+                    buckets = [(rollup.hour, aggregates) for minute, aggregates in rollup.minutes.items()
+                               if first_minute <= minute < end]
+                else:
+                    buckets = [(minute, aggregates) for minute, aggregates in rollup.minutes.items()
+                               if first_minute <= minute < end]
+                for bucket, aggregates in buckets:
+                    for key, aggregate in aggregates.items():
+                        if any(key[position] != value for position, value in exact_filters):
+                            continue
+                        if path_filter and not fnmatch.fnmatchcase(key[2], path_filter):
+                            continue
+                        group = tuple(key[position] for position in group_positions)
+                        if bucketed:
+                            group = (bucket,) + group
+                        target = groups.get(group)
+                        if target is None:
+                            target = groups[group] = _new_aggregate()
+                        _merge(target, aggregate)
+                        _merge(totals, aggregate)
+
+        rows = []
+        for group, aggregate in groups.items():
+            row: Dict[str, Any] = {}
+            values = group
+            if bucketed:
+                row['bucket'] = datetime.fromtimestamp(group[0], tz=timezone.utc).isoformat()
+                values = group[1:]
+            row.update(zip(group_by, values))
+            row.update(summarize(aggregate))
+            rows.append(row)
+        rows.sort(key=lambda row: (row.get('bucket', ''), -row['count']))
+        if limit is not None and len(rows) > limit:
+            rows = sorted(rows, key=lambda row: -row['count'])[:limit]
+            rows.sort(key=lambda row: (row.get('bucket', ''), -row['count']))
+
+        return {
+            'start': datetime.fromtimestamp(start, tz=timezone.utc).isoformat(),
+            'end': datetime.fromtimestamp(end, tz=timezone.utc).isoformat(),
+            'interval': resolution if bucketed else 'total',
+            'group_by': list(group_by),
+            'rows': rows,
+            'totals': summarize(totals),
+        }
+
+    def scan(self, start: float, end: float) -> Iterator[Dict[str, Any]]:
+        """Raw rows between two times, read from the segments.
+
+        Args:
+            start: Range start (Unix seconds, inclusive)
+            end: Range end (Unix seconds, exclusive)
+
+        Yields:
+            One dictionary per row, in file order
+        """
+        self.flush()
+        first_hour = int(start // 3600) * 3600
+        for hour, bases in sorted(self._files_by_hour().items()):
+            if hour < first_hour or hour >= end:
+                continue
+            for base in bases:
+                blocks, dictionaries, _ = read_segment(os.path.join(self.path, base + '.seg'))
+                events, methods, paths = (dictionaries[name] for name in DICTIONARY_COLUMNS)
+                for block in blocks:
+                    for ts, event, method, path, status, duration_ms in zip(*(block[name] for name, _ in COLUMNS)):
+                        if start <= ts < end:
+                            yield {
+                                'timestamp': ts,
+                                'event': events[event],
+                                'method': methods[method],
+                                'path': paths[path],
+                                'status': status,
+                                'duration_ms': duration_ms,
+                            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Segment files, bytes on disk and rows waiting to be flushed."""
+        files = self._files_by_hour()
+        size = 0
+        for bases in files.values():
+            for base in bases:
+                try:
+                    size += os.path.getsize(os.path.join(self.path, base + '.seg'))
+                except OSError:
+                    pass
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'path': self.path,
+            'hours': len(files),
+            'segments': sum(len(bases) for bases in files.values()),
+            'segment_bytes': size,
+            'pending_rows': pending,
+        }
+
+
+_store: Optional[EventStore] = None
+_store_lock = threading.Lock()
+
+
+def get_event_store() -> EventStore:
+    """Get the process-wide analytics event store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore()
+        return _store
@@ -0,0 +1,327 @@
+"""
+Bounded, cached extraction of structured data from web pages.
+
+Competitor research used to re-crawl every site for every workflow, with an
+unbounded fan-out. ``ExtractionPipeline`` instead:
+
+- caps concurrent calls per crawl provider (e.g. Firecrawl) with a semaphore,
+- spaces requests to the same domain (one at a time, ``EXTRACTION_DOMAIN_INTERVAL_SECONDS`` apart),
+- caches extracted data per normalized URL in SQLite. Within
+  ``EXTRACTION_CACHE_FRESH_SECONDS`` the cached data is used as is. After that
+  the page is revalidated with ``If-None-Match``/``If-Modified-Since`` and only
+  re-extracted when it changed,
+- takes a fresh extraction's validators from the provider's page metadata
+  when it reports them, and otherwise fetches them in the background after
+  the extraction instead of delaying it,
+- shares one extraction between concurrent requests for the same URL, and
+- yields results as each URL finishes (``stream``).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.extraction_pipeline')
+
+# --- Configuration ---
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "extraction_cache.db")
+# Cached data is used without revalidation for this long
+EXTRACTION_CACHE_FRESH_SECONDS = int(os.getenv("EXTRACTION_CACHE_FRESH_SECONDS", 6 * 3600))
+# Entries older than this are re-extracted even if the page reports no change
+EXTRACTION_CACHE_MAX_AGE_SECONDS = int(os.getenv("EXTRACTION_CACHE_MAX_AGE_SECONDS", 14 * 86400))
+EXTRACTION_PROVIDER_CONCURRENCY = int(os.getenv("EXTRACTION_PROVIDER_CONCURRENCY", 4))
+EXTRACTION_DOMAIN_INTERVAL_SECONDS = float(os.getenv("EXTRACTION_DOMAIN_INTERVAL_SECONDS", 2.0))
+EXTRACTION_REVALIDATE_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_REVALIDATE_TIMEOUT_SECONDS", 10))
+EXTRACTION_USER_AGENT = os.getenv("EXTRACTION_USER_AGENT", "DecisionPointsBot/1.0 (+https://decisionpoints.intellisol.cc)")
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a URL: lower-cased scheme and host, no fragment, no trailing slash."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+class ExtractionCache:
+    """SQLite store of extracted data with the page's HTTP validators."""
+
+    def __init__(self, path: Optional[str] = EXTRACTION_CACHE_PATH):
+        """Initialize cache.
+
+        Args:
+            path: SQLite file (None or empty for an in-memory database)
+        """
+        self.path = path or ':memory:'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "url TEXT PRIMARY KEY, data TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "extracted_at REAL NOT NULL, validated_at REAL NOT NULL)"
+        )
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, etag, last_modified, extracted_at, validated_at FROM extractions WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'data': json.loads(row[0]), 'etag': row[1], 'last_modified': row[2],
+            'extracted_at': row[3], 'validated_at': row[4],
+        }
+
+    def set(self, url: str, data: Dict[str, Any], etag: Optional[str], last_modified: Optional[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (url, data, etag, last_modified, extracted_at, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(data, default=str), etag, last_modified, now, now),
+            )
+
+    def set_validators(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Store the HTTP validators of an existing entry."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE extractions SET etag = ?, last_modified = ? WHERE url = ?", (etag, last_modified, url)
+            )
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as just revalidated."""
+        with self._lock:
+            self._conn.execute("UPDATE extractions SET validated_at = ? WHERE url = ?", (time.time(), url))
+
+
+class ExtractionPipeline:
+    """Provider-bounded, domain-polite, cached extraction runner."""
+
+    def __init__(
+        self,
+        provider: str,
+        extract: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        cache: Optional[ExtractionCache] = None,
+        provider_concurrency: int = EXTRACTION_PROVIDER_CONCURRENCY,
+        domain_interval: float = EXTRACTION_DOMAIN_INTERVAL_SECONDS,
+        fresh_seconds: int = EXTRACTION_CACHE_FRESH_SECONDS,
+        max_age_seconds: int = EXTRACTION_CACHE_MAX_AGE_SECONDS,
+    ):
+        """Initialize pipeline.
+
+        Args:
+            provider: Crawl provider name; calls to the same provider share one concurrency limit
+            extract: Coroutine function returning JSON-serializable data for a URL (None if nothing found)
+            cache: Extraction cache (uses EXTRACTION_CACHE_PATH if None)
+            provider_concurrency: Concurrent extract calls allowed for the provider
+            domain_interval: Minimum seconds between requests to one domain
+            fresh_seconds: Age below which cached data is used without revalidation
+            max_age_seconds: Age above which cached data is always re-extracted
+        """
+        self.provider = provider
+        self.extract = extract
+        self.cache = cache if cache is not None else ExtractionCache()
+        self.provider_concurrency = provider_concurrency
+        self.domain_interval = domain_interval
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+        # asyncio primitives belong to one event loop, so they are kept per loop
+        self._provider_semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._domain_locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+        self._domain_last_request: Dict[str, float] = {}
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+        self._http_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._background: Set["asyncio.Task[None]"] = set()
+        self._stats: Counter = Counter()
+
+    # --- Limits ---
+
+    def _provider_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._provider_semaphores.get(id(loop))
+        if semaphore is None:
+            semaphore = self._provider_semaphores[id(loop)] = asyncio.Semaphore(self.provider_concurrency)
+        return semaphore
+
+    async def _polite(self, url: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a request once the domain's previous request is ``domain_interval`` in the past."""
+        domain = urlsplit(url).netloc.lower()
+        key = (id(asyncio.get_running_loop()), domain)
+        lock = self._domain_locks.get(key)
+        if lock is None:
+            lock = self._domain_locks[key] = asyncio.Lock()
+        async with lock:
+            wait = self._domain_last_request.get(domain, 0.0) + self.domain_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await request()
+            finally:
+                self._domain_last_request[domain] = time.monotonic()
+
+    def _http_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        entry = self._http_clients.get(id(loop))
+        if entry is not None and entry[0] is loop:
+            return entry[1]
+        for key, (client_loop, _) in list(self._http_clients.items()):
+            if client_loop.is_closed():
+                del self._http_clients[key]
+        client = httpx.AsyncClient(
+            timeout=EXTRACTION_REVALIDATE_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            headers={'User-Agent': EXTRACTION_USER_AGENT},
+        )
+        self._http_clients[id(loop)] = (loop, client)
+        return client
+
+    # --- HTTP validators ---
+
+    @staticmethod
+    def _validators_from(data: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """ETag and Last-Modified from the provider's page metadata, when it reports them."""
+        metadata = data.get('metadata')
+        if not isinstance(metadata, dict):
+            return None, None
+        fields = {name.lower().replace('_', '-'): value for name, value in metadata.items() if isinstance(value, str)}
+        return fields.get('etag'), fields.get('last-modified') or fields.get('lastmodified')
+
+    async def _conditional_get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                               polite: bool = True) -> Tuple[int, Optional[str], Optional[str]]:
+        """Issue a (conditional) GET without reading the body.
+
+        Args:
+            url: Page URL
+            etag: Cached ETag, sent as If-None-Match
+            last_modified: Cached Last-Modified, sent as If-Modified-Since
+            polite: Wait for the domain's request interval first
+
+        Returns:
+            (status code, ETag, Last-Modified); status 0 if the request failed
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        async def _request() -> Tuple[int, Optional[str], Optional[str]]:
+            async with self._http_client().stream('GET', url, headers=headers) as response:
+                return response.status_code, response.headers.get('etag'), response.headers.get('last-modified')
+
+        try:
+            return await (self._polite(url, _request) if polite else _request())
+        except httpx.HTTPError as e:
+            logger.debug(f"Validator request to {url} failed: {e}")
+            return 0, None, None
+
+    # --- Extraction ---
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Extracted data for a URL, from cache when it is still valid."""
+        key = normalize_url(url)
+        entry = self.cache.get(key)
+        now = time.time()
+
+        if entry is not None and now - entry['extracted_at'] < self.max_age_seconds:
+            if now - entry['validated_at'] < self.fresh_seconds:
+                self._stats['fresh_hits'] += 1
+                return entry['data']
+            if entry['etag'] or entry['last_modified']:
+                status, _, _ = await self._conditional_get(url, entry['etag'], entry['last_modified'])
+                if status == 304:
+                    self.cache.touch(key)
+                    self._stats['revalidated'] += 1
+                    logger.debug(f"{url} unchanged (304); reusing cached extraction.")
+                    return entry['data']
+                self._stats['changed'] += 1
+
+        return await self._extract_shared(url, key)
+
+    async def _extract_shared(self, url: str, key: str) -> Optional[Dict[str, Any]]:
+        """Extract once for all concurrent callers asking for the same URL."""
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[Optional[Dict[str, Any]]]" = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            data = await self._extract_and_store(url, key)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+            return data
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    async def _extract_and_store(self, url: str, key: str) -> Optional[Dict[str, Any]]:
+        self._stats['extractions'] += 1
+
+        async def _extract() -> Optional[Dict[str, Any]]:
+            async with self._provider_semaphore():
+                return await self.extract(url)
+
+        data = await self._polite(url, _extract)
+        if not data:
+            return data
+
+        etag, last_modified = self._validators_from(data)
+        self.cache.set(key, data, etag, last_modified)
+        if not (etag or last_modified):
+            # Not reported by the provider: fetch them without holding up this result
+            task = asyncio.ensure_future(self._store_validators(url, key))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return data
+
+    async def _store_validators(self, url: str, key: str) -> None:
+        # Runs right after the provider's crawl, so it skips the domain interval
+        status, etag, last_modified = await self._conditional_get(url, polite=False)
+        if status and (etag or last_modified):
+            self.cache.set_validators(key, etag, last_modified)
+            self._stats['validators_fetched'] += 1
+
+    async def stream(self, urls: List[str]) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], Optional[BaseException]]]:
+        """Extract several URLs concurrently, yielding ``(url, data, error)`` as each finishes."""
+        async def _one(url: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[BaseException]]:
+            try:
+                return url, await self.get(url), None
+            except Exception as e:
+                return url, None, e
+
+        tasks = [asyncio.ensure_future(_one(url)) for url in dict.fromkeys(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache hit, revalidation and extraction counters."""
+        stats = dict(self._stats)
+        served = stats.get('fresh_hits', 0) + stats.get('revalidated', 0)
+        lookups = served + stats.get('extractions', 0)
+        stats['cache_hit_rate'] = served / lookups if lookups else 0.0
+        return stats
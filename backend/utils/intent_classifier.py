@@ -0,0 +1,491 @@
+"""
+Local fast-path intent classifier for the OrchestratorAgent.
+
+Picking which agent handles a prompt used to cost a full LLM round trip on
+every task. ``IntentClassifier`` answers locally when it is confident:
+
+1. A keyword/regex rule table. A prompt that matches the rules of exactly one
+   agent is classified without further work once those rules have proven
+   themselves: each rule's confidence is the Wilson lower bound of its
+   agreement with the logged LLM decisions it matched, so a rule without a
+   track record defers to the next tier.
+2. A TF-IDF nearest-neighbour model trained on past LLM classifications,
+   which are appended to a JSONL log as they happen.
+
+Predictions below the confidence threshold fall back to the LLM, whose answer
+then becomes new training data. Confident local answers never reach the LLM,
+so a sampled share of them (``INTENT_SHADOW_SAMPLE_RATE``) is also labelled by
+the LLM in the background and logged as a shadow decision. Run
+``python -m utils.intent_classifier`` to evaluate the local tiers against the
+logged LLM decisions, including the live agreement of shadowed answers.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.intent_classifier')
+
+# --- Configuration ---
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.75))
+# JSONL log of LLM classifications used as training data (empty disables persistence)
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", "intent_classifications.jsonl")
+INTENT_MAX_EXAMPLES = int(os.getenv("INTENT_MAX_EXAMPLES", 5000))
+# Labelled examples needed before the nearest-neighbour tier is trusted
+INTENT_MIN_EXAMPLES = int(os.getenv("INTENT_MIN_EXAMPLES", 25))
+INTENT_NEIGHBOURS = int(os.getenv("INTENT_NEIGHBOURS", 5))
+# Nearest neighbours less similar than this are not considered a match
+INTENT_MIN_SIMILARITY = float(os.getenv("INTENT_MIN_SIMILARITY", 0.3))
+# Share of confident local answers also classified by the LLM for evaluation (0 disables)
+INTENT_SHADOW_SAMPLE_RATE = float(os.getenv("INTENT_SHADOW_SAMPLE_RATE", 0.05))
+
+INTENT_LABELS = (
+    "market_analyzer", "content_generator", "lead_generator",
+    "freelance_tasker", "web_searcher", "workflow_manager", "self",
+)
+
+# z-score of the Wilson lower bound used as a rule's confidence
+INTENT_RULE_CONFIDENCE_Z = float(os.getenv("INTENT_RULE_CONFIDENCE_Z", 1.96))
+
+# Each pattern names a request for the agent, not just a word it often involves
+INTENT_RULES: Dict[str, List[str]] = {
+    "lead_generator": [
+        r"\b(find|generate|get|build) (me )?(some |more |new )?(sales |b2b )?leads\b",
+        r"\blead generation\b", r"\b(leads|prospects|users) (on|from) quora\b",
+        r"\boutreach (list|targets)\b",
+    ],
+    "freelance_tasker": [
+        r"\b(upwork|fiverr) (jobs?|gigs?|projects?|proposals?|bids?)\b",
+        r"\bfreelance (jobs?|gigs?|projects?|work)\b",
+        r"\b(bid|apply) (on|for) (\w+ )?(freelance |client )?(jobs|gigs|projects)\b",
+    ],
+    "content_generator": [
+        r"\b(write|draft) (me )?(a |an )?(\w+ )?(blog|article|post|newsletter)",
+        r"\b(write|draft) (me )?(some |a few )?(tweets|captions|social media posts)\b",
+        r"\b(write|draft|generate) (some )?(marketing|ad|sales) copy\b",
+    ],
+    "market_analyzer": [
+        r"\bmarket (analysis|research|sizing|gaps?|opportunit\w*) (for|on|of|in)\b",
+        r"\b(analy[sz]e|research) (the )?(\w+ )?(market|niche|competitors)\b",
+        r"\bcompetitor analysis\b", r"\bprofitable niches?\b",
+    ],
+    "web_searcher": [
+        r"^\s*(search|look up|lookup) (the web |online )?(for )?\w", r"\bsearch (the )?(web|internet|online)\b",
+        r"\bfind (information|info|news) (on|about)\b", r"\blatest news\b",
+    ],
+    "workflow_manager": [
+        r"\bautonomous income\b", r"\bincome (generation )?workflow\b", r"\b(start|run|resume) (the |a )?workflow\b",
+        r"\blaunch (a |an )?(new )?(product|business|saas)\b",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class IntentPrediction(NamedTuple):
+    label: Optional[str]
+    confidence: float
+    source: str  # 'rules', 'knn' or 'none'
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word unigrams plus adjacent bigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def wilson_lower_bound(successes: int, total: int, z: float = INTENT_RULE_CONFIDENCE_Z) -> float:
+    """Lower bound of the Wilson score interval for a success rate (0 without observations)."""
+    if total <= 0:
+        return 0.0
+    rate = successes / total
+    denominator = 1 + z * z / total
+    centre = rate + z * z / (2 * total)
+    margin = z * math.sqrt(rate * (1 - rate) / total + z * z / (4 * total * total))
+    return max(0.0, (centre - margin) / denominator)
+
+
+class RuleTable:
+    """Keyword/regex rules mapping prompts to agent keys, calibrated on logged LLM decisions."""
+
+    def __init__(self, rules: Dict[str, List[str]] = INTENT_RULES):
+        self.rules = {
+            label: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for label, patterns in rules.items()
+        }
+        # (label, pattern) -> [prompts matched, of which the LLM chose label]
+        self._counts: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+
+    def _matches(self, prompt: str) -> Dict[str, List[str]]:
+        matched: Dict[str, List[str]] = {}
+        for label, patterns in self.rules.items():
+            hits = [p.pattern for p in patterns if p.search(prompt)]
+            if hits:
+                matched[label] = hits
+        return matched
+
+    def observe(self, prompt: str, label: str) -> None:
+        """Count an LLM decision against every rule the prompt matches."""
+        for rule_label, patterns in self._matches(prompt).items():
+            for pattern in patterns:
+                counts = self._counts[(rule_label, pattern)]
+                counts[0] += 1
+                counts[1] += rule_label == label
+
+    def calibrate(self, decisions: Iterable[Dict[str, Any]]) -> "RuleTable":
+        """Recompute rule confidences from logged LLM decisions."""
+        self._counts.clear()
+        for entry in decisions:
+            self.observe(entry['prompt'], entry['label'])
+        return self
+
+    def confidence(self, label: str, pattern: str) -> float:
+        matched, agreed = self._counts.get((label, pattern), (0, 0))
+        return wilson_lower_bound(agreed, matched)
+
+    def rule_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Matches, LLM agreement and confidence per rule."""
+        return {
+            f"{label}: {pattern}": {'matched': matched, 'agreed': agreed, 'confidence': round(wilson_lower_bound(agreed, matched), 4)}
+            for (label, pattern), (matched, agreed) in sorted(self._counts.items())
+        }
+
+    def predict(self, prompt: str) -> IntentPrediction:
+        matched = self._matches(prompt)
+        if len(matched) == 1:
+            label, patterns = next(iter(matched.items()))
+            return IntentPrediction(label, max(self.confidence(label, pattern) for pattern in patterns), 'rules')
+        # No match, or conflicting matches: let the next tier decide
+        return IntentPrediction(None, 0.0, 'none')
+
+
+class TfidfNearestNeighbours:
+    """Cosine-similarity k-NN over sparse TF-IDF vectors, rebuilt lazily after new examples."""
+
+    def __init__(self, neighbours: int = INTENT_NEIGHBOURS, min_similarity: float = INTENT_MIN_SIMILARITY):
+        self.neighbours = neighbours
+        self.min_similarity = min_similarity
+        self._examples: List[Tuple[List[str], str]] = []
+        self._idf: Dict[str, float] = {}
+        self._vectors: List[Dict[str, float]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> "TfidfNearestNeighbours":
+        self._examples = [(tokenize(prompt), label) for prompt, label in examples]
+        self._dirty = True
+        return self
+
+    def add(self, prompt: str, label: str, max_examples: int = INTENT_MAX_EXAMPLES) -> None:
+        self._examples.append((tokenize(prompt), label))
+        if len(self._examples) > max_examples:
+            del self._examples[:len(self._examples) - max_examples]
+        self._dirty = True
+
+    def _rebuild(self) -> None:
+        document_frequency: Counter = Counter()
+        for tokens, _ in self._examples:
+            document_frequency.update(set(tokens))
+        total = len(self._examples)
+        self._idf = {term: math.log((1 + total) / (1 + df)) + 1.0 for term, df in document_frequency.items()}
+        self._vectors = [self._vectorize(tokens) for tokens, _ in self._examples]
+        # Inverted index so only examples sharing a term are scored
+        self._postings = defaultdict(list)
+        for index, vector in enumerate(self._vectors):
+            for term in vector:
+                self._postings[term].append(index)
+        self._dirty = False
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(token for token in tokens if token in self._idf)
+        vector = {term: (1 + math.log(count)) * self._idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def predict(self, prompt: str) -> IntentPrediction:
+        if not self._examples:
+            return IntentPrediction(None, 0.0, 'none')
+        if self._dirty:
+            self._rebuild()
+
+        query = self._vectorize(tokenize(prompt))
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in query.items():
+            for index in self._postings.get(term, ()):
+                scores[index] += weight * self._vectors[index][term]
+
+        nearest = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:self.neighbours]
+        nearest = [(index, similarity) for index, similarity in nearest if similarity >= self.min_similarity]
+        if not nearest:
+            return IntentPrediction(None, 0.0, 'none')
+
+        votes: Dict[str, float] = defaultdict(float)
+        for index, similarity in nearest:
+            votes[self._examples[index][1]] += similarity
+        label, weight = max(votes.items(), key=lambda item: item[1])
+        # Similarity-weighted vote share, scaled down when even the best neighbour is a weak match
+        confidence = (weight / sum(votes.values())) * min(1.0, nearest[0][1] / 0.6)
+        return IntentPrediction(label, confidence, 'knn')
+
+
+class IntentClassifier:
+    """Rules first, then nearest neighbours; callers fall back to the LLM when not confident."""
+
+    def __init__(
+        self,
+        log_path: Optional[str] = INTENT_LOG_PATH,
+        threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+        min_examples: int = INTENT_MIN_EXAMPLES,
+        rules: Optional[RuleTable] = None,
+        shadow_rate: float = INTENT_SHADOW_SAMPLE_RATE,
+    ):
+        """Initialize classifier.
+
+        Args:
+            log_path: JSONL file of past LLM decisions to train on and append to (None disables)
+            threshold: Minimum confidence for a local answer
+            min_examples: Labelled examples needed before the nearest-neighbour tier is used
+            rules: Rule table (uses INTENT_RULES if None); calibrated on the decision log
+            shadow_rate: Share of accepted local answers to also label with the LLM
+        """
+        self.log_path = log_path or None
+        self.threshold = threshold
+        self.shadow_rate = shadow_rate
+        self.min_examples = min_examples
+        self.rules = rules or RuleTable()
+        self.model = TfidfNearestNeighbours()
+        self._lock = threading.Lock()
+        self._stats = {'rules': 0, 'knn': 0, 'fallback': 0, 'recorded': 0, 'shadowed': 0}
+        if self.log_path:
+            decisions = load_decisions(self.log_path)
+            self.rules.calibrate(decisions)
+            self.model.fit((entry['prompt'], entry['label']) for entry in decisions[-INTENT_MAX_EXAMPLES:])
+            logger.info(f"Intent classifier loaded {len(self.model)} logged decisions from {self.log_path}.")
+
+    def fit(self, decisions: List[Dict[str, Any]]) -> "IntentClassifier":
+        """Calibrate the rules and train the nearest-neighbour tier on LLM decisions."""
+        with self._lock:
+            self.rules.calibrate(decisions)
+            self.model.fit((entry['prompt'], entry['label']) for entry in decisions[-INTENT_MAX_EXAMPLES:])
+        return self
+
+    def predict(self, prompt: str) -> IntentPrediction:
+        """Best local prediction regardless of the threshold."""
+        with self._lock:
+            prediction = self.rules.predict(prompt)
+            if self.accepts(prediction) or len(self.model) < self.min_examples:
+                return prediction
+            # A rule without enough agreement yet defers to the nearest neighbours
+            neighbours = self.model.predict(prompt)
+            return neighbours if neighbours.confidence > prediction.confidence else prediction
+
+    def accepts(self, prediction: IntentPrediction) -> bool:
+        """Whether a prediction is confident enough to skip the LLM."""
+        return prediction.label is not None and prediction.confidence >= self.threshold
+
+    def classify(self, prompt: str) -> IntentPrediction:
+        """Predict locally and count whether the answer is used or falls back to the LLM."""
+        prediction = self.predict(prompt)
+        with self._lock:
+            self._stats[prediction.source if self.accepts(prediction) else 'fallback'] += 1
+        return prediction
+
+    def should_shadow(self, prediction: IntentPrediction) -> bool:
+        """Whether to also label an accepted local answer with the LLM."""
+        if self.shadow_rate <= 0 or not self.accepts(prediction):
+            return False
+        return self.shadow_rate >= 1.0 or random.random() < self.shadow_rate
+
+    def record(self, prompt: str, label: str, local: Optional[IntentPrediction] = None, shadow: bool = False) -> None:
+        """Add an LLM decision to the training data and the decision log.
+
+        Args:
+            prompt: Classified prompt
+            label: Agent key chosen by the LLM
+            local: Local prediction made for the same prompt, logged for shadow evaluation
+            shadow: The local prediction was used and the LLM only labelled it
+        """
+        if label not in INTENT_LABELS:
+            return
+        entry = {'prompt': prompt, 'label': label, 'timestamp': time.time()}
+        if local is not None and local.label is not None:
+            entry['local_label'] = local.label
+            entry['local_confidence'] = round(local.confidence, 4)
+            entry['local_source'] = local.source
+        if shadow:
+            entry['shadow'] = True
+
+        with self._lock:
+            self.rules.observe(prompt, label)
+            self.model.add(prompt, label)
+            self._stats['recorded'] += 1
+            self._stats['shadowed'] += shadow
+            if self.log_path:
+                try:
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry) + '\n')
+                except OSError as e:
+                    logger.warning(f"Could not append to intent decision log {self.log_path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counts of local answers per tier and LLM fallbacks."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['examples'] = len(self.model)
+        answered = stats['rules'] + stats['knn']
+        total = answered + stats['fallback']
+        stats['local_rate'] = answered / total if total else 0.0
+        return stats
+
+
+def load_decisions(path: str) -> List[Dict[str, Any]]:
+    """Read logged LLM decisions, skipping malformed lines."""
+    if not os.path.exists(path):
+        return []
+    decisions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('prompt') and entry.get('label') in INTENT_LABELS:
+                decisions.append(entry)
+    return decisions
+
+
+def shadow_agreement(decisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Agreement of the local answers that were served with the LLM's shadow labels.
+
+    Unlike ``evaluate``, which replays the current classifier, this scores the
+    answers as they were given at the time, per tier.
+
+    Returns:
+        Shadowed decision count, overall agreement and per-tier breakdown
+    """
+    tiers: Dict[str, Counter] = defaultdict(Counter)
+    confusions: Counter = Counter()
+    for entry in decisions:
+        if not entry.get('shadow') or not entry.get('local_label'):
+            continue
+        counts = tiers[entry.get('local_source', 'unknown')]
+        counts['total'] += 1
+        if entry['local_label'] == entry['label']:
+            counts['agree'] += 1
+        else:
+            confusions[f"{entry['label']} -> {entry['local_label']}"] += 1
+
+    total = sum(counts['total'] for counts in tiers.values())
+    agree = sum(counts['agree'] for counts in tiers.values())
+    return {
+        'decisions': total,
+        'agreement': agree / total if total else 0.0,
+        'tiers': {
+            tier: dict(counts, agreement=counts['agree'] / counts['total'])
+            for tier, counts in tiers.items()
+        },
+        'top_confusions': confusions.most_common(10),
+    }
+
+
+def evaluate(
+    decisions: List[Dict[str, Any]],
+    threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+    folds: int = 5,
+    min_examples: int = INTENT_MIN_EXAMPLES,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Cross-validate the local tiers against logged LLM decisions.
+
+    The LLM label is treated as ground truth. Each fold calibrates the rules
+    and trains the nearest-neighbour tier on the other folds, so no prompt is
+    scored by a model that has seen it.
+
+    Returns:
+        Coverage (share answered locally), accuracy of local answers,
+        per-tier, per-label and per-rule breakdowns, and the most common confusions
+    """
+    shuffled = list(decisions)
+    random.Random(seed).shuffle(shuffled)
+    folds = max(2, min(folds, len(shuffled))) if len(shuffled) > 1 else 1
+
+    tiers: Dict[str, Counter] = defaultdict(Counter)
+    per_label: Dict[str, Counter] = defaultdict(Counter)
+    confusions: Counter = Counter()
+    latencies: List[float] = []
+
+    for fold in range(folds):
+        test = shuffled[fold::folds]
+        train = [entry for index, entry in enumerate(shuffled) if index % folds != fold]
+        classifier = IntentClassifier(log_path=None, threshold=threshold, min_examples=min_examples).fit(train)
+
+        for entry in test:
+            started = time.perf_counter()
+            prediction = classifier.classify(entry['prompt'])
+            latencies.append(time.perf_counter() - started)
+            per_label[entry['label']]['total'] += 1
+            if not classifier.accepts(prediction):
+                tiers['fallback']['total'] += 1
+                continue
+            correct = prediction.label == entry['label']
+            tiers[prediction.source]['total'] += 1
+            tiers[prediction.source]['correct'] += correct
+            per_label[entry['label']]['local'] += 1
+            per_label[entry['label']]['correct'] += correct
+            if not correct:
+                confusions[f"{entry['label']} -> {prediction.label}"] += 1
+
+    total = len(shuffled)
+    local = sum(tiers[tier]['total'] for tier in ('rules', 'knn'))
+    correct = sum(tiers[tier]['correct'] for tier in ('rules', 'knn'))
+    latencies.sort()
+    return {
+        'decisions': total,
+        'threshold': threshold,
+        'coverage': local / total if total else 0.0,
+        'local_accuracy': correct / local if local else 0.0,
+        # Accuracy of the whole pipeline when fallbacks go to the LLM
+        'end_to_end_agreement': (correct + tiers['fallback']['total']) / total if total else 0.0,
+        'tiers': {tier: dict(counts) for tier, counts in tiers.items()},
+        'per_label': {label: dict(counts) for label, counts in per_label.items()},
+        # Rule confidences as served when calibrated on every logged decision
+        'rules': RuleTable().calibrate(shuffled).rule_stats(),
+        'top_confusions': confusions.most_common(10),
+        'p50_local_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        'p99_local_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier against logged LLM decisions.")
+    parser.add_argument('log_path', nargs='?', default=INTENT_LOG_PATH, help="JSONL decision log")
+    parser.add_argument('--threshold', type=float, nargs='+', default=[INTENT_CONFIDENCE_THRESHOLD],
+                        help="Confidence threshold(s) to evaluate")
+    parser.add_argument('--folds', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    decisions = load_decisions(args.log_path)
+    if not decisions:
+        print(f"No logged decisions found in {args.log_path}.", file=sys.stderr)
+        return 1
+    for threshold in args.threshold:
+        print(json.dumps(evaluate(decisions, threshold=threshold, folds=args.folds), indent=2))
+    print(json.dumps({'shadow': shadow_agreement(decisions)}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
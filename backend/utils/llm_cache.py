@@ -0,0 +1,362 @@
+"""
+Shared response cache for LLM calls.
+
+Agents route their Gemini calls through ``LLMCache.generate``. Responses are
+cached on an exact key of (model, prompt hash, generation config) in a SQLite
+file that survives restarts, with a TTL per agent. Concurrent identical calls
+share one request.
+
+An optional near-duplicate tier (``LLM_CACHE_SEMANTIC``) embeds the variable
+input a caller passes as ``semantic_text`` (never the templated prompt, whose
+shared boilerplate makes unrelated requests look alike) locally with hashed
+word and character n-grams, and reuses a cached response when the input for
+the same agent, model and config is almost identical (cosine similarity at or
+above ``LLM_CACHE_SEMANTIC_THRESHOLD``). Calls without ``semantic_text`` only
+use exact matches.
+"""
+
+import os
+import json
+import math
+import time
+import zlib
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import setup_logger
+
+try:
+    from prometheus_client import Counter as PrometheusCounter
+except ImportError:  # Metrics are optional; stats() is always available
+    PrometheusCounter = None
+
+logger = setup_logger('utils.llm_cache')
+
+# --- Configuration ---
+# SQLite file for cached responses (empty keeps the cache in memory only)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_DEFAULT_TTL_SECONDS = int(os.getenv("LLM_CACHE_DEFAULT_TTL_SECONDS", 6 * 3600))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() == "true"
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", 0.95))
+# Most recent entries per (agent, model, config) scope kept in the near-duplicate index
+LLM_CACHE_SEMANTIC_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SEMANTIC_MAX_ENTRIES", 2000))
+LLM_CACHE_PURGE_EVERY = int(os.getenv("LLM_CACHE_PURGE_EVERY", 500))
+
+# Per-agent TTLs in seconds; LLM_CACHE_TTLS (JSON object) overrides entries
+AGENT_TTLS: Dict[str, int] = {
+    'orchestrator': 24 * 3600,
+    'improvement': 24 * 3600,
+    'code_generation': 24 * 3600,
+    'content_generation': 6 * 3600,
+}
+try:
+    AGENT_TTLS.update({agent: int(ttl) for agent, ttl in json.loads(os.getenv("LLM_CACHE_TTLS", "{}")).items()})
+except (ValueError, AttributeError) as e:
+    logger.warning(f"Ignoring invalid LLM_CACHE_TTLS: {e}")
+
+EMBEDDING_BUCKETS = 1 << 18
+
+if PrometheusCounter is not None:
+    _LOOKUP_COUNTER = PrometheusCounter(
+        'llm_cache_lookups_total',
+        'LLM cache lookups by agent and outcome (exact, semantic, miss)',
+        ['agent', 'outcome']
+    )
+else:
+    _LOOKUP_COUNTER = None
+
+
+def embed(text: str) -> Dict[int, float]:
+    """Locally computed sparse embedding: hashed word unigrams/bigrams and character trigrams, L2-normalized."""
+    normalized = ' '.join(text.lower().split())
+    words = normalized.split(' ')
+    features: Counter = Counter()
+    features.update(f"w:{word}" for word in words)
+    features.update(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    features.update(f"c:{normalized[i:i + 3]}" for i in range(max(0, len(normalized) - 2)))
+
+    vector: Dict[int, float] = defaultdict(float)
+    for feature, count in features.items():
+        vector[zlib.crc32(feature.encode('utf-8')) % EMBEDDING_BUCKETS] += 1 + math.log(count)
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {bucket: weight / norm for bucket, weight in vector.items()} if norm else {}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+def _config_fingerprint(config: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(config or {}, sort_keys=True, default=str)
+
+
+def make_cache_key(model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Exact cache key for (model, prompt hash, generation config)."""
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{model}\0{prompt_hash}\0{_config_fingerprint(config)}".encode('utf-8')).hexdigest()
+
+
+class LLMCacheStore:
+    """SQLite storage for cached responses and their prompt embeddings."""
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH):
+        """Initialize store.
+
+        Args:
+            path: SQLite file (None or empty for an in-memory database)
+        """
+        self.path = path or ':memory:'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, scope TEXT NOT NULL, response TEXT NOT NULL, "
+            "embedding TEXT, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_scope ON llm_cache (scope, created_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, scope: str, response: str, ttl: int, embedding: Optional[Dict[int, float]] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, scope, response, embedding, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, response, json.dumps(embedding) if embedding is not None else None, now, now + ttl),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def scope_embeddings(self, scope: str, limit: int) -> List[Tuple[str, Dict[int, float], float]]:
+        """Most recent unexpired (key, embedding, expires_at) rows for a scope, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, embedding, expires_at FROM llm_cache "
+                "WHERE scope = ? AND embedding IS NOT NULL AND expires_at > ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (scope, time.time(), limit),
+            ).fetchall()
+        return [(key, {int(b): w for b, w in json.loads(embedding).items()}, expires_at) for key, embedding, expires_at in reversed(rows)]
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class LLMCache:
+    """Exact and near-duplicate response cache in front of LLM calls."""
+
+    def __init__(
+        self,
+        store: Optional[LLMCacheStore] = None,
+        semantic: bool = LLM_CACHE_SEMANTIC,
+        semantic_threshold: float = LLM_CACHE_SEMANTIC_THRESHOLD,
+        agent_ttls: Optional[Dict[str, int]] = None,
+        default_ttl: int = LLM_CACHE_DEFAULT_TTL_SECONDS,
+    ):
+        """Initialize cache.
+
+        Args:
+            store: Persistent response store (uses LLM_CACHE_PATH if None)
+            semantic: Also reuse responses for near-duplicate inputs of calls that pass semantic_text
+            semantic_threshold: Minimum cosine similarity for a near-duplicate hit
+            agent_ttls: TTL in seconds per agent name (uses AGENT_TTLS if None)
+            default_ttl: TTL for agents without an entry in agent_ttls
+        """
+        self.store = store if store is not None else LLMCacheStore()
+        self.semantic = semantic
+        self.semantic_threshold = semantic_threshold
+        self.agent_ttls = agent_ttls if agent_ttls is not None else AGENT_TTLS
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        # scope -> key -> (embedding, expires_at), loaded from the store on first use
+        self._semantic_index: Dict[str, "OrderedDict[str, Tuple[Dict[int, float], float]]"] = {}
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[str]"] = {}
+        self._stats: Dict[str, Counter] = defaultdict(Counter)
+        self._writes = 0
+
+    def ttl_for(self, agent: str) -> int:
+        return self.agent_ttls.get(agent, self.default_ttl)
+
+    def _record(self, agent: str, outcome: str) -> None:
+        with self._lock:
+            self._stats[agent][outcome] += 1
+        if _LOOKUP_COUNTER is not None and outcome in ('exact', 'semantic', 'miss'):
+            _LOOKUP_COUNTER.labels(agent=agent, outcome=outcome).inc()
+
+    def _scope_index(self, scope: str) -> "OrderedDict[str, Tuple[Dict[int, float], float]]":
+        with self._lock:
+            index = self._semantic_index.get(scope)
+        if index is None:
+            index = OrderedDict(
+                (key, (embedding, expires_at))
+                for key, embedding, expires_at in self.store.scope_embeddings(scope, LLM_CACHE_SEMANTIC_MAX_ENTRIES)
+            )
+            with self._lock:
+                index = self._semantic_index.setdefault(scope, index)
+        return index
+
+    def _semantic_lookup(self, scope: str, embedding: Dict[int, float]) -> Optional[Tuple[str, float]]:
+        """Find the most similar cached prompt in the scope above the threshold."""
+        index = self._scope_index(scope)
+        now = time.time()
+        best_key, best_similarity = None, self.semantic_threshold
+        with self._lock:
+            candidates = list(index.items())
+        for key, (candidate, expires_at) in candidates:
+            if expires_at <= now:
+                continue
+            similarity = cosine(embedding, candidate)
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return (best_key, best_similarity) if best_key else None
+
+    def _index_add(self, scope: str, key: str, embedding: Dict[int, float], expires_at: float) -> None:
+        index = self._scope_index(scope)
+        with self._lock:
+            index[key] = (embedding, expires_at)
+            index.move_to_end(key)
+            while len(index) > LLM_CACHE_SEMANTIC_MAX_ENTRIES:
+                index.popitem(last=False)
+
+    async def generate(
+        self,
+        agent: str,
+        model: str,
+        prompt: str,
+        call: Callable[[], Awaitable[str]],
+        config: Optional[Dict[str, Any]] = None,
+        ttl: Optional[int] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+        semantic_text: Optional[str] = None,
+    ) -> str:
+        """Return a cached response for the prompt, or make the call and cache its result.
+
+        Args:
+            agent: Calling agent name, used for TTLs and metrics
+            model: Model name (part of the cache key)
+            prompt: Full prompt text
+            call: Coroutine function performing the real LLM call and returning its text
+            config: Generation config and any other inputs that change the output (part of the key)
+            ttl: Override the agent's TTL in seconds
+            validate: Only responses for which this returns True are cached
+            semantic_text: The caller's variable input, without prompt boilerplate; enables
+                near-duplicate lookup for this call when the semantic tier is on
+
+        Returns:
+            The response text
+        """
+        key = make_cache_key(model, prompt, config)
+        scope = f"{agent}\0{model}\0{_config_fingerprint(config)}"
+
+        try:
+            cached_response = self.store.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed for {agent}: {type(e).__name__}: {e}")
+            cached_response = None
+        if cached_response is not None:
+            self._record(agent, 'exact')
+            logger.debug(f"LLM cache exact hit for {agent} ({model}).")
+            return cached_response
+
+        embedding = embed(semantic_text) if self.semantic and semantic_text else None
+        if embedding:
+            match = self._semantic_lookup(scope, embedding)
+            if match is not None:
+                cached_response = self.store.get(match[0])
+                if cached_response is not None:
+                    self._record(agent, 'semantic')
+                    logger.debug(f"LLM cache near-duplicate hit for {agent} ({model}, similarity {match[1]:.3f}).")
+                    return cached_response
+
+        # Share one call between identical concurrent requests
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self._record(agent, 'coalesced')
+            return await asyncio.shield(pending)
+
+        self._record(agent, 'miss')
+        future: "asyncio.Future[str]" = loop.create_future()
+        self._inflight[inflight_key] = future
+        started = time.monotonic()
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+        with self._lock:
+            self._stats[agent]['call_ms'] += int((time.monotonic() - started) * 1000)
+        if isinstance(response, str) and response.strip() and (validate is None or validate(response)):
+            self._put(agent, scope, key, response, ttl if ttl is not None else self.ttl_for(agent), embedding)
+        return response
+
+    def _put(self, agent: str, scope: str, key: str, response: str, ttl: int, embedding: Optional[Dict[int, float]]) -> None:
+        try:
+            self.store.set(key, scope, response, ttl, embedding)
+            if embedding:
+                self._index_add(scope, key, embedding, time.time() + ttl)
+            self._record(agent, 'stored')
+            self._writes += 1
+            if self._writes % LLM_CACHE_PURGE_EVERY == 0:
+                self.store.purge_expired()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed for {agent}: {type(e).__name__}: {e}")
+
+    def invalidate(self, model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> None:
+        """Drop a cached response, e.g. when it turned out to be unusable."""
+        key = make_cache_key(model, prompt, config)
+        self.store.delete(key)
+        with self._lock:
+            for index in self._semantic_index.values():
+                index.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-agent lookup outcomes and hit rates."""
+        with self._lock:
+            per_agent = {agent: dict(counts) for agent, counts in self._stats.items()}
+        for counts in per_agent.values():
+            hits = counts.get('exact', 0) + counts.get('semantic', 0) + counts.get('coalesced', 0)
+            lookups = hits + counts.get('miss', 0)
+            counts['hit_rate'] = hits / lookups if lookups else 0.0
+        return per_agent
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the process-wide LLM response cache."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
@@ -0,0 +1,295 @@
+"""
+Batched brand-name availability checks.
+
+``NameAvailabilityChecker.check_many`` takes every candidate name at once and,
+per distinct normalized name:
+
+- probes the domains directly (DNS, then RDAP for unresolved names) through a
+  ``DomainProbe``. ``StubDomainProbe`` replaces network access for local runs
+  (``NAME_AVAILABILITY_PROBE=stub``),
+- runs one web search covering both social handles and trademark/brand usage,
+  instead of one search per aspect,
+- counts a name as trademarked or in use only on a strong search signal: a
+  result on the name's own domain, a result titled with the name itself, or a
+  trademark registry listing. Plain mentions leave the verdict unclear,
+- reports a name 'available' only if its domain is free and the search ran: a
+  failed search makes the verdict 'error', and without a search the verdict
+  is at best 'uncertain',
+- memoizes verdicts by normalized name for ``NAME_AVAILABILITY_TTL_SECONDS``,
+  shared by every workflow in the process, unless a probe or the search
+  failed. Concurrent checks of the same name share one lookup.
+"""
+
+import os
+import re
+import socket
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.cache import SimpleCache
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.name_availability')
+
+# --- Configuration ---
+NAME_AVAILABILITY_PROBE = os.getenv("NAME_AVAILABILITY_PROBE", "dns").lower()
+NAME_AVAILABILITY_TLDS = [tld.strip().lstrip('.') for tld in os.getenv("NAME_AVAILABILITY_TLDS", "com,io").split(',') if tld.strip()]
+NAME_AVAILABILITY_TTL_SECONDS = int(os.getenv("NAME_AVAILABILITY_TTL_SECONDS", 24 * 3600))
+RDAP_URL = os.getenv("RDAP_URL", "https://rdap.org/domain/{domain}")
+
+SOCIAL_HOSTS = ('twitter.com', 'x.com', 'instagram.com', 'facebook.com', 'tiktok.com', 'linkedin.com')
+TRADEMARK_HOSTS = ('uspto.gov', 'tmsearch.uspto.gov', 'euipo.europa.eu', 'branddb.wipo.int', 'wipo.int', 'trademarkia.com', 'ipo.gov.uk')
+
+# (summary, status); status is 'available', 'likely_taken', 'uncertain' or 'error'
+Verdict = Tuple[str, str]
+SearchFunction = Callable[[str], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+def normalize_name(name: str) -> str:
+    """Memo key for a name: lower case, letters and digits only."""
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+class DomainProbe:
+    """Abstract base class for domain registration probes."""
+
+    async def probe(self, domain: str) -> Optional[bool]:
+        """Return True if the domain looks unregistered, False if registered, None if unknown."""
+        raise NotImplementedError
+
+
+class DnsRdapDomainProbe(DomainProbe):
+    """Resolves the domain; names that do not resolve are confirmed with an RDAP lookup."""
+
+    def __init__(self, rdap_url: str = RDAP_URL):
+        self.rdap_url = rdap_url
+
+    async def probe(self, domain: str) -> Optional[bool]:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.getaddrinfo(domain, None)
+            return False # Resolves, so it is registered
+        except socket.gaierror:
+            pass
+        # Registered domains do not always resolve; RDAP knows about registrations
+        try:
+            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
+                response = await client.get(self.rdap_url.format(domain=domain))
+            if response.status_code == 404:
+                return True
+            if response.status_code == 200:
+                return False
+            return None
+        except httpx.HTTPError as e:
+            logger.debug(f"RDAP lookup for {domain} failed: {e}")
+            return None
+
+
+class StubDomainProbe(DomainProbe):
+    """Offline probe with fixed answers, for local development and tests."""
+
+    def __init__(self, verdicts: Optional[Dict[str, Optional[bool]]] = None, default: Optional[bool] = True):
+        """Initialize probe.
+
+        Args:
+            verdicts: Domain -> availability overrides
+            default: Answer for domains not in ``verdicts``
+        """
+        self.verdicts = verdicts or {}
+        self.default = default
+
+    async def probe(self, domain: str) -> Optional[bool]:
+        return self.verdicts.get(domain, self.default)
+
+
+def create_domain_probe(kind: str = NAME_AVAILABILITY_PROBE) -> DomainProbe:
+    """Create the configured domain probe ('dns' or 'stub')."""
+    if kind == 'stub':
+        return StubDomainProbe()
+    return DnsRdapDomainProbe()
+
+
+class NameAvailabilityChecker:
+    """Checks domain, social and trademark availability for many names at once."""
+
+    def __init__(
+        self,
+        probe: Optional[DomainProbe] = None,
+        tlds: Optional[List[str]] = None,
+        ttl: int = NAME_AVAILABILITY_TTL_SECONDS,
+    ):
+        """Initialize checker.
+
+        Args:
+            probe: Domain probe (configured by NAME_AVAILABILITY_PROBE if None)
+            tlds: TLDs to probe; the first one decides the domain verdict
+            ttl: Seconds a verdict is memoized
+        """
+        self.probe = probe or create_domain_probe()
+        self.tlds = tlds or NAME_AVAILABILITY_TLDS or ['com']
+        self.ttl = ttl
+        self._memo = SimpleCache(default_timeout=ttl, max_size=10000)
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[Verdict]"] = {}
+
+    async def check_many(self, names: List[str], search: Optional[SearchFunction] = None) -> Dict[str, Verdict]:
+        """Check every name; names that normalize the same are looked up once.
+
+        Args:
+            names: Candidate brand names
+            search: Web search returning result dicts (title, summary, source), or None on error.
+                Social and trademark checks are skipped if None, so no name is reported available.
+
+        Returns:
+            Name -> (summary, status)
+        """
+        by_key: Dict[str, str] = {}
+        for name in names:
+            key = normalize_name(name)
+            if key:
+                by_key.setdefault(key, name)
+        verdicts = await asyncio.gather(*[self._check(key, name, search) for key, name in by_key.items()])
+        by_verdict = dict(zip(by_key, verdicts))
+
+        results: Dict[str, Verdict] = {}
+        for name in names:
+            key = normalize_name(name)
+            results[name] = by_verdict.get(key, ("Not a valid name for availability checks.", 'error'))
+        return results
+
+    async def _check(self, key: str, name: str, search: Optional[SearchFunction]) -> Verdict:
+        memo_key = f"{key}:{'search' if search else 'domain'}"
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), memo_key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[Verdict]" = loop.create_future()
+        self._inflight[inflight_key] = future
+        complete = False
+        try:
+            verdict, complete = await self._lookup(key, name, search)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Availability check for '{name}' failed: {e}", exc_info=True)
+            verdict = (f"Availability check failed: {e}", 'error')
+        finally:
+            self._inflight.pop(inflight_key, None)
+        # A verdict with a failed sub-check is retried on the next request
+        if complete:
+            self._memo.set(memo_key, verdict, timeout=self.ttl)
+        future.set_result(verdict)
+        return verdict
+
+    async def _lookup(self, key: str, name: str, search: Optional[SearchFunction]) -> Tuple[Verdict, bool]:
+        """Run the probes and the search for one name.
+
+        Returns:
+            (verdict, complete); complete is False if any probe or the search failed
+        """
+        domains = [f"{key}.{tld}" for tld in self.tlds]
+        query = f'"{name}" official site OR trademark OR official account'
+        probe_results, search_results = await asyncio.gather(
+            asyncio.gather(*[self.probe.probe(domain) for domain in domains]),
+            search(query) if search else asyncio.sleep(0, result=None),
+        )
+
+        domain_details = ', '.join(
+            f"{domain} {'unregistered' if available else 'registered' if available is False else 'unknown'}"
+            for domain, available in zip(domains, probe_results)
+        )
+        primary = probe_results[0]
+        domain_status = {True: "Likely Available", False: "Likely Unavailable"}.get(primary, "Unclear/Check Manually")
+
+        if search is None:
+            social_status = trademark_status = "Skipped"
+            social_details = trademark_details = "search not configured"
+        elif search_results is None:
+            social_status = trademark_status = "Error during check"
+            social_details = trademark_details = "search failed"
+        else:
+            social_status, social_details, trademark_status, trademark_details = self._interpret_search(key, search_results)
+
+        summary = (
+            f"Domain: {domain_status} ({domain_details}). "
+            f"Social: {social_status} ({social_details}). "
+            f"Trademark: {trademark_status} ({trademark_details})"
+        )
+        if search is not None and search_results is None:
+            status = 'error'
+        elif domain_status == "Likely Unavailable" or trademark_status == "Likely Unavailable":
+            status = 'likely_taken'
+        elif search is None:
+            # A free domain alone says nothing about trademarks or handles
+            status = 'uncertain'
+        elif domain_status == "Likely Available" and social_status != "Likely Unavailable":
+            # Prioritize domain availability, allow social to be unclear if domain is good
+            status = 'available'
+        else:
+            status = 'uncertain'
+        logger.info(f"Availability for '{name}': {status} - {summary}")
+        complete = None not in probe_results and (search is None or search_results is not None)
+        return (summary, status), complete
+
+    @staticmethod
+    def _interpret_search(key: str, results: List[Dict[str, Any]]) -> Tuple[str, str, str, str]:
+        """Read social handle and brand usage signals from one set of search results.
+
+        Nearly every result mentions the quoted name, so a mention alone is not
+        a signal. Brand usage needs the name's own domain (``key.<tld>``), a
+        title whose leading part is exactly the name, or a trademark registry
+        listing naming it.
+        """
+        social_hits = []
+        brand_hits = []
+        mentions = 0
+        for item in results:
+            source = str(item.get('source') or item.get('url') or '')
+            host = urlsplit(source).netloc.lower().removeprefix('www.')
+            title = str(item.get('title') or '')
+            text = normalize_name(f"{title} {item.get('summary', '')}")
+            if host in SOCIAL_HOSTS:
+                if key in normalize_name(urlsplit(source).path):
+                    social_hits.append(host)
+                continue
+            registry = any(host == tm_host or host.endswith('.' + tm_host) for tm_host in TRADEMARK_HOSTS)
+            title_head = normalize_name(re.split(r'\s[|\-\u2013\u2014:]\s|[|:]', title, maxsplit=1)[0])
+            if key in host.split('.')[:-1] or title_head == key or (registry and key in text):
+                brand_hits.append(title or source)
+            elif key in text:
+                mentions += 1
+
+        if social_hits:
+            social = ("Likely Unavailable", f"existing profiles on {', '.join(sorted(set(social_hits)))}")
+        else:
+            social = ("Unclear/Check Manually", "no matching profiles in search results")
+        if brand_hits:
+            trademark = ("Likely Unavailable", f"in use: {'; '.join(str(hit)[:80] for hit in brand_hits[:2])}")
+        elif mentions:
+            trademark = ("Unclear/Check Manually", f"mentioned in {mentions} of {len(results)} search results")
+        else:
+            trademark = ("Likely Available", f"no brand usage in {len(results)} search results")
+        return social[0], social[1], trademark[0], trademark[1]
+
+
+_checker: Optional[NameAvailabilityChecker] = None
+_checker_lock = threading.Lock()
+
+
+def get_name_availability_checker() -> NameAvailabilityChecker:
+    """Get the process-wide availability checker (verdicts are shared across workflows)."""
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            _checker = NameAvailabilityChecker()
+        return _checker
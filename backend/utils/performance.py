@@ -15,6 +15,8 @@ import hashlib
 import json
 import gzip
 import io
+import threading
+import uuid
 from typing import Any, Dict, Optional, Callable, TypeVar, Union, List, Tuple, cast
 from datetime import datetime
 
@@ -23,11 +25,77 @@ from flask import request, Response, g, current_app
 from werkzeug.wsgi import get_input_stream
 from werkzeug.http import parse_accept_header
 
+from utils.cache import SimpleCache
+from utils.logger import setup_logger
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON is used instead
+    msgpack = None
+
+logger = setup_logger('utils.performance')
+
 # Type variable for generic function return types
 T = TypeVar('T')
 
 # ===== Advanced Caching =====
 
+# Serialization markers prefixed to values stored by TieredCache. Redis may be
+# shared with other services, so only data formats are ever decoded (never pickle).
+_MSGPACK_MARKER = b'M'
+_JSON_MARKER = b'J'
+
+def _is_plain_data(value: Any, allow_bytes: bool) -> bool:
+    """Check whether a value round-trips through msgpack (or JSON, without bytes) unchanged."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+    if isinstance(value, bytes):
+        return allow_bytes
+    if isinstance(value, list):
+        return all(_is_plain_data(item, allow_bytes) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_plain_data(v, allow_bytes) for k, v in value.items())
+    return False
+
+def serialize_cache_value(value: Any) -> bytes:
+    """Serialize a cache value with msgpack, or JSON when msgpack is not installed.
+    
+    Args:
+        value: Value to serialize
+        
+    Returns:
+        Marker-prefixed serialized bytes
+        
+    Raises:
+        TypeError: If the value is not plain data
+        OverflowError: If an integer is too wide for msgpack
+    """
+    if msgpack is not None:
+        if _is_plain_data(value, allow_bytes=True):
+            return _MSGPACK_MARKER + msgpack.packb(value, use_bin_type=True)
+    elif _is_plain_data(value, allow_bytes=False):
+        return _JSON_MARKER + json.dumps(value).encode('utf-8')
+    raise TypeError(f"Cannot cache a value of type {type(value).__name__}")
+
+def deserialize_cache_value(data: bytes) -> Any:
+    """Deserialize bytes produced by serialize_cache_value.
+    
+    Args:
+        data: Marker-prefixed serialized bytes
+        
+    Returns:
+        Original value
+        
+    Raises:
+        ValueError: If the data is not in a recognized format
+    """
+    marker, payload = data[:1], data[1:]
+    if marker == _MSGPACK_MARKER and msgpack is not None:
+        return msgpack.unpackb(payload, raw=False)
+    if marker == _JSON_MARKER:
+        return json.loads(payload)
+    raise ValueError("Unrecognized cache value encoding")
+
 class CacheBackend:
     """Abstract base class for cache backends."""
     
@@ -39,6 +107,20 @@ class CacheBackend:
         """Set cache item with expiration."""
         raise NotImplementedError
     
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several items from cache; missing keys are omitted."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> None:
+        """Set several cache items with the same expiration."""
+        for key, value in mapping.items():
+            self.set(key, value, timeout)
+    
     def delete(self, key: str) -> None:
         """Delete item from cache."""
         raise NotImplementedError
@@ -183,6 +265,244 @@ class RedisCache(CacheBackend):
         for key in self.redis_client.keys(f"{self.prefix}*"):
             self.redis_client.delete(key)
 
+class TieredCache(CacheBackend):
+    """Two-tier cache: a small per-process L1 in front of a shared Redis L2.
+
+    Reads are served from L1 when possible and fall back to Redis, filling L1
+    on the way back. Writes and deletes go to Redis and are broadcast on a
+    pub/sub channel so the L1 of every other worker drops its stale copy.
+    """
+
+    def __init__(self, redis_url: str, default_timeout: int = 300, prefix: str = 'cache:',
+                 l1_max_size: int = 1024, l1_timeout: int = 30,
+                 invalidation_channel: str = 'cache:invalidate'):
+        """Initialize tiered cache.
+
+        Args:
+            redis_url: Redis connection URL
+            default_timeout: Default cache expiration in seconds
+            prefix: Key prefix for cache entries
+            l1_max_size: Maximum number of entries kept in the in-process tier
+            l1_timeout: Upper bound in seconds on how long L1 serves an entry,
+                limiting staleness if an invalidation message is missed
+            invalidation_channel: Redis pub/sub channel used for invalidation
+        """
+        self.redis_client = redis.from_url(redis_url)
+        self.default_timeout = default_timeout
+        self.prefix = prefix
+        self.l1_timeout = l1_timeout
+        self.l1 = SimpleCache(default_timeout=l1_timeout, max_size=l1_max_size)
+        self.invalidation_channel = invalidation_channel
+        self._instance_id = uuid.uuid4().hex
+        self._stats = {'l2_hits': 0, 'l2_misses': 0}
+        self._listener = threading.Thread(
+            target=self._listen_for_invalidations, name='cache-invalidation', daemon=True
+        )
+        self._listener.start()
+
+    def _make_key(self, key: str) -> str:
+        """Create a prefixed Redis key."""
+        return f"{self.prefix}{key}"
+
+    def _l1_timeout_for(self, timeout: Optional[int]) -> int:
+        """L1 entries never outlive their Redis counterpart."""
+        expiration = timeout if timeout is not None else self.default_timeout
+        return min(expiration, self.l1_timeout)
+
+    def _fill_l1(self, key: str, value: Any, pttl: int) -> None:
+        """Copy a value read from Redis into L1 for no longer than its remaining TTL.
+
+        Args:
+            key: Cache key
+            value: Deserialized value
+            pttl: Milliseconds the Redis key has left (-1: no expiry)
+        """
+        if pttl < 0:
+            self.l1.set(key, value, self.l1_timeout)
+            return
+        timeout = self._l1_timeout_for(pttl // 1000)
+        # Keys about to expire in Redis are not worth an L1 entry
+        if timeout > 0:
+            self.l1.set(key, value, timeout)
+
+    # --- Invalidation ---
+
+    def _publish_invalidation(self, keys: List[str], pipe=None) -> None:
+        """Tell other workers to drop ``keys`` from their L1 (``['*']`` clears it)."""
+        message = json.dumps({'origin': self._instance_id, 'keys': keys})
+        (pipe or self.redis_client).publish(self.invalidation_channel, message)
+
+    def _listen_for_invalidations(self) -> None:
+        """Background loop applying invalidations published by other workers."""
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.invalidation_channel)
+                # Messages may have been missed while disconnected
+                self.l1.clear()
+                for message in pubsub.listen():
+                    self._apply_invalidation(message.get('data'))
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+                time.sleep(1.0)
+
+    def _apply_invalidation(self, data: Any) -> None:
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if payload.get('origin') == self._instance_id:
+            return
+        for key in payload.get('keys', []):
+            if key == '*':
+                self.l1.clear()
+                return
+            self.l1.delete(key)
+
+    # --- Operations ---
+
+    def _decode(self, key: str, raw: Optional[bytes]) -> Optional[Any]:
+        """Decode a Redis value, treating entries in an unknown format as misses."""
+        if raw is None:
+            return None
+        try:
+            return deserialize_cache_value(raw)
+        except ValueError as e:
+            logger.warning(f"Ignoring undecodable cache entry {key}: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get item from L1, falling back to Redis.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if not found
+        """
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(self._make_key(key))
+        pipe.pttl(self._make_key(key))
+        raw, pttl = pipe.execute()
+        value = self._decode(key, raw)
+        if value is None:
+            self._stats['l2_misses'] += 1
+            return None
+
+        self._stats['l2_hits'] += 1
+        self._fill_l1(key, value, pttl)
+        return value
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several items, fetching all L1 misses and their TTLs in one Redis round trip.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of found keys to their values
+        """
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            value = self.l1.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+
+        if not missing:
+            return found
+
+        redis_keys = [self._make_key(key) for key in missing]
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.mget(redis_keys)
+        for redis_key in redis_keys:
+            pipe.pttl(redis_key)
+        raws, *pttls = pipe.execute()
+        for key, raw, pttl in zip(missing, raws, pttls):
+            value = self._decode(key, raw)
+            if value is None:
+                self._stats['l2_misses'] += 1
+                continue
+            self._stats['l2_hits'] += 1
+            self._fill_l1(key, value, pttl)
+            found[key] = value
+        return found
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        """Set cache item in both tiers and invalidate other workers' L1.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            timeout: Expiration time in seconds (uses default if None)
+        """
+        self.set_many({key: value}, timeout)
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> None:
+        """Set several items in a single pipelined Redis round trip.
+
+        Args:
+            mapping: Keys and values to cache
+            timeout: Expiration time in seconds (uses default if None)
+        """
+        if not mapping:
+            return
+        expiration = timeout if timeout is not None else self.default_timeout
+
+        # Values that cannot be encoded are not cached at all
+        encoded: Dict[str, bytes] = {}
+        for key, value in mapping.items():
+            try:
+                encoded[key] = serialize_cache_value(value)
+            except (TypeError, ValueError, OverflowError) as e:
+                logger.debug(f"Not caching {key}: {e}")
+        if not encoded:
+            return
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key, data in encoded.items():
+            pipe.setex(self._make_key(key), expiration, data)
+        self._publish_invalidation(list(encoded), pipe)
+        pipe.execute()
+
+        l1_timeout = self._l1_timeout_for(timeout)
+        for key in encoded:
+            self.l1.set(key, mapping[key], l1_timeout)
+
+    def delete(self, key: str) -> None:
+        """Delete item from both tiers.
+
+        Args:
+            key: Cache key to delete
+        """
+        self.l1.delete(key)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.delete(self._make_key(key))
+        self._publish_invalidation([key], pipe)
+        pipe.execute()
+
+    def clear(self) -> None:
+        """Clear all cache entries with this prefix in both tiers."""
+        self.l1.clear()
+        keys = list(self.redis_client.scan_iter(match=f"{self.prefix}*"))
+        pipe = self.redis_client.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*keys)
+        self._publish_invalidation(['*'], pipe)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get L1 counters together with L2 hit/miss counts."""
+        stats = {f"l1_{name}": value for name, value in self.l1.stats().items()}
+        stats.update(self._stats)
+        return stats
+
 class CacheManager:
     """Cache manager that selects the appropriate backend."""
     
@@ -209,6 +529,14 @@ class CacheManager:
         if cache_type == 'redis':
             redis_url = app.config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
             self.cache_backend = RedisCache(redis_url, default_timeout)
+        elif cache_type == 'tiered':
+            redis_url = app.config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+            self.cache_backend = TieredCache(
+                redis_url,
+                default_timeout,
+                l1_max_size=app.config.get('CACHE_L1_MAX_SIZE', 1024),
+                l1_timeout=app.config.get('CACHE_L1_TIMEOUT', 30)
+            )
         else:
             # Default to in-memory cache
             self.cache_backend = MemoryCache(default_timeout)
@@ -224,6 +552,14 @@ class CacheManager:
         """Set cache item with expiration."""
         self.cache_backend.set(key, value, timeout)
     
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several items from cache."""
+        return self.cache_backend.get_many(keys)
+    
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> None:
+        """Set several cache items with expiration."""
+        self.cache_backend.set_many(mapping, timeout)
+    
     def delete(self, key: str) -> None:
         """Delete item from cache."""
         self.cache_backend.delete(key)
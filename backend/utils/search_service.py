@@ -0,0 +1,261 @@
+"""
+Shared Brave Search service.
+
+All web searches in the process go through one ``BraveSearchService``:
+
+- one pooled ``httpx.AsyncClient`` per event loop,
+- results cached by normalized query (case, whitespace) and search options
+  for ``SEARCH_CACHE_TTL_SECONDS``, in memory or in Redis when
+  ``SEARCH_CACHE_REDIS_URL`` is set,
+- identical searches already in flight are shared instead of repeated,
+- a token bucket spreads the API rate limit across all callers. When no
+  token is available a caller waits for one, for up to
+  ``BRAVE_QUOTA_MAX_WAIT_SECONDS``, instead of failing. A 429 response pauses
+  the bucket for the server's ``Retry-After``.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from utils.cache import SimpleCache
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.search_service')
+
+# --- Configuration ---
+BRAVE_SEARCH_URL = 'https://api.search.brave.com/res/v1/web/search'
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", 6 * 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 5000))
+SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL")
+# Brave plan limits: sustained requests per second and burst size
+BRAVE_QUOTA_RATE_PER_SECOND = float(os.getenv("BRAVE_QUOTA_RATE_PER_SECOND", 1.0))
+BRAVE_QUOTA_BURST = int(os.getenv("BRAVE_QUOTA_BURST", 1))
+BRAVE_QUOTA_MAX_WAIT_SECONDS = float(os.getenv("BRAVE_QUOTA_MAX_WAIT_SECONDS", 30))
+BRAVE_MAX_429_RETRIES = int(os.getenv("BRAVE_MAX_429_RETRIES", 2))
+
+
+class SearchQuotaExceededError(Exception):
+    """Raised when a search could not get a quota token within the allowed wait."""
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for caching: lower case, single spaces."""
+    return ' '.join(query.lower().split())
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every caller in the process."""
+
+    def __init__(self, rate: float, burst: int):
+        """Initialize bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly from the future; return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def _refund(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    async def acquire(self, max_wait: float) -> float:
+        """Wait for a token (queueing behind earlier callers).
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            SearchQuotaExceededError: The token would not be available within ``max_wait``
+        """
+        wait = self._reserve()
+        if wait > max_wait:
+            self._refund()
+            raise SearchQuotaExceededError(f"Search quota exhausted; next slot in {wait:.1f}s")
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds`` (after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class BraveSearchService:
+    """Cached, coalesced, rate-limited Brave web search."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[Any] = None,
+        ttl: int = SEARCH_CACHE_TTL_SECONDS,
+        bucket: Optional[TokenBucket] = None,
+        max_wait: float = BRAVE_QUOTA_MAX_WAIT_SECONDS,
+    ):
+        """Initialize service.
+
+        Args:
+            api_key: Brave subscription token (BRAVE_API_KEY if None)
+            cache: Cache with ``get``/``set(key, value, timeout)`` (in-memory or Redis by default)
+            ttl: Seconds a result stays cached
+            bucket: Rate limiter (built from BRAVE_QUOTA_* if None)
+            max_wait: Longest a caller queues for a quota token
+        """
+        self.api_key = api_key or os.getenv("BRAVE_API_KEY")
+        self.cache = cache if cache is not None else self._default_cache()
+        self.ttl = ttl
+        self.bucket = bucket or TokenBucket(BRAVE_QUOTA_RATE_PER_SECOND, BRAVE_QUOTA_BURST)
+        self.max_wait = max_wait
+        self._clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[Dict[str, Any]]"] = {}
+        self._stats: Counter = Counter()
+
+    @staticmethod
+    def _default_cache() -> Any:
+        if SEARCH_CACHE_REDIS_URL:
+            from utils.performance import RedisCache
+            return RedisCache(SEARCH_CACHE_REDIS_URL, default_timeout=SEARCH_CACHE_TTL_SECONDS, prefix='brave:')
+        return SimpleCache(default_timeout=SEARCH_CACHE_TTL_SECONDS, max_size=SEARCH_CACHE_MAX_ENTRIES)
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(id(loop))
+        if entry is not None and entry[0] is loop:
+            return entry[1]
+        for key, (client_loop, _) in list(self._clients.items()):
+            if client_loop.is_closed():
+                del self._clients[key]
+        client = httpx.AsyncClient(
+            timeout=15.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        self._clients[id(loop)] = (loop, client)
+        return client
+
+    @staticmethod
+    def cache_key(query: str, **params: Any) -> str:
+        material = json.dumps({'q': normalize_query(query), **params}, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    async def search(self, query: str, count: int = 5, search_lang: str = 'en', text_decorations: bool = True) -> Dict[str, Any]:
+        """Run a web search and return Brave's JSON response.
+
+        Raises:
+            ValueError: No API key configured
+            SearchQuotaExceededError: No quota within ``max_wait``
+            httpx.HTTPError: The request failed
+        """
+        if not self.api_key:
+            raise ValueError("Brave API key not configured.")
+        params = {'count': count, 'search_lang': search_lang, 'text_decorations': text_decorations}
+        key = self.cache_key(query, **params)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._stats['cache_hits'] += 1
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            data = await self._fetch(query, params)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            self.cache.set(key, data, timeout=self.ttl)
+            future.set_result(data)
+            return data
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    async def _fetch(self, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {
+            'X-Subscription-Token': self.api_key,
+            'Accept': 'application/json',
+        }
+        request_params = {
+            'q': query,
+            'count': params['count'],
+            'text_decorations': str(params['text_decorations']).lower(),
+            'search_lang': params['search_lang'],
+        }
+        for attempt in range(BRAVE_MAX_429_RETRIES + 1):
+            waited = await self.bucket.acquire(self.max_wait)
+            if waited:
+                self._stats['quota_waits'] += 1
+            self._stats['requests'] += 1
+            response = await self._client().get(BRAVE_SEARCH_URL, params=request_params, headers=headers)
+            if response.status_code == 429 and attempt < BRAVE_MAX_429_RETRIES:
+                retry_after = self._retry_after(response)
+                self._stats['rate_limited'] += 1
+                logger.warning(f"Brave API rate limited; pausing searches for {retry_after:.1f}s.")
+                self.bucket.pause(retry_after)
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise SearchQuotaExceededError("Brave API kept rate limiting the request")  # pragma: no cover
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        try:
+            return max(1.0, float(response.headers.get('retry-after', 1)))
+        except ValueError:
+            return 1.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request, cache and quota counters."""
+        stats = dict(self._stats)
+        lookups = stats.get('cache_hits', 0) + stats.get('coalesced', 0) + stats.get('requests', 0)
+        stats['cache_hit_rate'] = stats.get('cache_hits', 0) / lookups if lookups else 0.0
+        return stats
+
+
+_search_service: Optional[BraveSearchService] = None
+_search_service_lock = threading.Lock()
+
+
+def get_search_service() -> BraveSearchService:
+    """Get the process-wide search service."""
+    global _search_service
+    with _search_service_lock:
+        if _search_service is None:
+            _search_service = BraveSearchService()
+        return _search_service
@@ -0,0 +1,349 @@
+"""
+Append-only Google Sheets sink with a local spool.
+
+Rows are de-duplicated on a key (for leads: website URL and username),
+appended to a local JSONL spool file and written to the sheet in chunks with
+the Sheets API ``values:append`` call. After every chunk the number of
+committed spool rows is saved next to the spool. A run whose writes fail can
+be resumed with the same ``sink_id``: rows are replayed from the last
+committed offset, so nothing is lost and nothing is written twice. If an
+append fails, its rows may have reached the sheet anyway (the response was
+lost), so the sheet's rows are read again before the next attempt.
+
+Spools live in a directory per owner (the user the run belongs to), and the
+owner is recorded in the offset file; a spool can only be resumed by its owner.
+
+Credentials come from ``GOOGLE_SHEETS_CREDENTIALS`` (service account file)
+or Application Default Credentials.
+"""
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.sheets_sink')
+
+# --- Configuration ---
+SHEETS_SPOOL_DIR = os.getenv("SHEETS_SPOOL_DIR", "sheets_spool")
+SHEETS_APPEND_CHUNK_ROWS = int(os.getenv("SHEETS_APPEND_CHUNK_ROWS", 500))
+GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
+
+# Sink IDs become file names, so they are restricted to a safe character set
+SINK_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+DRIVE_PERMISSIONS_URL = "https://www.googleapis.com/drive/v3/files/{file_id}/permissions"
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
+
+
+class SheetsUnavailableError(Exception):
+    """Raised when no Google credentials are available for the Sheets API."""
+
+
+class SinkOwnershipError(PermissionError):
+    """Raised when a spool is resumed by someone other than the user who owns it."""
+
+
+class SheetsClient:
+    """Minimal async client for the Sheets v4 REST API."""
+
+    def __init__(self, credentials_path: Optional[str] = GOOGLE_SHEETS_CREDENTIALS):
+        try:
+            import google.auth
+            from google.oauth2 import service_account
+        except ImportError as e:
+            raise SheetsUnavailableError(f"google-auth is not installed: {e}")
+        try:
+            if credentials_path:
+                self.credentials = service_account.Credentials.from_service_account_file(credentials_path, scopes=SHEETS_SCOPES)
+            else:
+                self.credentials, _ = google.auth.default(scopes=SHEETS_SCOPES)
+        except Exception as e:
+            raise SheetsUnavailableError(f"No usable Google credentials: {e}")
+        self._client = httpx.AsyncClient(timeout=60.0)
+
+    async def _headers(self) -> Dict[str, str]:
+        if not self.credentials.valid:
+            from google.auth.transport.requests import Request
+            # Token refresh is a blocking HTTP call
+            await asyncio.get_running_loop().run_in_executor(None, self.credentials.refresh, Request())
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
+        response = await self._client.request(method, url, headers=await self._headers(), **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    async def create_spreadsheet(self, title: str) -> Tuple[str, str]:
+        """Create a spreadsheet and return (spreadsheet_id, url)."""
+        data = await self._request("POST", SHEETS_API_URL, json={"properties": {"title": title}})
+        return data["spreadsheetId"], data["spreadsheetUrl"]
+
+    async def share(self, spreadsheet_id: str, email: str, role: str = "writer") -> None:
+        await self._request(
+            "POST", DRIVE_PERMISSIONS_URL.format(file_id=spreadsheet_id),
+            params={"sendNotificationEmail": "false"},
+            json={"type": "user", "role": role, "emailAddress": email},
+        )
+
+    async def get_values(self, spreadsheet_id: str, range_: str) -> List[List[Any]]:
+        data = await self._request("GET", f"{SHEETS_API_URL}/{spreadsheet_id}/values/{range_}")
+        return data.get("values", [])
+
+    async def append_rows(self, spreadsheet_id: str, range_: str, rows: List[List[Any]]) -> None:
+        await self._request(
+            "POST", f"{SHEETS_API_URL}/{spreadsheet_id}/values/{range_}:append",
+            params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+            json={"values": rows},
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class SheetSink:
+    """Chunked, de-duplicated, resumable appends of dict records to one sheet."""
+
+    def __init__(
+        self,
+        sink_id: str,
+        owner: str,
+        columns: Sequence[str],
+        key_columns: Sequence[str],
+        client: SheetsClient,
+        spreadsheet_id: Optional[str] = None,
+        title: Optional[str] = None,
+        share_with: Optional[str] = None,
+        chunk_rows: int = SHEETS_APPEND_CHUNK_ROWS,
+        spool_dir: str = SHEETS_SPOOL_DIR,
+    ):
+        """Initialize sink, picking up an existing spool for ``sink_id`` if there is one.
+
+        Args:
+            sink_id: Identifier of the spool (``SINK_ID_PATTERN``); reuse it to resume a failed run
+            owner: User the run belongs to; only they can resume its spool
+            columns: Sheet columns, in order; records are dicts keyed by these
+            key_columns: Columns that identify a row for de-duplication
+            client: Sheets API client
+            spreadsheet_id: Existing spreadsheet to append to (a new one is created if None)
+            title: Title for a newly created spreadsheet
+            share_with: Email address given write access to a newly created spreadsheet
+            chunk_rows: Rows per append request
+            spool_dir: Directory for spool and offset files
+
+        Raises:
+            ValueError: If ``sink_id`` is not a valid sink ID or ``owner`` is empty
+            SinkOwnershipError: If the existing spool for ``sink_id`` belongs to another owner
+        """
+        if not isinstance(sink_id, str) or not SINK_ID_PATTERN.match(sink_id):
+            raise ValueError(f"Invalid sheet sink ID: {sink_id!r}")
+        if not owner:
+            raise ValueError("A sheet sink needs an owner")
+        self.sink_id = sink_id
+        self.owner = str(owner)
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.client = client
+        self.title = title or f"Leads {sink_id}"
+        self.share_with = share_with
+        self.chunk_rows = chunk_rows
+        # Owner IDs are hashed so they can be used as a directory name whatever they contain
+        owner_dir = os.path.join(spool_dir, hashlib.sha256(self.owner.encode("utf-8")).hexdigest()[:32])
+        os.makedirs(owner_dir, exist_ok=True)
+        self.spool_path = os.path.join(owner_dir, f"{sink_id}.jsonl")
+        self.offset_path = os.path.join(owner_dir, f"{sink_id}.offset.json")
+
+        state = self._load_offset()
+        if state.get("owner", self.owner) != self.owner:
+            raise SinkOwnershipError(f"Sheet sink {sink_id} belongs to another user")
+        self.spreadsheet_id: Optional[str] = state.get("spreadsheet_id") or spreadsheet_id
+        self.spreadsheet_url: Optional[str] = state.get("spreadsheet_url")
+        self.committed: int = state.get("committed", 0)
+        self._header_written: bool = state.get("header_written", False)
+        self._keys = set()
+        self.spooled = 0
+        for record in self._read_spool(0):
+            self._keys.add(self._key(record))
+            self.spooled += 1
+        # Keys of rows found in the sheet itself; spooled rows matching them are not appended
+        self._sheet_keys = set()
+        self._sheet_keys_loaded = False
+        self._lock = asyncio.Lock()
+
+    # --- Spool ---
+
+    def _key(self, record: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(record.get(column) or "").strip().lower() for column in self.key_columns)
+
+    def _load_offset(self) -> Dict[str, Any]:
+        try:
+            with open(self.offset_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_offset(self) -> None:
+        tmp_path = f"{self.offset_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "owner": self.owner,
+                "spreadsheet_id": self.spreadsheet_id,
+                "spreadsheet_url": self.spreadsheet_url,
+                "committed": self.committed,
+                "header_written": self._header_written,
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def _append_spool(self, lines: List[str]) -> None:
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking file I/O (writes are fsynced) off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _read_spool(self, start: int) -> Iterable[Dict[str, Any]]:
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                for index, line in enumerate(f):
+                    if index >= start and line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    # --- Sheet ---
+
+    async def _ensure_sheet(self) -> None:
+        if self.spreadsheet_id is None:
+            self.spreadsheet_id, self.spreadsheet_url = await self.client.create_spreadsheet(self.title)
+            logger.info(f"Created spreadsheet {self.spreadsheet_id} for sink {self.sink_id}.")
+            if self.share_with:
+                await self.client.share(self.spreadsheet_id, self.share_with)
+            await self._run_blocking(self._save_offset)
+        elif self.spreadsheet_url is None:
+            self.spreadsheet_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
+
+        if not self._sheet_keys_loaded:
+            # Rows already in an existing sheet (from earlier runs) count as duplicates too
+            existing = await self.client.get_values(self.spreadsheet_id, "A:ZZ")
+            if existing:
+                header = existing[0]
+                if header[:len(self.columns)] == self.columns:
+                    self._header_written = True
+                for row in existing[1:]:
+                    self._sheet_keys.add(self._key(dict(zip(header, row))))
+                self._keys |= self._sheet_keys
+            self._sheet_keys_loaded = True
+
+    async def add(self, records: List[Dict[str, Any]]) -> int:
+        """Spool new records and append full chunks to the sheet.
+
+        Records are spooled before any Sheets API call, so a failing request
+        leaves them pending for the next flush instead of dropping them.
+
+        Returns:
+            Number of records accepted (not duplicates)
+        """
+        async with self._lock:
+            accepted = []
+            for record in records:
+                key = self._key(record)
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                accepted.append(record)
+            if accepted:
+                if not os.path.exists(self.offset_path):
+                    # Record the owner before the first spooled row
+                    await self._run_blocking(self._save_offset)
+                lines = [
+                    json.dumps({column: record.get(column, "") for column in self.columns}, default=str) + "\n"
+                    for record in accepted
+                ]
+                await self._run_blocking(self._append_spool, lines)
+                self.spooled += len(accepted)
+            if self.spooled - self.committed >= self.chunk_rows:
+                await self._ensure_sheet()
+                await self._flush_locked(full_chunks_only=True)
+            return len(accepted)
+
+    async def flush(self) -> Optional[str]:
+        """Append every uncommitted spooled row and return the spreadsheet URL."""
+        async with self._lock:
+            await self._ensure_sheet()
+            await self._flush_locked(full_chunks_only=False)
+            return self.spreadsheet_url
+
+    async def _flush_locked(self, full_chunks_only: bool) -> None:
+        if not self._header_written:
+            await self._append_rows([self.columns])
+            self._header_written = True
+            await self._run_blocking(self._save_offset)
+
+        chunk: List[List[Any]] = []
+        consumed = 0
+        pending = await self._run_blocking(lambda: list(self._read_spool(self.committed)))
+        for record in pending:
+            consumed += 1
+            if self._key(record) in self._sheet_keys:
+                # Spooled before the sheet's rows were known; already in the sheet
+                continue
+            chunk.append([record.get(column, "") for column in self.columns])
+            if len(chunk) == self.chunk_rows:
+                await self._commit_chunk(chunk, consumed)
+                chunk, consumed = [], 0
+        if consumed and (not chunk or not full_chunks_only):
+            # A trailing run of skipped rows is committed even when only full chunks are due
+            await self._commit_chunk(chunk, consumed)
+
+    async def _append_rows(self, rows: List[List[Any]]) -> None:
+        try:
+            await self.client.append_rows(self.spreadsheet_id, "A1", rows)
+        except Exception:
+            # The rows may have been appended even though the call failed (e.g. a lost
+            # response); the sheet's keys are read again before the next attempt
+            self._sheet_keys_loaded = False
+            raise
+
+    async def _commit_chunk(self, rows: List[List[Any]], consumed: int) -> None:
+        if rows:
+            await self._append_rows(rows)
+        self.committed += consumed
+        await self._run_blocking(self._save_offset)
+        logger.info(f"Sink {self.sink_id}: appended {len(rows)} rows ({self.committed}/{self.spooled} committed).")
+
+    @property
+    def pending(self) -> int:
+        """Spooled rows not yet written to the sheet."""
+        return self.spooled - self.committed
+
+    async def close(self) -> None:
+        """Close the underlying Sheets API client."""
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "SheetSink":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def discard_spool(self) -> None:
+        """Remove the spool once everything is committed."""
+        if self.pending:
+            return
+        for path in (self.spool_path, self.offset_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
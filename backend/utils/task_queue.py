@@ -0,0 +1,522 @@
+"""
+Durable background task queue for long-running agent invocations.
+
+Routes used to hand ``agent.run_async`` straight to
+``socketio.start_background_task``, which spawns an unbounded thread per
+request and loses the work if the process dies. ``TaskQueue`` instead runs
+tasks on a fixed pool of worker threads (each with its own event loop), picks
+work from priority lanes while honouring a per-user concurrency limit, and
+records every task in a durable backend (SQLite locally, Redis in production)
+so status can be polled and unfinished work is picked up again after a crash.
+
+Instances heartbeat their ownership of tasks; tasks owned by an instance whose
+heartbeat has lapsed are reclaimed by any live instance.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from collections import Counter, deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import redis
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.task_queue')
+
+# --- Configuration ---
+TASK_QUEUE_URL = os.getenv("TASK_QUEUE_URL", "sqlite:///task_queue.db")
+TASK_QUEUE_WORKERS = int(os.getenv("TASK_QUEUE_WORKERS", 8))
+TASK_QUEUE_PER_USER_LIMIT = int(os.getenv("TASK_QUEUE_PER_USER_LIMIT", 2))
+TASK_QUEUE_MAX_PENDING = int(os.getenv("TASK_QUEUE_MAX_PENDING", 1000))
+TASK_QUEUE_MAX_ATTEMPTS = int(os.getenv("TASK_QUEUE_MAX_ATTEMPTS", 3))
+TASK_QUEUE_HEARTBEAT_TTL_SECONDS = float(os.getenv("TASK_QUEUE_HEARTBEAT_TTL_SECONDS", 30))
+TASK_QUEUE_DRAIN_SECONDS = float(os.getenv("TASK_QUEUE_DRAIN_SECONDS", 30))
+
+# Lanes in the order workers take from them
+PRIORITY_LANES = ('high', 'normal', 'low')
+
+
+class TaskStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+UNFINISHED_STATUSES = (TaskStatus.QUEUED.value, TaskStatus.RUNNING.value)
+
+
+class QueueFullError(Exception):
+    """Raised when a task is submitted while the queue is at capacity."""
+
+
+class QueueClosedError(Exception):
+    """Raised when a task is submitted after shutdown has started."""
+
+
+class TaskBackend:
+    """Abstract base class for durable task record storage."""
+
+    def save(self, record: Dict[str, Any]) -> None:
+        """Insert or replace a task record."""
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task record, or None if it does not exist."""
+        raise NotImplementedError
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        """Get every queued or running task record."""
+        raise NotImplementedError
+
+    def claim(self, task_id: str, expected_owner: Optional[str], new_owner: str) -> bool:
+        """Atomically move a task to ``new_owner`` if it is still owned by ``expected_owner``."""
+        raise NotImplementedError
+
+    def heartbeat(self, owner: str, ttl: float) -> None:
+        """Mark a queue instance as alive for ``ttl`` seconds."""
+        raise NotImplementedError
+
+    def release(self, owner: str) -> None:
+        """Drop a queue instance's heartbeat so its tasks can be reclaimed at once."""
+        raise NotImplementedError
+
+    def owner_alive(self, owner: Optional[str]) -> bool:
+        """Check whether a queue instance's heartbeat is current."""
+        raise NotImplementedError
+
+
+class SQLiteTaskBackend(TaskBackend):
+    """Single-file SQLite backend for local development and single-host deployments."""
+
+    def __init__(self, path: str):
+        """Initialize backend.
+
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, owner TEXT, record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS owners (owner TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def save(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, status, owner, record) VALUES (?, ?, ?, ?)",
+                (record['id'], record['status'], record.get('owner'), json.dumps(record, default=str)),
+            )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM tasks WHERE status IN (?, ?)", UNFINISHED_STATUSES
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def claim(self, task_id: str, expected_owner: Optional[str], new_owner: str) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT owner, record FROM tasks WHERE id = ?", (task_id,)).fetchone()
+                if row is None or row[0] != expected_owner:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                record = json.loads(row[1])
+                record['owner'] = new_owner
+                self._conn.execute(
+                    "UPDATE tasks SET owner = ?, record = ? WHERE id = ?",
+                    (new_owner, json.dumps(record, default=str), task_id),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, owner: str, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO owners (owner, expires_at) VALUES (?, ?)", (owner, time.time() + ttl)
+            )
+
+    def release(self, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM owners WHERE owner = ?", (owner,))
+
+    def owner_alive(self, owner: Optional[str]) -> bool:
+        if not owner:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT expires_at FROM owners WHERE owner = ?", (owner,)).fetchone()
+        return bool(row) and row[0] > time.time()
+
+
+class RedisTaskBackend(TaskBackend):
+    """Redis backend shared by every application instance."""
+
+    def __init__(self, redis_url: str, prefix: str = 'taskqueue'):
+        """Initialize backend.
+
+        Args:
+            redis_url: Redis connection URL
+            prefix: Key prefix for task records, the unfinished set and heartbeats
+        """
+        self.redis = redis.from_url(redis_url)
+        self.prefix = prefix
+        self._unfinished_key = f"{prefix}:unfinished"
+
+    def _task_key(self, task_id: str) -> str:
+        return f"{self.prefix}:task:{task_id}"
+
+    def _owner_key(self, owner: str) -> str:
+        return f"{self.prefix}:owner:{owner}"
+
+    def save(self, record: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline()
+        pipe.set(self._task_key(record['id']), json.dumps(record, default=str))
+        if record['status'] in UNFINISHED_STATUSES:
+            pipe.sadd(self._unfinished_key, record['id'])
+        else:
+            pipe.srem(self._unfinished_key, record['id'])
+        pipe.execute()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        value = self.redis.get(self._task_key(task_id))
+        return json.loads(value) if value else None
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        task_ids = [task_id.decode('utf-8') for task_id in self.redis.smembers(self._unfinished_key)]
+        if not task_ids:
+            return []
+        values = self.redis.mget([self._task_key(task_id) for task_id in task_ids])
+        return [json.loads(value) for value in values if value]
+
+    def claim(self, task_id: str, expected_owner: Optional[str], new_owner: str) -> bool:
+        key = self._task_key(task_id)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                value = pipe.get(key)
+                if not value:
+                    return False
+                record = json.loads(value)
+                if record.get('owner') != expected_owner:
+                    return False
+                record['owner'] = new_owner
+                pipe.multi()
+                pipe.set(key, json.dumps(record, default=str))
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def heartbeat(self, owner: str, ttl: float) -> None:
+        self.redis.set(self._owner_key(owner), 1, px=int(ttl * 1000))
+
+    def release(self, owner: str) -> None:
+        self.redis.delete(self._owner_key(owner))
+
+    def owner_alive(self, owner: Optional[str]) -> bool:
+        return bool(owner) and bool(self.redis.exists(self._owner_key(owner)))
+
+
+def create_task_backend(url: str = TASK_QUEUE_URL) -> TaskBackend:
+    """Create a backend from a URL (``redis://...`` or ``sqlite:///path``)."""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisTaskBackend(url)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return SQLiteTaskBackend(url)
+
+
+def _serialize_result(result: Any) -> Any:
+    """Reduce a handler result (typically an ADK Event) to JSON-friendly data."""
+    if hasattr(result, 'type') and hasattr(result, 'data'):
+        event_type = getattr(result.type, 'value', result.type)
+        return {'type': str(event_type), 'data': result.data}
+    return result
+
+
+class TaskQueue:
+    """Bounded worker pool with priority lanes, per-user limits and durable task records."""
+
+    def __init__(
+        self,
+        backend: TaskBackend,
+        workers: int = TASK_QUEUE_WORKERS,
+        per_user_limit: int = TASK_QUEUE_PER_USER_LIMIT,
+        max_pending: int = TASK_QUEUE_MAX_PENDING,
+        max_attempts: int = TASK_QUEUE_MAX_ATTEMPTS,
+        heartbeat_ttl: float = TASK_QUEUE_HEARTBEAT_TTL_SECONDS,
+    ):
+        """Initialize queue.
+
+        Args:
+            backend: Durable storage for task records
+            workers: Number of worker threads
+            per_user_limit: Tasks one user may have running at once (0 disables)
+            max_pending: Queued tasks accepted before submit raises QueueFullError
+            max_attempts: Runs allowed before an interrupted task is marked failed
+            heartbeat_ttl: Seconds before a silent instance's tasks may be reclaimed
+        """
+        self.backend = backend
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.heartbeat_ttl = heartbeat_ttl
+        self.owner = uuid.uuid4().hex
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._lanes: Dict[str, Deque[Dict[str, Any]]] = {lane: deque() for lane in PRIORITY_LANES}
+        self._running_by_user: Counter = Counter()
+        self._running = 0
+        self._cv = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closed = False  # No new submissions
+        self._stopping = False  # Idle workers exit instead of waiting
+        self._stop_heartbeat = threading.Event()
+        self._stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'rejected': 0, 'reclaimed': 0}
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+        """Register the coroutine function that runs tasks of ``kind``.
+
+        Handlers receive the task payload, which must be JSON-serializable so
+        the task can be recovered after a restart.
+        """
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        """Start the heartbeat, reclaim orphaned tasks and start the worker threads."""
+        if self._threads:
+            return
+        self.backend.heartbeat(self.owner, self.heartbeat_ttl)
+        self._reclaim_orphans()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name='task-queue-heartbeat', daemon=True)
+        heartbeat.start()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'task-queue-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Task queue {self.owner} started with {self.workers} workers (per-user limit {self.per_user_limit}).")
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[str] = None, priority: str = 'normal') -> str:
+        """Queue a task.
+
+        Args:
+            kind: Registered handler name
+            payload: JSON-serializable handler input
+            user_id: Owner used for the per-user concurrency limit and status checks
+            priority: One of PRIORITY_LANES
+
+        Returns:
+            The new task ID
+
+        Raises:
+            QueueClosedError: If the queue is shutting down
+            QueueFullError: If max_pending tasks are already queued
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for task kind '{kind}'.")
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority '{priority}'. Expected one of {PRIORITY_LANES}.")
+
+        record = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'payload': payload,
+            'user_id': user_id,
+            'priority': priority,
+            'status': TaskStatus.QUEUED.value,
+            'owner': self.owner,
+            'attempts': 0,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        with self._cv:
+            if self._closed:
+                raise QueueClosedError("Task queue is shutting down.")
+            if self._pending_count() >= self.max_pending:
+                self._stats['rejected'] += 1
+                raise QueueFullError(f"Task queue is full ({self.max_pending} tasks pending).")
+            self.backend.save(record)
+            self._lanes[priority].append(record)
+            self._stats['submitted'] += 1
+            self._cv.notify()
+        logger.info(f"Queued task {record['id']} ({kind}, priority={priority}, user={user_id}).")
+        return record['id']
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task record from the durable backend."""
+        return self.backend.get(task_id)
+
+    def _pending_count(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _pop_runnable(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest task from the highest lane whose user is under the limit. Caller holds the lock."""
+        for lane in PRIORITY_LANES:
+            queue = self._lanes[lane]
+            for index, record in enumerate(queue):
+                user_id = record.get('user_id')
+                if user_id is None or not self.per_user_limit or self._running_by_user[user_id] < self.per_user_limit:
+                    del queue[index]
+                    return record
+        return None
+
+    def _worker_loop(self) -> None:
+        # One long-lived loop per worker so loop-bound pools (A2A transport, httpx) are reused
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while True:
+                with self._cv:
+                    record = self._pop_runnable()
+                    while record is None:
+                        if self._stopping or (self._closed and not self._pending_count()):
+                            return
+                        self._cv.wait()
+                        record = self._pop_runnable()
+                    user_id = record.get('user_id')
+                    if user_id is not None:
+                        self._running_by_user[user_id] += 1
+                    self._running += 1
+
+                try:
+                    self._run(loop, record)
+                finally:
+                    with self._cv:
+                        if user_id is not None:
+                            self._running_by_user[user_id] -= 1
+                            if self._running_by_user[user_id] <= 0:
+                                del self._running_by_user[user_id]
+                        self._running -= 1
+                        self._cv.notify_all()
+        finally:
+            loop.close()
+
+    def _run(self, loop: asyncio.AbstractEventLoop, record: Dict[str, Any]) -> None:
+        """Run one task on the worker's loop and persist its outcome."""
+        task_id = record['id']
+        record.update(status=TaskStatus.RUNNING.value, started_at=time.time(), attempts=record.get('attempts', 0) + 1)
+        self._save(record)
+        logger.info(f"Running task {task_id} ({record['kind']}, attempt {record['attempts']}).")
+
+        try:
+            result = loop.run_until_complete(self._handlers[record['kind']](record['payload']))
+            record.update(status=TaskStatus.SUCCEEDED.value, result=_serialize_result(result))
+            self._stats['succeeded'] += 1
+        except Exception as e:
+            logger.error(f"Task {task_id} ({record['kind']}) failed: {type(e).__name__}: {e}", exc_info=True)
+            record.update(status=TaskStatus.FAILED.value, error=f"{type(e).__name__}: {e}")
+            self._stats['failed'] += 1
+        record['finished_at'] = time.time()
+        self._save(record)
+
+    def _save(self, record: Dict[str, Any]) -> None:
+        try:
+            self.backend.save(record)
+        except Exception as e:
+            logger.error(f"Failed to persist task {record['id']}: {type(e).__name__}: {e}", exc_info=True)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop_heartbeat.wait(self.heartbeat_ttl / 3):
+            try:
+                self.backend.heartbeat(self.owner, self.heartbeat_ttl)
+                self._reclaim_orphans()
+            except Exception as e:
+                logger.error(f"Task queue heartbeat failed: {type(e).__name__}: {e}", exc_info=True)
+
+    def _reclaim_orphans(self) -> None:
+        """Take over unfinished tasks whose owning instance is no longer alive."""
+        for record in self.backend.list_unfinished():
+            owner = record.get('owner')
+            if owner == self.owner or self.backend.owner_alive(owner):
+                continue
+            if record['kind'] not in self._handlers or not self.backend.claim(record['id'], owner, self.owner):
+                continue
+
+            record['owner'] = self.owner
+            self._stats['reclaimed'] += 1
+            if record['status'] == TaskStatus.RUNNING.value and record.get('attempts', 0) >= self.max_attempts:
+                record.update(
+                    status=TaskStatus.FAILED.value,
+                    error=f"Interrupted {record['attempts']} times; giving up.",
+                    finished_at=time.time(),
+                )
+                self._save(record)
+                logger.warning(f"Task {record['id']} abandoned after {record['attempts']} interrupted attempts.")
+                continue
+
+            record['status'] = TaskStatus.QUEUED.value
+            self._save(record)
+            with self._cv:
+                self._lanes.get(record.get('priority'), self._lanes['normal']).append(record)
+                self._cv.notify()
+            logger.info(f"Reclaimed task {record['id']} ({record['kind']}) from instance {owner}.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth per lane, running counts and lifetime counters."""
+        with self._cv:
+            stats = dict(self._stats)
+            stats['pending'] = {lane: len(queue) for lane, queue in self._lanes.items()}
+            stats['running'] = self._running
+            stats['running_by_user'] = dict(self._running_by_user)
+        stats['workers'] = len(self._threads)
+        return stats
+
+    def shutdown(self, drain: bool = True, timeout: float = TASK_QUEUE_DRAIN_SECONDS) -> None:
+        """Stop accepting tasks and wait for workers to finish.
+
+        With ``drain`` the workers keep running queued tasks until the queue is
+        empty or ``timeout`` passes; otherwise only running tasks are awaited.
+        Tasks left queued stay in the backend and are reclaimed on the next start.
+        """
+        with self._cv:
+            self._closed = True
+            if not drain:
+                self._stopping = True
+            self._cv.notify_all()
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive() and not self._stopping:
+                # Drain window is over: let workers exit once their current task ends
+                with self._cv:
+                    self._stopping = True
+                    self._cv.notify_all()
+
+        self._stop_heartbeat.set()
+        with self._cv:
+            running = self._running
+            unfinished = self._pending_count() + running
+        if not running:
+            try:
+                # Release ownership so a restarted instance reclaims leftovers immediately;
+                # with tasks still running the heartbeat is left to lapse instead
+                self.backend.release(self.owner)
+            except Exception as e:
+                logger.error(f"Failed to release task queue heartbeat: {type(e).__name__}: {e}", exc_info=True)
+        logger.info(f"Task queue {self.owner} shut down ({unfinished} task(s) left for recovery).")
@@ -0,0 +1,228 @@
+"""
+Incremental streaming of LLM output to SocketIO clients.
+
+While a task runs, model output is forwarded as ``task_update`` events with
+``status: 'streaming'``, a monotonically increasing ``seq`` and the text
+``delta``. Chunks are batched on a time/size window so the socket is not
+flooded with one event per token. The final ``completed``/``failed`` update
+carries ``final_seq``.
+
+Every stream keeps its deltas for a while, so a client that reconnects can
+emit ``task_stream_resume`` with ``{task_id, last_seq}`` and receive what it
+missed (see ``TaskStreamRegistry.replay``).
+
+Agents do not need a reference to the stream. The orchestrator activates it
+with ``use_task_stream`` around the work, and ``stream_completion`` publishes
+to whichever stream is active in the current context.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.task_stream')
+
+# --- Configuration ---
+STREAM_FLUSH_INTERVAL_SECONDS = float(os.getenv("STREAM_FLUSH_INTERVAL_SECONDS", 0.1))
+STREAM_FLUSH_MAX_CHARS = int(os.getenv("STREAM_FLUSH_MAX_CHARS", 512))
+# Finished streams kept for resume, and for how long
+STREAM_HISTORY_MAX_TASKS = int(os.getenv("STREAM_HISTORY_MAX_TASKS", 500))
+STREAM_HISTORY_TTL_SECONDS = float(os.getenv("STREAM_HISTORY_TTL_SECONDS", 900))
+
+_current_stream: ContextVar[Optional["TaskStream"]] = ContextVar('current_task_stream', default=None)
+
+
+class TaskStream:
+    """Batches text chunks for one task into sequenced ``task_update`` deltas."""
+
+    def __init__(
+        self,
+        task_id: str,
+        emit: Callable[..., Any],
+        flush_interval: float = STREAM_FLUSH_INTERVAL_SECONDS,
+        max_chars: int = STREAM_FLUSH_MAX_CHARS,
+    ):
+        """Initialize stream.
+
+        Args:
+            task_id: Task the deltas belong to
+            emit: SocketIO emit function (``socketio.emit``)
+            flush_interval: Longest a chunk waits before being sent, in seconds
+            max_chars: Buffered characters that trigger an immediate send
+        """
+        self.task_id = task_id
+        self.emit = emit
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self.seq = 0
+        self.deltas: List[Dict[str, Any]] = []
+        self.final: Optional[Dict[str, Any]] = None
+        self.updated_at = time.monotonic()
+        self._buffer: List[str] = []
+        self._buffered_chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = threading.Lock()
+
+    def publish(self, text: str) -> None:
+        """Queue a chunk; it is sent when the size or time window is reached."""
+        if not text or self.final is not None:
+            return
+        with self._lock:
+            self._buffer.append(text)
+            self._buffered_chars += len(text)
+            flush_now = self._buffered_chars >= self.max_chars
+        if flush_now:
+            self.flush()
+        elif self._timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()
+                return
+            self._timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self) -> None:
+        """Send buffered text as one delta."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buffer:
+                return
+            self.seq += 1
+            payload = {
+                'task_id': self.task_id,
+                'status': 'streaming',
+                'seq': self.seq,
+                'delta': ''.join(self._buffer),
+            }
+            self._buffer.clear()
+            self._buffered_chars = 0
+            self.deltas.append(payload)
+            self.updated_at = time.monotonic()
+        self.emit('task_update', payload)
+
+    def finish(self, payload: Dict[str, Any]) -> None:
+        """Flush pending text, then send and keep the final status update."""
+        self.flush()
+        with self._lock:
+            self.final = dict(payload, final_seq=self.seq)
+            self.updated_at = time.monotonic()
+        self.emit('task_update', self.final)
+
+    def replay(self, after_seq: int) -> List[Dict[str, Any]]:
+        """Deltas newer than ``after_seq``, plus the final update if the task has finished."""
+        with self._lock:
+            missed = [delta for delta in self.deltas if delta['seq'] > after_seq]
+            if self.final is not None:
+                missed.append(self.final)
+        return missed
+
+
+class TaskStreamRegistry:
+    """Recent task streams, kept so reconnecting clients can resume."""
+
+    def __init__(self, max_tasks: int = STREAM_HISTORY_MAX_TASKS, ttl: float = STREAM_HISTORY_TTL_SECONDS):
+        self.max_tasks = max_tasks
+        self.ttl = ttl
+        self._streams: "OrderedDict[str, TaskStream]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, task_id: str, emit: Callable[..., Any]) -> TaskStream:
+        """Create (or replace) the stream for a task."""
+        stream = TaskStream(task_id, emit)
+        with self._lock:
+            self._streams[task_id] = stream
+            self._streams.move_to_end(task_id)
+            self._prune()
+        return stream
+
+    def get(self, task_id: str) -> Optional[TaskStream]:
+        with self._lock:
+            return self._streams.get(task_id)
+
+    def replay(self, task_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """Updates a client that last saw ``after_seq`` has missed (empty if the task is unknown)."""
+        stream = self.get(task_id)
+        return stream.replay(after_seq) if stream else []
+
+    def _prune(self) -> None:
+        horizon = time.monotonic() - self.ttl
+        for task_id, stream in list(self._streams.items()):
+            if len(self._streams) <= self.max_tasks and (stream.final is None or stream.updated_at > horizon):
+                break
+            del self._streams[task_id]
+
+
+_registry = TaskStreamRegistry()
+
+
+def get_task_stream_registry() -> TaskStreamRegistry:
+    """Get the process-wide stream registry."""
+    return _registry
+
+
+@contextmanager
+def use_task_stream(stream: Optional[TaskStream]) -> Iterator[Optional[TaskStream]]:
+    """Make ``stream`` the target of ``publish_delta`` within this context."""
+    token = _current_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _current_stream.reset(token)
+
+
+def publish_delta(text: str) -> None:
+    """Send text to the active task stream, if any."""
+    stream = _current_stream.get()
+    if stream is not None:
+        stream.publish(text)
+
+
+async def stream_llm_text(llm: Any, prompt: str) -> AsyncIterator[str]:
+    """Yield text chunks from an LLM client, falling back to one chunk if it cannot stream.
+
+    Supports ADK LLM clients (``generate_text_stream_async``) and
+    google.generativeai models (``generate_content_async(..., stream=True)``).
+    """
+    if hasattr(llm, 'generate_text_stream_async'):
+        async for chunk in llm.generate_text_stream_async(prompt=prompt):
+            yield chunk
+    elif hasattr(llm, 'generate_content_async'):
+        response = await llm.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+    else:
+        yield await llm.generate_text_async(prompt=prompt)
+
+
+async def stream_completion(llm: Any, prompt: str) -> str:
+    """Run a completion, publishing chunks to the active stream, and return the full text."""
+    chunks = []
+    async for chunk in stream_llm_text(llm, prompt):
+        if chunk:
+            chunks.append(chunk)
+            publish_delta(chunk)
+    return ''.join(chunks)
+
+
+async def cached_stream_completion(cache: Any, agent: str, model: str, prompt: str, llm: Any, **kwargs: Any) -> str:
+    """``LLMCache.generate`` with streaming; a cached answer is published as a single delta."""
+    called = False
+
+    async def _call() -> str:
+        nonlocal called
+        called = True
+        return await stream_completion(llm, prompt)
+
+    text = await cache.generate(agent, model, prompt, _call, **kwargs)
+    if not called:
+        publish_delta(text)
+    return text
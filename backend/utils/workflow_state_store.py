@@ -0,0 +1,229 @@
+"""
+Write-behind state store for workflow runs.
+
+Workflow steps transition status several times in quick succession. Instead of
+one Firestore ``set(merge=True)`` per transition, updates are merged per
+``workflow_run_id`` in memory and flushed together after a short debounce
+window using Firestore batched writes. Callers force an immediate flush at
+durability points (step results, pending approval, failure, stop, completion);
+only step-start status updates are left to the debounce window.
+
+``InMemoryStateBackend`` stands in for Firestore so workflows can run and be
+tested offline.
+"""
+
+import os
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logger import setup_logger
+
+logger = setup_logger('utils.workflow_state_store')
+
+# --- Configuration ---
+WORKFLOW_STATE_FLUSH_SECONDS = float(os.getenv("WORKFLOW_STATE_FLUSH_SECONDS", 0.5))
+# Firestore allows at most 500 writes per batch
+FIRESTORE_MAX_BATCH_WRITES = 500
+
+
+class StateBackend:
+    """Abstract base class for workflow state backends."""
+
+    async def commit(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """Merge each document's fields into storage."""
+        raise NotImplementedError
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document, or None if it does not exist."""
+        raise NotImplementedError
+
+
+class FirestoreStateBackend(StateBackend):
+    """Firestore backend that writes each flush as batched merge-sets."""
+
+    def __init__(self, db, collection_name: str):
+        """Initialize backend.
+
+        Args:
+            db: Firestore AsyncClient
+            collection_name: Collection holding workflow run documents
+        """
+        self.db = db
+        self.collection_name = collection_name
+
+    async def commit(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        items = list(updates.items())
+        for start in range(0, len(items), FIRESTORE_MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for doc_id, data in items[start:start + FIRESTORE_MAX_BATCH_WRITES]:
+                doc_ref = self.db.collection(self.collection_name).document(doc_id)
+                batch.set(doc_ref, data, merge=True)
+            await batch.commit()
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        doc_snapshot = await self.db.collection(self.collection_name).document(doc_id).get()
+        return doc_snapshot.to_dict() if doc_snapshot.exists else None
+
+
+class InMemoryStateBackend(StateBackend):
+    """Process-local backend for offline runs and tests."""
+
+    def __init__(self):
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.commit_count = 0
+
+    async def commit(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        self.commit_count += 1
+        for doc_id, data in updates.items():
+            self.documents.setdefault(doc_id, {}).update(data)
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        document = self.documents.get(doc_id)
+        return dict(document) if document is not None else None
+
+
+class WorkflowStateStore:
+    """Coalescing, debounced writer in front of a StateBackend.
+
+    The store is shared by task-queue workers that each run their own event
+    loop. Documents taken by a flush stay visible as in-flight until their
+    commit finishes, so reads include them and a durable update waits for an
+    in-flight commit of its run started by another worker.
+    """
+
+    def __init__(self, backend: StateBackend, flush_interval: float = WORKFLOW_STATE_FLUSH_SECONDS):
+        """Initialize store.
+
+        Args:
+            backend: Backend the merged updates are committed to
+            flush_interval: Debounce window in seconds before pending updates are written
+        """
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Run ID -> (fields, commit future) of flushes still being committed, oldest first
+        self._inflight: Dict[str, List[Tuple[Dict[str, Any], "concurrent.futures.Future[None]"]]] = {}
+        self._lock = threading.Lock()
+        self._flush_handles: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.TimerHandle]] = {}
+        self._stats = {'updates': 0, 'flushes': 0, 'documents_written': 0}
+
+    async def update(self, workflow_run_id: str, data: Dict[str, Any], durable: bool = False) -> None:
+        """Queue fields to merge into a workflow run's state.
+
+        Args:
+            workflow_run_id: Workflow run document ID
+            data: Fields to merge; later updates to the same field win
+            durable: Return only once this run's state, including commits
+                started by other workers, is written
+
+        Raises:
+            Exception: For a durable update, if committing the run's state failed
+        """
+        with self._lock:
+            self._pending.setdefault(workflow_run_id, {}).update(data)
+            self._stats['updates'] += 1
+
+        if durable or self.flush_interval <= 0:
+            await self.flush(workflow_run_id)
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Arm a debounce timer on the running loop if one is not already pending."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._flush_handles.get(id(loop))
+            if entry is not None and entry[0] is loop:
+                return
+            # Forget timers of loops that closed before they fired; their updates stay pending
+            for key, (handle_loop, _) in list(self._flush_handles.items()):
+                if handle_loop.is_closed():
+                    del self._flush_handles[key]
+            handle = loop.call_later(self.flush_interval, lambda: loop.create_task(self._timed_flush(loop)))
+            self._flush_handles[id(loop)] = (loop, handle)
+
+    async def _timed_flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            entry = self._flush_handles.get(id(loop))
+            if entry is not None and entry[0] is loop:
+                del self._flush_handles[id(loop)]
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Background workflow state flush failed: {type(e).__name__}: {e}", exc_info=True)
+
+    async def flush(self, workflow_run_id: Optional[str] = None) -> None:
+        """Write pending updates in batched commits.
+
+        On failure the updates are put back (under any newer ones) and the
+        error is re-raised.
+
+        Args:
+            workflow_run_id: Flush only this run, and wait for commits of it
+                already in flight elsewhere (all runs if None)
+        """
+        future: "concurrent.futures.Future[None]" = concurrent.futures.Future()
+        with self._lock:
+            if workflow_run_id is None:
+                pending, self._pending = self._pending, {}
+                earlier = []
+            else:
+                data = self._pending.pop(workflow_run_id, None)
+                pending = {workflow_run_id: data} if data else {}
+                earlier = [commit for _, commit in self._inflight.get(workflow_run_id, [])]
+            for doc_id, data in pending.items():
+                self._inflight.setdefault(doc_id, []).append((data, future))
+
+        try:
+            if pending:
+                await self.backend.commit(pending)
+        except Exception as e:
+            with self._lock:
+                for doc_id, data in pending.items():
+                    newer = self._pending.get(doc_id, {})
+                    self._pending[doc_id] = {**data, **newer}
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(None)
+            if pending:
+                with self._lock:
+                    self._stats['flushes'] += 1
+                    self._stats['documents_written'] += len(pending)
+                logger.debug(f"Flushed workflow state for {len(pending)} run(s).")
+        finally:
+            with self._lock:
+                for doc_id in pending:
+                    commits = [entry for entry in self._inflight.get(doc_id, []) if entry[1] is not future]
+                    if commits:
+                        self._inflight[doc_id] = commits
+                    else:
+                        self._inflight.pop(doc_id, None)
+
+        # Earlier commits of this run (possibly on another worker's loop) must land too;
+        # if one failed its fields are pending again and this update is not durable
+        for commit in earlier:
+            await asyncio.wrap_future(commit)
+
+    async def get(self, workflow_run_id: str) -> Optional[Dict[str, Any]]:
+        """Read a workflow run's state, including updates not yet flushed or still being committed."""
+        # Snapshot before reading the backend, so a commit finishing in between is not missed
+        with self._lock:
+            overlay: Dict[str, Any] = {}
+            for data, _ in self._inflight.get(workflow_run_id, []):
+                overlay.update(data)
+            overlay.update(self._pending.get(workflow_run_id, {}))
+        document = await self.backend.get(workflow_run_id)
+        if document is None and not overlay:
+            return None
+        return {**(document or {}), **overlay}
+
+    def stats(self) -> Dict[str, Any]:
+        """Get update/flush counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_runs'] = len(self._pending)
+            stats['inflight_runs'] = len(self._inflight)
+        return stats